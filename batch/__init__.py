@@ -0,0 +1,8 @@
+"""bco-rag batch init file
+
+Serves as a headless wrapper for the bco-rag tool, generating every domain
+for a whole manifest (or directory) of papers with a worker pool.
+"""
+
+__version__ = "0.1"
+__author__ = "seankim658"
@@ -0,0 +1,361 @@
+""" Headless batch runner.
+
+Generates every domain for each entry of a batch manifest without any
+interactive prompts, with the entries spread over a process or thread pool.
+The outputs are written per paper exactly like the one-shot mode. Entries
+writing to the same paper output directory are run one after the other, so
+the output maps are never updated concurrently.
+
+Every finished entry is appended to a JSON lines journal as soon as it
+completes. When the batch is started again with the same journal, the
+entries already recorded as done are skipped (failed entries are retried),
+so an interrupted batch continues where it stopped. An entry interrupted
+mid-generation is generated again in full.
+
+The process pool is the default. The thread pool avoids the process start up
+cost, but every thread shares the process wide state a `BcoRag` instance
+modifies: the llama index global `Settings` (the LLM, embedding model and
+chunking settings, and in debug mode the callback manager holding the token
+counters) and `sys.stdout` (redirected while the PDFMarker loader runs). The
+thread pool is therefore only accepted when every entry has the same options,
+none of them run in debug mode and none use the PDFMarker loader, otherwise
+the `BatchRunner` constructor raises a `ValueError`.
+"""
+
+import os
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+from typing import Optional, get_args
+from bcorag import misc_functions as misc_fns
+from bcorag.bcorag import BcoRag
+from bcorag.cache import DEFAULT_CACHE_DIR
+from bcorag.custom_types.core_types import OptionKey
+from .custom_types import (
+    BatchEntry,
+    BatchPool,
+    BatchResult,
+    create_batch_result,
+)
+
+DEFAULT_WORKERS = 4
+
+
+def run_batch_entry(
+    entry: BatchEntry, output_dir: str, cache_dir: Optional[str]
+) -> BatchResult:
+    """Generates every domain for a batch entry. Runs in the pool workers, so
+    any error (including an exit requested by the entry) is caught and
+    reported in the result.
+
+    Parameters
+    ----------
+    entry : BatchEntry
+        The batch entry.
+    output_dir : str
+        The directory to dump the outputs to.
+    cache_dir : str or None
+        The root directory for the on disk caches, None disables caching.
+
+    Returns
+    -------
+    BatchResult
+        The entry result.
+    """
+    t0 = time.time()
+    filepath = entry["user_selections"]["filepath"]
+    try:
+        # the pool workers are reused across entries, so close the instance's
+        # connections before taking the next entry
+        with BcoRag(
+            entry["user_selections"], output_dir=output_dir, cache_dir=cache_dir
+        ) as bco_rag:
+            domains = list(bco_rag.generate_all().keys())
+    # `misc_fns.graceful_exit` raises SystemExit, which only fails this entry
+    except (Exception, SystemExit) as e:
+        return create_batch_result(
+            key=entry["key"],
+            filepath=filepath,
+            status="failed",
+            domains=[],
+            elapsed_time=time.time() - t0,
+            error=f"{type(e).__name__}: {e}",
+            timestamp=misc_fns.create_timestamp(),
+        )
+    return create_batch_result(
+        key=entry["key"],
+        filepath=filepath,
+        status="done",
+        domains=domains,
+        elapsed_time=time.time() - t0,
+        error=None,
+        timestamp=misc_fns.create_timestamp(),
+    )
+
+
+def _check_thread_pool(entries: list[BatchEntry]):
+    """Checks the entries can run on a thread pool. The threads share the llama
+    index global `Settings` and `sys.stdout`, so the entries must all have the
+    same options and can't run in debug mode (the token counters are attached
+    to the global callback manager) or use the PDFMarker loader (which
+    redirects stdout).
+
+    Parameters
+    ----------
+    entries : list[BatchEntry]
+        The batch entries.
+
+    Raises
+    ------
+    ValueError
+        If the entries can't share a thread pool.
+    """
+    options: set[tuple] = set()
+    for entry in entries:
+        user_selections = entry["user_selections"]
+        if user_selections["mode"] == "debug":
+            raise ValueError(
+                "The thread pool doesn't support debug mode, use the process pool."
+            )
+        if user_selections["loader"] == "PDFMarker":
+            raise ValueError(
+                "The thread pool doesn't support the PDFMarker loader, use the process pool."
+            )
+        options.add(
+            tuple(str(user_selections[option]) for option in get_args(OptionKey))
+        )
+    if len(options) > 1:
+        raise ValueError(
+            "The thread pool requires every entry to use the same options, use the process pool."
+        )
+
+
+class BatchRunner:
+    """Runs the entries of a batch manifest on a worker pool.
+
+    Attributes
+    ----------
+    _entries : list[BatchEntry]
+        The batch entries.
+    _journal_path : str
+        The JSON lines file recording the finished entries.
+    _output_dir : str
+        The directory to dump the outputs to.
+    _cache_dir : str or None
+        The root directory for the on disk caches, None disables caching.
+    _workers : int
+        The number of entries generated at once.
+    _pool : BatchPool
+        Whether the entries run on a process or thread pool.
+    _verbose : bool
+        Whether to print the progress.
+    _logger : logging.Logger
+        The batch logger.
+    """
+
+    def __init__(
+        self,
+        entries: list[BatchEntry],
+        journal_path: str,
+        output_dir: str = "./output",
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        workers: int = DEFAULT_WORKERS,
+        pool: BatchPool = "process",
+        verbose: bool = True,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        entries : list[BatchEntry]
+            The batch entries (see `batch.manifest.load_manifest`).
+        journal_path : str
+            The JSON lines file recording the finished entries, reusing the
+            journal of an interrupted batch resumes it.
+        output_dir : str, optional
+            The directory to dump the outputs to.
+        cache_dir : str or None, optional
+            The root directory for the on disk caches, None disables caching.
+        workers : int, optional
+            The number of entries generated at once.
+        pool : BatchPool, optional
+            Whether the entries run on a process or thread pool.
+        verbose : bool, optional
+            Whether to print the progress.
+
+        Raises
+        ------
+        ValueError
+            If `workers` is less than 1 or the entries can't share a thread
+            pool.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        if pool == "thread":
+            _check_thread_pool(entries)
+        self._entries = entries
+        self._journal_path = journal_path
+        self._output_dir = output_dir
+        self._cache_dir = cache_dir
+        self._workers = workers
+        self._pool = pool
+        self._verbose = verbose
+        self._logger = logging.getLogger("bcorag.batch")
+
+    def completed_keys(self) -> set[str]:
+        """Gets the entries recorded as done in the journal.
+
+        Returns
+        -------
+        set[str]
+            The keys of the finished entries.
+        """
+        if not os.path.isfile(self._journal_path):
+            return set()
+        completed: set[str] = set()
+        with open(self._journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # a partially written last line from an interrupted run
+                    continue
+                if result.get("status") == "done":
+                    completed.add(result["key"])
+        return completed
+
+    def run(self) -> list[BatchResult]:
+        """Generates every entry not yet recorded as done in the journal.
+
+        Returns
+        -------
+        list[BatchResult]
+            The results of the entries run by this call, in completion order.
+        """
+        completed = self.completed_keys()
+        remaining = [entry for entry in self._entries if entry["key"] not in completed]
+        self._log_output(
+            f"{len(self._entries)} batch entries, {len(self._entries) - len(remaining)} already done, running {len(remaining)} on {self._workers} {self._pool} worker(s)."
+        )
+
+        # entries writing to the same output directory run one after the other
+        queues: dict[str, deque[BatchEntry]] = {}
+        for entry in remaining:
+            queues.setdefault(self._output_root(entry), deque()).append(entry)
+
+        results: list[BatchResult] = []
+        executor = self._create_executor()
+        running: dict[Future[BatchResult], str] = {}
+
+        def _submit_next(output_root: str):
+            queue = queues[output_root]
+            if queue:
+                future = executor.submit(
+                    run_batch_entry, queue.popleft(), self._output_dir, self._cache_dir
+                )
+                running[future] = output_root
+
+        try:
+            for output_root in queues:
+                _submit_next(output_root)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    output_root = running.pop(future)
+                    result = future.result()
+                    self._record(result)
+                    results.append(result)
+                    _submit_next(output_root)
+        except KeyboardInterrupt:
+            self._log_output(
+                "Batch interrupted, run it again with the same journal to resume."
+            )
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        failed = sum(1 for result in results if result["status"] == "failed")
+        self._log_output(
+            f"Batch finished, {len(results) - failed} entries done, {failed} failed."
+        )
+        return results
+
+    def _create_executor(self) -> Executor:
+        """Creates the worker pool.
+
+        Returns
+        -------
+        Executor
+            The process or thread pool executor.
+        """
+        if self._pool == "thread":
+            return ThreadPoolExecutor(max_workers=self._workers)
+        return ProcessPoolExecutor(max_workers=self._workers)
+
+    def _output_root(self, entry: BatchEntry) -> str:
+        """Gets the output directory an entry writes to (matches the BcoRag
+        output path).
+
+        Parameters
+        ----------
+        entry : BatchEntry
+            The batch entry.
+
+        Returns
+        -------
+        str
+            The paper output directory.
+        """
+        file_name = entry["user_selections"]["filename"]
+        return os.path.join(
+            self._output_dir,
+            os.path.splitext(file_name.lower().replace(" ", "_").strip())[0],
+        )
+
+    def _record(self, result: BatchResult):
+        """Appends an entry result to the journal.
+
+        Parameters
+        ----------
+        result : BatchResult
+            The entry result.
+        """
+        journal_dir = os.path.dirname(self._journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        with open(self._journal_path, "ab") as f:
+            # a partially written last line from an interrupted run would
+            # swallow this result
+            if f.tell() > 0:
+                with open(self._journal_path, "rb") as journal:
+                    journal.seek(-1, os.SEEK_END)
+                    if journal.read(1) != b"\n":
+                        f.write(b"\n")
+            f.write((json.dumps(result) + "\n").encode("utf-8"))
+        if result["status"] == "done":
+            self._log_output(
+                f"Generated {', '.join(domain.upper() for domain in result['domains'])} for `{result['filepath']}` in {result['elapsed_time']:.2f}s."
+            )
+        else:
+            self._log_output(f"Failed `{result['filepath']}`: {result['error']}")
+
+    def _log_output(self, message: str):
+        """Logs a progress message and prints it in verbose mode.
+
+        Parameters
+        ----------
+        message : str
+            The message.
+        """
+        if self._verbose:
+            print(message)
+        self._logger.info(message)
@@ -0,0 +1,112 @@
+from typing import Literal, Optional, TypedDict
+from bcorag.custom_types.core_types import UserSelections
+
+BatchPool = Literal["process", "thread"]
+BatchStatus = Literal["done", "failed"]
+
+
+class BatchEntry(TypedDict):
+    """A paper to generate in a batch run.
+
+    Attributes
+    ----------
+    key : str
+        The hash of the entry's user selections, used to resume a batch.
+    user_selections : UserSelections
+        The user selections to create the BcoRag instance with.
+    """
+
+    key: str
+    user_selections: UserSelections
+
+
+def create_batch_entry(key: str, user_selections: UserSelections) -> BatchEntry:
+    """Constructor for the `BatchEntry` TypedDict.
+
+    Parameters
+    ----------
+    key : str
+        The hash of the entry's user selections.
+    user_selections : UserSelections
+        The user selections to create the BcoRag instance with.
+
+    Returns
+    -------
+    BatchEntry
+    """
+    return_data: BatchEntry = {"key": key, "user_selections": user_selections}
+    return return_data
+
+
+class BatchResult(TypedDict):
+    """Journal record of a processed batch entry.
+
+    Attributes
+    ----------
+    key : str
+        The hash of the entry's user selections.
+    filepath : str
+        The paper file path.
+    status : BatchStatus
+        Whether every domain was generated ("done") or the entry failed.
+    domains : list[str]
+        The generated domains.
+    elapsed_time : float
+        The time spent on the entry in seconds.
+    error : Optional[str]
+        The error message if the entry failed.
+    timestamp : str
+        When the entry finished.
+    """
+
+    key: str
+    filepath: str
+    status: BatchStatus
+    domains: list[str]
+    elapsed_time: float
+    error: Optional[str]
+    timestamp: str
+
+
+def create_batch_result(
+    key: str,
+    filepath: str,
+    status: BatchStatus,
+    domains: list[str],
+    elapsed_time: float,
+    error: Optional[str],
+    timestamp: str,
+) -> BatchResult:
+    """Constructor for the `BatchResult` TypedDict.
+
+    Parameters
+    ----------
+    key : str
+        The hash of the entry's user selections.
+    filepath : str
+        The paper file path.
+    status : BatchStatus
+        Whether every domain was generated ("done") or the entry failed.
+    domains : list[str]
+        The generated domains.
+    elapsed_time : float
+        The time spent on the entry in seconds.
+    error : Optional[str]
+        The error message if the entry failed.
+    timestamp : str
+        When the entry finished.
+
+    Returns
+    -------
+    BatchResult
+    """
+    return_data: BatchResult = {
+        "key": key,
+        "filepath": filepath,
+        "status": status,
+        "domains": domains,
+        "elapsed_time": elapsed_time,
+        "error": error,
+        "timestamp": timestamp,
+    }
+    return return_data
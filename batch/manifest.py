@@ -0,0 +1,278 @@
+""" Batch manifest parsing.
+
+A batch manifest lists the papers to generate, each with optional git data
+and other documents. The manifest can be:
+
+- A JSON file, either a list of paper entries or an object with a `papers`
+  list and an optional `options` object overriding the default options from
+  the `conf.json` file for the whole batch.
+- A CSV file with one paper entry per row (using the default options).
+- A directory, every PDF file in it is a paper entry without git data or
+  other documents.
+
+Each paper entry has a `filepath` and optionally a `git_url` (or a
+`local_path` to a local checkout), a `git_branch`, a list of `git_filters`
+(`filter`, `filter_type` and `value` objects, JSON encoded in CSV files)
+and a list of `other_docs` (semicolon delimited in CSV files).
+"""
+
+import os
+import csv
+import json
+from hashlib import md5
+from typing import Any, Optional, get_args
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from bcorag import misc_functions as misc_fns
+from bcorag.custom_types.core_types import (
+    GitData,
+    GitFilter,
+    GitFilters,
+    LlmCacheMode,
+    OptionKey,
+    UserSelections,
+    create_git_data,
+    create_git_filters,
+    create_user_selections,
+)
+from bcorag.local_git_loader import WORKING_TREE_REF, local_repo_identity
+from bcorag.vector_stores import missing_dependency
+from .custom_types import BatchEntry, create_batch_entry
+
+DEFAULT_BRANCH = "main"
+
+
+def load_manifest(
+    path: str,
+    llm_cache_mode: LlmCacheMode = "off",
+    config_path: str = "./bcorag/conf.json",
+) -> list[BatchEntry]:
+    """Loads the batch entries from a manifest. Entries with identical user
+    selections are only included once.
+
+    Parameters
+    ----------
+    path : str
+        The JSON or CSV manifest file path, or a directory of PDF files.
+    llm_cache_mode : LlmCacheMode, optional
+        The LLM response cache mode for every entry.
+    config_path : str, optional
+        The config JSON file with the default and supported options.
+
+    Returns
+    -------
+    list[BatchEntry]
+        The batch entries in manifest order.
+
+    Raises
+    ------
+    ValueError
+        If the manifest is malformed or references missing files.
+    """
+    option_overrides: dict[str, Any] = {}
+    if os.path.isdir(path):
+        rows: list[dict[str, Any]] = [
+            {"filepath": filepath}
+            for filepath in sorted(misc_fns.get_file_list(path, "pdf"))
+        ]
+    elif path.lower().endswith(".csv"):
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rows = [dict(row) for row in csv.DictReader(f)]
+    else:
+        data = misc_fns.load_json(path)
+        if isinstance(data, dict):
+            option_overrides = data.get("options") or {}
+            rows = data.get("papers", [])
+        elif isinstance(data, list):
+            rows = data
+        else:
+            raise ValueError(f"Could not load the batch manifest `{path}`.")
+
+    options = _batch_options(option_overrides, config_path)
+    entries: dict[str, BatchEntry] = {}
+    for row in rows:
+        filepath = row.get("filepath")
+        if not filepath or not os.path.isfile(filepath):
+            raise ValueError(
+                f"Invalid paper file `{filepath}` in the batch manifest."
+            )
+        other_docs = _parse_list(row.get("other_docs"))
+        for other_doc in other_docs:
+            if not os.path.isfile(other_doc):
+                raise ValueError(
+                    f"Invalid other document `{other_doc}` for `{filepath}`."
+                )
+        user_selections = create_user_selections(
+            llm=options["llm"],
+            embedding_model=options["embedding_model"],
+            filename=os.path.basename(filepath),
+            filepath=filepath,
+            vector_store=options["vector_store"],
+            loader=options["loader"],
+            mode=options["mode"],
+            similarity_top_k=int(options["similarity_top_k"]),
+            chunking_config=options["chunking_config"],
+            git_data=_parse_git_data(row),
+            other_docs=other_docs or None,
+            llm_cache_mode=llm_cache_mode,
+        )
+        key = entry_key(user_selections)
+        entries.setdefault(key, create_batch_entry(key, user_selections))
+    return list(entries.values())
+
+
+def entry_key(user_selections: UserSelections) -> str:
+    """Generates the hash identifying a batch entry across runs. The LLM
+    cache mode doesn't influence the key.
+
+    Parameters
+    ----------
+    user_selections : UserSelections
+        The entry's user selections.
+
+    Returns
+    -------
+    str
+        The hexidecimal MD5 hash.
+    """
+    key_data = {
+        key: value for key, value in user_selections.items() if key != "llm_cache_mode"
+    }
+    key_data["filepath"] = os.path.abspath(user_selections["filepath"])
+    key_str = json.dumps(key_data, sort_keys=True, default=str)
+    return md5(key_str.encode("utf-8")).hexdigest()
+
+
+def _batch_options(overrides: dict[str, Any], config_path: str) -> dict[str, Any]:
+    """Resolves the options for the whole batch from the config defaults and
+    the manifest overrides.
+
+    Parameters
+    ----------
+    overrides : dict[str, Any]
+        The options set in the manifest.
+    config_path : str
+        The config JSON file with the default and supported options.
+
+    Returns
+    -------
+    dict[str, Any]
+        The value of every option.
+
+    Raises
+    ------
+    ValueError
+        If the config file can't be loaded or an option isn't supported.
+    """
+    config = misc_fns.load_config_data(config_path)
+    if config is None:
+        raise ValueError(f"Error reading config file `{config_path}`.")
+    options: dict[str, Any] = {}
+    option: OptionKey
+    for option in get_args(OptionKey):
+        schema = config["options"][option]
+        value = overrides.get(option, schema.get("default"))
+        if str(value) not in schema["list"]:
+            raise ValueError(
+                f"Unsupported `{option}` option `{value}` in the batch manifest."
+            )
+        if option == "vector_store":
+            package = missing_dependency(str(value))
+            if package is not None:
+                raise ValueError(
+                    f"The `{value}` vector store requires {package}, please `pip install {package}`."
+                )
+        options[option] = value
+    return options
+
+
+def _parse_git_data(row: dict[str, Any]) -> Optional[GitData]:
+    """Parses the git data of a manifest entry.
+
+    Parameters
+    ----------
+    row : dict[str, Any]
+        The manifest entry.
+
+    Returns
+    -------
+    GitData or None
+        The git data or None if the entry has no repository.
+
+    Raises
+    ------
+    ValueError
+        If the repository URL or local path is invalid.
+    """
+    git_url = row.get("git_url")
+    local_path = row.get("local_path")
+    filters = row.get("git_filters") or []
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+    git_filters = [_parse_git_filter(filter) for filter in filters]
+    if local_path:
+        if not os.path.isdir(local_path):
+            raise ValueError(f"Invalid local checkout `{local_path}`.")
+        local_path = os.path.abspath(local_path)
+        user, repo = local_repo_identity(local_path)
+        branch = row.get("git_branch") or WORKING_TREE_REF
+        return create_git_data(user, repo, branch, git_filters, local_path)
+    if git_url:
+        match = misc_fns.extract_repo_data(git_url)
+        if match is None:
+            raise ValueError(f"Error parsing repository URL `{git_url}`.")
+        branch = row.get("git_branch") or DEFAULT_BRANCH
+        return create_git_data(match[0], match[1], branch, git_filters)
+    return None
+
+
+def _parse_git_filter(data: dict[str, Any]) -> GitFilters:
+    """Parses a git filter of a manifest entry.
+
+    Parameters
+    ----------
+    data : dict[str, Any]
+        The filter with the `filter` kind (such as `directory` or
+        `max_file_size`), the `filter_type` (`include` or `exclude`, defaults
+        to `exclude`) and the list of values.
+
+    Returns
+    -------
+    GitFilters
+
+    Raises
+    ------
+    ValueError
+        If the filter kind isn't supported.
+    """
+    try:
+        filter = GitFilter[str(data["filter"]).upper()]
+    except KeyError:
+        raise ValueError(f"Unsupported git filter `{data.get('filter')}`.")
+    filter_type = (
+        GithubRepositoryReader.FilterType.INCLUDE
+        if str(data.get("filter_type", "exclude")).lower() == "include"
+        else GithubRepositoryReader.FilterType.EXCLUDE
+    )
+    return create_git_filters(
+        filter_type, filter, value=[str(value) for value in data.get("value", [])]
+    )
+
+
+def _parse_list(value: Any) -> list[str]:
+    """Parses a list valued manifest field, semicolon delimited in CSV files.
+
+    Parameters
+    ----------
+    value : Any
+        The field value.
+
+    Returns
+    -------
+    list[str]
+        The list items.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(";") if item.strip()]
+    return [str(item) for item in value]
@@ -1,11 +1,13 @@
 """ Handles the RAG implementation using the llama-index library.
 """
 
+from collections import Counter
 from typing import Optional, get_args
 from llama_index.core import (
     VectorStoreIndex,
     SimpleDirectoryReader,
     Settings,
+    Document,
     get_response_synthesizer,
     Response,
 )
@@ -13,20 +15,24 @@ from llama_index.core.callbacks import (
     CallbackManager,
     TokenCountingHandler,
 )
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.prompts import PromptTemplate
-from llama_index.core.schema import QueryBundle
+from llama_index.core.schema import BaseNode, QueryBundle, NodeWithScore
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.base.response.schema import RESPONSE_TYPE
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.llms import LLM
 from llama_index.llms.openai import OpenAI  # type: ignore
 from llama_index.embeddings.openai import OpenAIEmbedding  # type: ignore
-from llama_index.core.node_parser import SemanticSplitterNodeParser
-from llama_index.readers.github import GithubRepositoryReader, GithubClient  # type: ignore
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
 from llama_index.readers.file import PDFReader  # type: ignore
 from llama_index.readers.pdf_marker import PDFMarkerReader  # type: ignore
-from llama_index.core.postprocessor import SentenceTransformerRerank
 from dotenv import load_dotenv
 import tiktoken
 import time
+import asyncio
+from weakref import WeakKeyDictionary
 from pathlib import Path
 from hashlib import md5
 import os
@@ -35,23 +41,58 @@ import json
 from .custom_types.core_types import (
     GitData,
     GitFilter,
-    GitFilters,
     UserSelections,
     DomainKey,
     DomainContent,
+    LlmCacheMode,
+    SharedIndex,
+    create_shared_index,
     add_source_nodes,
     default_domain_content,
 )
 from .custom_types.output_map_types import (
     OutputTrackerGitFilter,
+    OutputTrackerParamSet,
     create_output_tracker_param_set,
     create_output_tracker_git_filter,
     create_output_tracker_runs_entry,
-    create_output_tracker_entry,
-    create_output_tracker_domain_entry,
-    default_output_tracker_file,
 )
 import bcorag.misc_functions as misc_fns
+from .output_tracker import OutputTracker
+from .cache import DEFAULT_CACHE_DIR
+from .cache.index_cache import (
+    IndexCache,
+    IndexUpdate,
+    document_hash,
+    document_alias_map,
+    document_label,
+    document_node_map,
+    index_fingerprint,
+)
+from .cache.document_cache import DocumentCache
+from .cache.snapshot_cache import SnapshotCache
+from .cache.embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCache,
+    EmbeddingCacheStats,
+    get_query_embedding_batch,
+)
+from .cache.retrieval_cache import RetrievalCache, retrieval_key
+from .cache.llm_cache import CachedLLM, LlmCache, validate_llm_cache_mode
+from .vector_stores import (
+    LocalVectorStore,
+    MatrixSimpleVectorStore,
+    create_storage_context,
+    parse_vector_store_option,
+)
+from .hybrid import BM25Index, HybridRetriever
+from .rerank import SharedRerank
+from .semantic_splitter import EmbeddingReuseSemanticSplitter
+from .multi_granularity import chunk_documents, embed_all_nodes
+from .dedup import DEFAULT_DEDUP_THRESHOLD, NodeDeduplicator, remove_provenance
+from .github_loader import GithubSnapshotReader
+from .local_git_loader import LocalGitReader
+from .repo_filters import PruneStats, format_prune_stats
 from .prompts import (
     PROMPT_DOMAIN_MAP,
     RETRIEVAL_PROMPT,
@@ -63,6 +104,8 @@ from .prompts import (
 # import llama_index.core
 # llama_index.core.set_global_handler("simple")
 
+DEFAULT_MAX_CONCURRENCY = 3
+
 
 @contextmanager
 def supress_stdout():
@@ -86,23 +129,34 @@ class BcoRag:
         The file path to the source file (paper).
     _output_path_root : str
         Path to the specific document directory to dump the outputs.
+    _output_tracker : OutputTracker
+        Records the generated domain runs for the document.
     _debug : bool
         Whether in debug mode or not.
     _logger : logging.Logger
         The document specific logger.
     _llm_model_name : str
         The LLM model name.
-    _llm_model : OpenAI
-        The Open AI LLM model instance.
+    _llm_model : OpenAI or CachedLLM
+        The Open AI LLM model instance (wrapped by the LLM response cache if
+        the LLM cache mode isn't "off").
+    _llm_cache_mode : LlmCacheMode
+        The LLM response cache mode.
     _embed_model_name : str
         The embedding model name.
-    _embed_model : OpenAIEmbedding
-        The embedding model instance.
+    _embed_model : OpenAIEmbedding or CachedEmbedding
+        The embedding model instance (wrapped by the embedding cache if caching
+        is enabled).
+    _embedding_cache : EmbeddingCache or None
+        The embedding cache (closed with the instance) or None if caching is
+        disabled.
     _loader : str
         The data loader being used.
     _vector_store : str
         The vector store being used.
-    _splitter : SemanticSplitterNodeParser or None
+    _hybrid : bool
+        Whether hybrid BM25 and vector retrieval is enabled.
+    _splitter : EmbeddingReuseSemanticSplitter or None
         The node parser (if a non-fixed chunking strategy is chosen).
     _similarity_top_k : int
         The similarity top k retrieval number for node sources.
@@ -116,18 +170,47 @@ class BcoRag:
         The list of documents (containers for the data source).
     _index : VectorStoreIndex
         The vector store index instance.
+    _bm25_index : BM25Index or None
+        The BM25 inverted index over the index nodes (only for hybrid
+        retrieval).
+    _index_key : str or None
+        The fingerprint of the index inputs (set once the index is built).
+    _chunking_sweep : list[str]
+        The other chunking configs to build indexes for alongside this
+        instance's index.
+    _shared_indexes : dict[str, SharedIndex]
+        The indexes built for each chunking config of the chunking sweep.
+    _index_cache : IndexCache or None
+        The persistent index cache or None if caching is disabled.
+    _document_cache : DocumentCache or None
+        The parsed document cache or None if caching is disabled.
+    _snapshot_cache : SnapshotCache or None
+        The github repository snapshot cache or None if caching is disabled.
+    _retrieval_cache : RetrievalCache or None
+        The post-rerank retrieval result cache or None if caching is disabled.
     _query_engine : RetrieverQueryEngine
         The query engine.
+    _rerank_postprocessor : SharedRerank
+        The reranker applied to the retrieved nodes (the cross-encoder is
+        loaded on the first query and shared process wide).
     _other_docs : list[str] | None
         Any other miscellaneous documents to include in the indexing process.
     _domain_content : DomainContent
         Holds the most recent generated domain.
+    _max_concurrent_queries : int
+        The maximum number of async queries in flight at once.
+    _query_semaphores : WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]
+        The query concurrency semaphore for each event loop.
     """
 
     def __init__(
         self,
         user_selections: UserSelections,
         output_dir: str = "./output",
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        shared_index: Optional[SharedIndex] = None,
+        max_concurrent_queries: int = DEFAULT_MAX_CONCURRENCY,
+        chunking_sweep: Optional[list[str]] = None,
     ):
         """Constructor.
 
@@ -138,8 +221,22 @@ class BcoRag:
         output_dir : str
             The directory to dump the outputs (relative to main.py entry point
             in the repo root).
-        evaluation_metrics : bool
-            Whether or not to calculate Faithfulness and Relevancy metrics.
+        cache_dir : str or None, optional
+            The root directory for the on disk caches (relative to main.py
+            entry point in the repo root). If None, caching is disabled.
+        shared_index : SharedIndex or None, optional
+            A previously built index to reuse instead of loading and indexing
+            the documents. The caller is responsible for making sure the index
+            was built with the same file, loader, chunking config, embedding
+            model, vector store, git data and other docs.
+        max_concurrent_queries : int, optional
+            The maximum number of async queries in flight at once on this
+            instance.
+        chunking_sweep : list[str] or None, optional
+            Other chunking configs to build indexes for alongside this
+            instance's index, in a single chunking and embedding pass over
+            the loaded documents (see `shared_indexes`). Ignored if a shared
+            index is passed.
         """
         load_dotenv()
 
@@ -156,11 +253,40 @@ class BcoRag:
             self._file_name.lower().strip().replace(" ", "_")
         )
         self._llm_model_name = user_selections["llm"]
-        self._llm_model = OpenAI(model=self._llm_model_name)
+        self._llm_model: LLM = OpenAI(model=self._llm_model_name)
+        self._llm_cache_mode: LlmCacheMode = validate_llm_cache_mode(
+            user_selections.get("llm_cache_mode", "off")
+        )
+        if self._llm_cache_mode != "off":
+            if cache_dir is None:
+                raise ValueError(
+                    f"The `{self._llm_cache_mode}` LLM cache mode requires a cache directory."
+                )
+            self._llm_model = CachedLLM(
+                llm=self._llm_model,
+                cache=LlmCache(os.path.join(cache_dir, "llm")),
+                mode=self._llm_cache_mode,
+            )
         self._embed_model_name = user_selections["embedding_model"]
-        self._embed_model = OpenAIEmbedding(model=self._embed_model_name)
+        embed_model, embed_dimensions = misc_fns.parse_embedding_model(
+            self._embed_model_name
+        )
+        self._embed_model: BaseEmbedding = OpenAIEmbedding(
+            model=embed_model, dimensions=embed_dimensions
+        )
+        self._embedding_cache: Optional[EmbeddingCache] = (
+            EmbeddingCache(os.path.join(cache_dir, "embeddings.sqlite3"))
+            if cache_dir is not None
+            else None
+        )
+        if self._embedding_cache is not None:
+            self._embed_model = CachedEmbedding(
+                embed_model=self._embed_model, cache=self._embedding_cache
+            )
         self._loader = user_selections["loader"]
         self._vector_store = user_selections["vector_store"]
+        _, self._hybrid = parse_vector_store_option(self._vector_store)
+        self._bm25_index: Optional[BM25Index] = None
         self._splitter = None
         self._similarity_top_k = user_selections["similarity_top_k"]
         self._chunking_config = user_selections["chunking_config"]
@@ -173,43 +299,66 @@ class BcoRag:
         )
         self._other_docs: list[str] | None = user_selections["other_docs"]
         self.domain_content: DomainContent = default_domain_content()
+        if max_concurrent_queries < 1:
+            raise ValueError("max_concurrent_queries must be at least 1.")
+        self._max_concurrent_queries = max_concurrent_queries
+        self._query_semaphores: WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = WeakKeyDictionary()
+        self._index_key: Optional[str] = None
+        self._chunking_sweep: list[str] = [
+            config
+            for config in dict.fromkeys(chunking_sweep or [])
+            if config != self._chunking_config
+        ]
+        self._shared_indexes: dict[str, SharedIndex] = {}
+        self._index_cache: Optional[IndexCache] = (
+            IndexCache(os.path.join(cache_dir, "indexes"))
+            if cache_dir is not None
+            else None
+        )
+        self._document_cache: Optional[DocumentCache] = (
+            DocumentCache(os.path.join(cache_dir, "documents"))
+            if cache_dir is not None
+            else None
+        )
+        self._snapshot_cache: Optional[SnapshotCache] = (
+            SnapshotCache(os.path.join(cache_dir, "github"))
+            if cache_dir is not None
+            else None
+        )
+        self._retrieval_cache: Optional[RetrievalCache] = (
+            RetrievalCache(os.path.join(cache_dir, "retrieval"))
+            if cache_dir is not None
+            else None
+        )
 
+        # replayed runs are served from the caches, any LLM cache miss raises
+        # an `LlmCacheMissError` instead of calling the API
         openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not openai_api_key:
+        if not openai_api_key and self._llm_cache_mode != "replay":
             raise EnvironmentError("OpenAI API key not found.")
 
         github_token = os.getenv("GITHUB_TOKEN")
-        if self._git_data is not None and not github_token:
+        if (
+            self._git_data is not None
+            and self._git_data.get("local_path") is None
+            and not github_token
+        ):
             raise EnvironmentError("Github token not found.")
 
         misc_fns.check_dir(self._output_path_root)
+        self._output_tracker = OutputTracker(self._output_path_root)
         self._display_info(user_selections, "User selections:")
 
         Settings.embed_model = self._embed_model
         Settings.llm = self._llm_model
 
-        match self._chunking_config:
-            case "semantic":
-                self._splitter = SemanticSplitterNodeParser.from_defaults(
-                    buffer_size=1,
-                    embed_model=self._embed_model,
-                    # The percentile of cosin dissimilarity that must be exceeded
-                    # between a group of sentences and the next to form a node. The
-                    # smaller this number is, the more nodes will be generated.
-                    breakpoint_percentile_threshold=90,
-                )
-            case "256 chunk size/20 chunk overlap":
-                Settings.chunk_size = 256
-                Settings.chunk_overlap = 50
-            case "512 chunk size/50 chunk overlap":
-                Settings.chunk_size = 512
-                Settings.chunk_overlap = 50
-            case "2048 chunk size/50 chunk overlap":
-                Settings.chunk_size = 2048
-                Settings.chunk_overlap = 50
-            case _:
-                Settings.chunk_size = 1024
-                Settings.chunk_overlap = 20
+        chunk_params = misc_fns.parse_chunking_config(self._chunking_config)
+        if chunk_params is None:
+            self._splitter = self._create_semantic_splitter()
+        else:
+            Settings.chunk_size, Settings.chunk_overlap = chunk_params
 
         if self._debug:
             self._token_counter = TokenCountingHandler(
@@ -223,99 +372,57 @@ class BcoRag:
                 "total": 0,
             }
 
-        match self._loader:
-            case "SimpleDirectoryReader":
-                loader = SimpleDirectoryReader(input_files=[self._file_path])
-                paper_documents = loader.load_data()
-            case "PDFReader":
-                # Note: download_loader is deprecated in llama_index now
-                # with supress_stdout():
-                #     pdf_loader = download_loader("PDFReader")
-                pdf_loader = PDFReader()
-                paper_documents = pdf_loader.load_data(file=Path(self._file_path))
-            case "PDFMarker":
-                with supress_stdout():
-                    pdf_loader = PDFMarkerReader()
-                    paper_documents = pdf_loader.load_data(file=Path(self._file_path))
-
-        other_docs = []
-        if self._other_docs:
-            for path in self._other_docs:
-                loader = SimpleDirectoryReader(input_files=[path])
-                other_docs += loader.load_data()
-
-        documents = paper_documents + other_docs  # type: ignore
-        if self._git_data is not None:
-
-            github_client = GithubClient(github_token)
-            # Note: download_loader is deprecated in llama_index now
-            # with supress_stdout():
-            #     download_loader("GithubRepositoryReader")
-
-            directory_filter: GitFilters | None = None
-            file_ext_filter: GitFilters | None = None
-            for filter in self._git_data["filters"]:
-                if filter["filter"] == GitFilter.DIRECTORY:
-                    directory_filter = filter
-                elif filter["filter"] == GitFilter.FILE_EXTENSION:
-                    file_ext_filter = filter
-
-            git_loader = GithubRepositoryReader(
-                github_client=github_client,
-                owner=self._git_data["user"],
-                repo=self._git_data["repo"],
-                filter_directories=(
-                    (directory_filter["value"], directory_filter["filter_type"])
-                    if directory_filter is not None
-                    else None
-                ),
-                filter_file_extensions=(
-                    (file_ext_filter["value"], file_ext_filter["filter_type"])
-                    if file_ext_filter is not None
-                    else None
-                ),
+        if shared_index is not None:
+            self._documents = shared_index["documents"]
+            self._index = shared_index["index"]
+            self._index_key = shared_index["index_key"]
+            self._logger.info(f"Reusing shared index `{self._index_key}`.")
+        else:
+            self._documents = self._load_documents(github_token)
+            self._index = self._build_index()
+        if self._hybrid and self._bm25_index is None:
+            self._bm25_index = BM25Index.from_nodes(
+                list(self._index.docstore.docs.values())
             )
-
-            github_documents = git_loader.load_data(branch=self._git_data["branch"])
-            documents += github_documents
-            self._logger.info(
-                f"Loading repo `{self._git_data['repo']}` from user `{self._git_data['user']}`"
+        if isinstance(self._embed_model, CachedEmbedding):
+            self._embed_model.warm_queries(self._retrieval_prompts())
+        embedding_cache_stats = self.embedding_cache_stats()
+        if embedding_cache_stats is not None:
+            self._display_info(
+                dict(embedding_cache_stats), "Embedding cache stats after indexing:"
             )
-        self._documents = documents
-
-        _chunk_fixed = (
-            False if user_selections["chunking_config"] == "semantic" else True
-        )
-        if self._vector_store == "VectorStoreIndex":
-            if _chunk_fixed:
-                self._index = VectorStoreIndex.from_documents(self._documents)
-            else:
-                if self._splitter is not None:
-                    nodes = self._splitter.build_semantic_nodes_from_documents(
-                        self._documents
-                    )
-                    self._index = VectorStoreIndex(nodes=nodes)
 
+        # a shared index holds the embedding model of the instance that built
+        # it, which may have been closed since
         base_retriever = VectorIndexRetriever(
             index=self._index,
             similarity_top_k=self._similarity_top_k * 3,
+            embed_model=self._embed_model,
         )
         # transform_retriever = TransformRetriever(
         #     retriever=base_retriever,
         #     query_transform=CustomQueryTransform(delimiter=DELIMITER),
         # )
+        retriever: VectorIndexRetriever | HybridRetriever = base_retriever
+        if self._bm25_index is not None:
+            retriever = HybridRetriever(
+                vector_retriever=base_retriever,
+                bm25_index=self._bm25_index,
+                docstore=self._index.docstore,
+                similarity_top_k=self._similarity_top_k * 3,
+            )
         llm_prompt_template = PromptTemplate(template=LLM_PROMPT_TEMPLATE)
         response_synthesizer = get_response_synthesizer(
             text_qa_template=llm_prompt_template
         )
-        rerank_postprocessor = SentenceTransformerRerank(
+        self._rerank_postprocessor = SharedRerank(
             top_n=self._similarity_top_k,
             keep_retrieval_score=True,
         )
         self._query_engine = RetrieverQueryEngine(
-            retriever=base_retriever,
+            retriever=retriever,
             response_synthesizer=response_synthesizer,
-            node_postprocessors=[rerank_postprocessor],
+            node_postprocessors=[self._rerank_postprocessor],
         )
 
         if (
@@ -327,13 +434,570 @@ class BcoRag:
                 "embedding"
             ] += self._token_counter.total_embedding_token_count
 
-    def perform_query(self, domain: DomainKey) -> str:
+    def _load_documents(self, github_token: Optional[str]) -> list[Document]:
+        """Loads the paper, any other documents and the optional github
+        repository into documents.
+
+        Parameters
+        ----------
+        github_token : str or None
+            The github token (only required if git data for a github hosted
+            repo was included).
+
+        Returns
+        -------
+        list[Document]
+            The loaded documents.
+        """
+        paper_documents = self._read_file(self._file_path, self._loader)
+
+        other_docs = []
+        if self._other_docs:
+            for path in self._other_docs:
+                other_docs += self._read_file(path, "SimpleDirectoryReader")
+
+        documents = paper_documents + other_docs  # type: ignore
+        local_path = (
+            self._git_data.get("local_path") if self._git_data is not None else None
+        )
+        if self._git_data is not None and local_path is not None:
+
+            local_loader = LocalGitReader(
+                path=local_path, filters=self._git_data["filters"]
+            )
+            documents += local_loader.load_data(ref=self._git_data["branch"])
+            self._logger.info(
+                f"Loading repo `{self._git_data['repo']}` from local checkout `{local_path}`"
+            )
+            self._log_prune_stats(local_loader.prune_stats)
+        elif self._git_data is not None:
+
+            git_loader = GithubSnapshotReader(
+                owner=self._git_data["user"],
+                repo=self._git_data["repo"],
+                filters=self._git_data["filters"],
+                github_token=github_token,
+                snapshot_cache=self._snapshot_cache,
+            )
+            try:
+                github_documents = git_loader.load_data(
+                    branch=self._git_data["branch"]
+                )
+            finally:
+                git_loader.close()
+            documents += github_documents
+            self._logger.info(
+                f"Loading repo `{self._git_data['repo']}` from user `{self._git_data['user']}`"
+            )
+            self._log_prune_stats(git_loader.prune_stats)
+
+        # copies of the same contents served from the document cache, or git
+        # blobs with the same sha, share a document ID, but the index maps
+        # nodes back to their document by ID. The copies are numbered in load
+        # order so their IDs are the same on every run and the incremental
+        # index update doesn't see them as changed.
+        copies: dict[str, int] = {}
+        for document in documents:
+            doc_id = document.doc_id
+            copy = copies.get(doc_id, 0)
+            copies[doc_id] = copy + 1
+            if copy:
+                document.id_ = f"{doc_id}#{copy}"
+        return documents
+
+    def _log_prune_stats(self, prune_stats: PruneStats):
+        """Logs the repository files the git filters pruned before they were
+        fetched.
+
+        Parameters
+        ----------
+        prune_stats : PruneStats
+            The prune tally of the repository loader.
+        """
+        if prune_stats["pruned_files"]:
+            self._display_info(
+                format_prune_stats(prune_stats),
+                "Repository files pruned before fetching:",
+            )
+
+    def _read_file(self, file_path: str, loader: str) -> list[Document]:
+        """Parses a single file with the specified data loader. If caching is
+        enabled, the parsed documents are served from (and stored to) the
+        document cache.
+
+        Parameters
+        ----------
+        file_path : str
+            The file to parse.
+        loader : str
+            The data loader to parse the file with.
+
+        Returns
+        -------
+        list[Document]
+            The parsed documents.
+        """
+        if self._document_cache is not None:
+            cached_documents = self._document_cache.load(file_path, loader)
+            if cached_documents is not None:
+                self._logger.info(
+                    f"Loaded cached `{loader}` documents for `{file_path}`."
+                )
+                return cached_documents
+
+        match loader:
+            case "PDFReader":
+                # Note: download_loader is deprecated in llama_index now
+                # with supress_stdout():
+                #     pdf_loader = download_loader("PDFReader")
+                pdf_loader = PDFReader()
+                documents = pdf_loader.load_data(file=Path(file_path))
+            case "PDFMarker":
+                with supress_stdout():
+                    pdf_loader = PDFMarkerReader()
+                    documents = pdf_loader.load_data(file=Path(file_path))
+            case _:
+                directory_loader = SimpleDirectoryReader(input_files=[file_path])
+                documents = directory_loader.load_data()
+
+        if self._document_cache is not None:
+            self._document_cache.store(file_path, loader, documents)
+        return documents
+
+    def _create_semantic_splitter(self) -> EmbeddingReuseSemanticSplitter:
+        """Creates the semantic splitter.
+
+        Returns
+        -------
+        EmbeddingReuseSemanticSplitter
+            The semantic splitter.
+        """
+        return EmbeddingReuseSemanticSplitter.from_defaults(
+            buffer_size=1,
+            embed_model=self._embed_model,
+            # The percentile of cosin dissimilarity that must be exceeded
+            # between a group of sentences and the next to form a node. The
+            # smaller this number is, the more nodes will be generated.
+            breakpoint_percentile_threshold=90,
+        )
+
+    def _build_index(self) -> VectorStoreIndex:
+        """Builds the vector store index from the loaded documents. If caching
+        is enabled and an index with the same fingerprint (document contents,
+        embedding model, chunking config, loader and vector store) was persisted
+        by a previous run, the index is loaded from disk instead and no
+        embedding calls are made. Otherwise, if a cached index shares some of
+        the documents, it is updated incrementally. Duplicate and near-duplicate
+        nodes are removed before embedding. For hybrid retrieval, the BM25
+        inverted index is built (or loaded) alongside the vector index.
+
+        Returns
+        -------
+        VectorStoreIndex
+            The vector store index.
+        """
+        if self._chunking_sweep:
+            return self._build_sweep_indexes()
+
+        index_key, document_hashes = index_fingerprint(
+            documents=self._documents,
+            embedding_model=self._embed_model_name,
+            chunking_config=self._chunking_config,
+            loader=self._loader,
+            vector_store=self._vector_store,
+            dedup_threshold=DEFAULT_DEDUP_THRESHOLD,
+        )
+        self._index_key = index_key
+
+        if self._index_cache is not None:
+            cached_index = self._index_cache.load(index_key)
+            if cached_index is not None:
+                self._logger.info(f"Loaded cached index `{index_key}`.")
+                if self._hybrid:
+                    self._bm25_index = self._index_cache.load_bm25_index(index_key)
+                return cached_index
+
+        updated = self._update_cached_index(document_hashes)
+        if updated is not None:
+            index, document_nodes, document_aliases = updated
+        else:
+            nodes, removed = self._deduplicate_nodes(
+                self._parse_nodes(self._documents)
+            )
+            index = VectorStoreIndex(
+                nodes=nodes,
+                storage_context=create_storage_context(self._vector_store),
+            )
+            document_nodes = document_node_map(self._documents, nodes)
+            document_aliases = document_alias_map(self._documents, removed)
+        if self._hybrid:
+            self._bm25_index = BM25Index.from_nodes(list(index.docstore.docs.values()))
+
+        self._persist_index(
+            index_key,
+            index,
+            self._chunking_config,
+            document_hashes,
+            self._bm25_index,
+            document_nodes,
+            document_aliases,
+        )
+        return index
+
+    def _parse_nodes(self, documents: list[Document]) -> list[BaseNode]:
+        """Chunks documents into nodes with the chunking config. Every
+        document is chunked independently, so chunking a subset of the
+        documents produces the same nodes as chunking all of them.
+
+        Parameters
+        ----------
+        documents : list[Document]
+            The documents to chunk.
+
+        Returns
+        -------
+        list[BaseNode]
+            The nodes.
+        """
+        if self._splitter is None:
+            return run_transformations(documents, Settings.transformations)
+        nodes = self._splitter.build_semantic_nodes_from_documents(documents)
+        self._logger.info(
+            f"Reused {self._splitter.reused_embeddings} of {len(nodes)} node embeddings from the semantic splitter."
+        )
+        return nodes
+
+    def _update_cached_index(self, document_hashes: list[str]) -> Optional[
+        tuple[VectorStoreIndex, dict[str, list[str]], dict[str, list[list[str]]]]
+    ]:
+        """Incrementally updates the cached index sharing the most documents
+        with the loaded documents. The nodes of removed or changed documents
+        are deleted and only the new or changed documents are chunked,
+        deduplicated against the remaining nodes and embedded. Unchanged
+        documents with duplicates collapsed into a deleted node are re-chunked
+        as well. The changes are recorded in the run log.
+
+        Parameters
+        ----------
+        document_hashes : list[str]
+            The content hashes of the loaded documents.
+
+        Returns
+        -------
+        (VectorStoreIndex, dict[str, list[str]], dict[str, list[list[str]]]) or None
+            The updated index, the node IDs for each document content hash
+            and the duplicate node aliases for each document content hash, or
+            None if there is no cached index to update.
+        """
+        if self._index_cache is None:
+            return None
+        base = self._index_cache.find_base_index(
+            loader=self._loader,
+            chunking_config=self._chunking_config,
+            embedding_model=self._embed_model_name,
+            vector_store=self._vector_store,
+            document_hashes=document_hashes,
+            dedup_threshold=DEFAULT_DEDUP_THRESHOLD,
+        )
+        if base is None:
+            return None
+        index = self._index_cache.load(base["key"])
+        if index is None:
+            return None
+
+        # a hash whose document count changed is treated as changed, so its
+        # nodes are rebuilt for every copy of the document
+        previous = Counter(base["document_hashes"])
+        current = Counter(document_hashes)
+        changed_hashes = {h for h in previous | current if previous[h] != current[h]}
+        base_aliases = base.get("document_aliases", {})
+        stale_hashes: set[str] = set()
+        deleted_ids: set[str] = set()
+        pending = set(changed_hashes)
+        while pending:
+            stale_hashes |= pending
+            for h in pending:
+                deleted_ids.update(base["document_nodes"].get(h, []))
+            # the documents whose duplicates were collapsed into a deleted
+            # node lose their copy of the chunk, so they're re-chunked
+            pending = {
+                h
+                for h, aliases in base_aliases.items()
+                if h not in stale_hashes
+                and current[h] > 0
+                and any(node_id in deleted_ids for node_id, _ in aliases)
+            }
+        new_documents = [
+            document
+            for document, h in zip(
+                self._documents, map(document_hash, self._documents)
+            )
+            if h in stale_hashes
+        ]
+
+        if deleted_ids:
+            index.delete_nodes(list(deleted_ids), delete_from_docstore=True)
+            for node_id in deleted_ids:
+                index.index_struct.nodes_dict.pop(node_id, None)
+        # drop the stale documents from the provenance of the remaining nodes
+        sources_by_node: dict[str, list[str]] = {}
+        for h in stale_hashes:
+            for node_id, source in base_aliases.get(h, []):
+                if node_id not in deleted_ids:
+                    sources_by_node.setdefault(node_id, []).append(source)
+        updated_nodes: dict[str, BaseNode] = {}
+        for node_id, sources in sources_by_node.items():
+            node = index.docstore.get_node(node_id)
+            remove_provenance(node, sources)
+            updated_nodes[node_id] = node
+
+        retained = {
+            node_id: updated_nodes.get(node_id, node)
+            for node_id, node in index.docstore.docs.items()
+        }
+        nodes, removed = self._deduplicate_nodes(
+            self._parse_nodes(new_documents), list(retained.values())
+        )
+        for _, kept in removed:
+            if kept.node_id in retained:
+                updated_nodes[kept.node_id] = kept
+        if updated_nodes:
+            index.docstore.add_documents(
+                list(updated_nodes.values()), allow_update=True
+            )
+        index.insert_nodes(nodes)
+        index.storage_context.index_store.add_index_struct(index.index_struct)
+
+        document_nodes = {
+            h: node_ids
+            for h, node_ids in base["document_nodes"].items()
+            if h not in stale_hashes
+        }
+        document_nodes.update(document_node_map(new_documents, nodes))
+        document_aliases = {
+            h: aliases
+            for h, aliases in base_aliases.items()
+            if h not in stale_hashes
+        }
+        document_aliases.update(document_alias_map(new_documents, removed))
+
+        # a document present on both sides under the same name was changed
+        base_labels = base.get("document_labels", {})
+        new_labels = {
+            document_label(document)
+            for document in new_documents
+            if document_hash(document) in changed_hashes
+        }
+        stale_labels = {base_labels.get(h, h) for h in changed_hashes}
+        update: IndexUpdate = {
+            "base_key": base["key"],
+            "added": sorted(new_labels - stale_labels),
+            "changed": sorted(new_labels & stale_labels),
+            "removed": sorted(stale_labels - new_labels),
+            "rechunked": sorted(
+                base_labels.get(h, h) for h in stale_hashes - changed_hashes
+            ),
+            "deleted_nodes": len(deleted_ids),
+            "inserted_nodes": len(nodes),
+        }
+        self._display_info(dict(update), "Incremental index update:")
+        return index, document_nodes, document_aliases
+
+    def _deduplicate_nodes(
+        self,
+        nodes: list[BaseNode],
+        existing_nodes: Optional[list[BaseNode]] = None,
+        chunking_config: Optional[str] = None,
+    ) -> tuple[list[BaseNode], list[tuple[BaseNode, BaseNode]]]:
+        """Removes the duplicate and near-duplicate nodes before embedding,
+        recording how many nodes and tokens were removed in the run log.
+
+        Parameters
+        ----------
+        nodes : list[BaseNode]
+            The chunked nodes.
+        existing_nodes : list[BaseNode] or None, optional
+            Already indexed nodes the new nodes are deduplicated against.
+        chunking_config : str or None, optional
+            The chunking config the nodes were chunked with, to log for
+            chunking sweeps.
+
+        Returns
+        -------
+        (list[BaseNode], list[tuple[BaseNode, BaseNode]])
+            The kept nodes and the (removed node, kept node) pairs.
+        """
+        deduplicator = NodeDeduplicator(threshold=DEFAULT_DEDUP_THRESHOLD)
+        deduplicator.add_existing(existing_nodes or [])
+        kept, removed = deduplicator.deduplicate(nodes)
+        header = "Node deduplication:"
+        if chunking_config is not None:
+            header = f"Node deduplication ({chunking_config}):"
+        self._display_info(dict(deduplicator.stats), header)
+        return kept, removed
+
+    def _build_sweep_indexes(self) -> VectorStoreIndex:
+        """Builds the indexes for this instance's chunking config and every
+        chunking config of the chunking sweep together. Cached indexes are
+        loaded from the index cache, the rest are chunked in a single pass
+        sharing the sentence splits and token counts, deduplicated and
+        embedded in a single batched pass.
+
+        Returns
+        -------
+        VectorStoreIndex
+            The vector store index for this instance's chunking config.
+        """
+        chunking_configs = [self._chunking_config] + self._chunking_sweep
+        fingerprints = {
+            chunking_config: index_fingerprint(
+                documents=self._documents,
+                embedding_model=self._embed_model_name,
+                chunking_config=chunking_config,
+                loader=self._loader,
+                vector_store=self._vector_store,
+                dedup_threshold=DEFAULT_DEDUP_THRESHOLD,
+            )
+            for chunking_config in chunking_configs
+        }
+        indexes: dict[str, VectorStoreIndex] = {}
+        bm25_indexes: dict[str, Optional[BM25Index]] = {}
+
+        if self._index_cache is not None:
+            for chunking_config in chunking_configs:
+                index_key = fingerprints[chunking_config][0]
+                cached_index = self._index_cache.load(index_key)
+                if cached_index is not None:
+                    self._logger.info(f"Loaded cached index `{index_key}`.")
+                    indexes[chunking_config] = cached_index
+                    if self._hybrid:
+                        bm25_indexes[chunking_config] = (
+                            self._index_cache.load_bm25_index(index_key)
+                        )
+
+        missing = [config for config in chunking_configs if config not in indexes]
+        if missing:
+            nodes_by_config = chunk_documents(
+                self._documents, missing, self._create_semantic_splitter
+            )
+            removed_by_config: dict[str, list[tuple[BaseNode, BaseNode]]] = {}
+            for chunking_config in missing:
+                kept, removed_by_config[chunking_config] = self._deduplicate_nodes(
+                    nodes_by_config[chunking_config], chunking_config=chunking_config
+                )
+                nodes_by_config[chunking_config] = kept
+            embedded = embed_all_nodes(nodes_by_config, self._embed_model)
+            self._logger.info(
+                f"Embedded {embedded} distinct chunks for the {', '.join(missing)} chunking configs."
+            )
+            for chunking_config, nodes in nodes_by_config.items():
+                index = VectorStoreIndex(
+                    nodes=nodes,
+                    storage_context=create_storage_context(self._vector_store),
+                )
+                bm25_index = BM25Index.from_nodes(nodes) if self._hybrid else None
+                index_key, document_hashes = fingerprints[chunking_config]
+                self._persist_index(
+                    index_key,
+                    index,
+                    chunking_config,
+                    document_hashes,
+                    bm25_index,
+                    document_node_map(self._documents, nodes),
+                    document_alias_map(
+                        self._documents, removed_by_config[chunking_config]
+                    ),
+                )
+                indexes[chunking_config] = index
+                bm25_indexes[chunking_config] = bm25_index
+
+        self._shared_indexes = {
+            chunking_config: create_shared_index(
+                index_key=fingerprints[chunking_config][0],
+                index=indexes[chunking_config],
+                documents=self._documents,
+            )
+            for chunking_config in chunking_configs
+        }
+        self._index_key = fingerprints[self._chunking_config][0]
+        self._bm25_index = bm25_indexes.get(self._chunking_config)
+        return indexes[self._chunking_config]
+
+    def _persist_index(
+        self,
+        index_key: str,
+        index: VectorStoreIndex,
+        chunking_config: str,
+        document_hashes: list[str],
+        bm25_index: Optional[BM25Index],
+        document_nodes: dict[str, list[str]],
+        document_aliases: dict[str, list[list[str]]],
+    ):
+        """Persists a built index to the index cache (if caching is enabled).
+
+        Parameters
+        ----------
+        index_key : str
+            The index fingerprint.
+        index : VectorStoreIndex
+            The built index.
+        chunking_config : str
+            The chunking config the index was built with.
+        document_hashes : list[str]
+            The sorted content hashes of every input document.
+        bm25_index : BM25Index or None
+            The BM25 inverted index for hybrid retrieval.
+        document_nodes : dict[str, list[str]]
+            The node IDs for each document content hash.
+        document_aliases : dict[str, list[list[str]]]
+            The duplicate node aliases for each document content hash.
+        """
+        if self._index_cache is None:
+            return
+        if self._index_cache.persist(
+            key=index_key,
+            index=index,
+            loader=self._loader,
+            chunking_config=chunking_config,
+            embedding_model=self._embed_model_name,
+            vector_store=self._vector_store,
+            document_hashes=document_hashes,
+            bm25_index=bm25_index,
+            document_nodes=document_nodes,
+            document_labels={
+                document_hash(document): document_label(document)
+                for document in self._documents
+            },
+            document_aliases=document_aliases,
+            dedup_threshold=DEFAULT_DEDUP_THRESHOLD,
+        ):
+            self._logger.info(f"Persisted index `{index_key}` to the cache.")
+
+    def perform_query(
+        self,
+        domain: DomainKey,
+        candidates: Optional[list[NodeWithScore]] = None,
+        reranked: bool = False,
+    ) -> str:
         """Performs a query for a specific BCO domain.
 
+        The run is recorded in the output tracker, but the `output_map.json`
+        and `output_map.tsv` views are not rewritten. Callers querying domains
+        one at a time must call `export_output_map` (or `close`, or use the
+        instance as a context manager) once they are done, `generate_all`
+        exports them itself.
+
         Parameters
         ----------
         domain : DomainKey
             The domain being queried for.
+        candidates : list[NodeWithScore] or None, optional
+            Previously retrieved candidate nodes for the domain (see
+            `retrieve_all`). If provided, the retrieval step is skipped and
+            the candidates go straight to the reranker.
+        reranked : bool, optional
+            Whether the candidates have already been reranked (see
+            `rerank_all`), in which case they go straight to the LLM.
 
         Returns
         -------
@@ -341,6 +1005,483 @@ class BcoRag:
             The generated domain.
         """
         query_start_time = time.time()
+        query_bundle = self._create_query_bundle(domain)
+        if candidates is not None and reranked:
+            nodes = candidates
+        else:
+            nodes = self._load_cached_nodes(query_bundle)
+            if nodes is None:
+                nodes = (
+                    self._query_engine.retrieve(query_bundle)
+                    if candidates is None
+                    else self._rerank_postprocessor.postprocess_nodes(
+                        candidates, query_bundle=query_bundle
+                    )
+                )
+                self._store_cached_nodes(query_bundle, nodes)
+        response_object = self._query_engine.synthesize(query_bundle, nodes)
+        return self._handle_query_response(
+            domain, query_bundle, response_object, query_start_time
+        )
+
+    async def aperform_query(
+        self,
+        domain: DomainKey,
+        timeout: Optional[float] = None,
+        candidates: Optional[list[NodeWithScore]] = None,
+        reranked: bool = False,
+    ) -> str:
+        """Async version of `perform_query`. The number of queries in flight
+        at once on this instance is bounded by `max_concurrent_queries`.
+
+        The domain content and the output tracker are only updated once the
+        query succeeds. If the query times out or the calling task is cancelled
+        the instance is left exactly as it was before the call. The output
+        handling runs without yielding to the event loop so concurrent queries
+        on the same instance can't interleave their output tracker updates.
+
+        Parameters
+        ----------
+        domain : DomainKey
+            The domain being queried for.
+        timeout : float or None, optional
+            The maximum number of seconds to wait for the query (not counting
+            time spent waiting for a concurrency slot). None waits indefinitely.
+        candidates : list[NodeWithScore] or None, optional
+            Previously retrieved candidate nodes for the domain (see
+            `retrieve_all`). If provided, the retrieval step is skipped and
+            the candidates go straight to the reranker.
+        reranked : bool, optional
+            Whether the candidates have already been reranked (see
+            `rerank_all`), in which case they go straight to the LLM.
+
+        Returns
+        -------
+        str
+            The generated domain.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the query doesn't complete within the timeout.
+        """
+        async with self._query_semaphore():
+            query_start_time = time.time()
+            query_bundle = self._create_query_bundle(domain)
+            try:
+                response_object = await asyncio.wait_for(
+                    self._aquery(query_bundle, candidates, reranked),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                self._logger.error(
+                    f"Query for the `{domain}` domain timed out after {timeout} seconds."
+                )
+                raise
+            except asyncio.CancelledError:
+                self._logger.info(f"Query for the `{domain}` domain was cancelled.")
+                raise
+        return self._handle_query_response(
+            domain, query_bundle, response_object, query_start_time
+        )
+
+    async def _aquery(
+        self,
+        query_bundle: QueryBundle,
+        candidates: Optional[list[NodeWithScore]],
+        reranked: bool,
+    ) -> RESPONSE_TYPE:
+        """Runs the async query, skipping retrieval if candidates are provided
+        or the reranked nodes are in the retrieval cache. The cross-encoder
+        reranking runs in a worker thread so it doesn't block the event loop,
+        and the timeout and cancellation of the query can fire while it runs
+        (the worker thread itself finishes in the background).
+
+        Parameters
+        ----------
+        query_bundle : QueryBundle
+            The query bundle for the domain.
+        candidates : list[NodeWithScore] or None
+            Previously retrieved candidate nodes for the domain.
+        reranked : bool
+            Whether the candidates have already been reranked.
+
+        Returns
+        -------
+        RESPONSE_TYPE
+            The query engine response.
+        """
+        if candidates is not None and reranked:
+            nodes = candidates
+        else:
+            nodes = self._load_cached_nodes(query_bundle)
+            if nodes is None:
+                if candidates is None:
+                    candidates = await self._query_engine.retriever.aretrieve(
+                        query_bundle
+                    )
+                nodes = await asyncio.to_thread(
+                    self._rerank_postprocessor.postprocess_nodes,
+                    candidates,
+                    query_bundle=query_bundle,
+                )
+                self._store_cached_nodes(query_bundle, nodes)
+        return await self._query_engine.asynthesize(query_bundle, nodes)
+
+    def retrieve_all(
+        self, domains: Optional[list[DomainKey]] = None
+    ) -> dict[DomainKey, list[NodeWithScore]]:
+        """Retrieves the candidate nodes for several domains at once. The
+        retrieval prompts are embedded in a single batched request and, for the
+        default in-memory vector store and the local vector stores, every domain
+        is searched for in a single batched search (fused with the BM25 results
+        for hybrid retrieval). The candidates are the nodes that would be
+        handed to the reranker by the query engine.
+
+        Parameters
+        ----------
+        domains : list[DomainKey] or None, optional
+            The domains to retrieve for, defaults to every domain.
+
+        Returns
+        -------
+        dict[DomainKey, list[NodeWithScore]]
+            The retrieved candidate nodes for each domain.
+        """
+        domain_list = list(get_args(DomainKey)) if domains is None else domains
+        if not domain_list:
+            return {}
+        retrieval_prompts = [
+            RETRIEVAL_PROMPT.format(domain, self._domain_map[domain]["retrieval_prompt"])
+            for domain in domain_list
+        ]
+        query_embeddings = get_query_embedding_batch(
+            self._embed_model, retrieval_prompts
+        )
+        top_k = self._similarity_top_k * 3
+
+        retriever = self._query_engine.retriever
+        vector_store = self._index.vector_store
+        if isinstance(vector_store, (LocalVectorStore, MatrixSimpleVectorStore)):
+            results = vector_store.batch_query(query_embeddings, top_k)
+        else:
+            return {
+                domain: retriever.retrieve(
+                    QueryBundle(query_str=prompt, embedding=embedding)
+                )
+                for domain, prompt, embedding in zip(
+                    domain_list, retrieval_prompts, query_embeddings
+                )
+            }
+
+        if isinstance(retriever, HybridRetriever):
+            bm25_results = retriever.bm25_index.batch_query(retrieval_prompts, top_k)
+            return {
+                domain: retriever.fuse(vector_result, bm25_result)
+                for domain, vector_result, bm25_result in zip(
+                    domain_list, results, bm25_results
+                )
+            }
+
+        node_ids = list({node_id for result in results for node_id, _ in result})
+        nodes = dict(zip(node_ids, self._index.docstore.get_nodes(node_ids)))
+        return {
+            domain: [
+                NodeWithScore(node=nodes[node_id], score=score)
+                for node_id, score in result
+            ]
+            for domain, result in zip(domain_list, results)
+        }
+
+    def rerank_all(
+        self, candidates: dict[DomainKey, list[NodeWithScore]]
+    ) -> dict[DomainKey, list[NodeWithScore]]:
+        """Reranks the candidate nodes for several domains in a single
+        cross-encoder batch. The rerank query for a domain includes the
+        content of its already generated dependencies, so the results are only
+        valid until one of those dependencies is regenerated. The results are
+        stored in the retrieval cache.
+
+        Parameters
+        ----------
+        candidates : dict[DomainKey, list[NodeWithScore]]
+            The retrieved candidate nodes for each domain (see `retrieve_all`).
+
+        Returns
+        -------
+        dict[DomainKey, list[NodeWithScore]]
+            The reranked nodes for each domain.
+        """
+        if not candidates:
+            return {}
+        domains = list(candidates.keys())
+        query_bundles = [self._create_query_bundle(domain) for domain in domains]
+        reranked = self._rerank_postprocessor.postprocess_batch(
+            [
+                (candidates[domain], query_bundle)
+                for domain, query_bundle in zip(domains, query_bundles)
+            ]
+        )
+        for query_bundle, nodes in zip(query_bundles, reranked):
+            self._store_cached_nodes(query_bundle, nodes)
+        return dict(zip(domains, reranked))
+
+    def _retrieval_cache_key(self, query_bundle: QueryBundle) -> Optional[str]:
+        """Builds the retrieval cache key for a domain query.
+
+        Parameters
+        ----------
+        query_bundle : QueryBundle
+            The query bundle for the domain.
+
+        Returns
+        -------
+        str or None
+            The retrieval cache key or None if the retrieval cache is disabled.
+        """
+        if self._retrieval_cache is None or self._index_key is None:
+            return None
+        return retrieval_key(
+            index_key=self._index_key,
+            retrieval_prompt="\n".join(query_bundle.embedding_strs),
+            similarity_top_k=self._similarity_top_k,
+            rerank_query=query_bundle.query_str,
+            rerank_model=self._rerank_postprocessor.model,
+        )
+
+    def _load_cached_nodes(
+        self, query_bundle: QueryBundle
+    ) -> Optional[list[NodeWithScore]]:
+        """Loads the cached post-rerank nodes for a domain query.
+
+        Parameters
+        ----------
+        query_bundle : QueryBundle
+            The query bundle for the domain.
+
+        Returns
+        -------
+        list[NodeWithScore] or None
+            The cached nodes or None on a cache miss.
+        """
+        key = self._retrieval_cache_key(query_bundle)
+        if key is None or self._retrieval_cache is None:
+            return None
+        nodes = self._retrieval_cache.load(key)
+        if nodes is not None:
+            self._logger.info(f"Retrieval cache hit `{key}`.")
+        return nodes
+
+    def _store_cached_nodes(
+        self, query_bundle: QueryBundle, nodes: list[NodeWithScore]
+    ):
+        """Stores the post-rerank nodes for a domain query.
+
+        Parameters
+        ----------
+        query_bundle : QueryBundle
+            The query bundle for the domain.
+        nodes : list[NodeWithScore]
+            The post-rerank nodes.
+        """
+        key = self._retrieval_cache_key(query_bundle)
+        if key is None or self._retrieval_cache is None:
+            return
+        if not self._retrieval_cache.store(key, nodes):
+            self._logger.error(f"Failed to store retrieval results `{key}`.")
+
+    def generate_all(
+        self,
+        domains: Optional[list[DomainKey]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[DomainKey, str]:
+        """Generates several domains concurrently. Synchronous wrapper around
+        `agenerate_all`, must not be called from within a running event loop.
+
+        Parameters
+        ----------
+        domains : list[DomainKey] or None, optional
+            The domains to generate, defaults to every domain.
+        max_concurrency : int or None, optional
+            The maximum number of domain queries in flight at once for this
+            call, the instance wide `max_concurrent_queries` limit still applies.
+        timeout : float or None, optional
+            The per domain query timeout in seconds.
+
+        Returns
+        -------
+        dict[DomainKey, str]
+            The generated domains.
+        """
+        return asyncio.run(self.agenerate_all(domains, max_concurrency, timeout))
+
+    async def agenerate_all(
+        self,
+        domains: Optional[list[DomainKey]] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> dict[DomainKey, str]:
+        """Generates several domains concurrently. Domains are scheduled
+        according to the `dependencies` lists in the domain map, a domain is
+        only queried once all of its dependencies have been generated and
+        independent domains are queried concurrently. Any dependencies that
+        are missing from `domains` and have not been generated yet are added.
+        The retrieval for every domain is done up front in a single batch (see
+        `retrieve_all`), as is the reranking for every domain that doesn't
+        wait on a dependency (see `rerank_all`). Domains with cached retrieval
+        results skip both steps. If any domain fails, the
+        remaining queries are cancelled.
+
+        Parameters
+        ----------
+        domains : list[DomainKey] or None, optional
+            The domains to generate, defaults to every domain.
+        max_concurrency : int or None, optional
+            The maximum number of domain queries in flight at once for this
+            call, the instance wide `max_concurrent_queries` limit still applies.
+        timeout : float or None, optional
+            The per domain query timeout in seconds.
+
+        Returns
+        -------
+        dict[DomainKey, str]
+            The generated domains.
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        domain_order = self._domain_generation_order(
+            list(get_args(DomainKey)) if domains is None else domains
+        )
+        semaphore = asyncio.Semaphore(
+            max_concurrency if max_concurrency is not None else len(domain_order)
+        )
+        # domains waiting on a dependency from this call can only be reranked
+        # once the dependency is generated, the rest are handled up front
+        ready = [
+            domain
+            for domain in domain_order
+            if not any(
+                dependency in domain_order
+                for dependency in self._domain_map[domain]["dependencies"]
+            )
+        ]
+        reranked: dict[DomainKey, list[NodeWithScore]] = {}
+        for domain in ready:
+            nodes = self._load_cached_nodes(self._create_query_bundle(domain))
+            if nodes is not None:
+                reranked[domain] = nodes
+        candidates = self.retrieve_all(
+            [domain for domain in domain_order if domain not in reranked]
+        )
+        reranked.update(
+            await asyncio.to_thread(
+                self.rerank_all,
+                {domain: candidates[domain] for domain in ready if domain in candidates},
+            )
+        )
+        tasks: dict[DomainKey, asyncio.Task[str]] = {}
+
+        async def _generate(domain: DomainKey) -> str:
+            dependencies = [
+                tasks[dependency]
+                for dependency in self._domain_map[domain]["dependencies"]
+                if dependency in tasks
+            ]
+            if dependencies:
+                await asyncio.gather(*dependencies)
+            async with semaphore:
+                return await self.aperform_query(
+                    domain,
+                    timeout=timeout,
+                    candidates=reranked.get(domain, candidates.get(domain)),
+                    reranked=domain in reranked,
+                )
+
+        for domain in domain_order:
+            tasks[domain] = asyncio.create_task(_generate(domain))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            self.export_output_map()
+        return {domain: task.result() for domain, task in tasks.items()}
+
+    def export_output_map(self) -> bool:
+        """Writes the `output_map.json` and `output_map.tsv` views of the
+        document's output tracker.
+
+        Returns
+        -------
+        bool
+            Whether the JSON output map was successfully written.
+        """
+        return self._output_tracker.export()
+
+    def close(self):
+        """Writes the output map views (see `export_output_map`) and closes
+        the output tracker and the embedding cache. The instance can't
+        generate domains afterwards.
+        """
+        self.export_output_map()
+        self._output_tracker.close()
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+
+    def __enter__(self) -> "BcoRag":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _query_semaphore(self) -> asyncio.Semaphore:
+        """Gets the semaphore bounding the concurrent queries for the running
+        event loop (semaphores can't be shared across event loops).
+
+        Returns
+        -------
+        asyncio.Semaphore
+            The query semaphore for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._query_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_concurrent_queries)
+            self._query_semaphores[loop] = semaphore
+        return semaphore
+
+    def _retrieval_prompts(self) -> list[str]:
+        """Builds the full retrieval prompt for every domain. These are static
+        across papers and runs.
+
+        Returns
+        -------
+        list[str]
+            The retrieval prompts.
+        """
+        domain: DomainKey
+        return [
+            RETRIEVAL_PROMPT.format(domain, self._domain_map[domain]["retrieval_prompt"])
+            for domain in get_args(DomainKey)
+        ]
+
+    def _create_query_bundle(self, domain: DomainKey) -> QueryBundle:
+        """Builds the query bundle for a domain, including the content of any
+        already generated dependency domains in the LLM prompt.
+
+        Parameters
+        ----------
+        domain : DomainKey
+            The domain being queried for.
+
+        Returns
+        -------
+        QueryBundle
+            The query bundle holding the LLM prompt and the retrieval prompt.
+        """
         domain_retrieval_prompt = self._domain_map[domain]["retrieval_prompt"]
         domain_llm_prompt = self._domain_map[domain]["llm_prompt"]
 
@@ -360,9 +1501,33 @@ class BcoRag:
             ],
             embedding=None,
         )
+        return query_bundle
+
+    def _handle_query_response(
+        self,
+        domain: DomainKey,
+        query_bundle: QueryBundle,
+        response_object: RESPONSE_TYPE,
+        query_start_time: float,
+    ) -> str:
+        """Updates the domain content with a query response and dumps the output.
 
-        response_object = self._query_engine.query(query_bundle)
+        Parameters
+        ----------
+        domain : DomainKey
+            The domain that was queried for.
+        query_bundle : QueryBundle
+            The query bundle used for the query.
+        response_object : RESPONSE_TYPE
+            The query engine response.
+        query_start_time : float
+            The time the query was started.
 
+        Returns
+        -------
+        str
+            The generated domain.
+        """
         if isinstance(response_object, Response):
             response_object = Response(
                 response=response_object.response,
@@ -422,6 +1587,47 @@ class BcoRag:
 
         return query_response
 
+    def shared_index(self) -> SharedIndex:
+        """Gets the built index so it can be reused by another instance with
+        the same index parameters.
+
+        Returns
+        -------
+        SharedIndex
+            The index, its fingerprint and the documents it was built from.
+        """
+        return create_shared_index(
+            index_key=self._index_key,  # type: ignore
+            index=self._index,
+            documents=self._documents,
+        )
+
+    def shared_indexes(self) -> dict[str, SharedIndex]:
+        """Gets the indexes built for every chunking config of the chunking
+        sweep, including this instance's own index, so they can be reused by
+        instances that only differ in the chunking config.
+
+        Returns
+        -------
+        dict[str, SharedIndex]
+            The shared index for each chunking config.
+        """
+        if not self._shared_indexes:
+            return {self._chunking_config: self.shared_index()}
+        return dict(self._shared_indexes)
+
+    def embedding_cache_stats(self) -> Optional[EmbeddingCacheStats]:
+        """Gets the embedding cache hit/miss counters for this instance.
+
+        Returns
+        -------
+        EmbeddingCacheStats or None
+            The counters or None if caching is disabled.
+        """
+        if isinstance(self._embed_model, CachedEmbedding):
+            return self._embed_model.stats
+        return None
+
     def choose_domain(
         self, automatic_query: bool = False
     ) -> Optional[tuple[DomainKey, str] | DomainKey]:
@@ -508,11 +1714,8 @@ class BcoRag:
         """Attempts to serialize the response into a JSON object and dumps the output.
         Also dumps the raw text regardless if JSON serialization was successful. The
         file dumps are dumped to the `output` directory located in the root of this
-        repo. Keeps a TSV file to track all of the domain outputs and what parameter
-        set generated the results.
-
-        Note: This function is getting long with some redundancy, it should be re-written
-        at some point. It works, but is ugly.
+        repo. The run is recorded in the output tracker along with the parameter set
+        that generated the results (see `bcorag.output_tracker`).
 
         Parameters
         ----------
@@ -550,195 +1753,67 @@ class BcoRag:
         generated_dir = os.path.join(self._output_path_root, "generated_domains")
         misc_fns.check_dir(generated_dir)
 
-        txt_file_unindexed = os.path.join(
-            generated_dir, f"{domain}-(index)-{self._parameter_set_hash}.txt"
-        )
-        json_file_unindexed = os.path.join(
-            generated_dir, f"{domain}-(index)-{self._parameter_set_hash}.json"
+        index = self._output_tracker.reserve_run(
+            domain, self._parameter_set_hash, self._output_tracker_param_set()
         )
-        source_file_unindexed = os.path.join(
-            self._output_path_root,
-            "reference_sources",
-            f"{domain}-(index)-{self._parameter_set_hash}.txt",
+        file_name = f"{domain}-{index}-{self._parameter_set_hash}"
+        txt_file = os.path.join(generated_dir, f"{file_name}.txt")
+        json_file = os.path.join(generated_dir, f"{file_name}.json")
+        source_file = os.path.join(
+            self._output_path_root, "reference_sources", f"{file_name}.txt"
         )
-
-        output_map_json = misc_fns.load_output_tracker(
-            os.path.join(self._output_path_root, "output_map.json")
+        if not dump_json_response(json_file, response):
+            json_file = "NA"
+
+        run_entry = create_output_tracker_runs_entry(
+            index,
+            misc_fns.create_timestamp(),
+            txt_file,
+            json_file,
+            source_file,
+            elapsed_time,
         )
 
-        # Create a new output file if one doesn't exist
-        if output_map_json is None:
-
-            txt_file = txt_file_unindexed.replace("(index)", "1")
-            json_file = json_file_unindexed.replace("(index)", "1")
-            source_file = source_file_unindexed.replace("(index)", "1")
-            if not dump_json_response(json_file, response):
-                json_file = "NA"
-
-            run_entry = create_output_tracker_runs_entry(
-                1,
-                misc_fns.create_timestamp(),
-                txt_file,
-                json_file,
-                source_file,
-                elapsed_time,
-            )
-
-            directory_filter: OutputTrackerGitFilter | None = None
-            file_ext_filter: OutputTrackerGitFilter | None = None
-            if self._git_data is not None:
-                for filter in self._git_data["filters"]:
-                    if filter["filter"] == GitFilter.FILE_EXTENSION:
-                        file_ext_filter = create_output_tracker_git_filter(
-                            ("include", filter["value"])
-                            if filter["filter_type"]
-                            == GithubRepositoryReader.FilterType.INCLUDE
-                            else ("exclude", filter["value"])
-                        )
-                    elif filter["filter"] == GitFilter.DIRECTORY:
-                        directory_filter = create_output_tracker_git_filter(
-                            ("include", filter["value"])
-                            if filter["filter_type"]
-                            == GithubRepositoryReader.FilterType.INCLUDE
-                            else ("exclude", filter["value"])
-                        )
-
-            param_set = create_output_tracker_param_set(
-                loader=self._loader,
-                vector_store=self._vector_store,
-                llm=self._llm_model_name,
-                embedding_model=self._embed_model_name,
-                similarity_top_k=self._similarity_top_k,
-                chunking_config=self._chunking_config,
-                git_user=self._git_data["user"] if self._git_data is not None else None,
-                git_repo=self._git_data["repo"] if self._git_data is not None else None,
-                git_branch=(
-                    self._git_data["branch"] if self._git_data is not None else None
-                ),
-                directory_git_filter=directory_filter,
-                file_ext_git_filter=file_ext_filter,
-                other_docs=self._other_docs,
-            )
-
-            instance_entry = create_output_tracker_entry(1, param_set, [run_entry])
-
-            domain_entry = create_output_tracker_domain_entry(
-                self._parameter_set_hash, instance_entry
-            )
-
-            output_data = default_output_tracker_file()
-            output_data[domain].append(domain_entry)
-
-        # update output map
-        else:
-
-            domain_map_entries = output_map_json[domain]
-
-            for domain_map_entry in domain_map_entries:
-
-                # found the collision entry
-                if domain_map_entry["hash_str"] == self._parameter_set_hash:
-
-                    new_index = domain_map_entry["entries"]["curr_index"] + 1
-                    domain_map_entry["entries"]["curr_index"] = new_index
-
-                    txt_file = txt_file_unindexed.replace("(index)", str(new_index))
-                    json_file = json_file_unindexed.replace("(index)", str(new_index))
-                    source_file = source_file_unindexed.replace(
-                        "(index)", str(new_index)
-                    )
-                    if not dump_json_response(json_file, response):
-                        json_file = "NA"
-
-                    run_entry = create_output_tracker_runs_entry(
-                        new_index,
-                        misc_fns.create_timestamp(),
-                        txt_file,
-                        json_file,
-                        source_file,
-                        elapsed_time,
-                    )
-
-                    domain_map_entry["entries"]["runs"].append(run_entry)
-
-                    break
-
-            # first time parameter set run (loop didn't break)
-            else:
-
-                txt_file = txt_file_unindexed.replace("(index)", "1")
-                json_file = json_file_unindexed.replace("(index)", "1")
-                source_file = source_file_unindexed.replace("(index)", "1")
-                if not dump_json_response(json_file, response):
-                    json_file = "NA"
-
-                run_entry = create_output_tracker_runs_entry(
-                    1,
-                    misc_fns.create_timestamp(),
-                    txt_file,
-                    json_file,
-                    source_file,
-                    elapsed_time,
-                )
-
-                directory_filter = None
-                file_ext_filter = None
-                if self._git_data is not None:
-                    for filter in self._git_data["filters"]:
-                        if filter["filter"] == GitFilter.FILE_EXTENSION:
-                            file_ext_filter = create_output_tracker_git_filter(
-                                ("include", filter["value"])
-                                if filter["filter_type"]
-                                == GithubRepositoryReader.FilterType.INCLUDE
-                                else ("exclude", filter["value"])
-                            )
-                        elif filter["filter"] == GitFilter.DIRECTORY:
-                            directory_filter = create_output_tracker_git_filter(
-                                ("include", filter["value"])
-                                if filter["filter_type"]
-                                == GithubRepositoryReader.FilterType.INCLUDE
-                                else ("exclude", filter["value"])
-                            )
-
-                param_set = create_output_tracker_param_set(
-                    loader=self._loader,
-                    vector_store=self._vector_store,
-                    llm=self._llm_model_name,
-                    embedding_model=self._embed_model_name,
-                    similarity_top_k=self._similarity_top_k,
-                    chunking_config=self._chunking_config,
-                    git_user=(
-                        self._git_data["user"] if self._git_data is not None else None
-                    ),
-                    git_repo=(
-                        self._git_data["repo"] if self._git_data is not None else None
-                    ),
-                    git_branch=(
-                        self._git_data["branch"] if self._git_data is not None else None
-                    ),
-                    directory_git_filter=directory_filter,
-                    file_ext_git_filter=file_ext_filter,
-                    other_docs=self._other_docs,
-                )
+        misc_fns.dump_string(txt_file, response)
+        misc_fns.dump_string(source_file, source_str)
+        self._output_tracker.add_run(domain, self._parameter_set_hash, run_entry)
 
-                instance_entry = create_output_tracker_entry(1, param_set, [run_entry])
+    def _output_tracker_param_set(self) -> OutputTrackerParamSet:
+        """Builds the output tracker parameter set for this instance.
 
-                domain_entry = create_output_tracker_domain_entry(
-                    self._parameter_set_hash, instance_entry
+        Returns
+        -------
+        OutputTrackerParamSet
+            The parameter set recorded with each run.
+        """
+        git_filters: dict[GitFilter, OutputTrackerGitFilter] = {}
+        if self._git_data is not None:
+            for filter in self._git_data["filters"]:
+                git_filters[filter["filter"]] = create_output_tracker_git_filter(
+                    ("include", [str(value) for value in filter["value"]])
+                    if filter["filter_type"] == GithubRepositoryReader.FilterType.INCLUDE
+                    else ("exclude", [str(value) for value in filter["value"]])
                 )
 
-                domain_map_entries.append(domain_entry)
-
-            output_data = output_map_json
-
-        misc_fns.dump_string(txt_file, response)
-        misc_fns.dump_string(source_file, source_str)
-        # writes the output mapping files
-        misc_fns.write_json(
-            os.path.join(self._output_path_root, "output_map.json"), output_data
-        )
-        misc_fns.dump_output_file_map_tsv(
-            os.path.join(self._output_path_root, "output_map.tsv"), output_data
+        return create_output_tracker_param_set(
+            loader=self._loader,
+            vector_store=self._vector_store,
+            llm=self._llm_model_name,
+            embedding_model=self._embed_model_name,
+            similarity_top_k=self._similarity_top_k,
+            chunking_config=self._chunking_config,
+            git_user=self._git_data["user"] if self._git_data is not None else None,
+            git_repo=self._git_data["repo"] if self._git_data is not None else None,
+            git_branch=self._git_data["branch"] if self._git_data is not None else None,
+            directory_git_filter=git_filters.get(GitFilter.DIRECTORY),
+            file_ext_git_filter=git_filters.get(GitFilter.FILE_EXTENSION),
+            glob_git_filter=git_filters.get(GitFilter.GLOB),
+            max_file_size_git_filter=git_filters.get(GitFilter.MAX_FILE_SIZE),
+            binary_git_filter=git_filters.get(GitFilter.BINARY),
+            git_local_path=(
+                self._git_data.get("local_path") if self._git_data is not None else None
+            ),
+            other_docs=self._other_docs,
         )
 
     def _display_info(
@@ -789,6 +1864,8 @@ class BcoRag:
             hash_list.append(params["git_data"]["user"])
             hash_list.append(params["git_data"]["repo"])
             hash_list.append(params["git_data"]["branch"])
+            if params["git_data"].get("local_path") is not None:
+                hash_list.append(os.path.abspath(params["git_data"]["local_path"]))
 
             for filter in params["git_data"]["filters"]:
 
@@ -799,6 +1876,11 @@ class BcoRag:
                     else "exclude"
                 )
                 filter_str = f"{filter_type}-{filter['value']}"
+                if filter["filter"] not in (
+                    GitFilter.DIRECTORY,
+                    GitFilter.FILE_EXTENSION,
+                ):
+                    filter_str = f"{filter['filter'].name.lower()}-{filter_str}"
                 hash_list.append(filter_str)
 
         sorted(hash_list)
@@ -806,6 +1888,39 @@ class BcoRag:
         hash_hex = md5(hash_str.encode("utf-8")).hexdigest()
         return hash_hex
 
+    def _domain_generation_order(self, domains: list[DomainKey]) -> list[DomainKey]:
+        """Orders domains so that every domain comes after its dependencies.
+        Dependencies that haven't been generated yet are added to the order.
+
+        Parameters
+        ----------
+        domains : list[DomainKey]
+            The domains to order.
+
+        Returns
+        -------
+        list[DomainKey]
+            The domains in dependency order.
+        """
+        order: list[DomainKey] = []
+        visiting: set[DomainKey] = set()
+
+        def _visit(domain: DomainKey):
+            if domain in order:
+                return
+            if domain in visiting:
+                raise ValueError(f"Circular domain dependency on `{domain}`.")
+            visiting.add(domain)
+            for dependency in self._domain_map[domain]["dependencies"]:
+                if dependency in domains or self.domain_content[dependency] is None:
+                    _visit(dependency)
+            visiting.remove(domain)
+            order.append(domain)
+
+        for domain in domains:
+            _visit(domain)
+        return order
+
     def _check_dependencies(self, domain: DomainKey) -> bool:
         """Checks a domain's dependencies.
 
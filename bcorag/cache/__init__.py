@@ -0,0 +1,9 @@
+""" Disk backed caches used by the BcoRag tool core.
+
+Each cache lives in its own subdirectory under the cache root directory
+(`./cache` relative to the `main.py` entry point by default).
+"""
+
+import os
+
+DEFAULT_CACHE_DIR = os.path.join(".", "cache")
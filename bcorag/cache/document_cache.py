@@ -0,0 +1,176 @@
+""" Parsed document cache.
+
+Parsing the paper is repeated on every `BcoRag` construction, and with the
+`PDFMarker` loader it can take tens of seconds per paper. The document cache
+stores the serialized `Document` list produced by a loader on disk, keyed by
+the file contents hash, the loader name and the installed loader version, so
+later constructions can deserialize the documents instead of re-parsing.
+"""
+
+import os
+import logging
+from hashlib import sha256
+from pathlib import Path
+from importlib.metadata import version, PackageNotFoundError
+from typing import Optional
+from llama_index.core.schema import Document
+from . import DEFAULT_CACHE_DIR
+from ..misc_functions import load_json, write_json_atomic
+
+# maps each supported loader to the distributions that affect its output (the
+# `SimpleDirectoryReader` parses PDF and other files with the default readers
+# from `llama-index-readers-file`)
+LOADER_DISTRIBUTIONS = {
+    "SimpleDirectoryReader": ("llama-index-core", "llama-index-readers-file"),
+    "PDFReader": ("llama-index-readers-file",),
+    "PDFMarker": ("llama-index-readers-pdf-marker",),
+}
+
+
+def file_hash(file_path: str) -> str:
+    """Computes the SHA-256 hash of a file's contents.
+
+    Parameters
+    ----------
+    file_path : str
+        The file to hash.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-256 hash.
+    """
+    hasher = sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def loader_version(loader: str) -> str:
+    """Gets the installed versions of the distributions providing a loader.
+
+    Parameters
+    ----------
+    loader : str
+        The loader name.
+
+    Returns
+    -------
+    str
+        The installed versions joined with "+", each "unknown" if it can't be
+        determined.
+    """
+    distributions = LOADER_DISTRIBUTIONS.get(loader)
+    if distributions is None:
+        return "unknown"
+    versions = []
+    for distribution in distributions:
+        try:
+            versions.append(version(distribution))
+        except PackageNotFoundError:
+            versions.append("unknown")
+    return "+".join(versions)
+
+
+class DocumentCache:
+    """Handles storing and loading parsed loader output.
+
+    Attributes
+    ----------
+    _cache_dir : str
+        The directory holding one JSON file per cached loader output.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "documents")):
+        """Constructor.
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            The directory to store the parsed documents in.
+        """
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger("bcorag.cache.document")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def load(self, file_path: str, loader: str) -> Optional[list[Document]]:
+        """Loads the cached documents for a file. Path related metadata is
+        updated to point at `file_path` in case the same contents were cached
+        from a different location.
+
+        Parameters
+        ----------
+        file_path : str
+            The file that was parsed.
+        loader : str
+            The loader name.
+
+        Returns
+        -------
+        list[Document] | None
+            The deserialized documents or None on a cache miss.
+        """
+        try:
+            cached = load_json(self._entry_path(file_path, loader))
+            if cached is None:
+                return None
+            documents = [Document.from_dict(data) for data in cached["documents"]]
+        except Exception as e:
+            self._logger.error(f"Failed to deserialize cached documents.\n{e}")
+            return None
+        cached_path = str(Path(cached["source_path"]))
+        current_path = str(Path(file_path))
+        if cached_path != current_path:
+            for document in documents:
+                if document.metadata.get("file_path") == cached_path:
+                    document.metadata["file_path"] = current_path
+                if "file_name" in document.metadata:
+                    document.metadata["file_name"] = os.path.basename(file_path)
+        return documents
+
+    def store(self, file_path: str, loader: str, documents: list[Document]) -> bool:
+        """Stores the parsed documents for a file.
+
+        Parameters
+        ----------
+        file_path : str
+            The file that was parsed.
+        loader : str
+            The loader name.
+        documents : list[Document]
+            The loader output.
+
+        Returns
+        -------
+        bool
+            Whether the documents were successfully stored.
+        """
+        data = {
+            "source_path": file_path,
+            "loader": loader,
+            "loader_version": loader_version(loader),
+            "documents": [document.to_dict() for document in documents],
+        }
+        return write_json_atomic(self._entry_path(file_path, loader), data)
+
+    def _entry_path(self, file_path: str, loader: str) -> str:
+        """Builds the cache entry path for a file and loader.
+
+        Parameters
+        ----------
+        file_path : str
+            The file being parsed.
+        loader : str
+            The loader name.
+
+        Returns
+        -------
+        str
+            The JSON file path for the cache entry.
+        """
+        key_str = f"{file_hash(file_path)}_{loader}_{loader_version(loader)}"
+        key = sha256(key_str.encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, f"{key}.json")
@@ -0,0 +1,666 @@
+""" Content addressed embedding cache.
+
+Different chunking configurations often produce identical chunk texts and
+unchanged repository files produce the same chunks on every run. The embedding
+cache stores every computed embedding in a local SQLite database keyed by the
+embedding model and the SHA-256 hash of the embedded text, so each unique
+chunk is only ever embedded once per model. The database is bounded by size
+and evicts the least recently used embeddings once the limit is exceeded.
+
+Query embeddings are stored separately from text embeddings (some embedding
+models embed queries differently than documents). The retrieval prompts are
+static across every paper and run, so once warmed their embeddings never
+have to be fetched over the network again.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from hashlib import sha256
+from typing import Any, Optional, TypedDict, Literal
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.utils import get_tokenizer
+from . import DEFAULT_CACHE_DIR
+
+# 1 GiB
+DEFAULT_MAX_SIZE_BYTES = 1024**3
+# fraction of the max size to evict down to once the limit is exceeded
+EVICTION_TARGET = 0.9
+
+EmbeddingKind = Literal["text", "query"]
+
+# maximum number of text hashes bound to a single lookup statement (SQLite
+# limits the number of variables per statement)
+_LOOKUP_BATCH_SIZE = 500
+
+# maps each embedding kind to its table
+_TABLES: dict[EmbeddingKind, str] = {
+    "text": "embeddings",
+    "query": "query_embeddings",
+}
+
+
+class EmbeddingCacheStats(TypedDict):
+    """Hit/miss counters for an embedding cache.
+
+    Attributes
+    ----------
+    hits : int
+        The number of texts served from the cache.
+    misses : int
+        The number of texts that had to be embedded.
+    saved_tokens : int
+        The estimated number of embedding tokens saved by cache hits.
+    embedded_tokens : int
+        The estimated number of tokens sent to the embedding model.
+    query_hits : int
+        The number of query embeddings served from the cache.
+    query_misses : int
+        The number of query embeddings that had to be embedded.
+    """
+
+    hits: int
+    misses: int
+    saved_tokens: int
+    embedded_tokens: int
+    query_hits: int
+    query_misses: int
+
+
+def default_embedding_cache_stats() -> EmbeddingCacheStats:
+    """Creates an empty, default EmbeddingCacheStats TypedDict.
+
+    Returns
+    -------
+    EmbeddingCacheStats
+    """
+    return_data: EmbeddingCacheStats = {
+        "hits": 0,
+        "misses": 0,
+        "saved_tokens": 0,
+        "embedded_tokens": 0,
+        "query_hits": 0,
+        "query_misses": 0,
+    }
+    return return_data
+
+
+def text_hash(text: str) -> str:
+    """Computes the cache key hash for a text.
+
+    Parameters
+    ----------
+    text : str
+        The text to hash.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-256 hash.
+    """
+    return sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def embedding_model_key(embed_model: BaseEmbedding) -> str:
+    """Builds the model name embeddings are cached under. Shortened
+    `text-embedding-3` embeddings are keyed separately from the full size
+    embeddings of the same model.
+
+    Parameters
+    ----------
+    embed_model : BaseEmbedding
+        The embedding model.
+
+    Returns
+    -------
+    str
+        The model name, including the requested dimensions if any.
+    """
+    dimensions = getattr(embed_model, "dimensions", None)
+    if dimensions is None:
+        return embed_model.model_name
+    return f"{embed_model.model_name}/{dimensions} dimensions"
+
+
+def queries_embed_as_text(embed_model: BaseEmbedding) -> bool:
+    """Checks whether an embedding model embeds queries exactly like texts,
+    in which case queries can be sent through the batched text embedding
+    endpoint. This is the case for the OpenAI embedding models in their
+    default similarity mode.
+
+    Parameters
+    ----------
+    embed_model : BaseEmbedding
+        The embedding model to check.
+
+    Returns
+    -------
+    bool
+        Whether query embeddings can be computed as text embeddings.
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        return queries_embed_as_text(embed_model.embed_model)
+    query_engine = getattr(embed_model, "_query_engine", None)
+    text_engine = getattr(embed_model, "_text_engine", None)
+    return query_engine is not None and query_engine == text_engine
+
+
+def get_query_embedding_batch(
+    embed_model: BaseEmbedding, queries: list[str]
+) -> list[Embedding]:
+    """Embeds several queries, in a single batched request when the model
+    embeds queries exactly like texts.
+
+    Parameters
+    ----------
+    embed_model : BaseEmbedding
+        The embedding model to use.
+    queries : list[str]
+        The queries to embed.
+
+    Returns
+    -------
+    list[list[float]]
+        The query embeddings.
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        return embed_model.get_query_embedding_batch(queries)
+    if queries_embed_as_text(embed_model):
+        return embed_model.get_text_embedding_batch(queries)
+    return [embed_model.get_query_embedding(query) for query in queries]
+
+
+class EmbeddingCache:
+    """SQLite backed embedding store with size based LRU eviction. Safe to
+    share between threads.
+
+    Attributes
+    ----------
+    _path : str
+        The path to the SQLite database file.
+    _max_size_bytes : int
+        The maximum total size of the stored vectors.
+    _connection : sqlite3.Connection
+        The database connection.
+    _lock : threading.Lock
+        Serializes access to the connection.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(
+        self,
+        path: str = os.path.join(DEFAULT_CACHE_DIR, "embeddings.sqlite3"),
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path to the SQLite database file.
+        max_size_bytes : int, optional
+            The maximum total size of the stored vectors before the least
+            recently used entries are evicted.
+        """
+        self._path = path
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("bcorag.cache.embedding")
+        parent_dir = os.path.dirname(path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            for table in _TABLES.values():
+                self._connection.execute(
+                    f"""CREATE TABLE IF NOT EXISTS {table} (
+                        model TEXT NOT NULL,
+                        text_hash TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        last_access REAL NOT NULL,
+                        tokens INTEGER,
+                        PRIMARY KEY (model, text_hash)
+                    )"""
+                )
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)"
+                )
+
+    def get_many(
+        self, model: str, texts: list[str], kind: EmbeddingKind = "text"
+    ) -> list[Optional[Embedding]]:
+        """Looks up the embeddings for a list of texts.
+
+        Parameters
+        ----------
+        model : str
+            The embedding model name.
+        texts : list[str]
+            The texts to look up.
+        kind : EmbeddingKind, optional
+            Whether to look up text (document) or query embeddings.
+
+        Returns
+        -------
+        list[list[float] | None]
+            The cached embedding for each text or None on a cache miss.
+        """
+        return [
+            entry[0] if entry is not None else None
+            for entry in self.get_entries(model, texts, kind)
+        ]
+
+    def get_entries(
+        self, model: str, texts: list[str], kind: EmbeddingKind = "text"
+    ) -> list[Optional[tuple[Embedding, Optional[int]]]]:
+        """Looks up the embeddings and stored token counts for a list of
+        texts. The texts are looked up in batches of `IN (...)` queries.
+
+        Parameters
+        ----------
+        model : str
+            The embedding model name.
+        texts : list[str]
+            The texts to look up.
+        kind : EmbeddingKind, optional
+            Whether to look up text (document) or query embeddings.
+
+        Returns
+        -------
+        list[tuple[list[float], int | None] | None]
+            The cached embedding and token count (None if it wasn't stored)
+            for each text or None on a cache miss.
+        """
+        table = _TABLES[kind]
+        hashes = [text_hash(text) for text in texts]
+        unique_hashes = list(dict.fromkeys(hashes))
+        found: dict[str, tuple[Embedding, Optional[int]]] = {}
+        with self._lock, self._connection:
+            now = time.time()
+            for i in range(0, len(unique_hashes), _LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[i : i + _LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector, tokens FROM {table} WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for hash_str, vector, tokens in rows:
+                    found[hash_str] = (
+                        np.frombuffer(vector, dtype=np.float32).tolist(),
+                        tokens,
+                    )
+                if rows:
+                    self._connection.execute(
+                        f"UPDATE {table} SET last_access = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                        (now, model, *batch),
+                    )
+        return [found.get(hash_str) for hash_str in hashes]
+
+    def put_many(
+        self,
+        model: str,
+        texts: list[str],
+        embeddings: list[Embedding],
+        kind: EmbeddingKind = "text",
+        tokens: Optional[list[int]] = None,
+    ):
+        """Stores embeddings in the cache and evicts the least recently used
+        entries if the size limit is exceeded.
+
+        Parameters
+        ----------
+        model : str
+            The embedding model name.
+        texts : list[str]
+            The embedded texts.
+        embeddings : list[list[float]]
+            The embedding for each text.
+        kind : EmbeddingKind, optional
+            Whether the embeddings are text (document) or query embeddings.
+        tokens : list[int] or None, optional
+            The token count of each text, stored so cache hits don't have to
+            tokenize the text again.
+        """
+        now = time.time()
+        token_counts: list[Optional[int]] = (
+            list(tokens) if tokens is not None else [None] * len(texts)
+        )
+        rows = []
+        for text, embedding, token_count in zip(texts, embeddings, token_counts):
+            vector = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append((model, text_hash(text), vector, len(vector), now, token_count))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"""INSERT OR REPLACE INTO {_TABLES[kind]}
+                    (model, text_hash, vector, size, last_access, tokens)
+                    VALUES (?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+            self._evict()
+
+    def size_bytes(self) -> int:
+        """Gets the total size of the stored vectors.
+
+        Returns
+        -------
+        int
+            The total size in bytes.
+        """
+        with self._lock:
+            return self._size_bytes()
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _size_bytes(self) -> int:
+        """Gets the total size of the stored vectors. Expects the lock to be held."""
+        total_size = 0
+        for table in _TABLES.values():
+            row = self._connection.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM {table}"
+            ).fetchone()
+            total_size += int(row[0])
+        return total_size
+
+    def _evict(self):
+        """Evicts the least recently used entries until the store is below the
+        eviction target. Expects the lock to be held.
+        """
+        total_size = self._size_bytes()
+        if total_size <= self._max_size_bytes:
+            return
+        target_size = int(self._max_size_bytes * EVICTION_TARGET)
+        evicted = 0
+        union_query = " UNION ALL ".join(
+            f"SELECT '{table}', model, text_hash, size, last_access FROM {table}"
+            for table in _TABLES.values()
+        )
+        cursor = self._connection.execute(f"{union_query} ORDER BY last_access ASC")
+        to_delete: dict[str, list[tuple[str, str]]] = {
+            table: [] for table in _TABLES.values()
+        }
+        for table, model, hash_str, size, _ in cursor:
+            if total_size <= target_size:
+                break
+            to_delete[table].append((model, hash_str))
+            total_size -= size
+            evicted += 1
+        for table, rows in to_delete.items():
+            self._connection.executemany(
+                f"DELETE FROM {table} WHERE model = ? AND text_hash = ?", rows
+            )
+        self._logger.info(f"Evicted {evicted} embeddings from the embedding cache.")
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that serves text and query embeddings from an
+    `EmbeddingCache` and only forwards cache misses to the wrapped model.
+
+    Attributes
+    ----------
+    _embed_model : BaseEmbedding
+        The wrapped embedding model.
+    _cache : EmbeddingCache
+        The embedding cache.
+    _tokenizer : Callable or None
+        Tokenizer used to estimate token counts (loaded on first use, the
+        llama index default tokenizer ships with its encoding so it works
+        offline).
+    _stats : EmbeddingCacheStats
+        The hit/miss counters.
+    _stats_lock : threading.Lock
+        Guards the counters.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _stats: EmbeddingCacheStats = PrivateAttr()
+    _stats_lock: Any = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        """Constructor.
+
+        Parameters
+        ----------
+        embed_model : BaseEmbedding
+            The embedding model to wrap.
+        cache : EmbeddingCache
+            The embedding cache to use.
+        """
+        super().__init__(
+            model_name=embedding_model_key(embed_model),
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache = cache
+        self._tokenizer = None
+        self._stats = default_embedding_cache_stats()
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def stats(self) -> EmbeddingCacheStats:
+        """Gets a copy of the hit/miss counters.
+
+        Returns
+        -------
+        EmbeddingCacheStats
+        """
+        with self._stats_lock:
+            return_data: EmbeddingCacheStats = {**self._stats}  # type: ignore
+        return return_data
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        """Gets the wrapped embedding model."""
+        return self._embed_model
+
+    def get_query_embedding_batch(self, queries: list[str]) -> list[Embedding]:
+        """Embeds several queries. Cached query embeddings are served from the
+        cache and the misses are embedded together in a single batched request
+        when the wrapped model embeds queries exactly like texts.
+
+        Parameters
+        ----------
+        queries : list[str]
+            The queries to embed.
+
+        Returns
+        -------
+        list[list[float]]
+            The query embeddings.
+        """
+        cached = self._cache.get_many(self.model_name, queries, kind="query")
+        missing = list(
+            dict.fromkeys(
+                query for query, embedding in zip(queries, cached) if embedding is None
+            )
+        )
+        for embedding in cached:
+            self._record_query(embedding is not None)
+        if not missing:
+            return cached  # type: ignore
+        if queries_embed_as_text(self._embed_model):
+            embeddings = self._embed_model.get_text_embedding_batch(missing)
+        else:
+            embeddings = [
+                self._embed_model.get_query_embedding(query) for query in missing
+            ]
+        self._cache.put_many(self.model_name, missing, embeddings, kind="query")
+        return self._merge(queries, cached, missing, embeddings)  # type: ignore
+
+    def warm_queries(self, queries: list[str]):
+        """Makes sure the query embeddings for a list of static queries are
+        cached so later lookups don't need a network call.
+
+        Parameters
+        ----------
+        queries : list[str]
+            The queries to warm.
+        """
+        self.get_query_embedding_batch(queries)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        embedding = self._cache.get_many(self.model_name, [query], kind="query")[0]
+        self._record_query(embedding is not None)
+        if embedding is None:
+            embedding = self._embed_model._get_query_embedding(query)
+            self._cache.put_many(self.model_name, [query], [embedding], kind="query")
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        embedding = self._cache.get_many(self.model_name, [query], kind="query")[0]
+        self._record_query(embedding is not None)
+        if embedding is None:
+            embedding = await self._embed_model._aget_query_embedding(query)
+            self._cache.put_many(self.model_name, [query], [embedding], kind="query")
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        entries = self._cache.get_entries(self.model_name, texts)
+        cached, missing, missing_tokens = self._record(texts, entries)
+        if missing:
+            embeddings = self._embed_model._get_text_embeddings(missing)
+            self._cache.put_many(
+                self.model_name, missing, embeddings, tokens=missing_tokens
+            )
+            cached = self._merge(texts, cached, missing, embeddings)
+        return cached  # type: ignore
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        entries = self._cache.get_entries(self.model_name, texts)
+        cached, missing, missing_tokens = self._record(texts, entries)
+        if missing:
+            embeddings = await self._embed_model._aget_text_embeddings(missing)
+            self._cache.put_many(
+                self.model_name, missing, embeddings, tokens=missing_tokens
+            )
+            cached = self._merge(texts, cached, missing, embeddings)
+        return cached  # type: ignore
+
+    def _record(
+        self, texts: list[str], entries: list[Optional[tuple[Embedding, Optional[int]]]]
+    ) -> tuple[list[Optional[Embedding]], list[str], list[int]]:
+        """Updates the counters for a lookup and collects the cache misses.
+        Only the misses (and hits stored without a token count) are tokenized,
+        the hits add up their stored token counts.
+
+        Parameters
+        ----------
+        texts : list[str]
+            The looked up texts.
+        entries : list[tuple[list[float], int | None] | None]
+            The lookup results.
+
+        Returns
+        -------
+        tuple[list[list[float] | None], list[str], list[int]]
+            The cached embedding for each text (None on a miss), the unique
+            texts that missed the cache and their token counts.
+        """
+        cached: list[Optional[Embedding]] = []
+        missing: list[str] = []
+        missing_tokens: list[int] = []
+        seen: set[str] = set()
+        hits = 0
+        hit_tokens = 0
+        for text, entry in zip(texts, entries):
+            if entry is not None:
+                embedding, tokens = entry
+                cached.append(embedding)
+                hits += 1
+                hit_tokens += tokens if tokens is not None else self._count_tokens(text)
+                continue
+            cached.append(None)
+            if text not in seen:
+                seen.add(text)
+                missing.append(text)
+                missing_tokens.append(self._count_tokens(text))
+        with self._stats_lock:
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(missing)
+            self._stats["saved_tokens"] += hit_tokens
+            self._stats["embedded_tokens"] += sum(missing_tokens)
+        return cached, missing, missing_tokens
+
+    def _record_query(self, hit: bool):
+        """Updates the query counters for a lookup.
+
+        Parameters
+        ----------
+        hit : bool
+            Whether the query embedding was served from the cache.
+        """
+        with self._stats_lock:
+            if hit:
+                self._stats["query_hits"] += 1
+            else:
+                self._stats["query_misses"] += 1
+
+    def _count_tokens(self, text: str) -> int:
+        """Estimates the number of embedding tokens for a text.
+
+        Parameters
+        ----------
+        text : str
+            The text to count.
+
+        Returns
+        -------
+        int
+            The token count.
+        """
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer()
+        return len(self._tokenizer(text))
+
+    def _merge(
+        self,
+        texts: list[str],
+        cached: list[Optional[Embedding]],
+        missing: list[str],
+        embeddings: list[Embedding],
+    ) -> list[Optional[Embedding]]:
+        """Fills the cache misses with the newly computed embeddings.
+
+        Parameters
+        ----------
+        texts : list[str]
+            The looked up texts.
+        cached : list[list[float] | None]
+            The lookup results.
+        missing : list[str]
+            The texts that were embedded.
+        embeddings : list[list[float]]
+            The new embeddings for the missing texts.
+
+        Returns
+        -------
+        list[list[float] | None]
+            The embedding for every looked up text.
+        """
+        computed = dict(zip(missing, embeddings))
+        return [
+            embedding if embedding is not None else computed[text]
+            for text, embedding in zip(texts, cached)
+        ]
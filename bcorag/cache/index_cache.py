@@ -0,0 +1,507 @@
+""" Persistent vector index cache.
+
+Building the vector index (chunking and embedding the paper, any other
+documents and the optional github repository) is the most expensive step of
+a run. The index cache persists each built index to disk under a fingerprint
+of every input that influences the index contents, so a later run with the
+same inputs can load the index from disk instead of re-embedding.
+
+Each manifest also records which nodes were chunked from which document, so
+when only some of the documents change (such as a github branch gaining a few
+commits or an edited `other_docs` file) the closest cached index can be
+updated incrementally instead of re-embedding every document. Nodes removed
+as duplicates are recorded as aliases of the node they collapsed into, so the
+documents sharing a node are re-chunked together when its owner changes.
+"""
+
+import os
+import json
+import shutil
+import logging
+from hashlib import sha256
+from collections import Counter
+from typing import Iterable, Optional, TypedDict, cast
+from llama_index.core import VectorStoreIndex, load_index_from_storage
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+from . import DEFAULT_CACHE_DIR
+from .. import __version__
+from ..dedup import node_source
+from ..hybrid import BM25Index
+from ..vector_stores import load_storage_context
+from ..misc_functions import create_timestamp, load_json, write_json
+
+MANIFEST_FILE = "manifest.json"
+
+
+class IndexManifest(TypedDict):
+    """Manifest persisted alongside each cached index.
+
+    Attributes
+    ----------
+    key : str
+        The index fingerprint.
+    loader : str
+        The data loader used to ingest the documents.
+    chunking_config : str
+        The chunking configuration used during node parsing.
+    embedding_model : str
+        The embedding model used to embed the nodes.
+    vector_store : str
+        The vector store the index was built for.
+    document_hashes : list[str]
+        The sorted content hashes of every input document.
+    document_nodes : dict[str, list[str]]
+        The IDs of the nodes chunked from each document, by document content
+        hash.
+    document_labels : dict[str, str]
+        The file path (or name) of each document, by document content hash.
+    document_aliases : dict[str, list[list[str]]]
+        The (kept node ID, source) pairs of the duplicate nodes removed from
+        each document, by document content hash.
+    dedup_threshold : float or None
+        The near-duplicate similarity threshold the nodes were deduplicated
+        with, None if they weren't deduplicated.
+    timestamp : str
+        When the index was persisted.
+    version : str
+        The version of the bcorag tool used.
+    """
+
+    key: str
+    loader: str
+    chunking_config: str
+    embedding_model: str
+    vector_store: str
+    document_hashes: list[str]
+    document_nodes: dict[str, list[str]]
+    document_labels: dict[str, str]
+    document_aliases: dict[str, list[list[str]]]
+    dedup_threshold: Optional[float]
+    timestamp: str
+    version: str
+
+
+class IndexUpdate(TypedDict):
+    """Summary of an incremental index update.
+
+    Attributes
+    ----------
+    base_key : str
+        The fingerprint of the cached index that was updated.
+    added : list[str]
+        The new documents.
+    changed : list[str]
+        The documents whose content changed.
+    removed : list[str]
+        The documents no longer present.
+    rechunked : list[str]
+        The unchanged documents re-chunked because nodes they had duplicates
+        collapsed into were deleted.
+    deleted_nodes : int
+        The number of nodes deleted from the cached index.
+    inserted_nodes : int
+        The number of nodes chunked and embedded from the new and changed
+        documents.
+    """
+
+    base_key: str
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+    rechunked: list[str]
+    deleted_nodes: int
+    inserted_nodes: int
+
+
+def document_hash(document: Document) -> str:
+    """Computes the content hash for a document.
+
+    The hash covers the document text along with the metadata that is embedded
+    with it. Metadata excluded from embedding (such as file modification dates)
+    is ignored so that touching a file doesn't invalidate the cache.
+
+    Parameters
+    ----------
+    document : Document
+        The document to hash.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-256 hash.
+    """
+    content = document.get_content(metadata_mode=MetadataMode.EMBED)
+    return sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def document_label(document: Document) -> str:
+    """Gets a readable name for a document to log.
+
+    Parameters
+    ----------
+    document : Document
+        The document.
+
+    Returns
+    -------
+    str
+        The document file path or name, falling back to the document ID.
+    """
+    for key in ("file_path", "file_name"):
+        value = document.metadata.get(key)
+        if value:
+            return str(value)
+    return document.doc_id
+
+
+def document_node_map(
+    documents: list[Document], nodes: Iterable[BaseNode]
+) -> dict[str, list[str]]:
+    """Maps each document content hash to the IDs of the nodes chunked from
+    that document.
+
+    Parameters
+    ----------
+    documents : list[Document]
+        The indexed documents.
+    nodes : Iterable[BaseNode]
+        The nodes chunked from the documents.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        The node IDs for each document content hash.
+    """
+    hashes = {document.doc_id: document_hash(document) for document in documents}
+    node_map: dict[str, list[str]] = {}
+    for node in nodes:
+        content_hash = hashes.get(node.ref_doc_id or "")
+        if content_hash is not None:
+            node_map.setdefault(content_hash, []).append(node.node_id)
+    return node_map
+
+
+def document_alias_map(
+    documents: list[Document], removed: Iterable[tuple[BaseNode, BaseNode]]
+) -> dict[str, list[list[str]]]:
+    """Maps each document content hash to the nodes its duplicate nodes were
+    collapsed into.
+
+    Parameters
+    ----------
+    documents : list[Document]
+        The indexed documents.
+    removed : Iterable[tuple[BaseNode, BaseNode]]
+        The (removed node, kept node) pairs from the deduplicator.
+
+    Returns
+    -------
+    dict[str, list[list[str]]]
+        The (kept node ID, removed node source) pairs for each document
+        content hash.
+    """
+    hashes = {document.doc_id: document_hash(document) for document in documents}
+    alias_map: dict[str, list[list[str]]] = {}
+    for node, kept in removed:
+        content_hash = hashes.get(node.ref_doc_id or "")
+        if content_hash is not None:
+            alias_map.setdefault(content_hash, []).append(
+                [kept.node_id, node_source(node)]
+            )
+    return alias_map
+
+
+def index_fingerprint(
+    documents: list[Document],
+    embedding_model: str,
+    chunking_config: str,
+    loader: str,
+    vector_store: str,
+    dedup_threshold: Optional[float] = None,
+) -> tuple[str, list[str]]:
+    """Computes the cache key for an index.
+
+    Parameters
+    ----------
+    documents : list[Document]
+        Every document being indexed (paper, other docs and repo files).
+    embedding_model : str
+        The embedding model name.
+    chunking_config : str
+        The chunking configuration.
+    loader : str
+        The data loader used for the paper.
+    vector_store : str
+        The vector store.
+    dedup_threshold : float or None, optional
+        The near-duplicate similarity threshold the nodes are deduplicated
+        with, None if they aren't deduplicated.
+
+    Returns
+    -------
+    (str, list[str])
+        The hexidecimal SHA-256 fingerprint and the sorted document hashes
+        it was computed from.
+    """
+    document_hashes = sorted(document_hash(document) for document in documents)
+    key_parts = [embedding_model, chunking_config, loader, vector_store]
+    if dedup_threshold is not None:
+        key_parts.append(f"dedup-{dedup_threshold}")
+    key_parts += document_hashes
+    key = sha256("_".join(key_parts).encode("utf-8")).hexdigest()
+    return key, document_hashes
+
+
+class IndexCache:
+    """Handles persisting and loading cached vector indexes.
+
+    Attributes
+    ----------
+    _cache_dir : str
+        The directory holding one subdirectory per cached index.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "indexes")):
+        """Constructor.
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            The directory to persist the indexes to.
+        """
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger("bcorag.cache.index")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def index_path(self, key: str) -> str:
+        """Gets the persist directory for an index.
+
+        Parameters
+        ----------
+        key : str
+            The index fingerprint.
+
+        Returns
+        -------
+        str
+            The persist directory path.
+        """
+        return os.path.join(self._cache_dir, key)
+
+    def load_manifest(self, key: str) -> Optional[IndexManifest]:
+        """Loads the manifest for a cached index.
+
+        Parameters
+        ----------
+        key : str
+            The index fingerprint.
+
+        Returns
+        -------
+        IndexManifest | None
+            The manifest or None if the index isn't cached.
+        """
+        manifest = load_json(os.path.join(self.index_path(key), MANIFEST_FILE))
+        if manifest is None:
+            return None
+        return cast(IndexManifest, manifest)
+
+    def load(self, key: str) -> Optional[VectorStoreIndex]:
+        """Loads a cached index. The global `Settings.embed_model` is used
+        as the embedding model for the loaded index.
+
+        Parameters
+        ----------
+        key : str
+            The index fingerprint.
+
+        Returns
+        -------
+        VectorStoreIndex | None
+            The loaded index or None on a cache miss or if the cached index
+            could not be loaded.
+        """
+        manifest = self.load_manifest(key)
+        if manifest is None:
+            return None
+        try:
+            storage_context = load_storage_context(
+                manifest["vector_store"], self.index_path(key)
+            )
+            index = load_index_from_storage(storage_context)
+        except Exception as e:
+            self._logger.error(f"Failed to load cached index `{key}`.\n{e}")
+            return None
+        if not isinstance(index, VectorStoreIndex):
+            self._logger.error(
+                f"Cached index `{key}` has unexpected type `{type(index)}`."
+            )
+            return None
+        return index
+
+    def find_base_index(
+        self,
+        loader: str,
+        chunking_config: str,
+        embedding_model: str,
+        vector_store: str,
+        document_hashes: list[str],
+        dedup_threshold: Optional[float] = None,
+    ) -> Optional[IndexManifest]:
+        """Finds the cached index that shares the most documents with a new
+        set of documents, for an incremental update. Only indexes built with
+        the same loader, chunking config, embedding model, vector store and
+        deduplication threshold (and recording their document nodes) are
+        considered.
+
+        Parameters
+        ----------
+        loader : str
+            The data loader used for the paper.
+        chunking_config : str
+            The chunking configuration.
+        embedding_model : str
+            The embedding model name.
+        vector_store : str
+            The vector store.
+        document_hashes : list[str]
+            The content hashes of the new set of documents.
+        dedup_threshold : float or None, optional
+            The near-duplicate similarity threshold, None if the nodes aren't
+            deduplicated.
+
+        Returns
+        -------
+        IndexManifest | None
+            The manifest of the closest cached index or None if no compatible
+            cached index shares any document.
+        """
+        current = Counter(document_hashes)
+        best: Optional[IndexManifest] = None
+        best_overlap = 0
+        for entry in os.scandir(self._cache_dir):
+            if not entry.is_dir() or ".tmp-" in entry.name:
+                continue
+            manifest = self.load_manifest(entry.name)
+            if (
+                manifest is None
+                or not manifest.get("document_nodes")
+                or manifest["loader"] != loader
+                or manifest["chunking_config"] != chunking_config
+                or manifest["embedding_model"] != embedding_model
+                or manifest["vector_store"] != vector_store
+                or manifest.get("dedup_threshold") != dedup_threshold
+            ):
+                continue
+            overlap = sum((Counter(manifest["document_hashes"]) & current).values())
+            if overlap > best_overlap:
+                best, best_overlap = manifest, overlap
+        return best
+
+    def load_bm25_index(self, key: str) -> Optional[BM25Index]:
+        """Loads the BM25 inverted index persisted with a cached index.
+
+        Parameters
+        ----------
+        key : str
+            The index fingerprint.
+
+        Returns
+        -------
+        BM25Index | None
+            The BM25 index or None if none was persisted with the index.
+        """
+        try:
+            return BM25Index.from_persist_dir(self.index_path(key))
+        except Exception as e:
+            self._logger.error(f"Failed to load cached BM25 index `{key}`.\n{e}")
+            return None
+
+    def persist(
+        self,
+        key: str,
+        index: VectorStoreIndex,
+        loader: str,
+        chunking_config: str,
+        embedding_model: str,
+        vector_store: str,
+        document_hashes: list[str],
+        bm25_index: Optional[BM25Index] = None,
+        document_nodes: Optional[dict[str, list[str]]] = None,
+        document_labels: Optional[dict[str, str]] = None,
+        document_aliases: Optional[dict[str, list[list[str]]]] = None,
+        dedup_threshold: Optional[float] = None,
+    ) -> bool:
+        """Persists an index to the cache. The index is written to a temporary
+        directory first and then moved into place so a partially written index
+        is never loaded.
+
+        Parameters
+        ----------
+        key : str
+            The index fingerprint.
+        index : VectorStoreIndex
+            The index to persist.
+        loader : str
+            The data loader used to ingest the documents.
+        chunking_config : str
+            The chunking configuration used during node parsing.
+        embedding_model : str
+            The embedding model used to embed the nodes.
+        vector_store : str
+            The vector store the index was built for.
+        document_hashes : list[str]
+            The sorted content hashes of every input document.
+        bm25_index : BM25Index or None, optional
+            The BM25 inverted index for hybrid retrieval to persist with the
+            index.
+        document_nodes : dict[str, list[str]] or None, optional
+            The node IDs for each document content hash, allowing the index
+            to be updated incrementally by a later run.
+        document_labels : dict[str, str] or None, optional
+            The file path (or name) for each document content hash, to log
+            which documents an incremental update changed.
+        document_aliases : dict[str, list[list[str]]] or None, optional
+            The (kept node ID, source) pairs of the duplicate nodes removed
+            from each document, by document content hash.
+        dedup_threshold : float or None, optional
+            The near-duplicate similarity threshold the nodes were
+            deduplicated with, None if they weren't deduplicated.
+
+        Returns
+        -------
+        bool
+            Whether the index was successfully persisted.
+        """
+        final_path = self.index_path(key)
+        tmp_path = f"{final_path}.tmp-{os.getpid()}"
+        manifest: IndexManifest = {
+            "key": key,
+            "loader": loader,
+            "chunking_config": chunking_config,
+            "embedding_model": embedding_model,
+            "vector_store": vector_store,
+            "document_hashes": document_hashes,
+            "document_nodes": document_nodes or {},
+            "document_labels": document_labels or {},
+            "document_aliases": document_aliases or {},
+            "dedup_threshold": dedup_threshold,
+            "timestamp": create_timestamp(),
+            "version": __version__,
+        }
+        try:
+            index.storage_context.persist(persist_dir=tmp_path)
+            if bm25_index is not None:
+                bm25_index.persist(tmp_path)
+            if not write_json(os.path.join(tmp_path, MANIFEST_FILE), dict(manifest)):
+                raise IOError("Failed to write the index manifest.")
+            if os.path.isdir(final_path):
+                shutil.rmtree(final_path)
+            os.replace(tmp_path, final_path)
+        except Exception as e:
+            self._logger.error(f"Failed to persist index `{key}`.\n{e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        return True
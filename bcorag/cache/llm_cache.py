@@ -0,0 +1,427 @@
+""" LLM response cache.
+
+Re-running a paper with the same parameter set calls the LLM again for every
+domain, even when only the output handling or the evaluation changed. The LLM
+response cache wraps the LLM and stores each response on disk keyed by the
+model name, the fully rendered prompt (including the retrieved context) and
+the generation parameters.
+
+Modes
+-----
+- `off`: the cache is bypassed entirely.
+- `record`: cached responses are replayed, misses call the LLM and are stored.
+- `replay`: only cached responses are used, a miss raises `LlmCacheMissError`
+  instead of calling the LLM so runs are fully offline and deterministic.
+"""
+
+import os
+import json
+import logging
+from hashlib import sha256
+from typing import Any, Optional, Sequence, get_args
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms.llm import LLM
+from . import DEFAULT_CACHE_DIR
+from ..custom_types.core_types import LlmCacheMode
+from ..misc_functions import create_timestamp, load_json, write_json_atomic
+
+# LLM attributes that change the generated output
+GENERATION_PARAMETERS = (
+    "temperature",
+    "max_tokens",
+    "top_p",
+    "logprobs",
+    "top_logprobs",
+    "additional_kwargs",
+)
+
+
+class LlmCacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def validate_llm_cache_mode(mode: str) -> LlmCacheMode:
+    """Validates an LLM cache mode.
+
+    Parameters
+    ----------
+    mode : str
+        The mode to validate.
+
+    Returns
+    -------
+    LlmCacheMode
+        The validated mode.
+
+    Raises
+    ------
+    ValueError
+        If the mode isn't one of `record`, `replay` or `off`.
+    """
+    mode = mode.lower().strip()
+    if mode not in get_args(LlmCacheMode):
+        raise ValueError(
+            f"Invalid LLM cache mode `{mode}`, expected one of {get_args(LlmCacheMode)}."
+        )
+    return mode  # type: ignore
+
+
+def generation_parameters(llm: LLM) -> dict[str, Any]:
+    """Collects the generation parameters of an LLM that affect its output.
+
+    Parameters
+    ----------
+    llm : LLM
+        The LLM.
+
+    Returns
+    -------
+    dict[str, Any]
+        The generation parameters the LLM defines.
+    """
+    return {
+        name: getattr(llm, name)
+        for name in GENERATION_PARAMETERS
+        if getattr(llm, name, None) is not None
+    }
+
+
+class LlmCache:
+    """Handles storing and loading LLM responses.
+
+    Attributes
+    ----------
+    _cache_dir : str
+        The directory holding one JSON file per cached response.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "llm")):
+        """Constructor.
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            The directory to store the responses in.
+        """
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger("bcorag.cache.llm")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, prompt: Any, parameters: dict[str, Any]) -> str:
+        """Computes the cache key for an LLM call.
+
+        Parameters
+        ----------
+        model : str
+            The model name.
+        prompt : Any
+            The rendered prompt (JSON serializable).
+        parameters : dict[str, Any]
+            The generation parameters and any call keyword arguments.
+
+        Returns
+        -------
+        str
+            The hexidecimal SHA-256 key.
+        """
+        key_str = json.dumps(
+            {"model": model, "prompt": prompt, "parameters": parameters},
+            sort_keys=True,
+            default=str,
+        )
+        return sha256(key_str.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[dict[str, Any]]:
+        """Loads a cached response.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        dict[str, Any] | None
+            The cached entry or None on a cache miss (a corrupted entry is
+            removed and treated as a miss).
+        """
+        entry_path = self._entry_path(key)
+        try:
+            entry = load_json(entry_path)
+        except (ValueError, OSError) as e:
+            self._logger.error(f"Removing corrupted LLM cache entry `{key}`.\n{e}")
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            return None
+        if entry is None or isinstance(entry, list):
+            return None
+        return entry
+
+    def store(
+        self, key: str, model: str, prompt: Any, parameters: dict[str, Any], text: str
+    ) -> bool:
+        """Stores a response. The prompt and parameters are stored alongside
+        the response so the cache entries can be inspected.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        model : str
+            The model name.
+        prompt : Any
+            The rendered prompt.
+        parameters : dict[str, Any]
+            The generation parameters and any call keyword arguments.
+        text : str
+            The response text.
+
+        Returns
+        -------
+        bool
+            Whether the response was successfully stored.
+        """
+        entry = {
+            "model": model,
+            "prompt": prompt,
+            "parameters": json.loads(json.dumps(parameters, default=str)),
+            "response": text,
+            "timestamp": create_timestamp(),
+        }
+        return write_json_atomic(self._entry_path(key), entry)
+
+    def _entry_path(self, key: str) -> str:
+        """Builds the cache entry path for a key.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        str
+            The JSON file path for the cache entry.
+        """
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+
+class CachedLLM(LLM):
+    """LLM wrapper that records and replays responses through an `LlmCache`.
+
+    Only the chat and completion calls are cached, streaming calls are passed
+    straight through to the wrapped LLM.
+
+    Attributes
+    ----------
+    _llm : LLM
+        The wrapped LLM.
+    _cache : LlmCache
+        The response cache.
+    _mode : LlmCacheMode
+        The cache mode (`record` or `replay`).
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    _llm: LLM = PrivateAttr()
+    _cache: LlmCache = PrivateAttr()
+    _mode: LlmCacheMode = PrivateAttr()
+    _logger: logging.Logger = PrivateAttr()
+
+    def __init__(self, llm: LLM, cache: LlmCache, mode: LlmCacheMode, **kwargs):
+        """Constructor.
+
+        Parameters
+        ----------
+        llm : LLM
+            The LLM to wrap.
+        cache : LlmCache
+            The response cache.
+        mode : LlmCacheMode
+            The cache mode, must be `record` or `replay`.
+        """
+        if mode == "off":
+            raise ValueError("CachedLLM can't be used with the `off` mode.")
+        super().__init__(callback_manager=llm.callback_manager, **kwargs)
+        self._llm = llm
+        self._cache = cache
+        self._mode = mode
+        self._logger = logging.getLogger("bcorag.cache.llm")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._llm.metadata
+
+    @property
+    def mode(self) -> LlmCacheMode:
+        """Gets the cache mode."""
+        return self._mode
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        prompt = self._chat_prompt(messages)
+        key, parameters = self._key(prompt, kwargs)
+        text = self._lookup(key)
+        if text is None:
+            response = self._llm.chat(messages, **kwargs)
+            self._record(key, prompt, parameters, response.message.content or "")
+            return response
+        return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=text))
+
+    async def achat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponse:
+        prompt = self._chat_prompt(messages)
+        key, parameters = self._key(prompt, kwargs)
+        text = self._lookup(key)
+        if text is None:
+            response = await self._llm.achat(messages, **kwargs)
+            self._record(key, prompt, parameters, response.message.content or "")
+            return response
+        return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=text))
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        key, parameters = self._key(prompt, {**kwargs, "formatted": formatted})
+        text = self._lookup(key)
+        if text is None:
+            response = self._llm.complete(prompt, formatted=formatted, **kwargs)
+            self._record(key, prompt, parameters, response.text)
+            return response
+        return CompletionResponse(text=text)
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        key, parameters = self._key(prompt, {**kwargs, "formatted": formatted})
+        text = self._lookup(key)
+        if text is None:
+            response = await self._llm.acomplete(prompt, formatted=formatted, **kwargs)
+            self._record(key, prompt, parameters, response.text)
+            return response
+        return CompletionResponse(text=text)
+
+    def stream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseGen:
+        return self._llm.stream_chat(messages, **kwargs)
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        return self._llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        return await self._llm.astream_chat(messages, **kwargs)
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        return await self._llm.astream_complete(prompt, formatted=formatted, **kwargs)
+
+    def _chat_prompt(self, messages: Sequence[ChatMessage]) -> list[list[str]]:
+        """Renders chat messages into a JSON serializable prompt.
+
+        Parameters
+        ----------
+        messages : Sequence[ChatMessage]
+            The chat messages.
+
+        Returns
+        -------
+        list[list[str]]
+            The (role, content) pair for each message.
+        """
+        return [[str(message.role.value), message.content or ""] for message in messages]
+
+    def _key(
+        self, prompt: Any, call_kwargs: dict[str, Any]
+    ) -> tuple[str, dict[str, Any]]:
+        """Computes the cache key for a call.
+
+        Parameters
+        ----------
+        prompt : Any
+            The rendered prompt.
+        call_kwargs : dict[str, Any]
+            The call keyword arguments.
+
+        Returns
+        -------
+        (str, dict[str, Any])
+            The cache key and the parameters it was computed from.
+        """
+        parameters = {**generation_parameters(self._llm), **call_kwargs}
+        return self._cache.key(self.metadata.model_name, prompt, parameters), parameters
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Looks up a cached response.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+
+        Returns
+        -------
+        str | None
+            The cached response text or None on a cache miss in record mode.
+
+        Raises
+        ------
+        LlmCacheMissError
+            On a cache miss in replay mode.
+        """
+        entry = self._cache.load(key)
+        if entry is not None:
+            self._logger.info(f"LLM cache hit `{key}`.")
+            return entry["response"]
+        if self._mode == "replay":
+            raise LlmCacheMissError(
+                f"No cached LLM response for `{key}` (model `{self.metadata.model_name}`) in replay mode."
+            )
+        return None
+
+    def _record(
+        self, key: str, prompt: Any, parameters: dict[str, Any], text: str
+    ) -> None:
+        """Stores a fresh response.
+
+        Parameters
+        ----------
+        key : str
+            The cache key.
+        prompt : Any
+            The rendered prompt.
+        parameters : dict[str, Any]
+            The generation parameters and any call keyword arguments.
+        text : str
+            The response text.
+        """
+        if not self._cache.store(
+            key, self.metadata.model_name, prompt, parameters, text
+        ):
+            self._logger.error(f"Failed to store LLM response `{key}`.")
@@ -0,0 +1,145 @@
+""" Retrieval result cache.
+
+When parameter sets only differ in the LLM, the retrieved and reranked source
+nodes for each domain are identical across the runs. The retrieval cache
+stores the final post-rerank nodes for each domain on disk, keyed by the index
+fingerprint, the domain retrieval prompt, the similarity top k and the rerank
+query, so LLM comparison sweeps only run the synthesis step.
+"""
+
+import os
+import logging
+from hashlib import sha256
+from typing import Optional
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+from . import DEFAULT_CACHE_DIR
+from ..misc_functions import create_timestamp, load_json, write_json_atomic
+
+
+def retrieval_key(
+    index_key: str,
+    retrieval_prompt: str,
+    similarity_top_k: int,
+    rerank_query: str,
+    rerank_model: str,
+) -> str:
+    """Computes the cache key for a domain's retrieval results.
+
+    The rerank query is part of the key because it includes the content of
+    any dependency domains, so a dependent domain only hits the cache when its
+    dependencies were generated with the same content.
+
+    Parameters
+    ----------
+    index_key : str
+        The index fingerprint.
+    retrieval_prompt : str
+        The full domain retrieval prompt.
+    similarity_top_k : int
+        The similarity top k (the number of nodes kept after reranking).
+    rerank_query : str
+        The query the retrieved nodes were reranked against.
+    rerank_model : str
+        The reranker model name.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-256 key.
+    """
+    key_str = "_".join(
+        [index_key, retrieval_prompt, str(similarity_top_k), rerank_query, rerank_model]
+    )
+    return sha256(key_str.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class RetrievalCache:
+    """Handles storing and loading post-rerank retrieval results.
+
+    Attributes
+    ----------
+    _cache_dir : str
+        The directory holding one JSON file per cached retrieval result.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "retrieval")):
+        """Constructor.
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            The directory to store the retrieval results in.
+        """
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger("bcorag.cache.retrieval")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def load(self, key: str) -> Optional[list[NodeWithScore]]:
+        """Loads cached retrieval results.
+
+        Parameters
+        ----------
+        key : str
+            The retrieval key.
+
+        Returns
+        -------
+        list[NodeWithScore] | None
+            The cached nodes or None on a cache miss.
+        """
+        try:
+            cached = load_json(self._entry_path(key))
+            if cached is None or isinstance(cached, list):
+                return None
+            return [
+                NodeWithScore(node=json_to_doc(entry["node"]), score=entry["score"])
+                for entry in cached["nodes"]
+            ]
+        except Exception as e:
+            self._logger.error(f"Failed to deserialize cached nodes `{key}`.\n{e}")
+            return None
+
+    def store(self, key: str, nodes: list[NodeWithScore]) -> bool:
+        """Stores retrieval results.
+
+        Parameters
+        ----------
+        key : str
+            The retrieval key.
+        nodes : list[NodeWithScore]
+            The post-rerank nodes.
+
+        Returns
+        -------
+        bool
+            Whether the nodes were successfully stored.
+        """
+        data = {
+            "timestamp": create_timestamp(),
+            "nodes": [
+                {
+                    "node": doc_to_json(node.node),
+                    "score": float(node.score) if node.score is not None else None,
+                }
+                for node in nodes
+            ],
+        }
+        return write_json_atomic(self._entry_path(key), data)
+
+    def _entry_path(self, key: str) -> str:
+        """Builds the cache entry path for a key.
+
+        Parameters
+        ----------
+        key : str
+            The retrieval key.
+
+        Returns
+        -------
+        str
+            The JSON file path for the cache entry.
+        """
+        return os.path.join(self._cache_dir, f"{key}.json")
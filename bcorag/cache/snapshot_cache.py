@@ -0,0 +1,188 @@
+""" Github repository snapshot cache.
+
+Loading a github repository fetches every blob that passes the filters, which
+for large repositories takes minutes and eats into the API rate limit, while
+parameter searches load the same repository for every parameter set. The
+snapshot cache stores the decoded files of a repository on disk keyed by the
+commit SHA the branch resolved to and the filters, so later loads of the same
+commit only make the branch lookup request. The filter prune stats of the
+tree listing are stored with the snapshot, so loads served from the cache
+still report the files, bytes and tokens the filters saved.
+"""
+
+import os
+import json
+import logging
+from hashlib import sha256
+from typing import Optional, TypedDict
+from . import DEFAULT_CACHE_DIR
+from ..custom_types.core_types import GitFilters
+from ..repo_filters import PruneStats
+from ..misc_functions import load_json, write_json_atomic
+
+
+class SnapshotFile(TypedDict):
+    """A decoded file of a repository snapshot.
+
+    Attributes
+    ----------
+    path : str
+        The file path relative to the repository root.
+    sha : str
+        The blob SHA.
+    text : str
+        The decoded file contents.
+    """
+
+    path: str
+    sha: str
+    text: str
+
+
+class Snapshot(TypedDict):
+    """A cached repository snapshot.
+
+    Attributes
+    ----------
+    files : list[SnapshotFile]
+        The decoded files.
+    prune_stats : PruneStats
+        The files pruned by the filters when the snapshot was fetched.
+    """
+
+    files: list[SnapshotFile]
+    prune_stats: PruneStats
+
+
+def create_snapshot(files: list[SnapshotFile], prune_stats: PruneStats) -> Snapshot:
+    """Constructor for the `Snapshot` TypedDict.
+
+    Parameters
+    ----------
+    files : list[SnapshotFile]
+    prune_stats : PruneStats
+
+    Returns
+    -------
+    Snapshot
+    """
+    return_data: Snapshot = {"files": files, "prune_stats": prune_stats}
+    return return_data
+
+
+def snapshot_key(
+    owner: str, repo: str, commit_sha: str, filters: list[GitFilters]
+) -> str:
+    """Computes the cache key for a repository snapshot.
+
+    Parameters
+    ----------
+    owner : str
+        The repository owner.
+    repo : str
+        The repository name.
+    commit_sha : str
+        The commit SHA the branch resolved to.
+    filters : list[GitFilters]
+        The filters applied to the repository files.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-256 key.
+    """
+    filter_parts = sorted(
+        [filter["filter"].name, filter["filter_type"].name, sorted(filter["value"])]
+        for filter in filters
+    )
+    key_str = json.dumps([owner, repo, commit_sha, filter_parts])
+    return sha256(key_str.encode("utf-8")).hexdigest()
+
+
+class SnapshotCache:
+    """Handles storing and loading repository snapshots.
+
+    Attributes
+    ----------
+    _cache_dir : str
+        The directory holding one JSON file per cached snapshot.
+    _logger : logging.Logger
+        The cache logger.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(DEFAULT_CACHE_DIR, "github")):
+        """Constructor.
+
+        Parameters
+        ----------
+        cache_dir : str, optional
+            The directory to store the snapshots in.
+        """
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger("bcorag.cache.snapshot")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def load(self, key: str) -> Optional[Snapshot]:
+        """Loads a cached snapshot.
+
+        Parameters
+        ----------
+        key : str
+            The snapshot key.
+
+        Returns
+        -------
+        Snapshot | None
+            The snapshot or None on a cache miss.
+        """
+        try:
+            cached = load_json(self._entry_path(key))
+            if cached is None:
+                return None
+            prune_stats = cached["prune_stats"]
+            return create_snapshot(
+                files=[
+                    {"path": file["path"], "sha": file["sha"], "text": file["text"]}
+                    for file in cached["files"]
+                ],
+                prune_stats={
+                    "pruned_files": dict(prune_stats["pruned_files"]),
+                    "pruned_bytes": dict(prune_stats["pruned_bytes"]),
+                    "estimated_tokens": int(prune_stats["estimated_tokens"]),
+                },
+            )
+        except Exception as e:
+            self._logger.error(f"Failed to deserialize cached snapshot `{key}`.\n{e}")
+            return None
+
+    def store(self, key: str, snapshot: Snapshot) -> bool:
+        """Stores a snapshot.
+
+        Parameters
+        ----------
+        key : str
+            The snapshot key.
+        snapshot : Snapshot
+            The decoded files and their prune stats.
+
+        Returns
+        -------
+        bool
+            Whether the snapshot was successfully stored.
+        """
+        return write_json_atomic(self._entry_path(key), snapshot)
+
+    def _entry_path(self, key: str) -> str:
+        """Builds the cache entry path for a snapshot.
+
+        Parameters
+        ----------
+        key : str
+            The snapshot key.
+
+        Returns
+        -------
+        str
+            The JSON file path for the cache entry.
+        """
+        return os.path.join(self._cache_dir, f"{key}.json")
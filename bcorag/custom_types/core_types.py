@@ -11,12 +11,14 @@ Type Aliases
         "similarity_top_k",
         "llm",
         "mode"]```
+- ```LlmCacheMode = Literal["record", "replay", "off"]```
 """
 
 from typing import TypedDict, Optional, Literal
 from enum import Enum
 from llama_index.readers.github import GithubRepositoryReader  # type: ignore
-from llama_index.core.schema import NodeWithScore
+from llama_index.core.schema import NodeWithScore, Document
+from llama_index.core import VectorStoreIndex
 
 ### General literals
 
@@ -34,11 +36,13 @@ OptionKey = Literal[
     "mode",
 ]
 
+LlmCacheMode = Literal["record", "replay", "off"]
+
 ### Core logic types
 
 
 class GitFilter(Enum):
-    """Enum delineating between the directory and file extension filters.
+    """Enum delineating between the git filter kinds.
 
     Attributes
     ----------
@@ -46,10 +50,22 @@ class GitFilter(Enum):
         A git directory filter, represented by the value 1.
     FILE_EXTENSION : int
         A file extension filter, represented by the value 2.
+    MAX_FILE_SIZE : int
+        A maximum file size filter, represented by the value 3. The value
+        holds the size limit in bytes and larger files are always excluded.
+    GLOB : int
+        A glob pattern filter on the file paths, represented by the value 4.
+    BINARY : int
+        A binary and minified file filter, represented by the value 5. Files
+        that look binary or minified by their path are always excluded, the
+        value holds any extra glob patterns to treat the same way.
     """
 
     DIRECTORY = 1
     FILE_EXTENSION = 2
+    MAX_FILE_SIZE = 3
+    GLOB = 4
+    BINARY = 5
 
 
 class GitFilters(TypedDict):
@@ -107,9 +123,13 @@ class GitData(TypedDict):
     repo : str
         The repo name.
     branch : str
-        The repo branch to index.
+        The repo branch to index. For a local checkout, any git ref (branch,
+        tag or commit), or an empty string to read the working tree.
     filters : list[GitFilters]
         The list of filters to apply.
+    local_path : str or None
+        The path to a local checkout of the repo to read instead of the
+        github API, or None to load the repo from github.
     """
 
     user: str
@@ -117,10 +137,15 @@ class GitData(TypedDict):
     branch: str
     # TODO : can we refactor this for a tuple?
     filters: list[GitFilters]
+    local_path: Optional[str]
 
 
 def create_git_data(
-    user: str, repo: str, branch: str, filters: list[GitFilters] = []
+    user: str,
+    repo: str,
+    branch: str,
+    filters: list[GitFilters] = [],
+    local_path: Optional[str] = None,
 ) -> GitData:
     """Constructor for the `GitData` TypedDict.
 
@@ -131,9 +156,13 @@ def create_git_data(
     repo : str
         The repo name.
     branch : str
-        The repo branch to index.
+        The repo branch to index. For a local checkout, any git ref (branch,
+        tag or commit), or an empty string to read the working tree.
     filters : list[GitFilters]
         The list of filters to apply.
+    local_path : str or None, optional
+        The path to a local checkout of the repo to read instead of the
+        github API.
 
     Returns
     -------
@@ -144,6 +173,7 @@ def create_git_data(
         "repo": repo,
         "branch": branch,
         "filters": filters,
+        "local_path": local_path,
     }
     return return_data
 
@@ -175,6 +205,8 @@ class UserSelections(TypedDict):
         The optional github repository information to include in the documents.
     other_docs : Optional[list[str]]
         The file path to any additional documentation to include in the documents.
+    llm_cache_mode : LlmCacheMode
+        The LLM response cache mode.
     """
 
     llm: str
@@ -188,6 +220,7 @@ class UserSelections(TypedDict):
     chunking_config: str
     git_data: Optional[GitData]
     other_docs: Optional[list[str]]
+    llm_cache_mode: LlmCacheMode
 
 
 def create_user_selections(
@@ -202,6 +235,7 @@ def create_user_selections(
     chunking_config: str,
     git_data: Optional[GitData],
     other_docs: Optional[list[str]],
+    llm_cache_mode: LlmCacheMode = "off",
 ) -> UserSelections:
     """Constructor for the `UserSelections` TypedDict.
 
@@ -229,6 +263,8 @@ def create_user_selections(
         The optional github repository information to include in the documents.
     other_docs : Optional[list[str]]
         The file path to any additional documentation to include in the documents.
+    llm_cache_mode : LlmCacheMode, optional
+        The LLM response cache mode, defaults to "off".
 
     Returns
     -------
@@ -246,6 +282,53 @@ def create_user_selections(
         "chunking_config": chunking_config,
         "git_data": git_data,
         "other_docs": other_docs,
+        "llm_cache_mode": llm_cache_mode,
+    }
+    return return_data
+
+
+class SharedIndex(TypedDict):
+    """Holds a built index so it can be reused by another BcoRag instance
+    with the same index parameters (file, loader, chunking config, embedding
+    model, vector store, git data and other docs).
+
+    Attributes
+    ----------
+    index_key : str
+        The fingerprint of the index inputs.
+    index : VectorStoreIndex
+        The built vector store index.
+    documents : list[Document]
+        The documents the index was built from.
+    """
+
+    index_key: str
+    index: VectorStoreIndex
+    documents: list[Document]
+
+
+def create_shared_index(
+    index_key: str, index: VectorStoreIndex, documents: list[Document]
+) -> SharedIndex:
+    """Constructor for the `SharedIndex` TypedDict.
+
+    Parameters
+    ----------
+    index_key : str
+        The fingerprint of the index inputs.
+    index : VectorStoreIndex
+        The built vector store index.
+    documents : list[Document]
+        The documents the index was built from.
+
+    Returns
+    -------
+    SharedIndex
+    """
+    return_data: SharedIndex = {
+        "index_key": index_key,
+        "index": index,
+        "documents": documents,
     }
     return return_data
 
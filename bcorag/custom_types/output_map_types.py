@@ -61,6 +61,14 @@ class OutputTrackerParamSet(TypedDict):
         The directory filter used for indexing the github repository (if applicable).
     file_ext_git_filter : Optional[OutputTrackerGitFilter]
         The file extension filter used for indexing the github repository (if applicable).
+    glob_git_filter : Optional[OutputTrackerGitFilter]
+        The glob pattern filter used for indexing the github repository (if applicable).
+    max_file_size_git_filter : Optional[OutputTrackerGitFilter]
+        The maximum file size filter (in bytes) used for indexing the github repository (if applicable).
+    binary_git_filter : Optional[OutputTrackerGitFilter]
+        The binary and minified file filter (with any extra patterns) used for indexing the github repository (if applicable).
+    git_local_path : Optional[str]
+        The local checkout the repository was read from (if applicable).
     other_docs : Optional[list[str]]
         The file path to any additional documentation included in the documents.
     """
@@ -76,6 +84,10 @@ class OutputTrackerParamSet(TypedDict):
     git_branch: Optional[str]
     directory_git_filter: Optional[OutputTrackerGitFilter]
     file_ext_git_filter: Optional[OutputTrackerGitFilter]
+    glob_git_filter: Optional[OutputTrackerGitFilter]
+    max_file_size_git_filter: Optional[OutputTrackerGitFilter]
+    binary_git_filter: Optional[OutputTrackerGitFilter]
+    git_local_path: Optional[str]
     other_docs: Optional[list[str]]
 
 
@@ -91,6 +103,10 @@ def create_output_tracker_param_set(
     git_branch: Optional[str],
     directory_git_filter: Optional[OutputTrackerGitFilter] = None,
     file_ext_git_filter: Optional[OutputTrackerGitFilter] = None,
+    glob_git_filter: Optional[OutputTrackerGitFilter] = None,
+    max_file_size_git_filter: Optional[OutputTrackerGitFilter] = None,
+    binary_git_filter: Optional[OutputTrackerGitFilter] = None,
+    git_local_path: Optional[str] = None,
     other_docs: Optional[list[str]] = None
 ) -> OutputTrackerParamSet:
     """Constructor for the `OutputTrackerParamSet` TypedDict.
@@ -119,6 +135,14 @@ def create_output_tracker_param_set(
         The directory filter used for indexing the github repository (if applicable).
     file_ext_git_filter : Optional[OutputTrackerGitFilter], optional
         The file extension filter used for indexing the github repository (if applicable).
+    glob_git_filter : Optional[OutputTrackerGitFilter], optional
+        The glob pattern filter used for indexing the github repository (if applicable).
+    max_file_size_git_filter : Optional[OutputTrackerGitFilter], optional
+        The maximum file size filter (in bytes) used for indexing the github repository (if applicable).
+    binary_git_filter : Optional[OutputTrackerGitFilter], optional
+        The binary and minified file filter (with any extra patterns) used for indexing the github repository (if applicable).
+    git_local_path : Optional[str], optional
+        The local checkout the repository was read from (if applicable).
     other_docs : Optional[list[str]]
         The file path to any additional documentation included in the documents.
 
@@ -138,6 +162,10 @@ def create_output_tracker_param_set(
         "git_branch": git_branch,
         "directory_git_filter": directory_git_filter,
         "file_ext_git_filter": file_ext_git_filter,
+        "glob_git_filter": glob_git_filter,
+        "max_file_size_git_filter": max_file_size_git_filter,
+        "binary_git_filter": binary_git_filter,
+        "git_local_path": git_local_path,
         "other_docs": other_docs,
     }
     return return_data
@@ -0,0 +1,369 @@
+""" Near-duplicate node elimination.
+
+Papers with supplementary documents and repositories with copied scripts
+produce many identical or nearly identical nodes, each of which is embedded
+and competes for the `similarity_top_k` retrieval slots. The deduplicator sits
+between chunking and indexing: exact duplicates are found by hashing the node
+text, near duplicates with MinHash signatures over word shingles and
+locality-sensitive hashing (LSH) banding, with the candidate pairs verified
+against the estimated Jaccard similarity. The first node of each duplicate
+group is kept and records the sources of the nodes collapsed into it in its
+metadata (excluded from the embedding and LLM content).
+"""
+
+import zlib
+import numpy as np
+from hashlib import sha256
+from typing import Optional, Sequence, TypedDict
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.utils import get_tokenizer
+
+DEFAULT_DEDUP_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 8
+SHINGLE_SIZE = 5
+PROVENANCE_KEY = "duplicate_sources"
+# the largest 61 bit Mersenne prime, the hash permutations are taken modulo it
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class DedupStats(TypedDict):
+    """Tally of the nodes removed by the deduplicator.
+
+    Attributes
+    ----------
+    exact_duplicates : int
+        The number of nodes removed as exact duplicates.
+    near_duplicates : int
+        The number of nodes removed as near duplicates.
+    removed_tokens : int
+        The number of tokens in the removed nodes.
+    kept_nodes : int
+        The number of nodes kept.
+    """
+
+    exact_duplicates: int
+    near_duplicates: int
+    removed_tokens: int
+    kept_nodes: int
+
+
+def create_dedup_stats() -> DedupStats:
+    """Constructor for the `DedupStats` TypedDict.
+
+    Returns
+    -------
+    DedupStats
+    """
+    return_data: DedupStats = {
+        "exact_duplicates": 0,
+        "near_duplicates": 0,
+        "removed_tokens": 0,
+        "kept_nodes": 0,
+    }
+    return return_data
+
+
+def node_source(node: BaseNode) -> str:
+    """Gets the source of a node to record as provenance.
+
+    Parameters
+    ----------
+    node : BaseNode
+        The node.
+
+    Returns
+    -------
+    str
+        The node's file path (or name) and page label if present, falling back
+        to the source document ID.
+    """
+    source = node.metadata.get("file_path") or node.metadata.get("file_name")
+    if source is None:
+        return node.ref_doc_id or node.node_id
+    page = node.metadata.get("page_label")
+    return f"{source}#page={page}" if page is not None else str(source)
+
+
+def add_provenance(node: BaseNode, sources: list[str]):
+    """Records the sources of the duplicates collapsed into a node. The
+    provenance is excluded from the embedding and LLM content of the node.
+
+    Parameters
+    ----------
+    node : BaseNode
+        The kept node.
+    sources : list[str]
+        The sources of the collapsed duplicates.
+    """
+    node.metadata[PROVENANCE_KEY] = node.metadata.get(PROVENANCE_KEY, []) + sources
+    for excluded_keys in (
+        node.excluded_embed_metadata_keys,
+        node.excluded_llm_metadata_keys,
+    ):
+        if PROVENANCE_KEY not in excluded_keys:
+            excluded_keys.append(PROVENANCE_KEY)
+
+
+def remove_provenance(node: BaseNode, sources: list[str]):
+    """Removes collapsed duplicate sources from a node's provenance.
+
+    Parameters
+    ----------
+    node : BaseNode
+        The kept node.
+    sources : list[str]
+        The sources to remove, one recorded occurrence each.
+    """
+    remaining = list(node.metadata.get(PROVENANCE_KEY, []))
+    for source in sources:
+        if source in remaining:
+            remaining.remove(source)
+    if remaining:
+        node.metadata[PROVENANCE_KEY] = remaining
+    else:
+        node.metadata.pop(PROVENANCE_KEY, None)
+
+
+class MinHasher:
+    """Computes MinHash signatures over the word shingles of a text.
+
+    Attributes
+    ----------
+    _a : np.ndarray
+        The multipliers of the hash permutations.
+    _b : np.ndarray
+        The offsets of the hash permutations.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        """Constructor.
+
+        Parameters
+        ----------
+        num_perm : int, optional
+            The number of hash permutations (signature length).
+        seed : int, optional
+            The seed of the hash permutations.
+        """
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Computes the MinHash signature of a text.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+
+        Returns
+        -------
+        np.ndarray
+            The (num_perm,) uint64 signature.
+        """
+        words = text.lower().split()
+        shingles = [
+            " ".join(words[i : i + SHINGLE_SIZE])
+            for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+        ]
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # the products stay below 2^64 as both factors are below 2^32
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return np.bitwise_and(permuted, _MAX_HASH).min(axis=0)
+
+
+class NodeDeduplicator:
+    """Collapses exact and near-duplicate nodes into the first node of each
+    duplicate group.
+
+    Attributes
+    ----------
+    _threshold : float
+        The minimum estimated Jaccard similarity of two nodes' word shingles
+        for them to be near duplicates.
+    _bands : int
+        The number of LSH bands the signatures are split into.
+    _hasher : MinHasher
+        The MinHash signature generator.
+    _exact : dict[str, BaseNode]
+        The kept nodes by text hash.
+    _signatures : list[np.ndarray]
+        The signature of each kept node.
+    _kept : list[BaseNode]
+        The kept nodes, in the order of `_signatures`.
+    _buckets : list[dict[bytes, list[int]]]
+        For each band, the kept node indices by band hash.
+    _tokenizer : Callable
+        The tokenizer used to count the removed tokens.
+    stats : DedupStats
+        The tally of the removed nodes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_DEDUP_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            The minimum estimated Jaccard similarity of two nodes' word
+            shingles for them to be near duplicates.
+        num_perm : int, optional
+            The MinHash signature length, must be divisible by `bands`.
+        bands : int, optional
+            The number of LSH bands. More bands find more candidate pairs
+            below the threshold (which are then rejected by the verification).
+
+        Raises
+        ------
+        ValueError
+            If the signature length isn't divisible by the number of bands.
+        """
+        if num_perm % bands != 0:
+            raise ValueError("The signature length must be divisible by the bands.")
+        self._threshold = threshold
+        self._bands = bands
+        self._hasher = MinHasher(num_perm)
+        self._exact: dict[str, BaseNode] = {}
+        self._signatures: list[np.ndarray] = []
+        self._kept: list[BaseNode] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._tokenizer = get_tokenizer()
+        self.stats = create_dedup_stats()
+
+    def add_existing(self, nodes: Sequence[BaseNode]):
+        """Registers already indexed nodes so new duplicates of them are
+        collapsed into them.
+
+        Parameters
+        ----------
+        nodes : Sequence[BaseNode]
+            The indexed nodes.
+        """
+        for node in nodes:
+            text = node.get_content(metadata_mode=MetadataMode.NONE)
+            self._exact.setdefault(self._text_hash(text), node)
+            self._keep(node, self._hasher.signature(text))
+
+    def deduplicate(
+        self, nodes: Sequence[BaseNode]
+    ) -> tuple[list[BaseNode], list[tuple[BaseNode, BaseNode]]]:
+        """Removes the nodes duplicating an earlier (or already registered)
+        node, recording their sources in the provenance of the node they
+        collapse into.
+
+        Parameters
+        ----------
+        nodes : Sequence[BaseNode]
+            The chunked nodes, in document order.
+
+        Returns
+        -------
+        (list[BaseNode], list[tuple[BaseNode, BaseNode]])
+            The kept nodes and the (removed node, kept node) pairs.
+        """
+        kept: list[BaseNode] = []
+        removed: list[tuple[BaseNode, BaseNode]] = []
+        for node in nodes:
+            text = node.get_content(metadata_mode=MetadataMode.NONE)
+            text_hash = self._text_hash(text)
+            canonical = self._exact.get(text_hash)
+            if canonical is not None:
+                self.stats["exact_duplicates"] += 1
+            else:
+                signature = self._hasher.signature(text)
+                canonical = self._find_near_duplicate(signature)
+                if canonical is not None:
+                    self.stats["near_duplicates"] += 1
+                else:
+                    self._exact[text_hash] = node
+                    self._keep(node, signature)
+                    kept.append(node)
+                    continue
+            add_provenance(canonical, [node_source(node)])
+            self.stats["removed_tokens"] += len(self._tokenizer(text))
+            removed.append((node, canonical))
+        self.stats["kept_nodes"] += len(kept)
+        return kept, removed
+
+    def _find_near_duplicate(self, signature: np.ndarray) -> Optional[BaseNode]:
+        """Finds a kept node whose estimated similarity to a signature meets
+        the threshold.
+
+        Parameters
+        ----------
+        signature : np.ndarray
+            The MinHash signature.
+
+        Returns
+        -------
+        BaseNode or None
+            The most similar qualifying kept node or None.
+        """
+        candidates: set[int] = set()
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            candidates.update(bucket.get(band, []))
+        best: Optional[int] = None
+        best_similarity = self._threshold
+        for index in sorted(candidates):
+            similarity = float(np.mean(self._signatures[index] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = index, similarity
+        return self._kept[best] if best is not None else None
+
+    def _keep(self, node: BaseNode, signature: np.ndarray):
+        """Adds a kept node to the LSH buckets.
+
+        Parameters
+        ----------
+        node : BaseNode
+            The kept node.
+        signature : np.ndarray
+            The node's MinHash signature.
+        """
+        index = len(self._kept)
+        self._kept.append(node)
+        self._signatures.append(signature)
+        for band, bucket in zip(self._band_keys(signature), self._buckets):
+            bucket.setdefault(band, []).append(index)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        """Splits a signature into its LSH band keys.
+
+        Parameters
+        ----------
+        signature : np.ndarray
+            The MinHash signature.
+
+        Returns
+        -------
+        list[bytes]
+            One key per band.
+        """
+        return [band.tobytes() for band in np.split(signature, self._bands)]
+
+    def _text_hash(self, text: str) -> str:
+        """Hashes a node text for exact duplicate detection.
+
+        Parameters
+        ----------
+        text : str
+            The node text.
+
+        Returns
+        -------
+        str
+            The hexidecimal SHA-256 hash of the whitespace normalized text.
+        """
+        return sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
@@ -0,0 +1,524 @@
+""" Github repository loader.
+
+Replaces `GithubRepositoryReader.load_data`, which walks the repository tree
+one request per directory and then fetches the blobs a few at a time. The
+snapshot reader resolves the branch to a commit SHA, lists the whole tree with
+a single recursive tree request, applies the filters to the listed paths and
+sizes and fetches the remaining blobs concurrently over a pooled HTTP session
+with bounded parallelism (identical blobs are only fetched once). The decoded
+files are stored in the snapshot cache keyed by the commit SHA and the
+filters, so the repository is only fetched again once the branch moves.
+
+Rate limited requests (429, or 403 with the rate limit exhausted), server
+errors and connection errors are retried a bounded number of times, waiting
+for the `Retry-After` or `X-RateLimit-Reset` header when present and backing
+off exponentially otherwise. A blob that still can't be fetched is skipped
+with a warning instead of failing the whole load, and the incomplete snapshot
+isn't cached.
+
+The documents match the `GithubRepositoryReader` output (the blob SHA as the
+document ID and the same `file_path`, `file_name` and `url` metadata). The API
+base URL is configurable so the reader can be pointed at a local stand-in
+server.
+"""
+
+import os
+import time
+import base64
+import binascii
+import logging
+import requests
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from requests.adapters import HTTPAdapter
+from llama_index.core.schema import Document
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from .cache.snapshot_cache import (
+    SnapshotCache,
+    SnapshotFile,
+    create_snapshot,
+    snapshot_key,
+)
+from .custom_types.core_types import GitFilter, GitFilters
+from .repo_filters import PruneStats, create_prune_stats, prune_file
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_RETRY_WAIT = 60
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GithubSnapshotReader:
+    """Loads a github repository branch into documents.
+
+    Attributes
+    ----------
+    _owner : str
+        The repository owner.
+    _repo : str
+        The repository name.
+    _filters : list[GitFilters]
+        The filters applied to the repository files.
+    _snapshot_cache : SnapshotCache or None
+        The snapshot cache or None if caching is disabled.
+    _api_url : str
+        The github API base URL.
+    _max_workers : int
+        The maximum number of blob requests in flight at once.
+    _timeout : float
+        The request timeout in seconds.
+    _retries : int
+        The number of retries for failed requests.
+    _max_retry_wait : float
+        The longest wait in seconds before a retry, requests that would have
+        to wait longer (such as an exhausted hourly rate limit) fail instead.
+    _session : requests.Session
+        The pooled HTTP session.
+    _prune_stats : PruneStats
+        The files pruned by the filters during the last tree listing.
+    _failed_blobs : list[str]
+        The blobs that couldn't be fetched during the last fetch.
+    _logger : logging.Logger
+        The loader logger.
+    """
+
+    def __init__(
+        self,
+        owner: str,
+        repo: str,
+        filters: Optional[list[GitFilters]] = None,
+        github_token: Optional[str] = None,
+        snapshot_cache: Optional[SnapshotCache] = None,
+        api_url: str = DEFAULT_API_URL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        max_retry_wait: float = DEFAULT_MAX_RETRY_WAIT,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        owner : str
+            The repository owner.
+        repo : str
+            The repository name.
+        filters : list[GitFilters] or None, optional
+            The filters applied to the repository files.
+        github_token : str or None, optional
+            The github token, unauthenticated requests have a much lower rate
+            limit.
+        snapshot_cache : SnapshotCache or None, optional
+            The snapshot cache, None disables caching.
+        api_url : str, optional
+            The github API base URL.
+        max_workers : int, optional
+            The maximum number of blob requests in flight at once.
+        timeout : float, optional
+            The request timeout in seconds.
+        retries : int, optional
+            The number of retries for failed requests (connection errors,
+            rate limiting and server errors), honouring the `Retry-After` and
+            `X-RateLimit-Reset` headers.
+        max_retry_wait : float, optional
+            The longest wait in seconds before a retry.
+        """
+        self._owner = owner
+        self._repo = repo
+        self._filters = filters or []
+        self._snapshot_cache = snapshot_cache
+        self._api_url = api_url.rstrip("/")
+        self._max_workers = max(1, max_workers)
+        self._timeout = timeout
+        self._retries = max(0, retries)
+        self._max_retry_wait = max_retry_wait
+        self._prune_stats = create_prune_stats()
+        self._failed_blobs: list[str] = []
+        self._logger = logging.getLogger("bcorag.github")
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._max_workers)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["Accept"] = "application/vnd.github+json"
+        if github_token:
+            self._session.headers["Authorization"] = f"Bearer {github_token}"
+
+    @property
+    def prune_stats(self) -> PruneStats:
+        """Gets the files pruned by the filters during the last load (restored
+        from the cache entry if the snapshot was served from the cache)."""
+        return self._prune_stats
+
+    def load_data(self, branch: str) -> list[Document]:
+        """Loads the files of a branch that pass the filters.
+
+        Parameters
+        ----------
+        branch : str
+            The branch name.
+
+        Returns
+        -------
+        list[Document]
+            One document per file that could be decoded as UTF-8 text.
+        """
+        self._prune_stats = create_prune_stats()
+        self._failed_blobs = []
+        commit_sha, tree_sha = self.resolve_branch(branch)
+        key = snapshot_key(self._owner, self._repo, commit_sha, self._filters)
+        snapshot = (
+            self._snapshot_cache.load(key) if self._snapshot_cache is not None else None
+        )
+        if snapshot is not None:
+            files = snapshot["files"]
+            self._prune_stats = snapshot["prune_stats"]
+            self._logger.info(
+                f"Loaded cached snapshot of `{self._owner}/{self._repo}` at `{commit_sha}`."
+            )
+        else:
+            files = self._fetch_snapshot(tree_sha)
+            if self._failed_blobs:
+                self._logger.warning(
+                    f"Skipped {len(self._failed_blobs)} blob(s) of `{self._owner}/{self._repo}` that couldn't be fetched, the snapshot isn't cached."
+                )
+            elif self._snapshot_cache is not None:
+                self._snapshot_cache.store(
+                    key, create_snapshot(files, self._prune_stats)
+                )
+        return [self._create_document(file, branch) for file in files]
+
+    def resolve_branch(self, branch: str) -> tuple[str, str]:
+        """Resolves a branch to the commit it points at.
+
+        Parameters
+        ----------
+        branch : str
+            The branch name.
+
+        Returns
+        -------
+        (str, str)
+            The commit SHA and its tree SHA.
+        """
+        data = self._get_json(f"/repos/{self._owner}/{self._repo}/branches/{branch}")
+        commit = data["commit"]
+        return commit["sha"], commit["commit"]["tree"]["sha"]
+
+    def list_blobs(self, tree_sha: str) -> list[tuple[str, str]]:
+        """Lists the blobs of a tree that pass the filters, tallying the
+        pruned files in the prune stats. If the recursive listing is truncated
+        (very large repositories), the tree is walked one directory at a time
+        instead.
+
+        Parameters
+        ----------
+        tree_sha : str
+            The root tree SHA.
+
+        Returns
+        -------
+        list[tuple[str, str]]
+            The (path, blob SHA) pairs.
+        """
+        data = self._get_json(
+            f"/repos/{self._owner}/{self._repo}/git/trees/{tree_sha}",
+            params={"recursive": "1"},
+        )
+        if data.get("truncated"):
+            self._logger.warning(
+                f"Recursive tree listing of `{self._owner}/{self._repo}` was truncated, walking the tree."
+            )
+            return self._walk_tree(tree_sha, "")
+        return [
+            (entry["path"], entry["sha"])
+            for entry in data["tree"]
+            if entry["type"] == "blob"
+            and prune_file(
+                entry["path"], entry.get("size"), self._filters, self._prune_stats
+            )
+        ]
+
+    @property
+    def failed_blobs(self) -> list[str]:
+        """Gets the blobs that couldn't be fetched during the last fetch."""
+        return self._failed_blobs
+
+    def fetch_blobs(self, blob_shas: list[str]) -> dict[str, Optional[bytes]]:
+        """Fetches blobs concurrently. Blobs that still fail after the retries
+        are skipped and listed in `failed_blobs`.
+
+        Parameters
+        ----------
+        blob_shas : list[str]
+            The blob SHAs, duplicates are only fetched once.
+
+        Returns
+        -------
+        dict[str, bytes or None]
+            The contents of each blob, None for blobs that couldn't be fetched
+            or decoded.
+        """
+        self._failed_blobs = []
+        unique_shas = list(dict.fromkeys(blob_shas))
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            contents = executor.map(self._try_fetch_blob, unique_shas)
+            return dict(zip(unique_shas, contents))
+
+    def close(self):
+        """Closes the pooled HTTP session."""
+        self._session.close()
+
+    def _fetch_snapshot(self, tree_sha: str) -> list[SnapshotFile]:
+        """Fetches and decodes the files of a tree that pass the filters.
+
+        Parameters
+        ----------
+        tree_sha : str
+            The root tree SHA.
+
+        Returns
+        -------
+        list[SnapshotFile]
+            The decoded files.
+        """
+        t0 = time.time()
+        blobs = self.list_blobs(tree_sha)
+        contents = self.fetch_blobs([sha for _, sha in blobs])
+        files: list[SnapshotFile] = []
+        for path, sha in blobs:
+            content = contents[sha]
+            if content is None:
+                continue
+            try:
+                text = content.decode("utf-8")
+            except UnicodeDecodeError:
+                self._logger.debug(f"Skipping `{path}`, not UTF-8 text.")
+                continue
+            files.append({"path": path, "sha": sha, "text": text})
+        self._logger.info(
+            f"Fetched {len(contents)} blob(s) for {len(blobs)} file(s) from `{self._owner}/{self._repo}` in {time.time() - t0:.2f}s."
+        )
+        return files
+
+    def _walk_tree(self, tree_sha: str, prefix: str) -> list[tuple[str, str]]:
+        """Lists the blobs of a tree one directory at a time, skipping the
+        directories an include directory filter can't match.
+
+        Parameters
+        ----------
+        tree_sha : str
+            The tree SHA.
+        prefix : str
+            The path of the tree relative to the repository root.
+
+        Returns
+        -------
+        list[tuple[str, str]]
+            The (path, blob SHA) pairs.
+        """
+        data = self._get_json(f"/repos/{self._owner}/{self._repo}/git/trees/{tree_sha}")
+        blobs: list[tuple[str, str]] = []
+        for entry in data["tree"]:
+            path = f"{prefix}{entry['path']}"
+            if entry["type"] == "tree" and self._allow_directory(path):
+                blobs.extend(self._walk_tree(entry["sha"], f"{path}/"))
+            elif entry["type"] == "blob" and prune_file(
+                path, entry.get("size"), self._filters, self._prune_stats
+            ):
+                blobs.append((path, entry["sha"]))
+        return blobs
+
+    def _allow_directory(self, path: str) -> bool:
+        """Checks whether a directory can hold files passing the directory
+        filters.
+
+        Parameters
+        ----------
+        path : str
+            The directory path relative to the repository root.
+
+        Returns
+        -------
+        bool
+            Whether the directory needs to be walked.
+        """
+        for filter in self._filters:
+            if filter["filter"] != GitFilter.DIRECTORY:
+                continue
+            if filter["filter_type"] == GithubRepositoryReader.FilterType.INCLUDE:
+                if not any(
+                    path.startswith(directory) or directory.startswith(path)
+                    for directory in filter["value"]
+                ):
+                    return False
+            elif any(path.startswith(directory) for directory in filter["value"]):
+                return False
+        return True
+
+    def _try_fetch_blob(self, blob_sha: str) -> Optional[bytes]:
+        """Fetches a single blob, recording it as failed instead of raising.
+
+        Parameters
+        ----------
+        blob_sha : str
+            The blob SHA.
+
+        Returns
+        -------
+        bytes or None
+            The blob contents or None if the blob couldn't be fetched or
+            decoded.
+        """
+        try:
+            return self._fetch_blob(blob_sha)
+        except requests.RequestException as e:
+            self._logger.warning(f"Failed to fetch blob `{blob_sha}`.\n{e}")
+            self._failed_blobs.append(blob_sha)
+            return None
+
+    def _fetch_blob(self, blob_sha: str) -> Optional[bytes]:
+        """Fetches and base64 decodes a single blob.
+
+        Parameters
+        ----------
+        blob_sha : str
+            The blob SHA.
+
+        Returns
+        -------
+        bytes or None
+            The blob contents or None if the blob couldn't be decoded.
+        """
+        data = self._get_json(f"/repos/{self._owner}/{self._repo}/git/blobs/{blob_sha}")
+        if data.get("encoding") != "base64":
+            self._logger.warning(
+                f"Skipping blob `{blob_sha}` with unsupported encoding `{data.get('encoding')}`."
+            )
+            return None
+        try:
+            return base64.b64decode(data["content"])
+        except binascii.Error:
+            self._logger.warning(f"Could not decode blob `{blob_sha}` as base64.")
+            return None
+
+    def _get_json(self, path: str, params: Optional[dict[str, str]] = None) -> Any:
+        """Makes a GET request against the github API, retrying rate limited,
+        server error and connection error responses.
+
+        Parameters
+        ----------
+        path : str
+            The API path.
+        params : dict[str, str] or None, optional
+            The query parameters.
+
+        Returns
+        -------
+        Any
+            The deserialized JSON response.
+
+        Raises
+        ------
+        requests.RequestException
+            If the request failed after the retries.
+        """
+        url = f"{self._api_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                response = self._session.get(url, params=params, timeout=self._timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self._retries:
+                    raise
+                delay: Optional[float] = DEFAULT_BACKOFF * 2**attempt
+            else:
+                if response.ok:
+                    return response.json()
+                delay = self._retry_delay(response, attempt)
+                if (
+                    delay is None
+                    or attempt >= self._retries
+                    or delay > self._max_retry_wait
+                ):
+                    response.raise_for_status()
+                self._logger.info(
+                    f"Github API returned {response.status_code} for `{path}`, retrying in {delay:.1f}s."
+                )
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """Gets how long to wait before retrying a failed request.
+
+        Parameters
+        ----------
+        response : requests.Response
+            The failed response.
+        attempt : int
+            The number of retries made so far.
+
+        Returns
+        -------
+        float or None
+            The wait in seconds or None if the request shouldn't be retried.
+        """
+        rate_limited = response.status_code == 429 or (
+            response.status_code == 403
+            and (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+                or "Retry-After" in response.headers
+            )
+        )
+        if not rate_limited and response.status_code not in RETRY_STATUSES:
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(
+                        0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    )
+                except (TypeError, ValueError):
+                    pass
+        reset = response.headers.get("X-RateLimit-Reset")
+        if rate_limited and reset is not None:
+            try:
+                return max(0.0, float(reset) - time.time())
+            except ValueError:
+                pass
+        return DEFAULT_BACKOFF * 2**attempt
+
+    def _create_document(self, file: SnapshotFile, branch: str) -> Document:
+        """Creates the document for a snapshot file.
+
+        Parameters
+        ----------
+        file : SnapshotFile
+            The decoded file.
+        branch : str
+            The branch the repository was loaded from.
+
+        Returns
+        -------
+        Document
+            The document.
+        """
+        url = os.path.join(
+            "https://github.com/", self._owner, self._repo, "blob/", branch, file["path"]
+        )
+        return Document(
+            text=file["text"],
+            doc_id=file["sha"],
+            extra_info={
+                "file_path": file["path"],
+                "file_name": file["path"].split("/")[-1],
+                "url": url,
+            },
+        )
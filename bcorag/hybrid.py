@@ -0,0 +1,468 @@
+""" Hybrid BM25 and vector retrieval.
+
+Domain retrieval prompts such as the parametric and execution domain prompts
+look for exact tool names, flags and file names, which dense retrieval often
+misses. The hybrid retriever searches a BM25 inverted index built over the
+same nodes alongside the vector store and fuses the two rankings with
+reciprocal rank fusion, so the candidate pool handed to the reranker contains
+the exact lexical matches as well as the semantic ones.
+
+The inverted index is stored as compressed sparse row numpy arrays (one row of
+node indices and term frequencies per term) and persisted next to the cached
+vector index.
+"""
+
+import os
+import re
+import json
+import numpy as np
+from collections import Counter
+from typing import Optional, Sequence
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.types import BaseDocumentStore
+from .similarity import top_k_indices
+
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+DEFAULT_RRF_K = 60
+BM25_ARRAYS_FILE = "bm25.npz"
+BM25_METADATA_FILE = "bm25.json"
+
+# compound tokens keep their separators so exact tool names, flags and file
+# names (`bwa-mem`, `--min-len`, `reads_1.fastq.gz`) can be matched whole
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+_TOKEN_SPLIT_PATTERN = re.compile(r"[._\-]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into BM25 terms. Compound tokens are indexed both whole and
+    as their separate parts.
+
+    Parameters
+    ----------
+    text : str
+        The text to tokenize.
+
+    Returns
+    -------
+    list[str]
+        The terms.
+    """
+    terms: list[str] = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _TOKEN_SPLIT_PATTERN.split(token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part and part not in _STOPWORDS)
+    return terms
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = DEFAULT_RRF_K
+) -> list[tuple[str, float]]:
+    """Fuses several rankings with reciprocal rank fusion, each item scores
+    the sum of `1 / (k + rank)` over the rankings it appears in.
+
+    Parameters
+    ----------
+    rankings : Sequence[Sequence[str]]
+        The rankings to fuse, each sorted from best to worst.
+    k : int, optional
+        The rank smoothing constant.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        The (item, fused score) pairs sorted by descending fused score (ties
+        keep the order items were first seen in).
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class BM25Index:
+    """Compact BM25 inverted index over the index nodes.
+
+    Attributes
+    ----------
+    _node_ids : list[str]
+        The node ID for each indexed node.
+    _vocabulary : dict[str, int]
+        Maps each term to its row in the postings arrays.
+    _indptr : np.ndarray
+        The postings row offsets, the postings of term `t` are
+        `_indptr[t]:_indptr[t + 1]`.
+    _postings : np.ndarray
+        The node index of every posting.
+    _term_frequencies : np.ndarray
+        The term frequency of every posting.
+    _node_lengths : np.ndarray
+        The number of terms in each node.
+    _k1 : float
+        The BM25 term frequency saturation parameter.
+    _b : float
+        The BM25 length normalization parameter.
+    """
+
+    def __init__(
+        self,
+        node_ids: list[str],
+        vocabulary: dict[str, int],
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        term_frequencies: np.ndarray,
+        node_lengths: np.ndarray,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+    ):
+        """Constructor, use `from_nodes` to build a new index.
+
+        Parameters
+        ----------
+        node_ids : list[str]
+            The node ID for each indexed node.
+        vocabulary : dict[str, int]
+            Maps each term to its row in the postings arrays.
+        indptr : np.ndarray
+            The postings row offsets.
+        postings : np.ndarray
+            The node index of every posting.
+        term_frequencies : np.ndarray
+            The term frequency of every posting.
+        node_lengths : np.ndarray
+            The number of terms in each node.
+        k1 : float, optional
+            The BM25 term frequency saturation parameter.
+        b : float, optional
+            The BM25 length normalization parameter.
+        """
+        self._node_ids = node_ids
+        self._vocabulary = vocabulary
+        self._indptr = indptr
+        self._postings = postings
+        self._term_frequencies = term_frequencies
+        self._node_lengths = node_lengths
+        self._k1 = k1
+        self._b = b
+
+    @classmethod
+    def from_nodes(
+        cls, nodes: Sequence[BaseNode], k1: float = DEFAULT_K1, b: float = DEFAULT_B
+    ) -> "BM25Index":
+        """Builds the inverted index. Nodes are indexed with the same content
+        (text and embedded metadata, such as the file path) as the embeddings.
+
+        Parameters
+        ----------
+        nodes : Sequence[BaseNode]
+            The nodes to index.
+        k1 : float, optional
+            The BM25 term frequency saturation parameter.
+        b : float, optional
+            The BM25 length normalization parameter.
+
+        Returns
+        -------
+        BM25Index
+            The built index.
+        """
+        vocabulary: dict[str, int] = {}
+        term_ids: list[int] = []
+        node_indices: list[int] = []
+        frequencies: list[int] = []
+        node_lengths = np.zeros(len(nodes), dtype=np.int32)
+        for node_index, node in enumerate(nodes):
+            terms = tokenize(node.get_content(metadata_mode=MetadataMode.EMBED))
+            node_lengths[node_index] = len(terms)
+            for term, count in Counter(terms).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                node_indices.append(node_index)
+                frequencies.append(count)
+
+        term_array = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_array, kind="stable")
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_array, minlength=len(vocabulary)), out=indptr[1:])
+        return cls(
+            node_ids=[node.node_id for node in nodes],
+            vocabulary=vocabulary,
+            indptr=indptr,
+            postings=np.asarray(node_indices, dtype=np.int32)[order],
+            term_frequencies=np.minimum(
+                np.asarray(frequencies, dtype=np.int64)[order], np.iinfo(np.uint16).max
+            ).astype(np.uint16),
+            node_lengths=node_lengths,
+            k1=k1,
+            b=b,
+        )
+
+    @property
+    def node_ids(self) -> list[str]:
+        """Gets the node ID for each indexed node."""
+        return self._node_ids
+
+    def scores(self, query: str) -> np.ndarray:
+        """Scores every node against a query.
+
+        Parameters
+        ----------
+        query : str
+            The query text.
+
+        Returns
+        -------
+        np.ndarray
+            The BM25 score of each node.
+        """
+        scores = np.zeros(len(self._node_ids), dtype=np.float32)
+        if len(self._node_ids) == 0:
+            return scores
+        node_count = len(self._node_ids)
+        average_length = max(float(self._node_lengths.mean()), 1.0)
+        for term in set(tokenize(query)):
+            term_id = self._vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            postings = self._postings[start:end]
+            frequencies = self._term_frequencies[start:end].astype(np.float32)
+            document_frequency = end - start
+            idf = np.log(
+                1.0 + (node_count - document_frequency + 0.5) / (document_frequency + 0.5)
+            )
+            length_norm = self._k1 * (
+                1.0 - self._b + self._b * self._node_lengths[postings] / average_length
+            )
+            scores[postings] += (
+                idf * frequencies * (self._k1 + 1.0) / (frequencies + length_norm)
+            )
+        return scores
+
+    def batch_query(self, queries: Sequence[str], k: int) -> list[list[tuple[str, float]]]:
+        """Finds the best matching nodes for several queries.
+
+        Parameters
+        ----------
+        queries : Sequence[str]
+            The query texts.
+        k : int
+            The number of nodes to return per query.
+
+        Returns
+        -------
+        list[list[tuple[str, float]]]
+            For each query, the (node ID, BM25 score) pairs of the nodes
+            matching at least one query term, sorted by descending score.
+        """
+        if len(self._node_ids) == 0 or k <= 0 or not queries:
+            return [[] for _ in queries]
+        indices, scores = top_k_indices(
+            np.stack([self.scores(query) for query in queries]), k
+        )
+        return [
+            [
+                (self._node_ids[index], float(score))
+                for index, score in zip(row_indices, row_scores)
+                if score > 0
+            ]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+
+    def persist(self, persist_dir: str) -> None:
+        """Persists the index into a directory.
+
+        Parameters
+        ----------
+        persist_dir : str
+            The directory to persist to (the cached vector index directory).
+        """
+        os.makedirs(persist_dir, exist_ok=True)
+        np.savez(
+            os.path.join(persist_dir, BM25_ARRAYS_FILE),
+            indptr=self._indptr,
+            postings=self._postings,
+            term_frequencies=self._term_frequencies,
+            node_lengths=self._node_lengths,
+        )
+        with open(os.path.join(persist_dir, BM25_METADATA_FILE), "w") as f:
+            json.dump(
+                {
+                    "node_ids": self._node_ids,
+                    "vocabulary": list(self._vocabulary.keys()),
+                    "k1": self._k1,
+                    "b": self._b,
+                },
+                f,
+            )
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> Optional["BM25Index"]:
+        """Loads a persisted index.
+
+        Parameters
+        ----------
+        persist_dir : str
+            The directory the index was persisted to.
+
+        Returns
+        -------
+        BM25Index or None
+            The loaded index or None if no index was persisted.
+        """
+        arrays_path = os.path.join(persist_dir, BM25_ARRAYS_FILE)
+        metadata_path = os.path.join(persist_dir, BM25_METADATA_FILE)
+        if not os.path.isfile(arrays_path) or not os.path.isfile(metadata_path):
+            return None
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+        with np.load(arrays_path) as arrays:
+            return cls(
+                node_ids=metadata["node_ids"],
+                vocabulary={
+                    term: term_id for term_id, term in enumerate(metadata["vocabulary"])
+                },
+                indptr=arrays["indptr"],
+                postings=arrays["postings"],
+                term_frequencies=arrays["term_frequencies"],
+                node_lengths=arrays["node_lengths"],
+                k1=metadata["k1"],
+                b=metadata["b"],
+            )
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing vector retrieval and BM25 retrieval with reciprocal
+    rank fusion. The fused score is set as the node score.
+
+    Attributes
+    ----------
+    _vector_retriever : BaseRetriever
+        The vector index retriever.
+    _bm25_index : BM25Index
+        The BM25 inverted index over the same nodes.
+    _docstore : BaseDocumentStore
+        The document store holding the nodes.
+    _similarity_top_k : int
+        The number of nodes each retriever returns and the fused ranking is
+        truncated to.
+    _rrf_k : int
+        The reciprocal rank fusion smoothing constant.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        bm25_index: BM25Index,
+        docstore: BaseDocumentStore,
+        similarity_top_k: int,
+        rrf_k: int = DEFAULT_RRF_K,
+        callback_manager: Optional[CallbackManager] = None,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        vector_retriever : BaseRetriever
+            The vector index retriever (returning `similarity_top_k` nodes).
+        bm25_index : BM25Index
+            The BM25 inverted index over the same nodes.
+        docstore : BaseDocumentStore
+            The document store holding the nodes.
+        similarity_top_k : int
+            The number of nodes to return.
+        rrf_k : int, optional
+            The reciprocal rank fusion smoothing constant.
+        callback_manager : CallbackManager or None, optional
+            The callback manager.
+        """
+        super().__init__(callback_manager=callback_manager)
+        self._vector_retriever = vector_retriever
+        self._bm25_index = bm25_index
+        self._docstore = docstore
+        self._similarity_top_k = similarity_top_k
+        self._rrf_k = rrf_k
+
+    @property
+    def bm25_index(self) -> BM25Index:
+        """Gets the BM25 inverted index."""
+        return self._bm25_index
+
+    def fuse(
+        self,
+        vector_results: Sequence[tuple[str, float]],
+        bm25_results: Sequence[tuple[str, float]],
+    ) -> list[NodeWithScore]:
+        """Fuses a vector ranking and a BM25 ranking.
+
+        Parameters
+        ----------
+        vector_results : Sequence[tuple[str, float]]
+            The (node ID, similarity) pairs from the vector retrieval.
+        bm25_results : Sequence[tuple[str, float]]
+            The (node ID, BM25 score) pairs from the BM25 retrieval.
+
+        Returns
+        -------
+        list[NodeWithScore]
+            The top nodes of the fused ranking, scored by their fused score.
+        """
+        fused = reciprocal_rank_fusion(
+            [
+                [node_id for node_id, _ in vector_results],
+                [node_id for node_id, _ in bm25_results],
+            ],
+            k=self._rrf_k,
+        )[: self._similarity_top_k]
+        nodes = self._docstore.get_nodes([node_id for node_id, _ in fused])
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, (_, score) in zip(nodes, fused)
+        ]
+
+    def _bm25_query(self, query_bundle: QueryBundle) -> str:
+        """Gets the BM25 query text for a query bundle. Like the vector
+        retrieval, this is the retrieval prompt (the embedding strings) rather
+        than the LLM prompt.
+
+        Parameters
+        ----------
+        query_bundle : QueryBundle
+            The query bundle.
+
+        Returns
+        -------
+        str
+            The BM25 query text.
+        """
+        return " ".join(query_bundle.embedding_strs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        vector_nodes = self._vector_retriever.retrieve(query_bundle)
+        bm25_results = self._bm25_index.batch_query(
+            [self._bm25_query(query_bundle)], self._similarity_top_k
+        )[0]
+        return self.fuse(
+            [(node.node.node_id, node.score or 0.0) for node in vector_nodes],
+            bm25_results,
+        )
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        vector_nodes = await self._vector_retriever.aretrieve(query_bundle)
+        bm25_results = self._bm25_index.batch_query(
+            [self._bm25_query(query_bundle)], self._similarity_top_k
+        )[0]
+        return self.fuse(
+            [(node.node.node_id, node.score or 0.0) for node in vector_nodes],
+            bm25_results,
+        )
@@ -0,0 +1,338 @@
+""" Local git checkout loader.
+
+Reads a repository from a local clone instead of the github API, so no
+network access or github token is needed. A git ref (branch, tag or commit)
+is read straight from the git objects: the tree is listed with a single
+`git ls-tree` call and the blobs are streamed through `git cat-file --batch`
+processes running in parallel over slices of the files. An empty ref reads the
+working tree instead (the tracked and untracked, non-ignored files), with the
+files read in parallel. The filters are applied to the listed paths and sizes
+before any file is read, with the same semantics as the github loader.
+
+The documents use the blob SHA as the document ID (computed for working tree
+files), so unchanged files keep the same ID as when loaded from github.
+"""
+
+import os
+import re
+import logging
+import subprocess
+from hashlib import sha1
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from llama_index.core.schema import Document
+from .custom_types.core_types import GitFilters
+from .github_loader import DEFAULT_MAX_WORKERS
+from .repo_filters import PruneStats, create_prune_stats, prune_file
+
+WORKING_TREE_REF = ""
+
+
+def blob_sha(content: bytes) -> str:
+    """Computes the git blob SHA of file contents.
+
+    Parameters
+    ----------
+    content : bytes
+        The file contents.
+
+    Returns
+    -------
+    str
+        The hexidecimal SHA-1 blob hash.
+    """
+    return sha1(f"blob {len(content)}\0".encode("utf-8") + content).hexdigest()
+
+
+def local_repo_identity(path: str) -> tuple[str, str]:
+    """Gets the github owner and repository name of a local checkout from its
+    `origin` remote.
+
+    Parameters
+    ----------
+    path : str
+        The local checkout path.
+
+    Returns
+    -------
+    (str, str)
+        The owner and repository name, or `local` and the checkout directory
+        name if the checkout has no github `origin` remote.
+    """
+    try:
+        remote = subprocess.run(
+            ["git", "-C", path, "remote", "get-url", "origin"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        remote = ""
+    match = re.search(r"github\.com[:/]([^/]+)/([^/]+?)(?:\.git)?/?$", remote)
+    if match is None:
+        return "local", os.path.basename(os.path.abspath(path))
+    return match.group(1).lower(), match.group(2).lower()
+
+
+class LocalGitReader:
+    """Loads a local git checkout into documents.
+
+    Attributes
+    ----------
+    _path : str
+        The local checkout path.
+    _filters : list[GitFilters]
+        The filters applied to the repository files.
+    _max_workers : int
+        The maximum number of files (or `git cat-file` processes) read at once.
+    _prune_stats : PruneStats
+        The files pruned by the filters during the last load.
+    _logger : logging.Logger
+        The loader logger.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        filters: Optional[list[GitFilters]] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        """Constructor.
+
+        Parameters
+        ----------
+        path : str
+            The local checkout path.
+        filters : list[GitFilters] or None, optional
+            The filters applied to the repository files.
+        max_workers : int, optional
+            The maximum number of files (or `git cat-file` processes) read at
+            once.
+        """
+        self._path = path
+        self._filters = filters or []
+        self._max_workers = max(1, max_workers)
+        self._prune_stats = create_prune_stats()
+        self._logger = logging.getLogger("bcorag.local_git")
+
+    @property
+    def prune_stats(self) -> PruneStats:
+        """Gets the files pruned by the filters during the last load."""
+        return self._prune_stats
+
+    def load_data(self, ref: str = WORKING_TREE_REF) -> list[Document]:
+        """Loads the files that pass the filters.
+
+        Parameters
+        ----------
+        ref : str, optional
+            The git ref (branch, tag or commit) to read, or an empty string to
+            read the working tree.
+
+        Returns
+        -------
+        list[Document]
+            One document per file that could be decoded as UTF-8 text.
+
+        Raises
+        ------
+        ValueError
+            If the ref can't be read (not a git checkout or an unknown ref).
+        """
+        self._prune_stats = create_prune_stats()
+        if ref == WORKING_TREE_REF:
+            files = self._read_working_tree()
+        else:
+            files = self._read_ref(ref)
+        documents: list[Document] = []
+        for path, sha, content in files:
+            try:
+                text = content.decode("utf-8")
+            except UnicodeDecodeError:
+                self._logger.debug(f"Skipping `{path}`, not UTF-8 text.")
+                continue
+            documents.append(
+                Document(
+                    text=text,
+                    doc_id=sha,
+                    extra_info={
+                        "file_path": path,
+                        "file_name": path.split("/")[-1],
+                    },
+                )
+            )
+        self._logger.info(
+            f"Read {len(documents)} file(s) from `{self._path}` at `{ref or 'working tree'}`."
+        )
+        return documents
+
+    def _read_ref(self, ref: str) -> list[tuple[str, str, bytes]]:
+        """Reads the files of a git ref from the git objects.
+
+        Parameters
+        ----------
+        ref : str
+            The git ref.
+
+        Returns
+        -------
+        list[tuple[str, str, bytes]]
+            The (path, blob SHA, contents) of each file passing the filters.
+
+        Raises
+        ------
+        ValueError
+            If the ref can't be listed.
+        """
+        try:
+            listing = self._git(["ls-tree", "-r", "-z", "-l", "--full-tree", ref])
+        except (OSError, subprocess.CalledProcessError) as e:
+            reason = (
+                e.stderr.decode("utf-8", "replace").strip()
+                if isinstance(e, subprocess.CalledProcessError) and e.stderr
+                else str(e)
+            )
+            raise ValueError(
+                f"Couldn't read git ref `{ref}` of `{self._path}`: {reason}"
+            ) from e
+        blobs: list[tuple[str, str]] = []
+        for entry in listing.split(b"\0"):
+            if not entry:
+                continue
+            info, path_bytes = entry.split(b"\t", 1)
+            _, object_type, sha, size = info.decode("ascii").split()
+            path = path_bytes.decode("utf-8", "surrogateescape")
+            # submodules are listed as commits
+            if object_type == "blob" and prune_file(
+                path, int(size), self._filters, self._prune_stats
+            ):
+                blobs.append((path, sha))
+
+        unique_shas = list(dict.fromkeys(sha for _, sha in blobs))
+        batch_size = -(-len(unique_shas) // self._max_workers) or 1
+        batches = [
+            unique_shas[i : i + batch_size]
+            for i in range(0, len(unique_shas), batch_size)
+        ]
+        contents: dict[str, bytes] = {}
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for batch_contents in executor.map(self._cat_blobs, batches):
+                contents.update(batch_contents)
+        return [(path, sha, contents[sha]) for path, sha in blobs]
+
+    def _cat_blobs(self, shas: list[str]) -> dict[str, bytes]:
+        """Reads blobs with a single `git cat-file --batch` process.
+
+        Parameters
+        ----------
+        shas : list[str]
+            The blob SHAs.
+
+        Returns
+        -------
+        dict[str, bytes]
+            The contents of each blob.
+        """
+        output = self._git(
+            ["cat-file", "--batch"], input=("\n".join(shas) + "\n").encode("ascii")
+        )
+        contents: dict[str, bytes] = {}
+        offset = 0
+        for sha in shas:
+            header_end = output.index(b"\n", offset)
+            header = output[offset:header_end].decode("ascii").split()
+            size = int(header[2])
+            start = header_end + 1
+            contents[sha] = output[start : start + size]
+            # each object is followed by a newline
+            offset = start + size + 1
+        return contents
+
+    def _read_working_tree(self) -> list[tuple[str, str, bytes]]:
+        """Reads the files of the working tree in parallel. In a git checkout
+        the tracked and untracked, non-ignored files are read, otherwise every
+        file under the path.
+
+        Returns
+        -------
+        list[tuple[str, str, bytes]]
+            The (path, blob SHA, contents) of each file passing the filters.
+        """
+        try:
+            listing = self._git(
+                ["ls-files", "-z", "--cached", "--others", "--exclude-standard"]
+            )
+            paths = [
+                path.decode("utf-8", "surrogateescape")
+                for path in listing.split(b"\0")
+                if path
+            ]
+        except (OSError, subprocess.CalledProcessError):
+            paths = []
+            for root, dirs, names in os.walk(self._path):
+                if ".git" in dirs:
+                    dirs.remove(".git")
+                relative_root = os.path.relpath(root, self._path)
+                for name in names:
+                    path = os.path.normpath(os.path.join(relative_root, name))
+                    paths.append(path.replace(os.sep, "/"))
+        paths = [
+            path
+            for path in dict.fromkeys(paths)
+            if os.path.isfile(os.path.join(self._path, path))
+            and prune_file(
+                path,
+                os.path.getsize(os.path.join(self._path, path)),
+                self._filters,
+                self._prune_stats,
+            )
+        ]
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            contents = list(executor.map(self._read_file, paths))
+        return [
+            (path, blob_sha(content), content)
+            for path, content in zip(paths, contents)
+        ]
+
+    def _read_file(self, path: str) -> bytes:
+        """Reads a working tree file.
+
+        Parameters
+        ----------
+        path : str
+            The file path relative to the checkout root.
+
+        Returns
+        -------
+        bytes
+            The file contents.
+        """
+        with open(os.path.join(self._path, path), "rb") as f:
+            return f.read()
+
+    def _git(self, args: list[str], input: Optional[bytes] = None) -> bytes:
+        """Runs a git command in the checkout.
+
+        Parameters
+        ----------
+        args : list[str]
+            The git command arguments.
+        input : bytes or None, optional
+            The standard input.
+
+        Returns
+        -------
+        bytes
+            The standard output.
+
+        Raises
+        ------
+        subprocess.CalledProcessError
+            If the command failed.
+        """
+        return subprocess.run(
+            ["git", "-C", self._path, *args],
+            input=input,
+            capture_output=True,
+            check=True,
+        ).stdout
@@ -9,6 +9,7 @@ import csv
 import logging
 import os
 import datetime
+import uuid
 import pytz
 from typing import Optional, NoReturn, cast, get_args
 from . import TIMEZONE, TIMESTAMP_FORMAT
@@ -127,6 +128,37 @@ def write_json(output_path: str, data: dict | list | OutputTrackerFile) -> bool:
         return False
 
 
+def write_json_atomic(output_path: str, data: dict | list | OutputTrackerFile) -> bool:
+    """Writes JSON out to the output path atomically. The data is written to a
+    temporary file in the same directory that then replaces the output file, so
+    an interrupted write never leaves a truncated file behind.
+
+    Parameters
+    ----------
+    output_path : str
+        The output file path.
+    data : dict | list | OutputTrackerFile
+        The data to dump.
+
+    Returns
+    -------
+    bool
+        Whether the process was successful.
+    """
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, output_path)
+        return True
+    except Exception as e:
+        logging.error(f"Failed to dump JSON to output path '{output_path}'.\n{e}")
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def dump_output_file_map_tsv(output_path: str, data: OutputTrackerFile):
     """Dumps the OutputTrackerFile object into a TSV table for better
     human readability.
@@ -160,6 +192,10 @@ def dump_output_file_map_tsv(output_path: str, data: OutputTrackerFile):
                 "git_branch",
                 "directory_filter",
                 "file_ext_filter",
+                "glob_filter",
+                "max_file_size_filter",
+                "binary_filter",
+                "git_local_path",
                 "elapsed_time",
                 "version",
             ]
@@ -188,6 +224,11 @@ def dump_output_file_map_tsv(output_path: str, data: OutputTrackerFile):
                         entry_set["entries"]["params"]["git_branch"],
                         entry_set["entries"]["params"]["directory_git_filter"],
                         entry_set["entries"]["params"]["file_ext_git_filter"],
+                        # not recorded in output maps from older versions
+                        entry_set["entries"]["params"].get("glob_git_filter"),
+                        entry_set["entries"]["params"].get("max_file_size_git_filter"),
+                        entry_set["entries"]["params"].get("binary_git_filter"),
+                        entry_set["entries"]["params"].get("git_local_path"),
                         entry["elapsed_time"],
                         entry["version"],
                     ]
@@ -282,6 +323,72 @@ def create_timestamp() -> str:
     return timestamp
 
 
+def parse_chunking_config(chunking_config: str) -> Optional[tuple[int, int]]:
+    """Gets the chunk size and chunk overlap for a fixed size chunking config.
+
+    Parameters
+    ----------
+    chunking_config : str
+        The chunking config option.
+
+    Returns
+    -------
+    (int, int) | None
+        The chunk size and chunk overlap or None for semantic chunking.
+    """
+    match chunking_config:
+        case "semantic":
+            return None
+        case "256 chunk size/20 chunk overlap":
+            return 256, 50
+        case "512 chunk size/50 chunk overlap":
+            return 512, 50
+        case "2048 chunk size/50 chunk overlap":
+            return 2048, 50
+        case _:
+            return 1024, 20
+
+
+def parse_embedding_model(option: str) -> tuple[str, Optional[int]]:
+    """Parses an embedding model option into the model name and the requested
+    embedding dimensions. Options of the form `<model>/<n> dimensions` request
+    shortened embeddings, which only the `text-embedding-3` models support.
+
+    Parameters
+    ----------
+    option : str
+        The embedding model option (for example
+        `text-embedding-3-large/1024 dimensions`).
+
+    Returns
+    -------
+    (str, int | None)
+        The model name and the requested dimensions, None for the model's
+        full dimensions.
+
+    Raises
+    ------
+    ValueError
+        If the option is malformed or requests dimensions from a model that
+        doesn't support them.
+    """
+    model, sep, dimensions_str = option.partition("/")
+    model = model.strip()
+    if not sep:
+        return model, None
+    match = re.fullmatch(r"(\d+) dimensions", dimensions_str.strip())
+    if match is None:
+        raise ValueError(f"Invalid embedding model option `{option}`.")
+    if not model.startswith("text-embedding-3"):
+        raise ValueError(
+            f"Embedding model `{model}` doesn't support reduced dimensions."
+        )
+    dimensions = int(match.group(1))
+    if dimensions <= 0:
+        raise ValueError(f"Invalid embedding dimensions in `{option}`.")
+    return model, dimensions
+
+
 def extract_repo_data(url: str) -> Optional[tuple[str, str]]:
     """Extracts the repository information from the repo URL.
 
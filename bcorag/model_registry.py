@@ -0,0 +1,220 @@
+""" Process wide registry of locally loaded models.
+
+Loading a local model (such as the cross-encoder used for reranking) from
+disk takes seconds. The model registry loads each model lazily on first use,
+shares it across every `BcoRag` instance in the process and frees it again
+once it has gone unused for longer than the idle timeout.
+"""
+
+import gc
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, Hashable, Optional
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+
+class _RegistryEntry:
+    """A loaded model and its usage bookkeeping.
+
+    Attributes
+    ----------
+    model : Any
+        The loaded model.
+    last_used : float
+        Monotonic timestamp of the last time the model was released.
+    in_use : int
+        The number of callers currently using the model.
+    """
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+class ModelRegistry:
+    """Thread safe registry of lazily loaded, idle evicted models.
+
+    Attributes
+    ----------
+    _idle_timeout : float or None
+        Seconds a model can go unused before it is freed, None disables
+        eviction.
+    _entries : dict[Hashable, _RegistryEntry]
+        The loaded models keyed by their registry key.
+    _lock : threading.Lock
+        Guards the entries.
+    _load_locks : dict[Hashable, threading.Lock]
+        Per key locks so a model is only loaded once when several threads
+        request it at the same time.
+    _reaper : threading.Thread or None
+        The background thread evicting idle models (started on first load).
+    _logger : logging.Logger
+        The registry logger.
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT):
+        """Constructor.
+
+        Parameters
+        ----------
+        idle_timeout : float or None, optional
+            Seconds a model can go unused before it is freed, None disables
+            eviction.
+        """
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be positive.")
+        self._idle_timeout = idle_timeout
+        self._entries: dict[Hashable, _RegistryEntry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[Hashable, threading.Lock] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._logger = logging.getLogger("bcorag.model_registry")
+
+    @contextmanager
+    def use(
+        self, key: Hashable, loader: Callable[[], Any]
+    ) -> Generator[Any, None, None]:
+        """Gets a model for the duration of the context, loading it first if
+        it isn't loaded. The model can't be evicted while in use.
+
+        Parameters
+        ----------
+        key : Hashable
+            The registry key identifying the model.
+        loader : Callable[[], Any]
+            Loads the model, only called on a registry miss.
+
+        Yields
+        ------
+        Any
+            The loaded model.
+        """
+        entry = self._acquire(key, loader)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def is_loaded(self, key: Hashable) -> bool:
+        """Checks whether a model is currently loaded.
+
+        Parameters
+        ----------
+        key : Hashable
+            The registry key identifying the model.
+
+        Returns
+        -------
+        bool
+            Whether the model is loaded.
+        """
+        with self._lock:
+            return key in self._entries
+
+    def evict_idle(self) -> int:
+        """Frees every model that has gone unused for longer than the idle
+        timeout.
+
+        Returns
+        -------
+        int
+            The number of models freed.
+        """
+        if self._idle_timeout is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                key
+                for key, entry in self._entries.items()
+                if entry.in_use == 0 and now - entry.last_used > self._idle_timeout
+            ]
+            for key in idle:
+                del self._entries[key]
+        for key in idle:
+            self._logger.info(f"Freed idle model `{key}`.")
+        if idle:
+            gc.collect()
+        return len(idle)
+
+    def clear(self):
+        """Frees every model not currently in use."""
+        with self._lock:
+            unused = [key for key, entry in self._entries.items() if entry.in_use == 0]
+            for key in unused:
+                del self._entries[key]
+        if unused:
+            gc.collect()
+
+    def _acquire(self, key: Hashable, loader: Callable[[], Any]) -> _RegistryEntry:
+        """Gets the registry entry for a model and marks it as in use.
+
+        Parameters
+        ----------
+        key : Hashable
+            The registry key identifying the model.
+        loader : Callable[[], Any]
+            Loads the model, only called on a registry miss.
+
+        Returns
+        -------
+        _RegistryEntry
+            The in use registry entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.in_use += 1
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.in_use += 1
+                    return entry
+            load_start = time.time()
+            model = loader()
+            self._logger.info(
+                f"Loaded model `{key}` in {round(time.time() - load_start, 2)} seconds."
+            )
+            with self._lock:
+                entry = _RegistryEntry(model)
+                entry.in_use += 1
+                self._entries[key] = entry
+                self._start_reaper()
+            return entry
+
+    def _start_reaper(self):
+        """Starts the background eviction thread if it isn't running. Must be
+        called with the registry lock held.
+        """
+        if self._idle_timeout is None or self._reaper is not None:
+            return
+        self._reaper = threading.Thread(
+            target=self._reap, name="bcorag-model-registry", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap(self):
+        """Background loop periodically evicting idle models. Exits once the
+        registry is empty, the next load restarts it.
+        """
+        assert self._idle_timeout is not None
+        interval = max(self._idle_timeout / 2, 1.0)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+            with self._lock:
+                if not self._entries:
+                    self._reaper = None
+                    return
+
+
+MODEL_REGISTRY = ModelRegistry()
@@ -0,0 +1,151 @@
+""" Multi-granularity chunking for chunking config sweeps.
+
+Parameter searches routinely sweep the chunking configs over the same
+documents, and each config is a separate load, chunk and embed. Building the
+indexes for several chunking configs together loads the documents once, runs
+every fixed size splitter over a shared sentence split and token count cache
+(so each piece of text is only sentence split and tokenized once across every
+granularity) and embeds the nodes of every granularity in a single batched
+pass, where identical chunks produced by several granularities are only
+embedded once.
+
+The nodes of each granularity are exactly the nodes the regular index build
+produces for that chunking config, so each resulting index is
+interchangeable with (and cached under the same fingerprint as) an index
+built on its own.
+"""
+
+from typing import Callable, Optional, Sequence
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.node_parser.text.utils import split_by_sentence_tokenizer
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+from llama_index.core.utils import get_tokenizer
+from .semantic_splitter import EmbeddingReuseSemanticSplitter
+from .misc_functions import parse_chunking_config
+
+
+class MemoizedSplitFn:
+    """Caches the output of a text splitting or tokenizing function so it can
+    be shared by several splitters.
+
+    Attributes
+    ----------
+    _fn : Callable[[str], list]
+        The wrapped function.
+    _cache : dict[str, list]
+        The cached output for each text.
+    """
+
+    def __init__(self, fn: Callable[[str], list]):
+        """Constructor.
+
+        Parameters
+        ----------
+        fn : Callable[[str], list]
+            The function to wrap.
+        """
+        self._fn = fn
+        self._cache: dict[str, list] = {}
+
+    def __call__(self, text: str) -> list:
+        cached = self._cache.get(text)
+        if cached is None:
+            cached = self._fn(text)
+            self._cache[text] = cached
+        return cached
+
+    def clear(self):
+        """Frees the cached outputs."""
+        self._cache.clear()
+
+
+def chunk_documents(
+    documents: Sequence[Document],
+    chunking_configs: Sequence[str],
+    semantic_splitter: Optional[Callable[[], EmbeddingReuseSemanticSplitter]] = None,
+) -> dict[str, list[BaseNode]]:
+    """Chunks the documents with several chunking configs at once. The fixed
+    size splitters share one sentence split and token count cache.
+
+    Parameters
+    ----------
+    documents : Sequence[Document]
+        The documents to chunk.
+    chunking_configs : Sequence[str]
+        The chunking configs to produce.
+    semantic_splitter : Callable[[], EmbeddingReuseSemanticSplitter] or None, optional
+        Creates the semantic splitter, required if `semantic` is one of the
+        chunking configs.
+
+    Returns
+    -------
+    dict[str, list[BaseNode]]
+        The nodes for each chunking config.
+    """
+    tokenizer = MemoizedSplitFn(get_tokenizer())
+    sentence_splitter = MemoizedSplitFn(split_by_sentence_tokenizer())
+    nodes_by_config: dict[str, list[BaseNode]] = {}
+    try:
+        for chunking_config in chunking_configs:
+            chunk_params = parse_chunking_config(chunking_config)
+            if chunk_params is None:
+                if semantic_splitter is None:
+                    raise ValueError(
+                        "A semantic splitter is required for semantic chunking."
+                    )
+                nodes_by_config[chunking_config] = (
+                    semantic_splitter().build_semantic_nodes_from_documents(documents)
+                )
+                continue
+            chunk_size, chunk_overlap = chunk_params
+            splitter = SentenceSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                tokenizer=tokenizer,
+                chunking_tokenizer_fn=sentence_splitter,
+            )
+            nodes_by_config[chunking_config] = splitter.get_nodes_from_documents(
+                documents
+            )
+    finally:
+        tokenizer.clear()
+        sentence_splitter.clear()
+    return nodes_by_config
+
+
+def embed_all_nodes(
+    nodes_by_config: dict[str, list[BaseNode]], embed_model: BaseEmbedding
+) -> int:
+    """Embeds the nodes of every chunking config in one batched pass. Nodes
+    that already have an embedding (such as semantic nodes reusing their
+    sentence group embedding) are skipped and identical embedding content is
+    only embedded once.
+
+    Parameters
+    ----------
+    nodes_by_config : dict[str, list[BaseNode]]
+        The nodes for each chunking config.
+    embed_model : BaseEmbedding
+        The embedding model.
+
+    Returns
+    -------
+    int
+        The number of distinct texts embedded.
+    """
+    pending: dict[str, list[BaseNode]] = {}
+    for nodes in nodes_by_config.values():
+        for node in nodes:
+            if node.embedding is None:
+                pending.setdefault(
+                    node.get_content(metadata_mode=MetadataMode.EMBED), []
+                ).append(node)
+    texts = list(pending.keys())
+    if not texts:
+        return 0
+    embeddings = embed_model.get_text_embedding_batch(texts)
+    for text, embedding in zip(texts, embeddings):
+        for node in pending[text]:
+            node.embedding = embedding
+    return len(texts)
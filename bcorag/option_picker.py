@@ -14,13 +14,18 @@ from .custom_types.core_types import (
     create_git_data,
     create_git_filters,
     OptionKey,
+    LlmCacheMode,
 )
 from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from .local_git_loader import local_repo_identity
+from .vector_stores import missing_dependency
 
 EXIT_OPTION = "Exit"
 
 
-def initialize_picker(filetype: str = "pdf") -> Optional[UserSelections]:
+def initialize_picker(
+    filetype: str = "pdf", llm_cache_mode: LlmCacheMode = "off"
+) -> Optional[UserSelections]:
     """Kicks off the initial pipeline step where the user picks their
     PDF file to index and chooser the data loader from a pre-set list.
 
@@ -29,6 +34,8 @@ def initialize_picker(filetype: str = "pdf") -> Optional[UserSelections]:
     filetype : str, optional
         The filetype to filter on, this project was build to handle PDF
         files so it is highly unlikely you will want to override this default.
+    llm_cache_mode : LlmCacheMode, optional
+        The LLM response cache mode to use.
 
     Returns
     -------
@@ -49,16 +56,36 @@ def initialize_picker(filetype: str = "pdf") -> Optional[UserSelections]:
     target_file_information = _file_picker(presets["paper_directory"], filetype)
     if target_file_information is None:
         return None
+    return_data["llm_cache_mode"] = llm_cache_mode
     return_data["filename"] = target_file_information[0]
     return_data["filepath"] = target_file_information[1]
 
     option: OptionKey
     for option in get_args(OptionKey):
+        option_list = presets["options"][option]["list"]
+        note = None
+        if option == "vector_store":
+            # hide the vector stores whose optional dependency isn't installed
+            missing = {
+                vector_store: missing_dependency(vector_store)
+                for vector_store in option_list
+            }
+            option_list = [
+                vector_store
+                for vector_store in option_list
+                if missing[vector_store] is None
+            ]
+            packages = sorted(
+                {package for package in missing.values() if package is not None}
+            )
+            if packages:
+                note = f"Some vector stores are hidden, `pip install {' '.join(packages)}` to enable them."
         target_option = _create_picker(
             option,
             presets["options"][option]["documentation"],
-            presets["options"][option]["list"],
+            option_list,
             presets["options"][option].get("default", None),
+            note,
         )
         if target_option is None:
             return None
@@ -107,7 +134,8 @@ def _file_picker(path: str, filetype: str = "pdf") -> Optional[Tuple[str, str]]:
 
 
 def _repo_picker() -> Optional[GitData] | Literal[0]:
-    """Allows the user to input a github repository link to be included in the indexing.
+    """Allows the user to input a github repository link (or the path to a local
+    checkout) to be included in the indexing.
 
     Returns
     -------
@@ -118,7 +146,7 @@ def _repo_picker() -> Optional[GitData] | Literal[0]:
 
     while True:
 
-        url_prompt = 'If you would like to include a Github repository enter the URL below. Enter "x" to exit or leave blank to skip.\n> '
+        url_prompt = 'If you would like to include a Github repository enter the URL (or the path to a local checkout) below. Enter "x" to exit or leave blank to skip.\n> '
         url = input(url_prompt)
         if not url or url is None:
             print("Skipping Github repo...")
@@ -126,16 +154,24 @@ def _repo_picker() -> Optional[GitData] | Literal[0]:
         elif url == "x":
             return 0
 
-        match = misc_fns.extract_repo_data(url)
-        if match is None:
-            print("Error parsing repository URL.")
-            continue
-        user = match[0]
-        repo = match[1]
-
-        branch = input("Repo branch to index (case sensitive):\n> ")
-        if not branch:
-            branch = "main"
+        local_path: Optional[str] = None
+        if os.path.isdir(url):
+            local_path = os.path.abspath(url)
+            user, repo = local_repo_identity(local_path)
+            branch = input(
+                "Git ref to index (branch, tag or commit), leave blank to read the working tree:\n> "
+            ).strip()
+        else:
+            match = misc_fns.extract_repo_data(url)
+            if match is None:
+                print("Error parsing repository URL.")
+                continue
+            user = match[0]
+            repo = match[1]
+
+            branch = input("Repo branch to index (case sensitive):\n> ")
+            if not branch:
+                branch = "main"
 
         git_filters: list[GitFilters] = []
 
@@ -179,7 +215,54 @@ def _repo_picker() -> Optional[GitData] | Literal[0]:
             file_ext_filter = create_git_filters(file_ext_filter_type, GitFilter.FILE_EXTENSION, value=file_exts)
             git_filters.append(file_ext_filter)
 
-        return_data = create_git_data(user, repo, branch, git_filters)
+        glob_filter_prompt = "Would you like to include a glob pattern filter?"
+        glob_filter_prompt += "\nEnter a list of comma-delimited glob patterns (such as `vendor/*, *.csv`) to either conditionally exclude or inclusively include. "
+        glob_filter_prompt += "Or leave blank to skip.\n> "
+        glob_filter_val = input(glob_filter_prompt)
+        if glob_filter_val:
+            patterns = [
+                pattern.strip()
+                for pattern in glob_filter_val.split(",")
+                if pattern.strip()
+            ]
+            glob_filter_condition_prompt = (
+                'Enter "include" or "exclude" for the glob pattern filter.\n> '
+            )
+            glob_filter_condition_val = input(glob_filter_condition_prompt)
+            glob_filter_type = (
+                GithubRepositoryReader.FilterType.INCLUDE
+                if glob_filter_condition_val.lower().strip() == "include"
+                else GithubRepositoryReader.FilterType.EXCLUDE
+            )
+            glob_filter = create_git_filters(glob_filter_type, GitFilter.GLOB, value=patterns)
+            git_filters.append(glob_filter)
+
+        while True:
+            max_size_val = input(
+                "Maximum file size to index in KB, larger files are skipped. Or leave blank to skip.\n> "
+            ).strip()
+            if not max_size_val:
+                break
+            if max_size_val.isdigit():
+                max_size_filter = create_git_filters(
+                    GithubRepositoryReader.FilterType.EXCLUDE,
+                    GitFilter.MAX_FILE_SIZE,
+                    value=[str(int(max_size_val) * 1024)],
+                )
+                git_filters.append(max_size_filter)
+                break
+            print("Please enter a whole number of KB.")
+
+        binary_filter_val = input(
+            "Would you like to skip binary and minified files (such as images, archives and `.min.js` files)? (y/N)\n> "
+        )
+        if binary_filter_val.lower().strip() in ("y", "yes"):
+            binary_filter = create_git_filters(
+                GithubRepositoryReader.FilterType.EXCLUDE, GitFilter.BINARY, value=[]
+            )
+            git_filters.append(binary_filter)
+
+        return_data = create_git_data(user, repo, branch, git_filters, local_path)
         return return_data
 
 
@@ -188,6 +271,7 @@ def _create_picker(
     documentation: str,
     option_list: list[str],
     default: Optional[str] = None,
+    note: Optional[str] = None,
 ) -> Optional[str]:
     """Creates a general picker CLI based on a list of options and the
     functionality to optionally mark one option as the default.
@@ -202,6 +286,8 @@ def _create_picker(
         The list of options to display in the picker menu.
     default : str | None, optional
         The option to mark one option as the default.
+    note : str | None, optional
+        An extra line to display below the picker title.
 
     Returns
     -------
@@ -209,6 +295,8 @@ def _create_picker(
         The chosen option of None if the user selected to exit.
     """
     pick_title = f"Please choose one of the following {title_keyword.replace('_', ' ').title()}s.\nDocumentation can be found at:\n{documentation}."
+    if note is not None:
+        pick_title += f"\n{note}"
     pick_options = [
         f"{option} (default)" if option == default else option for option in option_list
     ]
@@ -0,0 +1,336 @@
+""" SQLite backed output tracker.
+
+Every generated domain used to re-read the paper's `output_map.json`, scan it
+for the parameter set hash and rewrite both the JSON and TSV output maps in
+full, which gets quadratically slower as runs accumulate. The output tracker
+stores the parameter sets and runs in an `output_map.sqlite3` database in the
+paper's output directory instead, with the parameter sets indexed on the
+domain and parameter set hash, so recording a run is a constant number of
+indexed statements.
+
+The database is the source of truth, readers should go through
+`load_output_map`. The `output_map.json` and `output_map.tsv` files are views
+of the database, materialized on demand (`OutputTracker.export`,
+`export_output_maps` or the `export` run mode) in the same format as before,
+so recording a run never rewrites them. A paper directory with an existing
+`output_map.json` but no database has the JSON map imported the first time it
+is opened, so the run indexes carry on from the existing runs.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Optional, get_args
+from .custom_types.core_types import DomainKey
+from .custom_types.output_map_types import (
+    OutputTrackerFile,
+    OutputTrackerParamSet,
+    OutputTrackerRunsEntry,
+    create_output_tracker_domain_entry,
+    create_output_tracker_entry,
+    create_output_tracker_runs_entry,
+    default_output_tracker_file,
+)
+from . import misc_functions as misc_fns
+
+TRACKER_FILE = "output_map.sqlite3"
+OUTPUT_MAP_JSON = "output_map.json"
+OUTPUT_MAP_TSV = "output_map.tsv"
+
+
+class OutputTracker:
+    """Tracks the generated domain runs of a paper. Safe to share between
+    threads.
+
+    Attributes
+    ----------
+    _output_root : str
+        The paper output directory.
+    _connection : sqlite3.Connection
+        The database connection.
+    _lock : threading.Lock
+        Serializes access to the connection.
+    _export_lock : threading.Lock
+        Serializes writing the output map views.
+    _logger : logging.Logger
+        The tracker logger.
+    """
+
+    def __init__(self, output_root: str):
+        """Constructor.
+
+        Parameters
+        ----------
+        output_root : str
+            The paper output directory, the database is created in it.
+        """
+        self._output_root = output_root
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._logger = logging.getLogger("bcorag.output_tracker")
+        os.makedirs(output_root, exist_ok=True)
+        path = os.path.join(output_root, TRACKER_FILE)
+        is_new = not os.path.isfile(path)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS param_sets (
+                    id INTEGER PRIMARY KEY,
+                    domain TEXT NOT NULL,
+                    hash_str TEXT NOT NULL,
+                    curr_index INTEGER NOT NULL,
+                    params TEXT NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS param_sets_domain_hash ON param_sets (domain, hash_str)"
+            )
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS runs (
+                    param_set_id INTEGER NOT NULL REFERENCES param_sets (id),
+                    run_index INTEGER NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    txt_file TEXT NOT NULL,
+                    json_file TEXT NOT NULL,
+                    source_node_file TEXT NOT NULL,
+                    elapsed_time REAL NOT NULL,
+                    version TEXT NOT NULL,
+                    PRIMARY KEY (param_set_id, run_index)
+                )"""
+            )
+        legacy_path = os.path.join(output_root, OUTPUT_MAP_JSON)
+        if is_new and os.path.isfile(legacy_path):
+            self._import_output_map(legacy_path)
+
+    def reserve_run(
+        self, domain: DomainKey, hash_str: str, params: OutputTrackerParamSet
+    ) -> int:
+        """Reserves the next run index for a domain parameter set, adding the
+        parameter set on its first run.
+
+        Parameters
+        ----------
+        domain : DomainKey
+            The generated domain.
+        hash_str : str
+            The parameter set hash.
+        params : OutputTrackerParamSet
+            The parameter set.
+
+        Returns
+        -------
+        int
+            The run index, used in the output file names.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO param_sets (domain, hash_str, curr_index, params) VALUES (?, ?, 0, ?)",
+                (domain, hash_str, json.dumps(params)),
+            )
+            self._connection.execute(
+                "UPDATE param_sets SET curr_index = curr_index + 1 WHERE domain = ? AND hash_str = ?",
+                (domain, hash_str),
+            )
+            row = self._connection.execute(
+                "SELECT curr_index FROM param_sets WHERE domain = ? AND hash_str = ?",
+                (domain, hash_str),
+            ).fetchone()
+        return int(row[0])
+
+    def add_run(self, domain: DomainKey, hash_str: str, run: OutputTrackerRunsEntry):
+        """Records a run once its output files are written.
+
+        Parameters
+        ----------
+        domain : DomainKey
+            The generated domain.
+        hash_str : str
+            The parameter set hash (the run index must have been reserved).
+        run : OutputTrackerRunsEntry
+            The run entry.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                """INSERT OR REPLACE INTO runs
+                SELECT id, ?, ?, ?, ?, ?, ?, ? FROM param_sets
+                WHERE domain = ? AND hash_str = ?""",
+                (
+                    run["index"],
+                    run["timestamp"],
+                    run["txt_file"],
+                    run["json_file"],
+                    run["source_node_file"],
+                    run["elapsed_time"],
+                    run["version"],
+                    domain,
+                    hash_str,
+                ),
+            )
+
+    def materialize(self) -> OutputTrackerFile:
+        """Builds the output map in the `output_map.json` format.
+
+        Returns
+        -------
+        OutputTrackerFile
+            The output map.
+        """
+        output_map = default_output_tracker_file()
+        with self._lock:
+            param_sets = self._connection.execute(
+                "SELECT id, domain, hash_str, curr_index, params FROM param_sets ORDER BY id"
+            ).fetchall()
+            runs = self._connection.execute(
+                """SELECT param_set_id, run_index, timestamp, txt_file, json_file,
+                source_node_file, elapsed_time, version
+                FROM runs ORDER BY param_set_id, run_index"""
+            ).fetchall()
+        runs_by_param_set: dict[int, list[OutputTrackerRunsEntry]] = {}
+        for param_set_id, *run in runs:
+            runs_by_param_set.setdefault(param_set_id, []).append(
+                create_output_tracker_runs_entry(*run)
+            )
+        for param_set_id, domain, hash_str, curr_index, params in param_sets:
+            entry = create_output_tracker_entry(
+                curr_index, json.loads(params), runs_by_param_set.get(param_set_id, [])
+            )
+            output_map[domain].append(
+                create_output_tracker_domain_entry(hash_str, entry)
+            )
+        return output_map
+
+    def export(
+        self, json_path: Optional[str] = None, tsv_path: Optional[str] = None
+    ) -> bool:
+        """Materializes the output map and writes the JSON and TSV views.
+
+        Parameters
+        ----------
+        json_path : str or None, optional
+            The JSON output map path, defaults to `output_map.json` in the
+            paper output directory.
+        tsv_path : str or None, optional
+            The TSV output map path, defaults to `output_map.tsv` in the paper
+            output directory.
+
+        Returns
+        -------
+        bool
+            Whether the JSON output map was successfully written.
+        """
+        tsv_path = tsv_path or os.path.join(self._output_root, OUTPUT_MAP_TSV)
+        tmp_tsv_path = f"{tsv_path}.tmp"
+        with self._export_lock:
+            output_map = self.materialize()
+            misc_fns.dump_output_file_map_tsv(tmp_tsv_path, output_map)
+            os.replace(tmp_tsv_path, tsv_path)
+            return misc_fns.write_json_atomic(
+                json_path or os.path.join(self._output_root, OUTPUT_MAP_JSON),
+                output_map,
+            )
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _import_output_map(self, path: str):
+        """Imports an existing JSON output map into the database.
+
+        Parameters
+        ----------
+        path : str
+            The `output_map.json` path.
+        """
+        output_map = misc_fns.load_output_tracker(path)
+        if output_map is None:
+            self._logger.error(f"Failed to import the output map `{path}`.")
+            return
+        domain: DomainKey
+        with self._lock, self._connection:
+            for domain in get_args(DomainKey):
+                for domain_entry in output_map.get(domain, []):
+                    entries = domain_entry["entries"]
+                    cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO param_sets (domain, hash_str, curr_index, params) VALUES (?, ?, ?, ?)",
+                        (
+                            domain,
+                            domain_entry["hash_str"],
+                            entries["curr_index"],
+                            json.dumps(entries["params"]),
+                        ),
+                    )
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                cursor.lastrowid,
+                                run["index"],
+                                run["timestamp"],
+                                run["txt_file"],
+                                run["json_file"],
+                                run["source_node_file"],
+                                run["elapsed_time"],
+                                run["version"],
+                            )
+                            for run in entries["runs"]
+                        ],
+                    )
+        self._logger.info(f"Imported the output map `{path}`.")
+
+
+def load_output_map(output_root: str) -> Optional[OutputTrackerFile]:
+    """Loads the output map of a paper output directory, materialized from
+    the tracker database (or read from `output_map.json` for output
+    directories without one).
+
+    Parameters
+    ----------
+    output_root : str
+        The paper output directory.
+
+    Returns
+    -------
+    OutputTrackerFile or None
+        The output map or None if the directory has no output map.
+    """
+    if os.path.isfile(os.path.join(output_root, TRACKER_FILE)):
+        tracker = OutputTracker(output_root)
+        try:
+            return tracker.materialize()
+        finally:
+            tracker.close()
+    return misc_fns.load_output_tracker(os.path.join(output_root, OUTPUT_MAP_JSON))
+
+
+def export_output_maps(path: str) -> list[str]:
+    """Writes the `output_map.json` and `output_map.tsv` views for a paper
+    output directory or every paper output directory under a directory.
+
+    Parameters
+    ----------
+    path : str
+        A paper output directory or the output directory holding them.
+
+    Returns
+    -------
+    list[str]
+        The paper output directories exported.
+    """
+    if os.path.isfile(os.path.join(path, TRACKER_FILE)):
+        output_roots = [path]
+    else:
+        output_roots = sorted(
+            entry.path
+            for entry in os.scandir(path)
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, TRACKER_FILE))
+        )
+    for output_root in output_roots:
+        tracker = OutputTracker(output_root)
+        try:
+            tracker.export()
+        finally:
+            tracker.close()
+    return output_roots
@@ -0,0 +1,251 @@
+""" Repository file filters.
+
+Evaluates the git filters against the repository tree metadata (the file
+path and size) so pruned files are never downloaded, read, chunked or
+embedded. The directory, file extension and glob filters either include or
+exclude the matching files, while the maximum file size and binary/minified
+filters always exclude. The binary/minified heuristic only looks at the file
+path (binary file extensions and minified or generated file names), since the
+contents aren't known before the download.
+
+The bytes and estimated tokens saved by each filter kind are tallied in a
+`PruneStats` dict for the run log.
+"""
+
+import os
+from fnmatch import fnmatchcase
+from typing import Optional, TypedDict
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from .custom_types.core_types import GitFilter, GitFilters
+
+# rough average of bytes per token for code and prose
+BYTES_PER_TOKEN = 4
+
+# fmt: off
+BINARY_EXTENSIONS = frozenset(
+    {
+        # images and media
+        ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".ico",
+        ".webp", ".svgz", ".mp3", ".mp4", ".wav", ".avi", ".mov", ".mkv",
+        # archives and compressed data
+        ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".zst",
+        ".bgz", ".bam", ".cram", ".sra",
+        # compiled and binary formats
+        ".exe", ".dll", ".so", ".dylib", ".a", ".o", ".class", ".jar",
+        ".pyc", ".pyo", ".whl", ".bin", ".dat", ".db", ".sqlite",
+        ".sqlite3", ".h5", ".hdf5", ".npy", ".npz", ".pkl", ".pickle",
+        ".parquet", ".feather", ".rds", ".rdata",
+        # documents and fonts
+        ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".ttf",
+        ".otf", ".woff", ".woff2", ".eot",
+    }
+)
+# fmt: on
+
+MINIFIED_PATTERNS = (
+    "*.min.js",
+    "*.min.css",
+    "*.min.map",
+    "*.js.map",
+    "*.css.map",
+    "*.bundle.js",
+    "*.chunk.js",
+)
+
+
+class PruneStats(TypedDict):
+    """Tally of the repository files pruned by the git filters.
+
+    Attributes
+    ----------
+    pruned_files : dict[str, int]
+        The number of files pruned by each filter kind.
+    pruned_bytes : dict[str, int]
+        The bytes pruned by each filter kind (for files with a known size).
+    estimated_tokens : int
+        The estimated number of embedding tokens saved.
+    """
+
+    pruned_files: dict[str, int]
+    pruned_bytes: dict[str, int]
+    estimated_tokens: int
+
+
+def create_prune_stats() -> PruneStats:
+    """Constructor for the `PruneStats` TypedDict.
+
+    Returns
+    -------
+    PruneStats
+    """
+    return_data: PruneStats = {
+        "pruned_files": {},
+        "pruned_bytes": {},
+        "estimated_tokens": 0,
+    }
+    return return_data
+
+
+def file_extension(path: str) -> str:
+    """Gets the lowercased extension of a file path, in the same format as the
+    `GithubRepositoryReader` file extension filter.
+
+    Parameters
+    ----------
+    path : str
+        The file path.
+
+    Returns
+    -------
+    str
+        The extension including the leading period.
+    """
+    return f".{os.path.splitext(path)[1][1:].lower()}"
+
+
+def match_glob(path: str, patterns: list[str]) -> bool:
+    """Checks a file path against glob patterns. Patterns without a `/` are
+    matched against the file name, the rest against the full path.
+
+    Parameters
+    ----------
+    path : str
+        The file path relative to the repository root.
+    patterns : list[str]
+        The glob patterns.
+
+    Returns
+    -------
+    bool
+        Whether any of the patterns matches.
+    """
+    file_name = path.rsplit("/", 1)[-1]
+    return any(
+        fnmatchcase(path if "/" in pattern else file_name, pattern)
+        for pattern in patterns
+    )
+
+
+def is_binary_or_minified(path: str, extra_patterns: Optional[list[str]] = None) -> bool:
+    """Checks whether a file looks binary or minified by its path.
+
+    Parameters
+    ----------
+    path : str
+        The file path relative to the repository root.
+    extra_patterns : list[str] or None, optional
+        Extra glob patterns to treat as binary or minified.
+
+    Returns
+    -------
+    bool
+        Whether the file looks binary or minified.
+    """
+    if file_extension(path) in BINARY_EXTENSIONS:
+        return True
+    return match_glob(path.lower(), list(MINIFIED_PATTERNS)) or match_glob(
+        path, extra_patterns or []
+    )
+
+
+def filter_reason(
+    path: str, size: Optional[int], filters: list[GitFilters]
+) -> Optional[GitFilter]:
+    """Finds the filter that prunes a repository file.
+
+    Parameters
+    ----------
+    path : str
+        The file path relative to the repository root.
+    size : int or None
+        The file size in bytes, None if unknown (the maximum file size filter
+        is then skipped).
+    filters : list[GitFilters]
+        The filters to apply.
+
+    Returns
+    -------
+    GitFilter or None
+        The kind of the first filter the file fails or None if the file
+        passes every filter.
+    """
+    for filter in filters:
+        match filter["filter"]:
+            case GitFilter.DIRECTORY:
+                matched = any(
+                    path.startswith(directory) for directory in filter["value"]
+                )
+            case GitFilter.FILE_EXTENSION:
+                matched = file_extension(path) in filter["value"]
+            case GitFilter.GLOB:
+                matched = match_glob(path, filter["value"])
+            case GitFilter.MAX_FILE_SIZE:
+                if size is not None and size > int(filter["value"][0]):
+                    return filter["filter"]
+                continue
+            case GitFilter.BINARY:
+                if is_binary_or_minified(path, filter["value"]):
+                    return filter["filter"]
+                continue
+            case _:
+                continue
+        if matched != (
+            filter["filter_type"] == GithubRepositoryReader.FilterType.INCLUDE
+        ):
+            return filter["filter"]
+    return None
+
+
+def prune_file(
+    path: str, size: Optional[int], filters: list[GitFilters], stats: PruneStats
+) -> bool:
+    """Checks a repository file against the filters, tallying the pruned
+    files.
+
+    Parameters
+    ----------
+    path : str
+        The file path relative to the repository root.
+    size : int or None
+        The file size in bytes, None if unknown.
+    filters : list[GitFilters]
+        The filters to apply.
+    stats : PruneStats
+        The tally to update.
+
+    Returns
+    -------
+    bool
+        Whether the file is kept.
+    """
+    reason = filter_reason(path, size, filters)
+    if reason is None:
+        return True
+    name = reason.name.lower()
+    stats["pruned_files"][name] = stats["pruned_files"].get(name, 0) + 1
+    if size is not None:
+        stats["pruned_bytes"][name] = stats["pruned_bytes"].get(name, 0) + size
+        stats["estimated_tokens"] += size // BYTES_PER_TOKEN
+    return False
+
+
+def format_prune_stats(stats: PruneStats) -> str:
+    """Formats the prune tally for logging.
+
+    Parameters
+    ----------
+    stats : PruneStats
+        The prune tally.
+
+    Returns
+    -------
+    str
+        One line per filter kind with the pruned files and bytes and the
+        estimated tokens saved in total.
+    """
+    lines = [
+        f"{name}: {count} file(s), {stats['pruned_bytes'].get(name, 0)} bytes"
+        for name, count in sorted(stats["pruned_files"].items())
+    ]
+    lines.append(f"estimated tokens saved: {stats['estimated_tokens']}")
+    return "\n".join(lines)
@@ -0,0 +1,388 @@
+""" Cross-encoder reranking backed by the process wide model registry.
+
+Drop in replacement for `SentenceTransformerRerank` that doesn't load the
+cross-encoder when constructed. The model is fetched from the model registry
+the first time nodes are reranked, so every `BcoRag` instance in the process
+shares a single loaded copy and constructing an instance costs nothing.
+`postprocess_batch` reranks the candidates of several queries in one batch.
+
+The cross-encoder scores are also memoized process wide, keyed by the model,
+the query and the passage. The rerank query of a domain is the same for every
+parameter set (unless it includes generated dependency content), so parameter
+sets sharing an index, such as the LLM or top k variants of a parameter
+search, only score the (query, node) pairs the previous ones didn't.
+"""
+
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Optional
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.utils import infer_torch_device
+from .model_registry import MODEL_REGISTRY, ModelRegistry
+
+DEFAULT_RERANK_MODEL = "cross-encoder/stsb-distilroberta-base"
+DEFAULT_MAX_LENGTH = 512
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_SCORES = 100_000
+
+
+def load_cross_encoder(model: str, device: str) -> Any:
+    """Loads a sentence transformers cross-encoder.
+
+    Parameters
+    ----------
+    model : str
+        The cross-encoder model name.
+    device : str
+        The device to load the model on.
+
+    Returns
+    -------
+    CrossEncoder
+        The loaded cross-encoder.
+    """
+    try:
+        from sentence_transformers import CrossEncoder  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "Cannot import sentence-transformers or torch package, please `pip install torch sentence-transformers`."
+        )
+    return CrossEncoder(model, max_length=DEFAULT_MAX_LENGTH, device=device)
+
+
+class ScoreCache:
+    """Thread safe, bounded LRU memo of cross-encoder scores.
+
+    Attributes
+    ----------
+    _max_scores : int
+        The maximum number of scores kept, the least recently used are
+        dropped first.
+    _scores : OrderedDict[str, float]
+        The scores keyed by the hash of the model, query and passage.
+    _lock : threading.Lock
+        Guards the scores.
+    """
+
+    def __init__(self, max_scores: int = DEFAULT_MAX_SCORES):
+        """Constructor.
+
+        Parameters
+        ----------
+        max_scores : int, optional
+            The maximum number of scores kept.
+        """
+        self._max_scores = max_scores
+        self._scores: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, query: str, passage: str) -> str:
+        """Computes the memo key for a scored pair.
+
+        Parameters
+        ----------
+        model : str
+            The cross-encoder model name.
+        query : str
+            The rerank query.
+        passage : str
+            The node content.
+
+        Returns
+        -------
+        str
+            The hexidecimal SHA-256 key.
+        """
+        hasher = sha256()
+        for part in (model, query, passage):
+            hasher.update(part.encode("utf-8", "surrogatepass"))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def get_many(self, keys: list[str]) -> list[Optional[float]]:
+        """Looks up several scores.
+
+        Parameters
+        ----------
+        keys : list[str]
+            The memo keys.
+
+        Returns
+        -------
+        list[float | None]
+            The score for each key, None on a miss.
+        """
+        with self._lock:
+            scores: list[Optional[float]] = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            return scores
+
+    def put_many(self, keys: list[str], scores: list[float]):
+        """Stores several scores.
+
+        Parameters
+        ----------
+        keys : list[str]
+            The memo keys.
+        scores : list[float]
+            The score for each key.
+        """
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self._max_scores:
+                self._scores.popitem(last=False)
+
+    def clear(self):
+        """Drops every score."""
+        with self._lock:
+            self._scores.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._scores)
+
+
+SCORE_CACHE = ScoreCache()
+
+
+class SharedRerank(BaseNodePostprocessor):
+    """Reranks nodes with a lazily loaded cross-encoder shared process wide.
+
+    Attributes
+    ----------
+    model : str
+        The cross-encoder model name.
+    top_n : int
+        Number of nodes to return sorted by score.
+    device : str or None
+        The device to run the cross-encoder on, inferred if None.
+    keep_retrieval_score : bool
+        Whether to keep the retrieval score in the node metadata.
+    batch_size : int
+        The number of pairs scored per cross-encoder forward pass.
+    """
+
+    model: str = Field(
+        default=DEFAULT_RERANK_MODEL, description="Cross-encoder model name."
+    )
+    top_n: int = Field(default=2, description="Number of nodes to return.")
+    device: Optional[str] = Field(
+        default=None, description="Device to run the cross-encoder on."
+    )
+    keep_retrieval_score: bool = Field(
+        default=False, description="Whether to keep the retrieval score in metadata."
+    )
+    batch_size: int = Field(
+        default=DEFAULT_BATCH_SIZE, description="Pairs scored per forward pass."
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SharedRerank"
+
+    def is_loaded(self, registry: ModelRegistry = MODEL_REGISTRY) -> bool:
+        """Checks whether the cross-encoder is currently loaded.
+
+        Parameters
+        ----------
+        registry : ModelRegistry, optional
+            The model registry to check.
+
+        Returns
+        -------
+        bool
+            Whether the cross-encoder is loaded.
+        """
+        return registry.is_loaded(self._registry_key())
+
+    def _registry_key(self) -> tuple[str, str, str]:
+        """Builds the model registry key for the cross-encoder.
+
+        Returns
+        -------
+        tuple[str, str, str]
+            The registry key.
+        """
+        return ("cross-encoder", self.model, self._device())
+
+    def _device(self) -> str:
+        """Gets the device to run the cross-encoder on.
+
+        Returns
+        -------
+        str
+            The device name.
+        """
+        if self.device is not None:
+            return self.device
+        return infer_torch_device()
+
+    def _predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Scores (query, passage) pairs with the shared cross-encoder. Pairs
+        already scored in this process are served from the score memo.
+
+        Parameters
+        ----------
+        pairs : list[tuple[str, str]]
+            The pairs to score.
+
+        Returns
+        -------
+        list[float]
+            The relevance score for each pair.
+        """
+        keys = [SCORE_CACHE.key(self.model, query, passage) for query, passage in pairs]
+        scores = SCORE_CACHE.get_many(keys)
+        misses = [i for i, score in enumerate(scores) if score is None]
+        if misses:
+            device = self._device()
+            with MODEL_REGISTRY.use(
+                self._registry_key(), lambda: load_cross_encoder(self.model, device)
+            ) as cross_encoder:
+                predicted = [
+                    float(score)
+                    for score in cross_encoder.predict(
+                        [pairs[i] for i in misses], batch_size=self.batch_size
+                    )
+                ]
+            SCORE_CACHE.put_many([keys[i] for i in misses], predicted)
+            for i, score in zip(misses, predicted):
+                scores[i] = score
+        return scores  # type: ignore
+
+    def postprocess_batch(
+        self, requests: list[tuple[list[NodeWithScore], QueryBundle]]
+    ) -> list[list[NodeWithScore]]:
+        """Reranks the nodes for several queries at once. The (query, node)
+        pairs of every request are deduplicated and scored together in as few
+        cross-encoder forward passes as possible, then the scores are split
+        back per request. Every domain has its own rerank query, so the
+        deduplication only saves the pairs repeated within a request (or by
+        requests sharing a query), the reuse across parameter sets comes from
+        the process wide score memo.
+
+        Each request gets its own copy of any node it shares with another
+        request so the rerank scores (and the retrieval score kept in the node
+        metadata) of one request don't leak into another.
+
+        Parameters
+        ----------
+        requests : list[tuple[list[NodeWithScore], QueryBundle]]
+            The candidate nodes and the query bundle for each request.
+
+        Returns
+        -------
+        list[list[NodeWithScore]]
+            The reranked nodes for each request, in request order.
+        """
+        pair_indices: dict[tuple[str, str], int] = {}
+        request_pairs: list[list[int]] = []
+        seen_nodes: set[int] = set()
+        request_nodes: list[list[NodeWithScore]] = []
+        for nodes, query_bundle in requests:
+            indices: list[int] = []
+            copies: list[NodeWithScore] = []
+            for node in nodes:
+                pair = (
+                    query_bundle.query_str,
+                    node.node.get_content(metadata_mode=MetadataMode.EMBED),
+                )
+                indices.append(pair_indices.setdefault(pair, len(pair_indices)))
+                if id(node.node) in seen_nodes:
+                    node = NodeWithScore(
+                        node=node.node.model_copy(
+                            update={"metadata": dict(node.node.metadata)}
+                        ),
+                        score=node.score,
+                    )
+                seen_nodes.add(id(node.node))
+                copies.append(node)
+            request_pairs.append(indices)
+            request_nodes.append(copies)
+
+        scores = self._predict(list(pair_indices.keys())) if pair_indices else []
+
+        results: list[list[NodeWithScore]] = []
+        for (_, query_bundle), nodes, indices in zip(
+            requests, request_nodes, request_pairs
+        ):
+            with self.callback_manager.event(
+                CBEventType.RERANKING,
+                payload={
+                    EventPayload.NODES: nodes,
+                    EventPayload.MODEL_NAME: self.model,
+                    EventPayload.QUERY_STR: query_bundle.query_str,
+                    EventPayload.TOP_K: self.top_n,
+                },
+            ) as event:
+                new_nodes = self._apply_scores(nodes, [scores[i] for i in indices])
+                event.on_end(payload={EventPayload.NODES: new_nodes})
+            results.append(new_nodes)
+        return results
+
+    def _postprocess_nodes(
+        self,
+        nodes: list[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> list[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if len(nodes) == 0:
+            return []
+
+        query_and_nodes = [
+            (
+                query_bundle.query_str,
+                node.node.get_content(metadata_mode=MetadataMode.EMBED),
+            )
+            for node in nodes
+        ]
+
+        with self.callback_manager.event(
+            CBEventType.RERANKING,
+            payload={
+                EventPayload.NODES: nodes,
+                EventPayload.MODEL_NAME: self.model,
+                EventPayload.QUERY_STR: query_bundle.query_str,
+                EventPayload.TOP_K: self.top_n,
+            },
+        ) as event:
+            scores = self._predict(query_and_nodes)
+            new_nodes = self._apply_scores(nodes, scores)
+            event.on_end(payload={EventPayload.NODES: new_nodes})
+
+        return new_nodes
+
+    def _apply_scores(
+        self, nodes: list[NodeWithScore], scores: list[float]
+    ) -> list[NodeWithScore]:
+        """Sets the rerank scores on the nodes and keeps the top n.
+
+        Parameters
+        ----------
+        nodes : list[NodeWithScore]
+            The nodes that were scored.
+        scores : list[float]
+            The rerank score for each node.
+
+        Returns
+        -------
+        list[NodeWithScore]
+            The top n nodes sorted by descending rerank score.
+        """
+        for node, score in zip(nodes, scores):
+            if self.keep_retrieval_score:
+                node.node.metadata["retrieval_score"] = node.score
+            node.score = score
+        return sorted(nodes, key=lambda x: -x.score if x.score else 0)[: self.top_n]
@@ -0,0 +1,126 @@
+""" Semantic splitter that reuses its sentence group embeddings.
+
+The semantic splitter embeds every sentence group (a sentence and its
+neighbouring sentences) to find the chunk breakpoints, after which the vector
+index embeds every resulting node again. Whenever a node's embedding content
+is exactly one of the sentence groups, the sentence group embedding is set as
+the node embedding, so the vector index only batch-embeds the remaining
+nodes.
+
+The match is on the final embedding content of the node. When the splitter
+runs as a transformation (`get_nodes_from_documents`), the parent document
+metadata is only copied onto the nodes after they are built, so the match
+waits until then and nodes embedding metadata never reuse a metadata-free
+sentence group embedding.
+"""
+
+from typing import Any, Sequence
+from llama_index.core.base.embeddings.base import Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.node_parser import SemanticSplitterNodeParser
+from llama_index.core.node_parser.text.semantic_splitter import SentenceCombination
+from llama_index.core.schema import BaseNode, Document, MetadataMode
+
+
+class EmbeddingReuseSemanticSplitter(SemanticSplitterNodeParser):
+    """Semantic splitter setting the sentence group embeddings on the nodes
+    they match.
+
+    Attributes
+    ----------
+    _chunk_embeddings : dict[str, Embedding]
+        The sentence group embeddings of the chunks that exactly match a
+        sentence group, for the documents currently being split.
+    _reused_embeddings : int
+        The number of node embeddings reused since the splitter was created.
+    _deferred : bool
+        Whether the nodes are being parsed by `get_nodes_from_documents`, in
+        which case the embeddings are matched once the document metadata is
+        set on the nodes.
+    """
+
+    _chunk_embeddings: dict[str, Embedding] = PrivateAttr(default_factory=dict)
+    _reused_embeddings: int = PrivateAttr(default=0)
+    _deferred: bool = PrivateAttr(default=False)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "EmbeddingReuseSemanticSplitter"
+
+    @property
+    def reused_embeddings(self) -> int:
+        """Gets the number of node embeddings reused from the sentence groups."""
+        return self._reused_embeddings
+
+    def build_semantic_nodes_from_documents(
+        self, documents: Sequence[BaseNode], show_progress: bool = False
+    ) -> list[BaseNode]:
+        if self._deferred:
+            return super().build_semantic_nodes_from_documents(
+                documents, show_progress=show_progress
+            )
+        self._chunk_embeddings = {}
+        try:
+            nodes = super().build_semantic_nodes_from_documents(
+                documents, show_progress=show_progress
+            )
+            self._reuse_embeddings(nodes)
+        finally:
+            self._chunk_embeddings = {}
+        return nodes
+
+    def _parse_nodes(
+        self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any
+    ) -> list[BaseNode]:
+        self._chunk_embeddings = {}
+        self._deferred = True
+        try:
+            return super()._parse_nodes(nodes, show_progress=show_progress, **kwargs)
+        except BaseException:
+            self._chunk_embeddings = {}
+            raise
+        finally:
+            self._deferred = False
+
+    def _postprocess_parsed_nodes(
+        self, nodes: list[BaseNode], parent_doc_map: dict[str, Document]
+    ) -> list[BaseNode]:
+        try:
+            nodes = super()._postprocess_parsed_nodes(nodes, parent_doc_map)
+            self._reuse_embeddings(nodes)
+        finally:
+            self._chunk_embeddings = {}
+        return nodes
+
+    def _reuse_embeddings(self, nodes: list[BaseNode]):
+        """Sets the sentence group embeddings on the nodes whose embedding
+        content is exactly one of the kept sentence groups.
+
+        Parameters
+        ----------
+        nodes : list[BaseNode]
+            The nodes, with their final metadata.
+        """
+        for node in nodes:
+            embedding = self._chunk_embeddings.get(
+                node.get_content(metadata_mode=MetadataMode.EMBED)
+            )
+            if node.embedding is None and embedding is not None:
+                node.embedding = embedding
+                self._reused_embeddings += 1
+
+    def _build_node_chunks(
+        self, sentences: list[SentenceCombination], distances: list[float]
+    ) -> list[str]:
+        chunks = super()._build_node_chunks(sentences, distances)
+        # only the embeddings of chunks that are exactly a sentence group are
+        # kept, the rest of the document's sentence embeddings are released
+        group_embeddings: dict[str, Embedding] = {
+            sentence["combined_sentence"]: sentence["combined_sentence_embedding"]
+            for sentence in sentences
+        }
+        for chunk in chunks:
+            embedding = group_embeddings.get(chunk)
+            if embedding:
+                self._chunk_embeddings[chunk] = embedding
+        return chunks
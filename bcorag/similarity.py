@@ -0,0 +1,251 @@
+""" Vectorized similarity search over the node embeddings.
+
+The default in-memory vector store keeps the node embeddings in a dictionary
+of Python lists and scores them one node at a time. The embedding matrix keeps
+the embeddings in a single contiguous float32 matrix with pre-normalized rows
+so any number of queries can be scored with one matrix product followed by a
+partial sort.
+"""
+
+import numpy as np
+from typing import Literal, Optional, Sequence
+from llama_index.core.vector_stores import SimpleVectorStore
+
+Precision = Literal["float32", "float16", "int8"]
+
+# rows converted back to float32 at a time when scoring a quantized matrix
+SCORE_BLOCK_ROWS = 8192
+
+
+class EmbeddingMatrix:
+    """Contiguous matrix of node embeddings for cosine similarity search.
+
+    Attributes
+    ----------
+    _node_ids : list[str]
+        The node ID for each matrix row.
+    _matrix : np.ndarray
+        The (nodes x dimensions) float32 matrix with L2 normalized rows.
+    """
+
+    def __init__(self, node_ids: list[str], embeddings: Sequence[Sequence[float]]):
+        """Constructor.
+
+        Parameters
+        ----------
+        node_ids : list[str]
+            The node ID for each embedding.
+        embeddings : Sequence[Sequence[float]]
+            The node embeddings.
+        """
+        self._node_ids = list(node_ids)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            # an empty store, `reshape` can't infer the dimensions
+            matrix = np.empty((len(self._node_ids), 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(self._node_ids), -1)
+        self._matrix = normalize_rows(matrix)
+
+    @classmethod
+    def from_vector_store(cls, vector_store: SimpleVectorStore) -> "EmbeddingMatrix":
+        """Builds the embedding matrix from a simple vector store.
+
+        Parameters
+        ----------
+        vector_store : SimpleVectorStore
+            The vector store holding the node embeddings.
+
+        Returns
+        -------
+        EmbeddingMatrix
+        """
+        embedding_dict = vector_store.data.embedding_dict
+        return cls(list(embedding_dict.keys()), list(embedding_dict.values()))
+
+    def __len__(self) -> int:
+        return len(self._node_ids)
+
+    @property
+    def node_ids(self) -> list[str]:
+        """Gets the node ID for each matrix row."""
+        return self._node_ids
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Gets the normalized (nodes x dimensions) embedding matrix."""
+        return self._matrix
+
+    def top_k(
+        self, query_embeddings: Sequence[Sequence[float]] | np.ndarray, k: int
+    ) -> list[list[tuple[str, float]]]:
+        """Finds the most similar nodes for each query by cosine similarity.
+
+        Parameters
+        ----------
+        query_embeddings : Sequence[Sequence[float]] | np.ndarray
+            The query embeddings, one per row.
+        k : int
+            The number of nodes to return per query.
+
+        Returns
+        -------
+        list[list[tuple[str, float]]]
+            For each query, the (node ID, similarity) pairs sorted by
+            descending similarity.
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_embeddings, np.float32)))
+        if len(self._node_ids) == 0 or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        top_indices, top_scores = top_k_indices(queries @ self._matrix.T, k)
+        return [
+            [
+                (self._node_ids[index], float(score))
+                for index, score in zip(row_indices, row_scores)
+            ]
+            for row_indices, row_scores in zip(top_indices, top_scores)
+        ]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the k highest scoring columns of each row with a partial sort.
+
+    Parameters
+    ----------
+    scores : np.ndarray
+        The (queries x nodes) score matrix.
+    k : int
+        The number of columns to return per row (capped at the column count).
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        The (queries x k) column indices and their scores, sorted by
+        descending score (ties keep the column order).
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        top_indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        # restore the column order so ties are broken the same way as a full sort
+        top_indices.sort(axis=1)
+    else:
+        top_indices = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    top_scores = np.take_along_axis(scores, top_indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(top_indices, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2 normalizes the rows of a matrix. Zero rows are left as zeros.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        The matrix to normalize.
+
+    Returns
+    -------
+    np.ndarray
+        The row normalized float32 matrix.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def quantize_rows(
+    matrix: np.ndarray, precision: Precision
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Quantizes a row normalized matrix for compact storage.
+
+    float16 is a plain cast. int8 uses symmetric per row scaling, each row is
+    divided by its largest absolute value and mapped onto [-127, 127].
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        The row normalized float32 matrix.
+    precision : Precision
+        The storage precision.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray | None)
+        The quantized matrix and, for int8, the per row scales to multiply
+        the int8 values by.
+    """
+    match precision:
+        case "float32":
+            return np.ascontiguousarray(matrix, dtype=np.float32), None
+        case "float16":
+            return np.ascontiguousarray(matrix, dtype=np.float16), None
+        case "int8":
+            max_abs = np.abs(matrix).max(axis=1)
+            max_abs[max_abs == 0] = 1.0
+            scales = (max_abs / 127.0).astype(np.float32)
+            codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127)
+            return np.ascontiguousarray(codes, dtype=np.int8), scales
+        case _:
+            raise ValueError(f"Unsupported precision `{precision}`.")
+
+
+def quantized_scores(
+    queries: np.ndarray, codes: np.ndarray, scales: Optional[np.ndarray]
+) -> np.ndarray:
+    """Approximate inner products against a quantized matrix. The quantized
+    rows are converted back to float32 in blocks so the full precision matrix
+    is never materialized.
+
+    Parameters
+    ----------
+    queries : np.ndarray
+        The normalized (queries x dimensions) float32 query matrix.
+    codes : np.ndarray
+        The quantized (nodes x dimensions) matrix.
+    scales : np.ndarray or None
+        The per row int8 scales (None for float16 and float32).
+
+    Returns
+    -------
+    np.ndarray
+        The (queries x nodes) approximate scores.
+    """
+    scores = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+    for start in range(0, codes.shape[0], SCORE_BLOCK_ROWS):
+        block = codes[start : start + SCORE_BLOCK_ROWS].astype(np.float32)
+        if scales is not None:
+            block *= scales[start : start + SCORE_BLOCK_ROWS, None]
+        scores[:, start : start + SCORE_BLOCK_ROWS] = queries @ block.T
+    return scores
+
+
+def recall_at_k(
+    reference: Sequence[Sequence[str]], results: Sequence[Sequence[str]], k: int
+) -> float:
+    """Computes the mean recall@k of approximate search results against a
+    reference (exact) search.
+
+    Parameters
+    ----------
+    reference : Sequence[Sequence[str]]
+        The reference node IDs for each query, sorted by descending similarity.
+    results : Sequence[Sequence[str]]
+        The evaluated node IDs for each query, sorted by descending similarity.
+    k : int
+        The cutoff.
+
+    Returns
+    -------
+    float
+        The fraction of the reference top k found in the evaluated top k,
+        averaged over the queries.
+    """
+    recalls = [
+        len(set(expected[:k]) & set(found[:k])) / len(expected[:k])
+        for expected, found in zip(reference, results)
+        if len(expected[:k]) > 0
+    ]
+    return float(np.mean(recalls)) if recalls else 1.0
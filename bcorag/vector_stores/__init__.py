@@ -0,0 +1,147 @@
+""" Local vector store backends.
+
+Maps the `vector_store` option names from `conf.json` to their vector store
+implementation. `VectorStoreIndex` is the default in-memory store (backed by
+the vectorized `MatrixSimpleVectorStore`), the rest are memory-mapped local
+stores for large indexes (such as big github repositories producing tens of
+thousands of nodes). Options suffixed with a precision (such as
+`NumpyFlatIndex/int8`) scan a quantized copy of the embedding matrix.
+Options suffixed with `/hybrid` use the same vector store and additionally
+build a BM25 inverted index for hybrid retrieval.
+"""
+
+import os
+from importlib.util import find_spec
+from typing import Any, Optional
+from llama_index.core import StorageContext
+from llama_index.core.storage.storage_context import DEFAULT_VECTOR_STORE
+from llama_index.core.vector_stores.simple import NAMESPACE_SEP, DEFAULT_PERSIST_FNAME
+from .base import LocalVectorStore
+from .simple_matrix import MatrixSimpleVectorStore
+from .numpy_flat import NumpyFlatVectorStore
+from .hnsw import HnswVectorStore
+from .faiss_store import FaissFlatVectorStore, FaissIvfVectorStore
+
+DEFAULT_VECTOR_STORE_OPTION = "VectorStoreIndex"
+HYBRID_SUFFIX = "/hybrid"
+
+LOCAL_VECTOR_STORES: dict[str, tuple[type[LocalVectorStore], dict[str, Any]]] = {
+    "NumpyFlatIndex": (NumpyFlatVectorStore, {}),
+    "NumpyFlatIndex/float16": (NumpyFlatVectorStore, {"precision": "float16"}),
+    "NumpyFlatIndex/int8": (NumpyFlatVectorStore, {"precision": "int8"}),
+    "HNSWIndex": (HnswVectorStore, {}),
+    "FaissFlatIndex": (FaissFlatVectorStore, {}),
+    "FaissIVFIndex": (FaissIvfVectorStore, {}),
+}
+
+# (module, pip package) of the optional dependency of each vector store
+OPTIONAL_DEPENDENCIES: dict[str, tuple[str, str]] = {
+    "HNSWIndex": ("hnswlib", "hnswlib"),
+    "FaissFlatIndex": ("faiss", "faiss-cpu"),
+    "FaissIVFIndex": ("faiss", "faiss-cpu"),
+}
+
+
+def parse_vector_store_option(vector_store: str) -> tuple[str, bool]:
+    """Splits the hybrid retrieval suffix off a vector store option.
+
+    Parameters
+    ----------
+    vector_store : str
+        The vector store option name.
+
+    Returns
+    -------
+    (str, bool)
+        The vector store option without the suffix and whether hybrid
+        retrieval is enabled.
+    """
+    if vector_store.endswith(HYBRID_SUFFIX):
+        return vector_store[: -len(HYBRID_SUFFIX)], True
+    return vector_store, False
+
+
+def missing_dependency(vector_store: str) -> Optional[str]:
+    """Checks whether the optional dependency of a vector store option is
+    installed.
+
+    Parameters
+    ----------
+    vector_store : str
+        The vector store option name.
+
+    Returns
+    -------
+    str or None
+        The pip package to install or None if the vector store can be used.
+    """
+    vector_store, _ = parse_vector_store_option(vector_store)
+    if vector_store not in OPTIONAL_DEPENDENCIES:
+        return None
+    module, package = OPTIONAL_DEPENDENCIES[vector_store]
+    return package if find_spec(module) is None else None
+
+
+def create_storage_context(vector_store: str) -> StorageContext:
+    """Creates the storage context for a fresh index.
+
+    Parameters
+    ----------
+    vector_store : str
+        The vector store option name.
+
+    Returns
+    -------
+    StorageContext
+        The storage context holding the vector store.
+
+    Raises
+    ------
+    ValueError
+        If the vector store option is unknown.
+    """
+    vector_store, _ = parse_vector_store_option(vector_store)
+    if vector_store == DEFAULT_VECTOR_STORE_OPTION:
+        return StorageContext.from_defaults(vector_store=MatrixSimpleVectorStore())
+    if vector_store not in LOCAL_VECTOR_STORES:
+        raise ValueError(f"Unsupported vector store `{vector_store}`.")
+    store_cls, store_kwargs = LOCAL_VECTOR_STORES[vector_store]
+    return StorageContext.from_defaults(vector_store=store_cls(**store_kwargs))
+
+
+def load_storage_context(vector_store: str, persist_dir: str) -> StorageContext:
+    """Loads the storage context for a persisted index.
+
+    Parameters
+    ----------
+    vector_store : str
+        The vector store option name the index was built with.
+    persist_dir : str
+        The index persist directory.
+
+    Returns
+    -------
+    StorageContext
+        The loaded storage context.
+
+    Raises
+    ------
+    ValueError
+        If the vector store option is unknown.
+    """
+    persist_path = os.path.join(
+        persist_dir, f"{DEFAULT_VECTOR_STORE}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"
+    )
+    vector_store, _ = parse_vector_store_option(vector_store)
+    if vector_store == DEFAULT_VECTOR_STORE_OPTION:
+        return StorageContext.from_defaults(
+            persist_dir=persist_dir,
+            vector_store=MatrixSimpleVectorStore.from_persist_path(persist_path),
+        )
+    if vector_store not in LOCAL_VECTOR_STORES:
+        raise ValueError(f"Unsupported vector store `{vector_store}`.")
+    store_cls, store_kwargs = LOCAL_VECTOR_STORES[vector_store]
+    return StorageContext.from_defaults(
+        persist_dir=persist_dir,
+        vector_store=store_cls.from_persist_path(persist_path, **store_kwargs),
+    )
@@ -0,0 +1,365 @@
+""" Shared logic for the local vector stores.
+
+The local vector stores keep every node embedding in a single contiguous
+float32 matrix with L2 normalized rows (so the inner product is the cosine
+similarity) instead of the per node Python lists of the default
+`SimpleVectorStore`. The matrix is persisted as a `.npy` file and memory-mapped
+on load, so loading a large index doesn't copy the embeddings into memory up
+front. Subclasses only implement the nearest neighbour search.
+"""
+
+import os
+import json
+import numpy as np
+from abc import abstractmethod
+from typing import Any, Optional, Sequence
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from ..similarity import normalize_rows
+
+
+class LocalVectorStore(BasePydanticVectorStore):
+    """Base class for the memory-mapped local vector stores. The node text is
+    kept in the document store, the vector store only holds the embeddings.
+
+    Attributes
+    ----------
+    _node_ids : list[str]
+        The node ID for each matrix row.
+    _ref_doc_ids : list[str or None]
+        The source document ID for each matrix row.
+    _matrix : np.ndarray or None
+        The (nodes x dimensions) float32 matrix with L2 normalized rows, None
+        until the first node is added.
+    _search_index : Any
+        The nearest neighbour search structure built from the matrix, None
+        until the first query after the matrix changes.
+    """
+
+    stores_text: bool = False
+
+    _node_ids: list[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list[Optional[str]] = PrivateAttr(default_factory=list)
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _search_index: Any = PrivateAttr(default=None)
+
+    @property
+    def client(self) -> None:
+        """The local vector stores have no client."""
+        return None
+
+    @property
+    def node_ids(self) -> list[str]:
+        """Gets the node ID for each matrix row."""
+        return self._node_ids
+
+    @property
+    def matrix(self) -> Optional[np.ndarray]:
+        """Gets the normalized (nodes x dimensions) embedding matrix."""
+        return self._matrix
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:
+        """Adds nodes to the vector store.
+
+        Parameters
+        ----------
+        nodes : Sequence[BaseNode]
+            The embedded nodes to add.
+
+        Returns
+        -------
+        list[str]
+            The IDs of the added nodes.
+        """
+        if not nodes:
+            return []
+        embeddings = normalize_rows(
+            np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        )
+        self._matrix = (
+            embeddings
+            if self._matrix is None
+            else np.concatenate([np.asarray(self._matrix), embeddings])
+        )
+        self._node_ids.extend(node.node_id for node in nodes)
+        self._ref_doc_ids.extend(node.ref_doc_id for node in nodes)
+        self._search_index = None
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Deletes every node belonging to a source document.
+
+        Parameters
+        ----------
+        ref_doc_id : str
+            The source document ID.
+        """
+        self._keep_rows([doc_id != ref_doc_id for doc_id in self._ref_doc_ids])
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[list[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        """Deletes nodes by ID.
+
+        Parameters
+        ----------
+        node_ids : list[str] or None, optional
+            The IDs of the nodes to delete.
+        filters : MetadataFilters or None, optional
+            Unsupported, the local vector stores don't hold node metadata.
+        """
+        if filters is not None:
+            raise NotImplementedError(
+                f"{self.class_name()} doesn't support metadata filters."
+            )
+        if not node_ids:
+            return
+        delete_ids = set(node_ids)
+        self._keep_rows([node_id not in delete_ids for node_id in self._node_ids])
+
+    def _keep_rows(self, keep: list[bool]):
+        """Drops the matrix rows (and their node IDs) that aren't kept.
+
+        Parameters
+        ----------
+        keep : list[bool]
+            Whether to keep each matrix row.
+        """
+        if all(keep) or self._matrix is None:
+            return
+        self._matrix = np.ascontiguousarray(np.asarray(self._matrix)[keep])
+        self._node_ids = [i for i, k in zip(self._node_ids, keep) if k]
+        self._ref_doc_ids = [i for i, k in zip(self._ref_doc_ids, keep) if k]
+        if not self._node_ids:
+            self._matrix = None
+        self._search_index = None
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Finds the nodes most similar to the query embedding.
+
+        Parameters
+        ----------
+        query : VectorStoreQuery
+            The vector store query.
+
+        Returns
+        -------
+        VectorStoreQueryResult
+            The most similar node IDs and their cosine similarities.
+        """
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise NotImplementedError(
+                f"{self.class_name()} only supports the default query mode."
+            )
+        if query.filters is not None:
+            raise NotImplementedError(
+                f"{self.class_name()} doesn't support metadata filters."
+            )
+        if query.query_embedding is None:
+            raise ValueError("Query embedding is required.")
+        if query.doc_ids is not None or query.node_ids is not None:
+            return self._query_subset(query)
+        result = self.batch_query([query.query_embedding], query.similarity_top_k)[0]
+        return VectorStoreQueryResult(
+            ids=[node_id for node_id, _ in result],
+            similarities=[score for _, score in result],
+        )
+
+    def batch_query(
+        self, query_embeddings: Sequence[Sequence[float]], k: int
+    ) -> list[list[tuple[str, float]]]:
+        """Finds the most similar nodes for several queries at once.
+
+        Parameters
+        ----------
+        query_embeddings : Sequence[Sequence[float]]
+            The query embeddings.
+        k : int
+            The number of nodes to return per query.
+
+        Returns
+        -------
+        list[list[tuple[str, float]]]
+            For each query, the (node ID, similarity) pairs sorted by
+            descending similarity.
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_embeddings, np.float32)))
+        if self._matrix is None or len(self._node_ids) == 0 or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        k = min(k, len(self._node_ids))
+        if self._search_index is None:
+            self._search_index = self._build_search_index(np.asarray(self._matrix))
+        indices, scores = self._search(queries, k)
+        return [
+            [
+                (self._node_ids[index], float(score))
+                for index, score in zip(row_indices, row_scores)
+                if index >= 0
+            ]
+            for row_indices, row_scores in zip(indices, scores)
+        ]
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        """Persists the vector store. The embedding matrix is written to a
+        `.npy` file and the node IDs to a JSON file next to `persist_path`.
+
+        Parameters
+        ----------
+        persist_path : str
+            The vector store persist path from the storage context.
+        """
+        base_path = os.path.splitext(persist_path)[0]
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        matrix = (
+            np.asarray(self._matrix)
+            if self._matrix is not None
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        np.save(f"{base_path}.npy", matrix)
+        with open(f"{base_path}.json", "w") as f:
+            json.dump(
+                {
+                    "class_name": self.class_name(),
+                    "node_ids": self._node_ids,
+                    "ref_doc_ids": self._ref_doc_ids,
+                },
+                f,
+            )
+        if len(self._node_ids) > 0:
+            if self._search_index is None:
+                self._search_index = self._build_search_index(matrix)
+            self._save_search_index(self._search_index, base_path)
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, **kwargs: Any) -> "LocalVectorStore":
+        """Loads a persisted vector store, memory-mapping the embedding matrix.
+
+        Parameters
+        ----------
+        persist_path : str
+            The vector store persist path from the storage context.
+        **kwargs
+            The vector store configuration the store was built with.
+
+        Returns
+        -------
+        LocalVectorStore
+            The loaded vector store.
+        """
+        base_path = os.path.splitext(persist_path)[0]
+        with open(f"{base_path}.json", "r") as f:
+            data = json.load(f)
+        store = cls(**kwargs)
+        store._node_ids = data["node_ids"]
+        store._ref_doc_ids = data["ref_doc_ids"]
+        if store._node_ids:
+            store._matrix = np.load(f"{base_path}.npy", mmap_mode="r")
+            store._search_index = store._load_search_index(store._matrix, base_path)
+        return store
+
+    def _query_subset(self, query: VectorStoreQuery) -> VectorStoreQueryResult:
+        """Exact search restricted to a subset of the nodes.
+
+        Parameters
+        ----------
+        query : VectorStoreQuery
+            The vector store query with `doc_ids` and/or `node_ids` set.
+
+        Returns
+        -------
+        VectorStoreQueryResult
+            The most similar node IDs and their cosine similarities.
+        """
+        rows = [
+            row
+            for row, (node_id, doc_id) in enumerate(
+                zip(self._node_ids, self._ref_doc_ids)
+            )
+            if (query.node_ids is None or node_id in query.node_ids)
+            and (query.doc_ids is None or doc_id in query.doc_ids)
+        ]
+        if not rows or self._matrix is None:
+            return VectorStoreQueryResult(ids=[], similarities=[])
+        assert query.query_embedding is not None
+        query_vector = normalize_rows(
+            np.asarray([query.query_embedding], dtype=np.float32)
+        )[0]
+        scores = np.asarray(self._matrix)[rows] @ query_vector
+        order = np.argsort(-scores, kind="stable")[: query.similarity_top_k]
+        return VectorStoreQueryResult(
+            ids=[self._node_ids[rows[i]] for i in order],
+            similarities=[float(scores[i]) for i in order],
+        )
+
+    @abstractmethod
+    def _build_search_index(self, matrix: np.ndarray) -> Any:
+        """Builds the nearest neighbour search structure.
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            The normalized embedding matrix.
+
+        Returns
+        -------
+        Any
+            The search structure.
+        """
+
+    @abstractmethod
+    def _search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Searches the nearest neighbour search structure.
+
+        Parameters
+        ----------
+        queries : np.ndarray
+            The normalized (queries x dimensions) query matrix.
+        k : int
+            The number of nodes to return per query (at most the node count).
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The (queries x k) matrix row indices (-1 for missing results) and
+            their cosine similarities, sorted by descending similarity.
+        """
+
+    def _save_search_index(self, search_index: Any, base_path: str) -> None:
+        """Persists the search structure, a no-op unless overridden.
+
+        Parameters
+        ----------
+        search_index : Any
+            The search structure.
+        base_path : str
+            The persist path without an extension.
+        """
+        return None
+
+    def _load_search_index(self, matrix: np.ndarray, base_path: str) -> Any:
+        """Loads the persisted search structure. Defaults to building it lazily
+        on the first query.
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            The memory-mapped embedding matrix.
+        base_path : str
+            The persist path without an extension.
+
+        Returns
+        -------
+        Any
+            The search structure or None to build it on the first query.
+        """
+        return None
@@ -0,0 +1,104 @@
+""" FAISS vector stores (exact flat and inverted file indexes).
+
+The flat index does an exact inner product search, the IVF index clusters the
+embeddings and only searches the clusters closest to the query. The FAISS
+index is saved next to the embedding matrix and memory-mapped on load. `faiss`
+is an optional dependency and is only imported when the store is used.
+"""
+
+import os
+import math
+import numpy as np
+from typing import Any
+from llama_index.core.bridge.pydantic import Field
+from .base import LocalVectorStore
+
+
+def _import_faiss() -> Any:
+    """Imports the optional `faiss` dependency.
+
+    Returns
+    -------
+    module
+        The `faiss` module.
+    """
+    try:
+        import faiss  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "The FAISS vector stores require faiss, please `pip install faiss-cpu`."
+        )
+    return faiss
+
+
+class FaissFlatVectorStore(LocalVectorStore):
+    """Exact cosine similarity search with a FAISS flat inner product index."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FaissFlatVectorStore"
+
+    def _build_search_index(self, matrix: np.ndarray) -> Any:
+        faiss = _import_faiss()
+        search_index = faiss.IndexFlatIP(matrix.shape[1])
+        search_index.add(np.ascontiguousarray(matrix))
+        return search_index
+
+    def _search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        scores, indices = self._search_index.search(queries, k)
+        return indices, scores
+
+    def _save_search_index(self, search_index: Any, base_path: str) -> None:
+        _import_faiss().write_index(search_index, f"{base_path}.faiss")
+
+    def _load_search_index(self, matrix: np.ndarray, base_path: str) -> Any:
+        path = f"{base_path}.faiss"
+        if not os.path.isfile(path):
+            return None
+        faiss = _import_faiss()
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+
+
+class FaissIvfVectorStore(FaissFlatVectorStore):
+    """Approximate cosine similarity search with a FAISS inverted file index.
+    Falls back to a flat index while there are too few nodes to train the
+    clustering.
+
+    Attributes
+    ----------
+    nprobe : int
+        The number of clusters searched per query.
+    min_train_size : int
+        The minimum number of nodes before the IVF index is used.
+    """
+
+    nprobe: int = Field(default=32, description="Clusters searched per query.")
+    min_train_size: int = Field(
+        default=4096, description="Minimum node count to build the IVF index."
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FaissIvfVectorStore"
+
+    def _build_search_index(self, matrix: np.ndarray) -> Any:
+        if matrix.shape[0] < self.min_train_size:
+            return super()._build_search_index(matrix)
+        faiss = _import_faiss()
+        matrix = np.ascontiguousarray(matrix)
+        # rule of thumb cluster count, keeping ~39 training points per cluster
+        nlist = max(1, min(int(4 * math.sqrt(matrix.shape[0])), matrix.shape[0] // 39))
+        quantizer = faiss.IndexFlatIP(matrix.shape[1])
+        search_index = faiss.IndexIVFFlat(
+            quantizer, matrix.shape[1], nlist, faiss.METRIC_INNER_PRODUCT
+        )
+        search_index.train(matrix)
+        search_index.add(matrix)
+        search_index.nprobe = min(self.nprobe, nlist)
+        return search_index
+
+    def _load_search_index(self, matrix: np.ndarray, base_path: str) -> Any:
+        search_index = super()._load_search_index(matrix, base_path)
+        if search_index is not None and hasattr(search_index, "nprobe"):
+            search_index.nprobe = min(self.nprobe, search_index.nlist)
+        return search_index
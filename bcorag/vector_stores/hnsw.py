@@ -0,0 +1,83 @@
+""" HNSW approximate nearest neighbour vector store backed by `hnswlib`.
+
+Builds a hierarchical navigable small world graph over the embedding matrix so
+queries take roughly logarithmic time in the node count. The graph is saved
+next to the memory-mapped embedding matrix. `hnswlib` is an optional
+dependency and is only imported when the store is used.
+"""
+
+import os
+import numpy as np
+from typing import Any
+from llama_index.core.bridge.pydantic import Field
+from .base import LocalVectorStore
+
+
+def _import_hnswlib() -> Any:
+    """Imports the optional `hnswlib` dependency.
+
+    Returns
+    -------
+    module
+        The `hnswlib` module.
+    """
+    try:
+        import hnswlib  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "The HNSWIndex vector store requires hnswlib, please `pip install hnswlib`."
+        )
+    return hnswlib
+
+
+class HnswVectorStore(LocalVectorStore):
+    """Approximate cosine similarity search with an HNSW graph.
+
+    Attributes
+    ----------
+    m : int
+        The number of bi-directional links per node.
+    ef_construction : int
+        The candidate list size while building the graph.
+    ef_search : int
+        The candidate list size while searching (raised to k if lower).
+    """
+
+    m: int = Field(default=16, description="Bi-directional links per node.")
+    ef_construction: int = Field(
+        default=200, description="Candidate list size while building."
+    )
+    ef_search: int = Field(default=64, description="Candidate list size while searching.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HnswVectorStore"
+
+    def _build_search_index(self, matrix: np.ndarray) -> Any:
+        hnswlib = _import_hnswlib()
+        search_index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        search_index.init_index(
+            max_elements=matrix.shape[0],
+            ef_construction=self.ef_construction,
+            M=self.m,
+        )
+        search_index.add_items(matrix, np.arange(matrix.shape[0]))
+        return search_index
+
+    def _search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        self._search_index.set_ef(max(self.ef_search, k))
+        labels, distances = self._search_index.knn_query(queries, k=k)
+        # the inner product space distance is 1 - inner product
+        return labels.astype(np.int64), 1.0 - distances
+
+    def _save_search_index(self, search_index: Any, base_path: str) -> None:
+        search_index.save_index(f"{base_path}.hnsw")
+
+    def _load_search_index(self, matrix: np.ndarray, base_path: str) -> Any:
+        path = f"{base_path}.hnsw"
+        if not os.path.isfile(path):
+            return None
+        hnswlib = _import_hnswlib()
+        search_index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        search_index.load_index(path, max_elements=matrix.shape[0])
+        return search_index
@@ -0,0 +1,121 @@
+""" Exact (flat) numpy vector store.
+
+Scores every node with a single matrix product against the memory-mapped
+embedding matrix and selects the top k with `argpartition`, so a query costs
+one BLAS call and a linear time partial sort instead of a Python loop and a
+heap over every node.
+
+The store can optionally scan a float16 or int8 quantized copy of the matrix
+instead, which is 2x or 4x smaller than the float32 matrix. The quantized scan
+oversamples the candidates and re-scores them exactly against the float32
+matrix, which stays memory-mapped on disk once persisted so only the candidate
+rows are ever read back.
+"""
+
+import os
+import numpy as np
+from typing import Any
+from llama_index.core.bridge.pydantic import Field
+from .base import LocalVectorStore
+from ..similarity import Precision, quantize_rows, quantized_scores, top_k_indices
+
+DEFAULT_RESCORE_FACTOR = 4
+
+
+class NumpyFlatVectorStore(LocalVectorStore):
+    """Exact cosine similarity search over the embedding matrix.
+
+    Attributes
+    ----------
+    precision : Precision
+        The precision of the scanned matrix (`float32`, `float16` or `int8`).
+    rescore_factor : int
+        For quantized precisions, the number of candidates re-scored against
+        the float32 matrix as a multiple of k.
+    """
+
+    precision: Precision = Field(
+        default="float32", description="Precision of the scanned matrix."
+    )
+    rescore_factor: int = Field(
+        default=DEFAULT_RESCORE_FACTOR,
+        description="Candidates re-scored at full precision, as a multiple of k.",
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyFlatVectorStore"
+
+    def _build_search_index(self, matrix: np.ndarray) -> Any:
+        if self.precision == "float32":
+            return matrix
+        return quantize_rows(matrix, self.precision)
+
+    def _search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        if self.precision == "float32":
+            return top_k_indices(queries @ np.asarray(self._search_index).T, k)
+        codes, scales = self._search_index
+        approx_scores = quantized_scores(queries, codes, scales)
+        candidates, _ = top_k_indices(
+            approx_scores, min(k * max(self.rescore_factor, 1), codes.shape[0])
+        )
+        return self._rescore(queries, candidates, k)
+
+    def _rescore(
+        self, queries: np.ndarray, candidates: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Re-scores the quantized scan candidates against the float32 matrix.
+
+        Parameters
+        ----------
+        queries : np.ndarray
+            The normalized (queries x dimensions) query matrix.
+        candidates : np.ndarray
+            The (queries x candidates) matrix row indices from the quantized
+            scan.
+        k : int
+            The number of nodes to return per query.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The (queries x k) matrix row indices and their exact cosine
+            similarities, sorted by descending similarity.
+        """
+        matrix = self._matrix
+        assert matrix is not None
+        indices = np.empty((queries.shape[0], k), dtype=np.int64)
+        scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        for row, (query, row_candidates) in enumerate(zip(queries, candidates)):
+            # sorted rows read the memory-mapped matrix in file order and
+            # break exact ties by row like the float32 scan
+            row_candidates = np.sort(row_candidates)
+            exact_scores = np.asarray(matrix[row_candidates]) @ query
+            order = np.argsort(-exact_scores, kind="stable")[:k]
+            indices[row] = row_candidates[order]
+            scores[row] = exact_scores[order]
+        return indices, scores
+
+    def _save_search_index(self, search_index: Any, base_path: str) -> None:
+        if self.precision == "float32":
+            return
+        codes, scales = search_index
+        np.save(f"{base_path}.{self.precision}.npy", codes)
+        if scales is not None:
+            np.save(f"{base_path}.{self.precision}.scales.npy", scales)
+
+    def _load_search_index(self, matrix: np.ndarray, base_path: str) -> Any:
+        if self.precision == "float32":
+            return matrix
+        codes_path = f"{base_path}.{self.precision}.npy"
+        if not os.path.isfile(codes_path):
+            return None
+        scales_path = f"{base_path}.{self.precision}.scales.npy"
+        scales = None
+        if self.precision == "int8":
+            if not os.path.isfile(scales_path):
+                return None
+            scales = np.load(scales_path)
+        # the quantized copy is scanned in full on every query, so it is read
+        # into memory while the float32 matrix stays memory-mapped
+        return np.load(codes_path), scales
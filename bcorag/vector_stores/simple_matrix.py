@@ -0,0 +1,107 @@
+""" Vectorized drop in replacement for the default in-memory vector store.
+
+`SimpleVectorStore` scores a query against every node in a Python loop with a
+heap. `MatrixSimpleVectorStore` keeps the same data (and the same persisted
+JSON format) but answers default mode queries from a contiguous float32
+embedding matrix with pre-normalized rows, using a single matrix-vector
+product and a partial sort. The results match `SimpleVectorStore` up to
+float32 rounding of the similarities. Metadata filters, node ID restrictions
+and the learner and MMR query modes fall back to the `SimpleVectorStore`
+implementation.
+"""
+
+from typing import Any, Optional, Sequence
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import (
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from ..similarity import EmbeddingMatrix
+
+
+class MatrixSimpleVectorStore(SimpleVectorStore):
+    """`SimpleVectorStore` with vectorized default mode queries.
+
+    Attributes
+    ----------
+    _embedding_matrix : EmbeddingMatrix or None
+        The embedding matrix built from the embedding dictionary, None until
+        the first query after the store changes.
+    """
+
+    _embedding_matrix: Optional[EmbeddingMatrix] = PrivateAttr(default=None)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> list[str]:
+        self._embedding_matrix = None
+        return super().add(nodes, **add_kwargs)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._embedding_matrix = None
+        super().delete(ref_doc_id, **delete_kwargs)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[list[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        self._embedding_matrix = None
+        super().delete_nodes(node_ids, filters, **delete_kwargs)
+
+    def clear(self) -> None:
+        self._embedding_matrix = None
+        super().clear()
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if (
+            query.mode != VectorStoreQueryMode.DEFAULT
+            or query.filters is not None
+            or query.node_ids is not None
+            or query.query_embedding is None
+        ):
+            return super().query(query, **kwargs)
+        result = self.batch_query([query.query_embedding], query.similarity_top_k)[0]
+        return VectorStoreQueryResult(
+            similarities=[score for _, score in result],
+            ids=[node_id for node_id, _ in result],
+        )
+
+    def batch_query(
+        self, query_embeddings: Sequence[Sequence[float]], k: int
+    ) -> list[list[tuple[str, float]]]:
+        """Finds the most similar nodes for several queries at once.
+
+        Parameters
+        ----------
+        query_embeddings : Sequence[Sequence[float]]
+            The query embeddings.
+        k : int
+            The number of nodes to return per query.
+
+        Returns
+        -------
+        list[list[tuple[str, float]]]
+            For each query, the (node ID, similarity) pairs sorted by
+            descending similarity.
+        """
+        return self.embedding_matrix().top_k(query_embeddings, k)
+
+    def embedding_matrix(self) -> EmbeddingMatrix:
+        """Gets the embedding matrix, rebuilding it if the store changed.
+
+        Returns
+        -------
+        EmbeddingMatrix
+            The embedding matrix.
+        """
+        # the embedding dictionary can also be changed directly, so the size
+        # is checked as well
+        if self._embedding_matrix is None or len(self._embedding_matrix) != len(
+            self.data.embedding_dict
+        ):
+            self._embedding_matrix = EmbeddingMatrix.from_vector_store(self)
+        return self._embedding_matrix
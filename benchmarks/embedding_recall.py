@@ -0,0 +1,323 @@
+""" Recall benchmark for reduced dimension and quantized embeddings.
+
+Embeds the chunks of a paper and the domain retrieval prompts once at the full
+dimensions of the embedding model, then reports the recall@k of each reduced
+dimension and storage precision combination against the exact float32 full
+dimension search. The `text-embedding-3` models are trained so a shortened
+embedding is the L2 normalized prefix of the full embedding (the API applies
+the same truncation when `dimensions` is requested), so every dimension is
+evaluated from a single set of embeddings. Embeddings go through the embedding
+cache, so repeated runs don't call the API.
+
+Usage
+-----
+```bash
+python -m benchmarks.embedding_recall --dimensions 1024 512 256 --k 1 3 5 10
+```
+"""
+
+import os
+import argparse
+import numpy as np
+from typing import Any, Optional, get_args
+from dotenv import load_dotenv
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode, TextNode
+from llama_index.embeddings.openai import OpenAIEmbedding  # type: ignore
+from bcorag.cache import DEFAULT_CACHE_DIR
+from bcorag.cache.embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCache,
+    get_query_embedding_batch,
+)
+from bcorag.custom_types.core_types import DomainKey
+from bcorag.prompts import PROMPT_DOMAIN_MAP, RETRIEVAL_PROMPT
+from bcorag.similarity import Precision, normalize_rows, recall_at_k
+from bcorag.vector_stores.numpy_flat import (
+    DEFAULT_RESCORE_FACTOR,
+    NumpyFlatVectorStore,
+)
+import bcorag.misc_functions as misc_fns
+
+DEFAULT_PAPER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "bcorag",
+    "test_papers",
+    "High resolution measurement.pdf",
+)
+PRECISIONS: tuple[Precision, ...] = get_args(Precision)
+
+
+def truncate_embeddings(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    """Shortens `text-embedding-3` embeddings to fewer dimensions.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        The full dimension embeddings.
+    dimensions : int
+        The number of dimensions to keep.
+
+    Returns
+    -------
+    np.ndarray
+        The L2 normalized embedding prefixes.
+    """
+    return normalize_rows(np.ascontiguousarray(embeddings[:, :dimensions]))
+
+
+def search(
+    node_ids: list[str],
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    precision: Precision = "float32",
+    rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+) -> list[list[str]]:
+    """Searches the nodes with a numpy flat vector store.
+
+    Parameters
+    ----------
+    node_ids : list[str]
+        The node ID for each embedding.
+    embeddings : np.ndarray
+        The (nodes x dimensions) node embeddings.
+    queries : np.ndarray
+        The (queries x dimensions) query embeddings.
+    k : int
+        The number of nodes to return per query.
+    precision : Precision, optional
+        The precision of the scanned matrix.
+    rescore_factor : int, optional
+        The number of candidates re-scored at full precision, as a multiple
+        of k.
+
+    Returns
+    -------
+    list[list[str]]
+        The top k node IDs for each query.
+    """
+    vector_store = NumpyFlatVectorStore(
+        precision=precision, rescore_factor=rescore_factor
+    )
+    vector_store.add(
+        [
+            TextNode(id_=node_id, text="", embedding=embedding.tolist())
+            for node_id, embedding in zip(node_ids, embeddings)
+        ]
+    )
+    return [
+        [node_id for node_id, _ in result]
+        for result in vector_store.batch_query(queries, k)
+    ]
+
+
+def run_benchmark(
+    node_ids: list[str],
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    dimensions: list[int],
+    ks: list[int],
+    rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+) -> list[dict[str, Any]]:
+    """Computes the recall@k of every dimension, precision and re-scoring
+    combination against the float32 full dimension search.
+
+    Parameters
+    ----------
+    node_ids : list[str]
+        The node ID for each embedding.
+    embeddings : np.ndarray
+        The (nodes x full dimensions) node embeddings.
+    queries : np.ndarray
+        The (queries x full dimensions) query embeddings.
+    dimensions : list[int]
+        The reduced dimensions to evaluate.
+    ks : list[int]
+        The recall cutoffs.
+    rescore_factor : int, optional
+        The re-scoring oversampling factor of the quantized searches.
+
+    Returns
+    -------
+    list[dict[str, Any]]
+        One result row per combination, with the matrix size in bytes and the
+        recall for each cutoff.
+    """
+    max_k = max(ks)
+    reference = search(node_ids, normalize_rows(embeddings), queries, max_k)
+    full_dimensions = embeddings.shape[1]
+    rows: list[dict[str, Any]] = []
+    for dims in [full_dimensions] + [d for d in dimensions if d < full_dimensions]:
+        reduced = truncate_embeddings(embeddings, dims)
+        reduced_queries = truncate_embeddings(queries, dims)
+        for precision in PRECISIONS:
+            # a factor of 1 re-scores exactly the quantized top k, so the
+            # ranking is the plain quantized scan
+            factors = [1] if precision == "float32" else [1, rescore_factor]
+            for factor in factors:
+                results = search(
+                    node_ids, reduced, reduced_queries, max_k, precision, factor
+                )
+                rows.append(
+                    {
+                        "dimensions": dims,
+                        "precision": precision,
+                        "rescore_factor": factor if precision != "float32" else None,
+                        "matrix_bytes": len(node_ids)
+                        * dims
+                        * np.dtype(precision).itemsize,
+                        "recall": {
+                            k: recall_at_k(reference, results, k) for k in ks
+                        },
+                    }
+                )
+    return rows
+
+
+def load_embeddings(
+    paper: str,
+    embedding_model: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    cache_dir: str,
+) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Chunks a paper and embeds the chunks and the domain retrieval prompts
+    at the full dimensions of the embedding model.
+
+    Parameters
+    ----------
+    paper : str
+        The paper PDF path.
+    embedding_model : str
+        The embedding model name.
+    chunk_size : int
+        The chunk size.
+    chunk_overlap : int
+        The chunk overlap.
+    cache_dir : str
+        The cache root directory holding the embedding cache.
+
+    Returns
+    -------
+    (list[str], np.ndarray, np.ndarray)
+        The node IDs, the node embeddings and the query embeddings.
+    """
+    documents = SimpleDirectoryReader(input_files=[paper]).load_data()
+    nodes = SentenceSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    ).get_nodes_from_documents(documents)
+    embed_model = CachedEmbedding(
+        embed_model=OpenAIEmbedding(model=embedding_model),
+        cache=EmbeddingCache(os.path.join(cache_dir, "embeddings.sqlite3")),
+    )
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    embeddings = np.asarray(embed_model.get_text_embedding_batch(texts), np.float32)
+    domain: DomainKey
+    retrieval_prompts = [
+        RETRIEVAL_PROMPT.format(domain, PROMPT_DOMAIN_MAP[domain]["retrieval_prompt"])
+        for domain in get_args(DomainKey)
+    ]
+    queries = np.asarray(
+        get_query_embedding_batch(embed_model, retrieval_prompts), np.float32
+    )
+    return [node.node_id for node in nodes], embeddings, queries
+
+
+def format_results(rows: list[dict[str, Any]], ks: list[int]) -> str:
+    """Formats the benchmark results as a plain text table.
+
+    Parameters
+    ----------
+    rows : list[dict[str, Any]]
+        The benchmark result rows.
+    ks : list[int]
+        The recall cutoffs.
+
+    Returns
+    -------
+    str
+        The results table.
+    """
+    header = ["dimensions", "precision", "rescore", "matrix KiB"] + [
+        f"recall@{k}" for k in ks
+    ]
+    lines = ["\t".join(header)]
+    for row in rows:
+        rescore = row["rescore_factor"]
+        values = [
+            str(row["dimensions"]),
+            row["precision"],
+            "-" if rescore is None else f"{rescore}x",
+            f"{row['matrix_bytes'] / 1024:.1f}",
+        ] + [f"{row['recall'][k]:.3f}" for k in ks]
+        lines.append("\t".join(values))
+    return "\n".join(lines)
+
+
+def main(args: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Reports the recall@k lost by reduced dimension and quantized embeddings."
+    )
+    parser.add_argument("--paper", default=DEFAULT_PAPER, help="Paper PDF to embed.")
+    parser.add_argument(
+        "--embedding-model",
+        default="text-embedding-3-large",
+        help="The text-embedding-3 model to benchmark.",
+    )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        nargs="+",
+        default=[1024, 512, 256],
+        help="Reduced dimensions to evaluate.",
+    )
+    parser.add_argument(
+        "--k", type=int, nargs="+", default=[1, 3, 5, 10], help="Recall cutoffs."
+    )
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--chunk-overlap", type=int, default=20)
+    parser.add_argument(
+        "--rescore-factor",
+        type=int,
+        default=DEFAULT_RESCORE_FACTOR,
+        help="Candidates re-scored at full precision, as a multiple of k.",
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--output", help="Optional JSON file to write the results to.")
+    options = parser.parse_args(args)
+
+    if not options.embedding_model.startswith("text-embedding-3"):
+        misc_fns.graceful_exit(
+            1, "Reduced dimensions are only supported by the text-embedding-3 models."
+        )
+    load_dotenv()
+    node_ids, embeddings, queries = load_embeddings(
+        options.paper,
+        options.embedding_model,
+        options.chunk_size,
+        options.chunk_overlap,
+        options.cache_dir,
+    )
+    rows = run_benchmark(
+        node_ids,
+        embeddings,
+        queries,
+        options.dimensions,
+        options.k,
+        options.rescore_factor,
+    )
+    print(
+        f"{options.embedding_model}: {len(node_ids)} nodes, {queries.shape[0]} queries\n"
+    )
+    print(format_results(rows, options.k))
+    if options.output is not None:
+        misc_fns.write_json(
+            options.output,
+            [{**row, "recall": {str(k): v for k, v in row["recall"].items()}} for row in rows],
+        )
+
+
+if __name__ == "__main__":
+    main()
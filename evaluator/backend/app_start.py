@@ -2,6 +2,7 @@
 """
 
 from bcorag import misc_functions as misc_fns
+from bcorag.output_tracker import load_output_map
 from .custom_types import (
     ConfigData,
     AppAttributes,
@@ -110,7 +111,7 @@ def _get_total_runs(app_state: AppState) -> int:
     """
     total_runs = 0
     for directory in app_state["generated_directory_paths"]:
-        output_map = misc_fns.load_json(os.path.join(directory, "output_map.json"))
+        output_map = load_output_map(directory)
         if output_map is None:
             misc_fns.graceful_exit(
                 1,
@@ -3,6 +3,7 @@
 import os
 import json
 from bcorag import misc_functions as misc_fns
+from bcorag.output_tracker import load_output_map
 from .custom_types import (
     AppState,
     EvalData,
@@ -166,7 +167,7 @@ def load_run_state(run_index: int, total_runs: int, app_state: AppState) -> RunS
 
         current_paper = os.path.basename(directory)
 
-        output_map = misc_fns.load_json(os.path.join(directory, "output_map.json"))
+        output_map = load_output_map(directory)
         if output_map is None:
             misc_fns.graceful_exit(
                 1, f"Error: Output map not found in directory `{directory}`"
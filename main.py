@@ -2,11 +2,16 @@ from llama_index.readers.github import GithubRepositoryReader  # type: ignore
 from bcorag import misc_functions as misc_fns
 from bcorag import option_picker as op
 from bcorag.bcorag import BcoRag
+from bcorag.output_tracker import export_output_maps
 from parameter_search.grid_search import BcoGridSearch
 from parameter_search.random_search import BcoRandomSearch
+from batch.batch_runner import DEFAULT_WORKERS, BatchRunner
+from batch.custom_types import BatchPool
+from batch.manifest import load_manifest
 from bcorag.custom_types.core_types import (
     GitFilter,
     GitFilters,
+    LlmCacheMode,
     create_git_data,
     create_git_filters,
 )
@@ -17,6 +22,7 @@ from parameter_search.custom_types import (
 )
 from evaluator.frontend.app import App
 from aggregator.aggregator import Aggregator
+from typing import get_args
 import argparse
 import os
 
@@ -82,12 +88,21 @@ def main() -> None:
         "run_mode",
         default="one-shot",
         nargs="?",
-        choices=["one-shot", "in-progress", "grid-search", "random-search", "evaluate"],
-        help="one-shot/in-progress/grid-search/random-search/evaluate",
+        choices=[
+            "one-shot",
+            "in-progress",
+            "grid-search",
+            "random-search",
+            "batch",
+            "export",
+            "evaluate",
+        ],
+        help="one-shot/in-progress/grid-search/random-search/batch/export/evaluate",
     )
 
     parser.add_argument(
-        "--path", help="Path to the directory to process (for in-progress mode)"
+        "--path",
+        help="Path to the directory to process (for in-progress and export modes, export defaults to `./output`)",
     )
     parser.add_argument(
         "--include",
@@ -107,6 +122,32 @@ def main() -> None:
         action="store_false",
         help="Prioritize include patterns (for in-progress mode)",
     )
+    parser.add_argument(
+        "--llm-cache",
+        default="off",
+        choices=list(get_args(LlmCacheMode)),
+        help="LLM response cache mode, record/replay/off (for one-shot, grid-search, random-search and batch modes)",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Path to the JSON or CSV batch manifest, or a directory of papers (for batch mode)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of papers to generate at once (for batch mode)",
+    )
+    parser.add_argument(
+        "--pool",
+        default="process",
+        choices=list(get_args(BatchPool)),
+        help="Worker pool kind, process/thread (for batch mode)",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Path to the batch journal used to resume an interrupted batch, defaults to `./output/.batch/<manifest name>.jsonl` (for batch mode)",
+    )
 
     options = parser.parse_args()
     run_mode = options.run_mode.lower().strip()
@@ -120,7 +161,7 @@ def main() -> None:
                 "################################## RUN START ##################################"
             )
 
-            user_choices = op.initialize_picker()
+            user_choices = op.initialize_picker(llm_cache_mode=options.llm_cache)
             if user_choices is None:
                 misc_fns.graceful_exit()
 
@@ -128,6 +169,7 @@ def main() -> None:
             while True:
                 domain = bco_rag.choose_domain()
                 if domain is None or isinstance(domain, tuple):
+                    bco_rag.close()
                     misc_fns.graceful_exit()
                 _ = bco_rag.perform_query(domain)
                 print(f"Successfully generated the {domain} domain.\n")
@@ -148,18 +190,69 @@ def main() -> None:
 
         case "grid-search":
 
-            grid_search = BcoGridSearch(_create_search_space())
+            grid_search = BcoGridSearch(
+                _create_search_space(), llm_cache_mode=options.llm_cache
+            )
             grid_search.train()
 
             misc_fns.graceful_exit()
 
         case "random-search":
 
-            random_search = BcoRandomSearch(_create_search_space(), subset_size=5)
+            random_search = BcoRandomSearch(
+                _create_search_space(), subset_size=5, llm_cache_mode=options.llm_cache
+            )
             random_search.train()
 
             misc_fns.graceful_exit()
 
+        case "batch":
+
+            if not options.manifest:
+                misc_fns.graceful_exit(1, "Manifest is required for batch mode")
+
+            misc_fns.check_dir("./logs")
+            logger = misc_fns.setup_root_logger("./logs/batch.log")
+            logger.info(
+                "################################## BATCH START ##################################"
+            )
+
+            try:
+                entries = load_manifest(options.manifest, options.llm_cache)
+            except ValueError as e:
+                misc_fns.graceful_exit(1, str(e))
+
+            manifest_name = os.path.splitext(
+                os.path.basename(os.path.normpath(options.manifest))
+            )[0]
+            journal_path = options.journal or os.path.join(
+                "./output", ".batch", f"{manifest_name}.jsonl"
+            )
+            try:
+                batch_runner = BatchRunner(
+                    entries,
+                    journal_path,
+                    workers=options.workers,
+                    pool=options.pool,
+                )
+            except ValueError as e:
+                misc_fns.graceful_exit(1, str(e))
+            results = batch_runner.run()
+
+            failed = any(result["status"] == "failed" for result in results)
+            misc_fns.graceful_exit(1 if failed else 0)
+
+        case "export":
+
+            path = options.path or "./output"
+            if not os.path.isdir(path):
+                misc_fns.graceful_exit(1, f"Invalid output directory `{path}`.")
+
+            output_roots = export_output_maps(path)
+            print(f"Exported the output maps for {len(output_roots)} output directories.")
+
+            misc_fns.graceful_exit()
+
         case "evaluate":
 
             app = App()
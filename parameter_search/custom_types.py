@@ -1,6 +1,6 @@
 import os
 from typing import TypedDict, Optional
-from bcorag.custom_types.core_types import GitData, OptionKey
+from bcorag.custom_types.core_types import GitData, OptionKey, UserSelections
 from bcorag.misc_functions import load_config_data, graceful_exit, get_file_list
 
 config_object = load_config_data("./bcorag/conf.json")
@@ -65,6 +65,40 @@ def create_git_data_file_config(filename: str, git_info: GitData) -> GitDataFile
     return return_data
 
 
+class IndexGroup(TypedDict):
+    """Group of parameter sets that share the same index.
+
+    Attributes
+    ----------
+    group_key : str
+        The hash of the index parameters shared by the group.
+    param_sets : list[UserSelections]
+        The parameter sets in the group (these only differ in the query
+        phase parameters, the LLM and the similarity top k).
+    """
+
+    group_key: str
+    param_sets: list[UserSelections]
+
+
+def create_index_group(group_key: str, param_sets: list[UserSelections]) -> IndexGroup:
+    """Constructor for the IndexGroup TypedDict.
+
+    Parameters
+    ----------
+    group_key : str
+        The hash of the index parameters shared by the group.
+    param_sets : list[UserSelections]
+        The parameter sets in the group.
+
+    Returns
+    -------
+    IndexGroup
+    """
+    return_data: IndexGroup = {"group_key": group_key, "param_sets": param_sets}
+    return return_data
+
+
 class SearchSpace(TypedDict):
     """Search space used for hyperparameter search.
 
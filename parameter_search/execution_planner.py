@@ -0,0 +1,117 @@
+"""Execution planner for the parameter searches.
+
+Only some of the parameters in a parameter set influence the index (the file,
+loader, chunking config, embedding model, vector store, git data and other
+docs). The LLM and similarity top k only influence the query phase. The
+planner groups the parameter sets by their index parameters so each index
+only has to be built once per group. Index groups that only differ in the
+chunking config belong to the same index family, whose indexes can be built
+together in a single chunking and embedding pass.
+"""
+
+import os
+import json
+from hashlib import md5
+from bcorag.custom_types.core_types import UserSelections
+from .custom_types import IndexGroup, create_index_group
+
+
+def index_group_key(param_set: UserSelections) -> str:
+    """Generates an MD5 hash of the index parameters of a parameter set.
+
+    Parameters
+    ----------
+    param_set : UserSelections
+        The parameter set.
+
+    Returns
+    -------
+    str
+        The hexidecimal MD5 hash.
+    """
+    return _index_parameters_hash(param_set, include_chunking_config=True)
+
+
+def index_family_key(param_set: UserSelections) -> str:
+    """Generates an MD5 hash of the index parameters of a parameter set,
+    excluding the chunking config.
+
+    Parameters
+    ----------
+    param_set : UserSelections
+        The parameter set.
+
+    Returns
+    -------
+    str
+        The hexidecimal MD5 hash.
+    """
+    return _index_parameters_hash(param_set, include_chunking_config=False)
+
+
+def _index_parameters_hash(
+    param_set: UserSelections, include_chunking_config: bool
+) -> str:
+    """Generates an MD5 hash of the index parameters of a parameter set.
+
+    Parameters
+    ----------
+    param_set : UserSelections
+        The parameter set.
+    include_chunking_config : bool
+        Whether to include the chunking config.
+
+    Returns
+    -------
+    str
+        The hexidecimal MD5 hash.
+    """
+    git_data = None
+    if param_set["git_data"] is not None:
+        git_data = {
+            "user": param_set["git_data"]["user"],
+            "repo": param_set["git_data"]["repo"],
+            "branch": param_set["git_data"]["branch"],
+            "local_path": param_set["git_data"].get("local_path"),
+            "filters": sorted(
+                f"{filter['filter_type']}-{filter['filter']}-{filter['value']}"
+                for filter in param_set["git_data"]["filters"]
+            ),
+        }
+    key_data = {
+        "filepath": os.path.normpath(param_set["filepath"]),
+        "loader": param_set["loader"],
+        "chunking_config": (
+            param_set["chunking_config"] if include_chunking_config else None
+        ),
+        "embedding_model": param_set["embedding_model"],
+        "vector_store": param_set["vector_store"],
+        "git_data": git_data,
+        "other_docs": param_set["other_docs"],
+    }
+    key_str = json.dumps(key_data, sort_keys=True, default=str)
+    return md5(key_str.encode("utf-8")).hexdigest()
+
+
+def create_execution_plan(param_sets: list[UserSelections]) -> list[IndexGroup]:
+    """Groups the parameter sets by their index parameters. Groups are
+    ordered by the first appearance of their index parameters and the
+    parameter sets within a group keep their original relative order.
+
+    Parameters
+    ----------
+    param_sets : list[UserSelections]
+        The parameter sets to plan.
+
+    Returns
+    -------
+    list[IndexGroup]
+        The index groups.
+    """
+    groups: dict[str, list[UserSelections]] = {}
+    for param_set in param_sets:
+        groups.setdefault(index_group_key(param_set), []).append(param_set)
+    return [
+        create_index_group(group_key, group_param_sets)
+        for group_key, group_param_sets in groups.items()
+    ]
@@ -5,6 +5,7 @@ from .parameter_search import BcoParameterSearch
 from .custom_types import SearchSpace
 from bcorag.custom_types.core_types import (
     UserSelections,
+    LlmCacheMode,
     create_git_data,
     create_user_selections,
 )
@@ -17,15 +18,19 @@ import os
 class BcoGridSearch(BcoParameterSearch):
     """BCO grid search class. Subclass of `BcoParameterSearch`."""
 
-    def __init__(self, search_space: SearchSpace):
+    def __init__(
+        self, search_space: SearchSpace, llm_cache_mode: LlmCacheMode = "off"
+    ):
         """Constructor.
 
         Parameters
         ----------
         search_space : SearchSpace
             The parameter search space.
+        llm_cache_mode : LlmCacheMode, optional
+            The LLM response cache mode for every parameter set.
         """
-        super().__init__(search_space)
+        super().__init__(search_space, llm_cache_mode=llm_cache_mode)
 
     def _setup_logger(self, path: str = "./logs", name: str = "grid-search") -> Logger:
         """Sets up the logger.
@@ -119,6 +124,7 @@ class BcoGridSearch(BcoParameterSearch):
                 base_selections["chunking_config"],
                 base_selections["git_data"],
                 base_selections["other_docs"],
+                self._llm_cache_mode,
             )
             param_sets.append(user_selections)
 
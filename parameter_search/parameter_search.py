@@ -9,10 +9,12 @@ from abc import ABC, abstractmethod
 from bcorag.bcorag import BcoRag, supress_stdout
 from bcorag.custom_types.core_types import (
     UserSelections,
-    DomainKey,
+    SharedIndex,
+    LlmCacheMode,
 )
 from .custom_types import GitDataFileConfig, SearchSpace
-from typing import Optional, get_args
+from .execution_planner import create_execution_plan, index_family_key
+from typing import Optional
 
 STANDARD_BACKOFF = 1
 
@@ -41,6 +43,8 @@ class BcoParameterSearch(ABC):
         The git data to associate with test runs.
     _verbose : bool
         Parameter search verbosity mode.
+    _llm_cache_mode : LlmCacheMode
+        The LLM response cache mode for every parameter set.
     _logger : logging.Logger
         The logger to use.
     backoff_time : int | float
@@ -53,6 +57,7 @@ class BcoParameterSearch(ABC):
         self,
         search_space: SearchSpace,
         verbose: bool = True,
+        llm_cache_mode: LlmCacheMode = "off",
     ):
         """Constructor.
 
@@ -62,6 +67,8 @@ class BcoParameterSearch(ABC):
             The parameter search space.
         verbose : bool, optional
             The verbosity level. False for no output, True for running output.
+        llm_cache_mode : LlmCacheMode, optional
+            The LLM response cache mode for every parameter set.
         """
 
         self._files: list[str] = search_space["filenames"]
@@ -74,40 +81,95 @@ class BcoParameterSearch(ABC):
         self._git_data: Optional[list[GitDataFileConfig]] = search_space["git_data"]
         self._other_docs: Optional[dict[str, list[str]]] = search_space["other_docs"]
         self._verbose: bool = verbose
+        self._llm_cache_mode: LlmCacheMode = llm_cache_mode
         self._logger = self._setup_logger()
         self.backoff_time: int | float = STANDARD_BACKOFF
         self.delay_reset = 3
 
     def train(self):
-        """Starts the generation workflow."""
+        """Starts the generation workflow. Parameter sets that share the same
+        index parameters are grouped together so each index is only built
+        once, the remaining parameter sets in the group reuse it and only run
+        the query phase. Index groups that only differ in the chunking config
+        have their indexes built together by the first group's instance.
+        """
 
         param_sets = self._create_param_sets()
-        for idx, param_set in enumerate(param_sets):
+        execution_plan = create_execution_plan(param_sets)
+        self._log_output(
+            f"{len(param_sets)} param sets planned into {len(execution_plan)} index group(s)."
+        )
+
+        # chunking configs of the index groups not yet built, per index family
+        pending_chunking_configs: dict[str, list[str]] = {}
+        for index_group in execution_plan:
+            first_param_set = index_group["param_sets"][0]
+            pending_chunking_configs.setdefault(
+                index_family_key(first_param_set), []
+            ).append(first_param_set["chunking_config"])
+        prebuilt_indexes: dict[str, dict[str, SharedIndex]] = {}
+
+        idx = 0
+        for group_idx, index_group in enumerate(execution_plan):
 
             self._log_output(
-                f"------------ Param Set {idx + 1}/{len(param_sets)} ------------"
+                f"============ Index Group {group_idx + 1}/{len(execution_plan)} ============"
             )
-            self._log_output(param_set)
-            t0 = time.time()
-
-            t1 = time.time()
-            bco_rag = self._create_bcorag(param_set)
-            self._log_output(f"RAG created, elapsed time: {time.time() - t1}")
-
-            t2 = time.time()
-            self._generate_domains(bco_rag)
-            self._log_output(
-                f"Domains generated, total elapsed time: {time.time() - t2}"
+            first_param_set = index_group["param_sets"][0]
+            family_key = index_family_key(first_param_set)
+            chunking_config = first_param_set["chunking_config"]
+            pending_chunking_configs[family_key].remove(chunking_config)
+            shared_index: Optional[SharedIndex] = prebuilt_indexes.get(
+                family_key, {}
+            ).pop(chunking_config, None)
+            chunking_sweep = (
+                pending_chunking_configs[family_key] if shared_index is None else []
             )
 
-            self._log_output(f"Sleeping for {self.backoff_time}...")
-            time.sleep(self.backoff_time)
-            if idx % self.delay_reset == 0:
-                self.backoff_time = STANDARD_BACKOFF
-            else:
-                self.backoff_time *= 2 + random.uniform(0, 1)
-
-            self._log_output(f"Param set elapsed time: {time.time() - t0}")
+            for param_set in index_group["param_sets"]:
+
+                self._log_output(
+                    f"------------ Param Set {idx + 1}/{len(param_sets)} ------------"
+                )
+                self._log_output(param_set)
+                t0 = time.time()
+
+                t1 = time.time()
+                with self._create_bcorag(
+                    param_set, shared_index, chunking_sweep
+                ) as bco_rag:
+                    if shared_index is None:
+                        shared_indexes = bco_rag.shared_indexes()
+                        shared_index = shared_indexes.pop(chunking_config)
+                        if shared_indexes:
+                            prebuilt_indexes.setdefault(family_key, {}).update(
+                                shared_indexes
+                            )
+                    self._log_output(f"RAG created, elapsed time: {time.time() - t1}")
+
+                    t2 = time.time()
+                    self._generate_domains(bco_rag)
+                    self._log_output(
+                        f"Domains generated, total elapsed time: {time.time() - t2}"
+                    )
+
+                    embedding_cache_stats = bco_rag.embedding_cache_stats()
+                    if embedding_cache_stats is not None:
+                        self._log_output(
+                            f"Embedding cache: {embedding_cache_stats['hits']} hits, "
+                            f"{embedding_cache_stats['misses']} misses, "
+                            f"~{embedding_cache_stats['saved_tokens']} embedding tokens saved"
+                        )
+
+                self._log_output(f"Sleeping for {self.backoff_time}...")
+                time.sleep(self.backoff_time)
+                if idx % self.delay_reset == 0:
+                    self.backoff_time = STANDARD_BACKOFF
+                else:
+                    self.backoff_time *= 2 + random.uniform(0, 1)
+
+                self._log_output(f"Param set elapsed time: {time.time() - t0}")
+                idx += 1
 
     @abstractmethod
     def _setup_logger(self, path: str, name: str) -> Logger:
@@ -120,7 +182,8 @@ class BcoParameterSearch(ABC):
         pass
 
     def _generate_domains(self, bcorag: BcoRag):
-        """Performs the bcorag query on each domain.
+        """Performs the bcorag query on each domain. Independent domains are
+        generated concurrently.
 
         Parameters
         ----------
@@ -128,16 +191,19 @@ class BcoParameterSearch(ABC):
             The setup BcoRag instance.
         """
 
-        domain: DomainKey
-        for domain in get_args(DomainKey):
-
-            t0 = time.time()
-            with supress_stdout():
-                bcorag.perform_query(domain)
-            self._log_output(f"\t{domain.upper()} domain generated, elapsed time: {time.time() - t0}")
+        t0 = time.time()
+        with supress_stdout():
+            generated_domains = bcorag.generate_all()
+        domain_list = ", ".join(domain.upper() for domain in generated_domains)
+        self._log_output(
+            f"\t{domain_list} domains generated, elapsed time: {time.time() - t0}"
+        )
 
     def _create_bcorag(
-        self, user_selections: UserSelections
+        self,
+        user_selections: UserSelections,
+        shared_index: Optional[SharedIndex] = None,
+        chunking_sweep: Optional[list[str]] = None,
     ) -> BcoRag:
         """Creates the BcoRag instance.
 
@@ -145,13 +211,20 @@ class BcoParameterSearch(ABC):
         ----------
         user_selections : UserSelections
             The parameter set.
+        shared_index : SharedIndex or None, optional
+            An already built index for the parameter set's index group.
+        chunking_sweep : list[str] or None, optional
+            The chunking configs of the other index groups in the same index
+            family to build indexes for alongside this instance's index.
 
         Returns
         -------
         BcoRag
             The instantiated BcoRag instance.
         """
-        bcorag = BcoRag(user_selections)
+        bcorag = BcoRag(
+            user_selections, shared_index=shared_index, chunking_sweep=chunking_sweep
+        )
         return bcorag
 
     def _log_output(self, message: str | UserSelections):
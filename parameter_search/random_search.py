@@ -5,6 +5,7 @@ from .parameter_search import BcoParameterSearch
 from .custom_types import SearchSpace
 from bcorag.custom_types.core_types import (
     UserSelections,
+    LlmCacheMode,
     create_git_data,
     create_user_selections,
 )
@@ -18,7 +19,12 @@ import random
 class BcoRandomSearch(BcoParameterSearch):
     """BCO random search class. Subclass of `BcoParameterSearch`."""
 
-    def __init__(self, search_space: SearchSpace, subset_size: int = 5):
+    def __init__(
+        self,
+        search_space: SearchSpace,
+        subset_size: int = 5,
+        llm_cache_mode: LlmCacheMode = "off",
+    ):
         """Constructor.
 
         Parameters
@@ -27,8 +33,10 @@ class BcoRandomSearch(BcoParameterSearch):
             The parameter search space.
         subset_size : int (default: 5)
             The number of parameter sets to search.
+        llm_cache_mode : LlmCacheMode, optional
+            The LLM response cache mode for every parameter set.
         """
-        super().__init__(search_space)
+        super().__init__(search_space, llm_cache_mode=llm_cache_mode)
         self.subset_size = subset_size
 
     def _setup_logger(
@@ -125,6 +133,7 @@ class BcoRandomSearch(BcoParameterSearch):
                 base_selections["chunking_config"],
                 base_selections["git_data"],
                 base_selections["other_docs"],
+                self._llm_cache_mode,
             )
             param_sets.append(user_selections)
 
@@ -13,6 +13,7 @@ from bcorag.custom_types.core_types import (
 )
 from bcorag.misc_functions import extract_repo_data, graceful_exit
 import os
+from typing import Iterator
 
 VERBOSE = False
 ASYNC = False
@@ -29,7 +30,7 @@ THRESHOLD = 0.70
 
 
 @pytest.fixture
-def setup_bcorag() -> BcoRag:
+def setup_bcorag() -> Iterator[BcoRag]:
 
     github_url = "https://github.com/dpastling/plethora"
     git_info = extract_repo_data(github_url)
@@ -72,10 +73,11 @@ def setup_bcorag() -> BcoRag:
         chunking_config="1024 chunk size/20 chunk overlap",
         git_data=git_data,
         other_docs=None,
+        llm_cache_mode=os.getenv("BCORAG_LLM_CACHE", "off"),  # type: ignore
     )
 
-    bcorag_instance = BcoRag(user_selections=user_selection)
-    return bcorag_instance
+    with BcoRag(user_selections=user_selection) as bcorag_instance:
+        yield bcorag_instance
 
 
 def create_metrics(
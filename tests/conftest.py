@@ -0,0 +1,276 @@
+import os
+import zlib
+import logging
+import numpy as np
+import pytest
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+from llama_index.core import Document, Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.base.llms.types import (
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import CustomLLM
+from bcorag.bcorag import BcoRag
+from bcorag.cache.index_cache import IndexCache
+from bcorag.cache.retrieval_cache import RetrievalCache
+from bcorag.custom_types.core_types import (
+    DomainMap,
+    LlmCacheMode,
+    UserSelections,
+    create_user_selections,
+    default_domain_content,
+)
+from bcorag.model_registry import MODEL_REGISTRY
+from bcorag.output_tracker import OutputTracker
+from bcorag.prompts import PROMPT_DOMAIN_MAP
+from bcorag.vector_stores import DEFAULT_VECTOR_STORE_OPTION, parse_vector_store_option
+from bcorag import misc_functions as misc_fns
+
+EMBEDDING_DIMENSIONS = 32
+
+
+class HashEmbedding(BaseEmbedding):
+    """Deterministic offline embedding model, a hashed bag of words. Records
+    every text embedded so tests can count the embedding calls.
+    """
+
+    _embedded: list[str] = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(model_name="hash-embedding", **kwargs)
+        self._embedded = []
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    @property
+    def embedded(self) -> list[str]:
+        return self._embedded
+
+    def vector(self, text: str) -> Embedding:
+        vector = np.full(EMBEDDING_DIMENSIONS, 0.01)
+        for token in text.lower().split():
+            vector[zlib.crc32(token.encode("utf-8")) % EMBEDDING_DIMENSIONS] += 1.0
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self.vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self.vector(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        self._embedded.append(text)
+        return self.vector(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        self._embedded.extend(texts)
+        return [self.vector(text) for text in texts]
+
+
+class StubLLM(CustomLLM):
+    """Offline LLM numbering its responses, so a fresh call never matches a
+    previous response."""
+
+    temperature: float = 0.0
+    calls: int = 0
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StubLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="stub-llm")
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        self.calls += 1
+        return CompletionResponse(text=f"response {self.calls} to {prompt}")
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        yield self.complete(prompt, formatted, **kwargs)
+
+
+class StubCrossEncoder:
+    """Offline cross-encoder scoring a (query, passage) pair by the number of
+    shared lowercased words. Records every scored pair."""
+
+    def __init__(self):
+        self.pairs: list[tuple[str, str]] = []
+
+    def predict(self, pairs, batch_size: int = 32):
+        self.pairs.extend(pairs)
+        return [
+            float(len(set(query.lower().split()) & set(passage.lower().split())))
+            for query, passage in pairs
+        ]
+
+
+@pytest.fixture
+def embed_model():
+    """A fresh `HashEmbedding`, also set as the global llama index embedding
+    model for the duration of the test."""
+    previous = Settings._embed_model
+    model = HashEmbedding()
+    Settings.embed_model = model
+    yield model
+    Settings._embed_model = previous
+
+
+@pytest.fixture
+def offline_models(monkeypatch):
+    """Replaces the OpenAI LLM and embedding model and the cross-encoder with
+    offline stubs and removes the OpenAI API key, so the `BcoRag` constructor
+    runs offline. Restores the llama index global settings the `BcoRag`
+    instances set."""
+    previous = (
+        Settings._llm,
+        Settings._embed_model,
+        Settings._node_parser,
+        Settings._transformations,
+    )
+    monkeypatch.setattr("bcorag.bcorag.OpenAI", lambda model: StubLLM())
+    monkeypatch.setattr(
+        "bcorag.bcorag.OpenAIEmbedding", lambda model, dimensions: HashEmbedding()
+    )
+    monkeypatch.setattr(
+        "bcorag.rerank.load_cross_encoder", lambda model, device: StubCrossEncoder()
+    )
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr("bcorag.bcorag.load_dotenv", lambda: None)
+    MODEL_REGISTRY.clear()
+    yield
+    MODEL_REGISTRY.clear()
+    (
+        Settings._llm,
+        Settings._embed_model,
+        Settings._node_parser,
+        Settings._transformations,
+    ) = previous
+
+
+def make_user_selections(
+    directory, llm_cache_mode: LlmCacheMode = "off"
+) -> UserSelections:
+    """User selections for a short text paper written to `directory`."""
+    paper = directory / "paper.txt"
+    paper.write_text("The pipeline reads fastq files and writes bed files.\n" * 20)
+    return create_user_selections(
+        "gpt-4o-mini",
+        "text-embedding-3-small",
+        paper.name,
+        str(paper),
+        "VectorStoreIndex",
+        "SimpleDirectoryReader",
+        "production",
+        2,
+        "256 chunk size/20 chunk overlap",
+        None,
+        None,
+        llm_cache_mode,
+    )
+
+
+def make_document(path: str, lines: int, seed: int) -> Document:
+    """A document of numbered lines with random values, so different seeds
+    give different chunks."""
+    rng = np.random.default_rng(seed)
+    text = "\n".join(
+        f"Line {i} of {path} sets value_{i} to {rng.integers(1000)}."
+        for i in range(lines)
+    )
+    return Document(text=text, metadata={"file_path": path})
+
+
+@pytest.fixture
+def bco_rag_factory(embed_model, tmp_path):
+    """Creates `BcoRag` instances without loading documents or building an
+    index (no network access), embedding with the `embed_model` fixture and
+    generating with a `StubLLM`. Every attribute the constructor sets is set
+    (checked by `test_bco_rag_init.py`), the index, query engine and reranker
+    to None, so tests only replace the parts they stub. Instances created with
+    `cache=True` share an index cache and a retrieval cache in the test's
+    temporary directory."""
+    previous_node_parser = Settings._node_parser
+    previous_transformations = Settings._transformations
+    created: list[BcoRag] = []
+
+    def create(
+        documents: Optional[list[Document]] = None,
+        vector_store: str = DEFAULT_VECTOR_STORE_OPTION,
+        chunking_config: str = "256 chunk size/20 chunk overlap",
+        cache: bool = False,
+        similarity_top_k: int = 2,
+        chunking_sweep: Optional[list[str]] = None,
+        domain_map: DomainMap = PROMPT_DOMAIN_MAP,
+        max_concurrent_queries: int = 1,
+    ) -> BcoRag:
+        chunk_params: Optional[tuple[int, int]] = misc_fns.parse_chunking_config(
+            chunking_config
+        )
+        assert chunk_params is not None, "Only fixed size chunking is supported."
+        Settings.chunk_size, Settings.chunk_overlap = chunk_params
+        bco_rag = BcoRag.__new__(BcoRag)
+        bco_rag._parameter_set_hash = "test-parameter-set"
+        bco_rag._domain_map = domain_map
+        bco_rag._file_name = "paper.txt"
+        bco_rag._file_path = str(tmp_path / "paper.txt")
+        bco_rag._output_path_root = str(tmp_path / "output" / "paper")
+        os.makedirs(bco_rag._output_path_root, exist_ok=True)
+        bco_rag._debug = False
+        bco_rag._logger = logging.getLogger("bcorag.tests")
+        bco_rag._llm_model_name = "gpt-4o-mini"
+        bco_rag._llm_model = StubLLM()
+        bco_rag._llm_cache_mode = "off"
+        bco_rag._embed_model_name = embed_model.model_name
+        bco_rag._embed_model = embed_model
+        bco_rag._embedding_cache = None
+        bco_rag._loader = "SimpleDirectoryReader"
+        bco_rag._vector_store = vector_store
+        _, bco_rag._hybrid = parse_vector_store_option(vector_store)
+        bco_rag._bm25_index = None
+        bco_rag._splitter = None
+        bco_rag._similarity_top_k = similarity_top_k
+        bco_rag._chunking_config = chunking_config
+        bco_rag._token_counter = None
+        bco_rag._token_counts = None
+        bco_rag._git_data = None
+        bco_rag._other_docs = None
+        bco_rag.domain_content = default_domain_content()
+        bco_rag._max_concurrent_queries = max_concurrent_queries
+        bco_rag._query_semaphores = WeakKeyDictionary()
+        bco_rag._index_key = None
+        bco_rag._chunking_sweep = [
+            config for config in chunking_sweep or [] if config != chunking_config
+        ]
+        bco_rag._shared_indexes = {}
+        bco_rag._index_cache = (
+            IndexCache(str(tmp_path / "index_cache")) if cache else None
+        )
+        bco_rag._document_cache = None
+        bco_rag._snapshot_cache = None
+        bco_rag._retrieval_cache = (
+            RetrievalCache(str(tmp_path / "retrieval_cache")) if cache else None
+        )
+        bco_rag._output_tracker = OutputTracker(bco_rag._output_path_root)
+        bco_rag._documents = documents if documents is not None else []
+        bco_rag._index = None  # type: ignore
+        bco_rag._query_engine = None  # type: ignore
+        bco_rag._rerank_postprocessor = None  # type: ignore
+        created.append(bco_rag)
+        return bco_rag
+
+    yield create
+    for bco_rag in created:
+        bco_rag._output_tracker.close()
+    Settings._node_parser = previous_node_parser
+    Settings._transformations = previous_transformations
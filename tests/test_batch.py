@@ -0,0 +1,296 @@
+import os
+import csv
+import json
+import time
+import threading
+import pytest
+from pathlib import Path
+from batch import batch_runner
+from batch.batch_runner import BatchRunner
+from batch.custom_types import create_batch_entry, create_batch_result
+from batch.manifest import entry_key, load_manifest
+from bcorag.custom_types.core_types import GitFilter, create_user_selections
+
+CONFIG_PATH = str(Path(__file__).parents[1] / "bcorag" / "conf.json")
+
+
+def _paper(tmp_path: Path, name: str) -> str:
+    path = tmp_path / "papers" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"The {name} paper.")
+    return str(path)
+
+
+def _entry(filepath: str, other_docs=None, mode="production", loader="PDFReader"):
+    user_selections = create_user_selections(
+        "gpt-4o-mini",
+        "text-embedding-3-small",
+        os.path.basename(filepath),
+        filepath,
+        "VectorStoreIndex",
+        loader,
+        mode,
+        5,
+        "1024 chunk size/20 chunk overlap",
+        None,
+        other_docs,
+        "off",
+    )
+    return create_batch_entry(entry_key(user_selections), user_selections)
+
+
+class StubEntryRunner:
+    """Stands in for `run_batch_entry`, records the entries run at once for
+    each paper and fails the entries of the `fail` file paths."""
+
+    def __init__(self, delay: float = 0.05, fail: tuple = ()):
+        self.delay = delay
+        self.fail = fail
+        self.calls: list[str] = []
+        self.in_flight: dict[str, int] = {}
+        self.max_in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, entry, output_dir, cache_dir):
+        filename = entry["user_selections"]["filename"]
+        with self._lock:
+            self.calls.append(entry["key"])
+            self.in_flight[filename] = self.in_flight.get(filename, 0) + 1
+            self.max_in_flight[filename] = max(
+                self.max_in_flight.get(filename, 0), self.in_flight[filename]
+            )
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight[filename] -= 1
+        failed = entry["user_selections"]["filepath"] in self.fail
+        return create_batch_result(
+            key=entry["key"],
+            filepath=entry["user_selections"]["filepath"],
+            status="failed" if failed else "done",
+            domains=[] if failed else ["usability"],
+            elapsed_time=self.delay,
+            error="RuntimeError: failed" if failed else None,
+            timestamp="2024-01-01-00-00-00",
+        )
+
+
+@pytest.fixture
+def stub_runner(monkeypatch):
+    stub = StubEntryRunner()
+    monkeypatch.setattr(batch_runner, "run_batch_entry", stub)
+    return stub
+
+
+def _runner(entries, tmp_path: Path, workers: int = 4) -> BatchRunner:
+    return BatchRunner(
+        entries,
+        journal_path=str(tmp_path / "journal.jsonl"),
+        output_dir=str(tmp_path / "output"),
+        cache_dir=None,
+        workers=workers,
+        pool="thread",
+        verbose=False,
+    )
+
+
+def test_json_manifest(tmp_path):
+    paper, other = _paper(tmp_path, "a.pdf"), _paper(tmp_path, "notes.txt")
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "options": {"loader": "PDFReader", "similarity_top_k": "3"},
+                "papers": [
+                    {
+                        "filepath": paper,
+                        "git_url": "https://github.com/owner/repo",
+                        "git_filters": [
+                            {"filter": "directory", "value": ["tests"]},
+                            {
+                                "filter": "file_extension",
+                                "filter_type": "include",
+                                "value": [".py"],
+                            },
+                        ],
+                        "other_docs": [other],
+                    },
+                    # identical user selections are only included once
+                    {"filepath": paper, "git_url": "https://github.com/owner/repo"},
+                    {"filepath": paper, "git_url": "https://github.com/owner/repo"},
+                ],
+            }
+        )
+    )
+    entries = load_manifest(str(manifest), config_path=CONFIG_PATH)
+    assert len(entries) == 2
+    user_selections = entries[0]["user_selections"]
+    assert user_selections["loader"] == "PDFReader"
+    assert user_selections["similarity_top_k"] == 3
+    assert user_selections["other_docs"] == [other]
+    git_data = user_selections["git_data"]
+    assert git_data is not None
+    assert (git_data["user"], git_data["repo"], git_data["branch"]) == (
+        "owner",
+        "repo",
+        "main",
+    )
+    assert [f["filter"] for f in git_data["filters"]] == [
+        GitFilter.DIRECTORY,
+        GitFilter.FILE_EXTENSION,
+    ]
+    assert entries[1]["user_selections"]["git_data"]["filters"] == []  # type: ignore
+
+
+def test_csv_manifest(tmp_path):
+    paper = _paper(tmp_path, "a.pdf")
+    others = [_paper(tmp_path, "b.txt"), _paper(tmp_path, "c.txt")]
+    manifest = tmp_path / "manifest.csv"
+    with open(manifest, "w", newline="") as f:
+        writer = csv.DictWriter(
+            f,
+            fieldnames=[
+                "filepath",
+                "git_url",
+                "git_branch",
+                "git_filters",
+                "other_docs",
+            ],
+        )
+        writer.writeheader()
+        writer.writerow(
+            {
+                "filepath": paper,
+                "git_url": "https://github.com/owner/repo",
+                "git_branch": "dev",
+                "git_filters": json.dumps(
+                    [{"filter": "max_file_size", "value": [10]}]
+                ),
+                "other_docs": "; ".join(others),
+            }
+        )
+        writer.writerow({"filepath": paper})
+    entries = load_manifest(str(manifest), config_path=CONFIG_PATH)
+    user_selections = entries[0]["user_selections"]
+    assert user_selections["other_docs"] == others
+    assert user_selections["git_data"]["branch"] == "dev"  # type: ignore
+    assert user_selections["git_data"]["filters"][0]["value"] == ["10"]  # type: ignore
+    assert entries[1]["user_selections"]["git_data"] is None
+    assert entries[1]["user_selections"]["other_docs"] is None
+    # the default options from the config file
+    assert user_selections["loader"] == "SimpleDirectoryReader"
+
+
+def test_directory_manifest(tmp_path):
+    papers = [_paper(tmp_path, "b.pdf"), _paper(tmp_path, "a.pdf")]
+    _paper(tmp_path, "notes.txt")
+    entries = load_manifest(str(tmp_path / "papers"), config_path=CONFIG_PATH)
+    assert [entry["user_selections"]["filepath"] for entry in entries] == sorted(
+        papers
+    )
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [
+        {"papers": [{"filepath": "missing.pdf"}]},
+        {"papers": [{"filepath": "PAPER", "other_docs": ["missing.txt"]}]},
+        {"options": {"llm": "unknown"}, "papers": [{"filepath": "PAPER"}]},
+        {"papers": [{"filepath": "PAPER", "git_filters": [{"filter": "unknown"}]}]},
+        {"papers": [{"filepath": "PAPER", "git_url": "not a url"}]},
+    ],
+)
+def test_invalid_manifest(tmp_path, manifest):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(manifest).replace("PAPER", _paper(tmp_path, "a.pdf")))
+    with pytest.raises(ValueError):
+        load_manifest(str(path), config_path=CONFIG_PATH)
+
+
+def test_run_serializes_entries_sharing_an_output_root(tmp_path, stub_runner):
+    a, b = _paper(tmp_path, "a.pdf"), _paper(tmp_path, "b.pdf")
+    other = _paper(tmp_path, "notes.txt")
+    # the first three entries write to the same output directory
+    entries = [_entry(a), _entry(a, [other]), _entry(a, [other, other]), _entry(b)]
+    results = _runner(entries, tmp_path).run()
+    assert sorted(result["key"] for result in results) == sorted(
+        entry["key"] for entry in entries
+    )
+    assert stub_runner.max_in_flight == {"a.pdf": 1, "b.pdf": 1}
+
+
+def test_run_resumes_from_the_journal(tmp_path, stub_runner):
+    a, b, c = (_paper(tmp_path, name) for name in ["a.pdf", "b.pdf", "c.pdf"])
+    entries = [_entry(a), _entry(b), _entry(c)]
+    stub_runner.fail = (b,)
+    runner = _runner(entries, tmp_path)
+    runner.run()
+    assert runner.completed_keys() == {entries[0]["key"], entries[2]["key"]}
+
+    # a torn last line from an interrupted run is ignored
+    with open(tmp_path / "journal.jsonl", "a") as f:
+        f.write('{"key": "' + entries[1]["key"] + '", "status": "do')
+    stub_runner.calls.clear()
+    stub_runner.fail = ()
+    results = _runner(entries, tmp_path).run()
+    # only the failed entry is retried
+    assert stub_runner.calls == [entries[1]["key"]]
+    assert [result["status"] for result in results] == ["done"]
+    assert runner.completed_keys() == {entry["key"] for entry in entries}
+
+    stub_runner.calls.clear()
+    assert _runner(entries, tmp_path).run() == []
+    assert stub_runner.calls == []
+
+
+@pytest.mark.parametrize(
+    "entry_options",
+    [
+        [{"mode": "debug"}],
+        [{"loader": "PDFMarker"}],
+        [{"loader": "PDFReader"}, {"loader": "SimpleDirectoryReader"}],
+    ],
+)
+def test_thread_pool_rejections(tmp_path, entry_options):
+    paper = _paper(tmp_path, "a.pdf")
+    entries = [_entry(paper, **options) for options in entry_options]
+    with pytest.raises(ValueError):
+        _runner(entries, tmp_path)
+    # the process pool accepts them
+    BatchRunner(entries, str(tmp_path / "journal.jsonl"), pool="process")
+
+
+def test_workers_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        _runner([], tmp_path, workers=0)
+
+
+class StubBcoRag:
+    """Stands in for `BcoRag` in `run_batch_entry`, recording the instances
+    closed."""
+
+    closed: list[str] = []
+
+    def __init__(self, user_selections, output_dir, cache_dir):
+        self.filepath = user_selections["filepath"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        StubBcoRag.closed.append(self.filepath)
+
+    def generate_all(self):
+        if self.filepath.endswith("fail.pdf"):
+            raise RuntimeError("failed")
+        return {"usability": "", "io": ""}
+
+
+def test_entries_close_their_bco_rag(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_runner, "BcoRag", StubBcoRag)
+    monkeypatch.setattr(StubBcoRag, "closed", [])
+    done, fail = _paper(tmp_path, "done.pdf"), _paper(tmp_path, "fail.pdf")
+    result = batch_runner.run_batch_entry(_entry(done), str(tmp_path), None)
+    assert (result["status"], result["domains"]) == ("done", ["usability", "io"])
+    result = batch_runner.run_batch_entry(_entry(fail), str(tmp_path), None)
+    assert (result["status"], result["error"]) == ("failed", "RuntimeError: failed")
+    assert StubBcoRag.closed == [done, fail]
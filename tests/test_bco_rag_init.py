@@ -0,0 +1,11 @@
+from bcorag.bcorag import BcoRag
+from conftest import make_user_selections
+
+
+def test_factory_sets_every_constructor_attribute(
+    offline_models, bco_rag_factory, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with BcoRag(make_user_selections(tmp_path), str(tmp_path), None) as bco_rag:
+        # a new constructor attribute has to be added to `bco_rag_factory`
+        assert set(vars(bco_rag)) == set(vars(bco_rag_factory()))
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from llama_index.core import Document
+from llama_index.core.schema import MetadataMode, TextNode
+from bcorag.dedup import (
+    PROVENANCE_KEY,
+    NodeDeduplicator,
+    add_provenance,
+    node_source,
+    remove_provenance,
+)
+from conftest import make_document
+
+
+def _text(seed: int, words: int = 120) -> str:
+    rng = np.random.default_rng(seed)
+    return " ".join(f"word{value}" for value in rng.integers(10000, size=words))
+
+
+def _node(text: str, path: str) -> TextNode:
+    return TextNode(text=text, metadata={"file_path": path})
+
+
+def test_exact_and_near_duplicates():
+    original = _text(1)
+    words = original.split()
+    words[60] = "changed"
+    nodes = [
+        _node(original, "a.py"),
+        _node(_text(2), "b.py"),
+        _node(original, "copy/a.py"),
+        _node(" ".join(words), "fork/a.py"),
+    ]
+    deduplicator = NodeDeduplicator()
+    kept, removed = deduplicator.deduplicate(nodes)
+
+    assert kept == nodes[:2]
+    assert [(node, canonical) for node, canonical in removed] == [
+        (nodes[2], nodes[0]),
+        (nodes[3], nodes[0]),
+    ]
+    stats = deduplicator.stats
+    assert (stats["exact_duplicates"], stats["near_duplicates"]) == (1, 1)
+    assert stats["kept_nodes"] == 2
+    assert stats["removed_tokens"] > 0
+    assert nodes[0].metadata[PROVENANCE_KEY] == ["copy/a.py", "fork/a.py"]
+    assert PROVENANCE_KEY not in nodes[1].metadata
+
+
+def test_dissimilar_nodes_are_kept():
+    nodes = [_node(_text(seed), f"{seed}.py") for seed in range(20)]
+    # half the words shared is well below the threshold
+    first, second = _text(100).split(), _text(101).split()
+    nodes.append(_node(" ".join(first), "first.py"))
+    nodes.append(_node(" ".join(first[:60] + second[60:]), "second.py"))
+    kept, removed = NodeDeduplicator().deduplicate(nodes)
+    assert kept == nodes and removed == []
+
+
+def test_duplicates_of_existing_nodes():
+    existing = _node(_text(1), "a.py")
+    deduplicator = NodeDeduplicator()
+    deduplicator.add_existing([existing])
+    new_nodes = [_node(_text(1), "b.py"), _node(_text(2), "c.py")]
+    kept, removed = deduplicator.deduplicate(new_nodes)
+    assert kept == [new_nodes[1]]
+    assert removed == [(new_nodes[0], existing)]
+    assert existing.metadata[PROVENANCE_KEY] == ["b.py"]
+    # the existing nodes aren't counted as kept
+    assert deduplicator.stats["kept_nodes"] == 1
+
+
+def test_provenance_is_not_embedded():
+    node = _node("some text", "a.py")
+    before = node.get_content(metadata_mode=MetadataMode.EMBED)
+    add_provenance(node, ["b.py", "c.py"])
+    add_provenance(node, ["b.py"])
+    assert node.metadata[PROVENANCE_KEY] == ["b.py", "c.py", "b.py"]
+    assert node.get_content(metadata_mode=MetadataMode.EMBED) == before
+    assert PROVENANCE_KEY not in node.get_content(metadata_mode=MetadataMode.LLM)
+    assert node.excluded_embed_metadata_keys.count(PROVENANCE_KEY) == 1
+
+    remove_provenance(node, ["b.py"])
+    assert node.metadata[PROVENANCE_KEY] == ["c.py", "b.py"]
+    remove_provenance(node, ["b.py", "c.py", "missing.py"])
+    assert PROVENANCE_KEY not in node.metadata
+
+
+def test_node_source():
+    assert node_source(_node("text", "src/main.py")) == "src/main.py"
+    paper = TextNode(text="text", metadata={"file_name": "paper.pdf", "page_label": "3"})
+    assert node_source(paper) == "paper.pdf#page=3"
+    assert node_source(TextNode(id_="node-1", text="text")) == "node-1"
+
+
+def test_invalid_bands():
+    with pytest.raises(ValueError):
+        NodeDeduplicator(num_perm=64, bands=7)
+
+
+def _provenance(index) -> list[tuple[str, str, list[str]]]:
+    return sorted(
+        (
+            node.get_content(),
+            node.metadata["file_path"],
+            sorted(node.metadata.get(PROVENANCE_KEY, [])),
+        )
+        for node in index.docstore.docs.values()
+    )
+
+
+def test_index_provenance_after_incremental_update(bco_rag_factory, embed_model):
+    def copy(document: Document, path: str) -> Document:
+        return Document(text=document.text, metadata={"file_path": path})
+
+    a, b = make_document("a.py", 100, 1), make_document("b.py", 80, 2)
+    v1 = [a, copy(a, "vendor/a.py"), b, copy(b, "copy/b.py")]
+    embed_model.embedded.clear()
+    index = bco_rag_factory(v1, cache=True)._build_index()
+    # every chunk of the copies is collapsed and embedded once
+    assert len(embed_model.embedded) == len(index.docstore.docs)
+    sources = {
+        source
+        for _, _, node_sources in _provenance(index)
+        for source in node_sources
+    }
+    assert sources == {"vendor/a.py", "copy/b.py"}
+
+    # removing the file the copy collapsed into keeps the copy's nodes
+    v2 = [v1[1], v1[2], v1[3]]
+    updated = bco_rag_factory(v2, cache=True)._build_index()
+    rebuilt = bco_rag_factory(v2)._build_index()
+    assert _provenance(updated) == _provenance(rebuilt)
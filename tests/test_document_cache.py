@@ -0,0 +1,79 @@
+import pytest
+from llama_index.core import Document
+from bcorag.cache import document_cache
+from bcorag.cache.document_cache import DocumentCache
+
+
+@pytest.fixture
+def paper(tmp_path):
+    path = tmp_path / "papers" / "paper.txt"
+    path.parent.mkdir()
+    path.write_text("The paper contents.")
+    return path
+
+
+def _documents(path) -> list[Document]:
+    return [
+        Document(
+            text="The paper contents.",
+            metadata={"file_path": str(path), "file_name": path.name},
+        )
+    ]
+
+
+def test_hit(tmp_path, paper):
+    cache = DocumentCache(str(tmp_path / "documents"))
+    assert cache.load(str(paper), "SimpleDirectoryReader") is None
+    documents = _documents(paper)
+    assert cache.store(str(paper), "SimpleDirectoryReader", documents)
+    cached = cache.load(str(paper), "SimpleDirectoryReader")
+    assert cached is not None
+    assert [document.to_dict() for document in cached] == [
+        document.to_dict() for document in documents
+    ]
+    # the same contents at another path hit, with the path metadata updated
+    copy = tmp_path / "copy.txt"
+    copy.write_text(paper.read_text())
+    cached = cache.load(str(copy), "SimpleDirectoryReader")
+    assert cached is not None
+    assert cached[0].metadata == {"file_path": str(copy), "file_name": "copy.txt"}
+
+
+def test_miss_when_the_contents_change(tmp_path, paper):
+    cache = DocumentCache(str(tmp_path / "documents"))
+    cache.store(str(paper), "SimpleDirectoryReader", _documents(paper))
+    paper.write_text("The revised paper contents.")
+    assert cache.load(str(paper), "SimpleDirectoryReader") is None
+
+
+def test_miss_when_the_loader_or_version_changes(tmp_path, paper, monkeypatch):
+    cache = DocumentCache(str(tmp_path / "documents"))
+    cache.store(str(paper), "SimpleDirectoryReader", _documents(paper))
+    assert cache.load(str(paper), "PDFReader") is None
+    monkeypatch.setattr(document_cache, "loader_version", lambda loader: "0.0.0")
+    assert cache.load(str(paper), "SimpleDirectoryReader") is None
+
+
+def test_miss_when_the_file_readers_change(tmp_path, paper, monkeypatch):
+    cache = DocumentCache(str(tmp_path / "documents"))
+    cache.store(str(paper), "SimpleDirectoryReader", _documents(paper))
+    installed = document_cache.version
+    # the `SimpleDirectoryReader` parses files with the default file readers
+    monkeypatch.setattr(
+        document_cache,
+        "version",
+        lambda distribution: (
+            "0.0.0"
+            if distribution == "llama-index-readers-file"
+            else installed(distribution)
+        ),
+    )
+    assert cache.load(str(paper), "SimpleDirectoryReader") is None
+
+
+def test_truncated_entry_is_a_miss(tmp_path, paper):
+    cache = DocumentCache(str(tmp_path / "documents"))
+    cache.store(str(paper), "SimpleDirectoryReader", _documents(paper))
+    (entry,) = (tmp_path / "documents").iterdir()
+    entry.write_text(entry.read_text()[:20])
+    assert cache.load(str(paper), "SimpleDirectoryReader") is None
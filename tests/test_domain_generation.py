@@ -0,0 +1,163 @@
+import time
+import asyncio
+import copy
+import pytest
+from types import SimpleNamespace
+from bcorag.bcorag import BcoRag
+from bcorag.prompts import PROMPT_DOMAIN_MAP
+
+ALL_DOMAINS = ["usability", "io", "description", "execution", "parametric", "error"]
+
+
+def _bco_rag(bco_rag_factory, domain_map=PROMPT_DOMAIN_MAP) -> BcoRag:
+    """A BcoRag instance with the retrieval steps stubbed out, the domain
+    queries record their start and end instead of calling the LLM."""
+    bco_rag = bco_rag_factory(domain_map=domain_map)
+    bco_rag._create_query_bundle = lambda domain: domain
+    bco_rag.retrieve_all = lambda domains: {domain: [] for domain in domains}
+    bco_rag.rerank_all = lambda candidates: dict(candidates)
+    bco_rag.events = []
+    bco_rag.in_flight = 0
+    bco_rag.max_in_flight = 0
+    bco_rag.fail_on = None
+
+    async def aperform_query(domain, timeout=None, candidates=None, reranked=False):
+        bco_rag.events.append(("start", domain))
+        bco_rag.in_flight += 1
+        bco_rag.max_in_flight = max(bco_rag.max_in_flight, bco_rag.in_flight)
+        await asyncio.sleep(0.01)
+        bco_rag.in_flight -= 1
+        if domain == bco_rag.fail_on:
+            raise RuntimeError(f"{domain} failed")
+        bco_rag.domain_content[domain] = f"generated {domain}"
+        bco_rag.events.append(("end", domain))
+        return f"generated {domain}"
+
+    bco_rag.aperform_query = aperform_query
+    return bco_rag
+
+
+def test_order_places_dependencies_first(bco_rag_factory):
+    bco_rag = _bco_rag(bco_rag_factory)
+    order = bco_rag._domain_generation_order(list(reversed(ALL_DOMAINS)))
+    assert sorted(order) == sorted(ALL_DOMAINS)
+    assert order.index("description") < order.index("parametric")
+
+
+def test_order_adds_missing_dependencies(bco_rag_factory):
+    bco_rag = _bco_rag(bco_rag_factory)
+    assert bco_rag._domain_generation_order(["parametric"]) == [
+        "description",
+        "parametric",
+    ]
+    bco_rag.domain_content["description"] = "already generated"
+    assert bco_rag._domain_generation_order(["parametric"]) == ["parametric"]
+
+
+def test_order_rejects_cycles(bco_rag_factory):
+    domain_map = copy.deepcopy(PROMPT_DOMAIN_MAP)
+    domain_map["description"]["dependencies"] = ["parametric"]
+    with pytest.raises(ValueError):
+        _bco_rag(bco_rag_factory, domain_map)._domain_generation_order(["parametric"])
+
+
+def test_generate_all_waits_for_dependencies(bco_rag_factory):
+    bco_rag = _bco_rag(bco_rag_factory)
+    generated = bco_rag.generate_all()
+    assert generated == {domain: f"generated {domain}" for domain in generated}
+    assert sorted(generated) == sorted(ALL_DOMAINS)
+    assert bco_rag.events.index(("end", "description")) < bco_rag.events.index(
+        ("start", "parametric")
+    )
+    # the independent domains are queried concurrently
+    assert bco_rag.max_in_flight == 5
+
+
+def test_generate_all_max_concurrency(bco_rag_factory):
+    bco_rag = _bco_rag(bco_rag_factory)
+    bco_rag.generate_all(["usability", "io", "error"], max_concurrency=1)
+    assert bco_rag.max_in_flight == 1
+    with pytest.raises(ValueError):
+        bco_rag.generate_all(max_concurrency=0)
+
+
+def test_generate_all_cancels_on_failure(bco_rag_factory):
+    bco_rag = _bco_rag(bco_rag_factory)
+    bco_rag.fail_on = "description"
+    with pytest.raises(RuntimeError):
+        bco_rag.generate_all()
+    assert ("start", "parametric") not in bco_rag.events
+
+
+def _timed_bco_rag(bco_rag_factory, delays: dict, rerank_delay: float = 0.0) -> BcoRag:
+    """A BcoRag instance running the real async query path on a stub query
+    engine, the synthesis for a domain sleeps for its delay and the rerank
+    blocks its thread for `rerank_delay` seconds."""
+    bco_rag = bco_rag_factory(max_concurrent_queries=len(ALL_DOMAINS))
+    bco_rag._create_query_bundle = lambda domain: domain
+    bco_rag.retrieve_all = lambda domains: {domain: [] for domain in domains}
+    bco_rag.rerank_all = lambda candidates: dict(candidates)
+
+    def postprocess_nodes(nodes, query_bundle):
+        time.sleep(rerank_delay)
+        return nodes
+
+    async def aretrieve(query_bundle):
+        return []
+
+    async def asynthesize(query_bundle, nodes):
+        await asyncio.sleep(delays.get(query_bundle, 0.0))
+        return f"generated {query_bundle}"
+
+    def handle_query_response(domain, query_bundle, response_object, start_time):
+        bco_rag.domain_content[domain] = response_object
+        return response_object
+
+    bco_rag._rerank_postprocessor = SimpleNamespace(
+        postprocess_nodes=postprocess_nodes
+    )
+    bco_rag._query_engine = SimpleNamespace(
+        retriever=SimpleNamespace(aretrieve=aretrieve), asynthesize=asynthesize
+    )
+    bco_rag._handle_query_response = handle_query_response
+    return bco_rag
+
+
+def test_aperform_query_timeout_leaves_other_domains(bco_rag_factory):
+    bco_rag = _timed_bco_rag(bco_rag_factory, {"io": 5.0})
+
+    async def query_all():
+        return await asyncio.gather(
+            *(bco_rag.aperform_query(domain, timeout=0.2) for domain in ALL_DOMAINS),
+            return_exceptions=True,
+        )
+
+    results = dict(zip(ALL_DOMAINS, asyncio.run(query_all())))
+    assert isinstance(results.pop("io"), asyncio.TimeoutError)
+    assert results == {domain: f"generated {domain}" for domain in results}
+    assert bco_rag.domain_content["io"] is None
+
+
+def test_aperform_query_timeout_fires_during_rerank(bco_rag_factory):
+    bco_rag = _timed_bco_rag(bco_rag_factory, {}, rerank_delay=1.0)
+
+    async def query():
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            await bco_rag.aperform_query("usability", timeout=0.1, candidates=[])
+        return time.perf_counter() - start
+
+    # the rerank runs in a worker thread, so the timeout isn't held up by it
+    assert asyncio.run(query()) < 0.5
+    assert bco_rag.domain_content["usability"] is None
+
+
+def test_generate_all_timeout_cancels_dependents(bco_rag_factory):
+    bco_rag = _timed_bco_rag(bco_rag_factory, {"description": 5.0})
+    with pytest.raises(asyncio.TimeoutError):
+        bco_rag.generate_all(timeout=0.2)
+    # the independent domains finish, the domain waiting on the timed out
+    # dependency is cancelled
+    for domain in ["usability", "io", "execution", "error"]:
+        assert bco_rag.domain_content[domain] == f"generated {domain}"
+    assert bco_rag.domain_content["parametric"] is None
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from bcorag.cache.embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCache,
+    embedding_model_key,
+)
+from conftest import HashEmbedding
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_round_trip(cache):
+    cache.put_many("model", ["a", "b"], [[0.1, 0.2], [0.3, 0.4]])
+    found = cache.get_many("model", ["b", "missing", "a"])
+    assert found[1] is None
+    assert np.allclose(found[0], [0.3, 0.4]) and np.allclose(found[2], [0.1, 0.2])
+    # embeddings are keyed by model and kind
+    assert cache.get_many("other-model", ["a"]) == [None]
+    assert cache.get_many("model", ["a"], kind="query") == [None]
+
+
+def test_persists_across_connections(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache(path)
+    cache.put_many("model", ["a"], [[1.0, 2.0]])
+    cache.close()
+    cache = EmbeddingCache(path)
+    assert np.allclose(cache.get_many("model", ["a"])[0], [1.0, 2.0])
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    # each 4 dimension float32 vector is 16 bytes
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_size_bytes=48)
+    cache.put_many("model", ["a", "b"], [[1.0] * 4, [2.0] * 4])
+    cache.put_many("model", ["c"], [[3.0] * 4])
+    cache.get_many("model", ["a"])
+    cache.put_many("model", ["d"], [[4.0] * 4])
+    assert cache.size_bytes() <= 48
+    assert cache.get_many("model", ["b"]) == [None]
+    assert all(embedding is not None for embedding in cache.get_many("model", ["a", "d"]))
+    cache.close()
+
+
+def test_cached_embedding_only_embeds_misses(cache):
+    model = HashEmbedding()
+    cached_model = CachedEmbedding(model, cache)
+    texts = ["first text", "second text", "first text"]
+    embeddings = cached_model.get_text_embedding_batch(texts)
+    assert model.embedded == ["first text", "second text"]
+    assert np.allclose(embeddings, [model.vector(text) for text in texts])
+    assert cached_model.stats["misses"] == 2
+
+    # a new wrapper over the same cache (a later run) makes no embedding calls
+    other_model = HashEmbedding()
+    other_cached_model = CachedEmbedding(other_model, cache)
+    other_embeddings = other_cached_model.get_text_embedding_batch(
+        ["second text", "third text"]
+    )
+    assert other_model.embedded == ["third text"]
+    assert np.allclose(other_embeddings[0], embeddings[1], atol=1e-6)
+    stats = other_cached_model.stats
+    assert (stats["hits"], stats["misses"], stats["saved_tokens"]) == (1, 1, 2)
+
+
+def test_hits_use_the_stored_token_counts(cache, monkeypatch):
+    CachedEmbedding(HashEmbedding(), cache).get_text_embedding_batch(
+        ["first text", "second text"]
+    )
+    assert [
+        tokens for _, tokens in cache.get_entries("hash-embedding", ["first text"])
+    ] == [2]
+
+    # the hits are never tokenized again, only the misses
+    tokenized: list[str] = []
+    cached_model = CachedEmbedding(HashEmbedding(), cache)
+    monkeypatch.setattr(
+        cached_model, "_count_tokens", lambda text: tokenized.append(text) or 2
+    )
+    cached_model.get_text_embedding_batch(["first text", "second text", "third text"])
+    assert tokenized == ["third text"]
+    stats = cached_model.stats
+    assert (stats["saved_tokens"], stats["embedded_tokens"]) == (4, 2)
+
+
+def test_batched_lookup(cache):
+    texts = [f"text {i}" for i in range(1200)]
+    cache.put_many("model", texts, [[float(i)] for i in range(len(texts))])
+    found = cache.get_many("model", ["missing", *texts])
+    assert found[0] is None
+    assert [embedding[0] for embedding in found[1:]] == list(range(len(texts)))  # type: ignore
+
+
+def test_cached_query_embeddings(cache):
+    cached_model = CachedEmbedding(HashEmbedding(), cache)
+    cached_model.warm_queries(["query one", "query two"])
+    embeddings = cached_model.get_query_embedding_batch(["query two", "query one"])
+    assert np.allclose(embeddings[0], cached_model.embed_model.vector("query two"))
+    stats = cached_model.stats
+    assert (stats["query_hits"], stats["query_misses"]) == (2, 2)
+    # query embeddings don't populate the text embeddings
+    assert cache.get_many(cached_model.model_name, ["query one"]) == [None]
+
+
+def test_model_key_includes_dimensions():
+    model = HashEmbedding()
+    assert embedding_model_key(model) == "hash-embedding"
+    object.__setattr__(model, "dimensions", 256)
+    assert embedding_model_key(model) == "hash-embedding/256 dimensions"
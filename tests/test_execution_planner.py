@@ -0,0 +1,142 @@
+import logging
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from bcorag.custom_types.core_types import (
+    GitFilter,
+    UserSelections,
+    create_git_data,
+    create_git_filters,
+    create_user_selections,
+)
+from parameter_search import parameter_search
+from parameter_search.parameter_search import BcoParameterSearch
+from parameter_search.execution_planner import (
+    create_execution_plan,
+    index_group_key,
+)
+
+EXCLUDE = GithubRepositoryReader.FilterType.EXCLUDE
+
+
+def _param_set(
+    llm: str = "gpt-4o-mini",
+    similarity_top_k: int = 1,
+    chunking_config: str = "256 chunk size/20 chunk overlap",
+    filepath: str = "./bcorag/test_papers/paper.pdf",
+    git_filter_values: tuple[str, ...] = ("tests",),
+) -> UserSelections:
+    git_data = create_git_data(
+        "owner",
+        "repo",
+        "main",
+        [create_git_filters(EXCLUDE, GitFilter.DIRECTORY, list(git_filter_values))],
+    )
+    return create_user_selections(
+        llm,
+        "text-embedding-3-small",
+        "paper.pdf",
+        filepath,
+        "VectorStoreIndex",
+        "SimpleDirectoryReader",
+        "production",
+        similarity_top_k,
+        chunking_config,
+        git_data,
+        None,
+    )
+
+
+def test_query_parameters_share_an_index():
+    assert index_group_key(_param_set()) == index_group_key(
+        _param_set(llm="gpt-4o", similarity_top_k=3)
+    )
+    # equivalent file paths and reordered filter values are the same index
+    assert index_group_key(_param_set()) == index_group_key(
+        _param_set(filepath="bcorag/test_papers/../test_papers/paper.pdf")
+    )
+    assert index_group_key(_param_set(git_filter_values=("a", "b"))) == (
+        index_group_key(_param_set(git_filter_values=("b", "a")))
+    )
+    assert index_group_key(_param_set()) != index_group_key(
+        _param_set(git_filter_values=("docs",))
+    )
+    assert index_group_key(_param_set()) != index_group_key(
+        _param_set(chunking_config="semantic")
+    )
+
+
+def test_create_execution_plan():
+    param_sets = [
+        _param_set(llm="gpt-4o"),
+        _param_set(chunking_config="semantic"),
+        _param_set(llm="gpt-4o-mini", similarity_top_k=2),
+        _param_set(chunking_config="semantic", similarity_top_k=3),
+        _param_set(llm="gpt-4-turbo"),
+    ]
+    plan = create_execution_plan(param_sets)
+    # groups are ordered by first appearance, param sets keep their order
+    assert [group["param_sets"] for group in plan] == [
+        [param_sets[0], param_sets[2], param_sets[4]],
+        [param_sets[1], param_sets[3]],
+    ]
+    assert [group["group_key"] for group in plan] == [
+        index_group_key(param_sets[0]),
+        index_group_key(param_sets[1]),
+    ]
+    assert create_execution_plan([]) == []
+
+
+class StubBcoRag:
+    """Stands in for `BcoRag` in the parameter search, recording the shared
+    index each instance was created with and whether it was closed."""
+
+    def __init__(self, param_set, shared_index, chunking_sweep):
+        self.param_set = param_set
+        self.shared_index = shared_index
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.closed = True
+
+    def shared_indexes(self):
+        return {self.param_set["chunking_config"]: {"index_key": id(self)}}
+
+    def generate_all(self):
+        return {"usability": ""}
+
+    def embedding_cache_stats(self):
+        return None
+
+
+class StubSearch(BcoParameterSearch):
+
+    def __init__(self, param_sets: list[UserSelections]):
+        self.param_sets = param_sets
+        self.instances: list[StubBcoRag] = []
+        self._verbose = False
+        self._logger = logging.getLogger("bcorag.tests")
+        self.backoff_time = 0
+        self.delay_reset = 3
+
+    def _setup_logger(self, path: str = "", name: str = "") -> logging.Logger:
+        return self._logger
+
+    def _create_param_sets(self) -> list[UserSelections]:
+        return self.param_sets
+
+    def _create_bcorag(self, user_selections, shared_index=None, chunking_sweep=None):
+        instance = StubBcoRag(user_selections, shared_index, chunking_sweep)
+        self.instances.append(instance)
+        return instance
+
+
+def test_train_closes_every_bco_rag(monkeypatch):
+    monkeypatch.setattr(parameter_search, "STANDARD_BACKOFF", 0)
+    search = StubSearch([_param_set(llm="gpt-4o"), _param_set(llm="gpt-4o-mini")])
+    search.train()
+    first, second = search.instances
+    assert first.closed and second.closed
+    # the second param set reuses the index built by the first, closed instance
+    assert (first.shared_index, second.shared_index) == (None, {"index_key": id(first)})
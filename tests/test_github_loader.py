@@ -0,0 +1,256 @@
+import json
+import base64
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from bcorag.cache.snapshot_cache import SnapshotCache
+from bcorag.custom_types.core_types import GitFilter, create_git_filters
+from bcorag.github_loader import GithubSnapshotReader
+
+EXCLUDE = GithubRepositoryReader.FilterType.EXCLUDE
+
+BLOBS = {
+    "b-readme": b"# Readme\n",
+    "b-main": b"print('main')\n",
+    "b-big": b"x = 1\n" * 100,
+    "b-data": b"1,2,3\n",
+    "b-logo": b"\x89PNG",
+}
+
+TREES = {
+    "t-root": [
+        {"path": "README.md", "type": "blob", "sha": "b-readme", "size": 9},
+        {"path": "logo.png", "type": "blob", "sha": "b-logo", "size": 4},
+        {"path": "src", "type": "tree", "sha": "t-src"},
+        {"path": "data", "type": "tree", "sha": "t-data"},
+    ],
+    "t-src": [
+        {"path": "main.py", "type": "blob", "sha": "b-main", "size": 14},
+        {"path": "big.py", "type": "blob", "sha": "b-big", "size": 600},
+    ],
+    "t-data": [{"path": "values.csv", "type": "blob", "sha": "b-data", "size": 6}],
+}
+
+
+def _recursive_tree() -> list[dict]:
+    entries = []
+    for entry in TREES["t-root"]:
+        entries.append(entry)
+        if entry["type"] == "tree":
+            for child in TREES[entry["sha"]]:
+                entries.append({**child, "path": f"{entry['path']}/{child['path']}"})
+    return entries
+
+
+class StubGithub:
+    """Local stand-in for the github API endpoints used by the loader."""
+
+    def __init__(self):
+        self.requests: list[str] = []
+        self.truncated = False
+        # queued error responses per path, (status, headers)
+        self.failures: dict[str, list[tuple[int, dict[str, str]]]] = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requests.append(self.path)
+                queued = stub.failures.get(url.path)
+                if queued:
+                    status, headers = queued.pop(0)
+                    self._send(status, {"message": "error"}, headers)
+                    return
+                parts = url.path.strip("/").split("/")
+                if parts[3] == "branches" and parts[4] == "main":
+                    self._send(
+                        200,
+                        {"commit": {"sha": "c-1", "commit": {"tree": {"sha": "t-root"}}}},
+                    )
+                elif parts[3:5] == ["git", "trees"] and "recursive=1" in url.query:
+                    self._send(
+                        200,
+                        {
+                            "tree": [] if stub.truncated else _recursive_tree(),
+                            "truncated": stub.truncated,
+                        },
+                    )
+                elif parts[3:5] == ["git", "trees"] and parts[5] in TREES:
+                    self._send(200, {"tree": TREES[parts[5]], "truncated": False})
+                elif parts[3:5] == ["git", "blobs"] and parts[5] in BLOBS:
+                    content = base64.b64encode(BLOBS[parts[5]]).decode("ascii")
+                    self._send(200, {"encoding": "base64", "content": content})
+                else:
+                    self._send(404, {"message": "Not Found"})
+
+            def _send(self, status, data, headers=None):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def count(self, fragment: str) -> int:
+        return sum(1 for path in self.requests if fragment in path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def github():
+    stub = StubGithub()
+    yield stub
+    stub.close()
+
+
+def _reader(github: StubGithub, filters=None, cache=None, retries=2):
+    return GithubSnapshotReader(
+        "owner",
+        "repo",
+        filters=filters or [],
+        snapshot_cache=cache,
+        api_url=github.url,
+        retries=retries,
+        max_retry_wait=5,
+    )
+
+
+def test_resolve_branch(github):
+    reader = _reader(github)
+    assert reader.resolve_branch("main") == ("c-1", "t-root")
+
+
+def test_load_data_prunes_files(github):
+    filters = [
+        create_git_filters(EXCLUDE, GitFilter.DIRECTORY, ["data"]),
+        create_git_filters(EXCLUDE, GitFilter.MAX_FILE_SIZE, ["100"]),
+        create_git_filters(EXCLUDE, GitFilter.BINARY, []),
+    ]
+    reader = _reader(github, filters)
+    documents = reader.load_data("main")
+    assert sorted(document.metadata["file_path"] for document in documents) == [
+        "README.md",
+        "src/main.py",
+    ]
+    assert reader.prune_stats["pruned_files"] == {
+        "directory": 1,
+        "max_file_size": 1,
+        "binary": 1,
+    }
+    assert github.count("/git/blobs/b-big") == 0
+    assert github.count("/git/blobs/b-data") == 0
+
+
+def test_truncated_tree_walk(github):
+    github.truncated = True
+    filters = [create_git_filters(EXCLUDE, GitFilter.DIRECTORY, ["data"])]
+    reader = _reader(github, filters)
+    documents = reader.load_data("main")
+    assert sorted(document.metadata["file_path"] for document in documents) == [
+        "README.md",
+        "src/big.py",
+        "src/main.py",
+    ]
+    assert github.count("/git/trees/t-src") == 1
+    # the excluded directory is never listed
+    assert github.count("/git/trees/t-data") == 0
+
+
+def test_rate_limited_requests_are_retried(github):
+    blob_path = "/repos/owner/repo/git/blobs/b-main"
+    github.failures[blob_path] = [
+        (429, {"Retry-After": "0"}),
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}),
+    ]
+    reader = _reader(github)
+    contents = reader.fetch_blobs(["b-main", "b-readme", "b-main"])
+    assert contents == {"b-main": BLOBS["b-main"], "b-readme": BLOBS["b-readme"]}
+    assert github.count("/git/blobs/b-main") == 3
+    assert reader.failed_blobs == []
+
+
+def test_failed_blob_is_skipped_and_not_cached(github, tmp_path):
+    github.failures["/repos/owner/repo/git/blobs/b-main"] = [
+        (403, {"Retry-After": "0"})
+    ] * 3
+    cache = SnapshotCache(str(tmp_path))
+    reader = _reader(github, cache=cache, retries=1)
+    documents = reader.load_data("main")
+    paths = [document.metadata["file_path"] for document in documents]
+    assert "src/main.py" not in paths and "README.md" in paths
+    assert reader.failed_blobs == ["b-main"]
+    assert list(tmp_path.iterdir()) == []
+
+    # the next load fetches the snapshot again and caches it
+    documents = reader.load_data("main")
+    assert "src/main.py" in [document.metadata["file_path"] for document in documents]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_forbidden_request_is_not_retried(github):
+    github.failures["/repos/owner/repo/branches/main"] = [(403, {})]
+    reader = _reader(github)
+    with pytest.raises(Exception):
+        reader.resolve_branch("main")
+    assert github.count("/branches/main") == 1
+
+
+def test_snapshot_cache_is_reused(github, tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    first = _reader(github, cache=cache).load_data("main")
+    requests_made = len(github.requests)
+    second = _reader(github, cache=cache).load_data("main")
+    assert [document.text for document in second] == [
+        document.text for document in first
+    ]
+    assert [document.doc_id for document in second] == [
+        document.doc_id for document in first
+    ]
+    # only the branch is resolved again
+    assert github.requests[requests_made:] == ["/repos/owner/repo/branches/main"]
+
+
+def test_cached_snapshot_restores_the_prune_stats(github, tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    filters = [
+        create_git_filters(EXCLUDE, GitFilter.DIRECTORY, ["data"]),
+        create_git_filters(EXCLUDE, GitFilter.MAX_FILE_SIZE, ["100"]),
+    ]
+    first = _reader(github, filters, cache=cache)
+    first.load_data("main")
+    assert first.prune_stats["pruned_files"] == {"directory": 1, "max_file_size": 1}
+    requests_made = len(github.requests)
+    second = _reader(github, filters, cache=cache)
+    second.load_data("main")
+    assert len(github.requests) == requests_made + 1
+    assert second.prune_stats == first.prune_stats
+
+
+def test_truncated_snapshot_is_fetched_again(github, tmp_path):
+    cache = SnapshotCache(str(tmp_path))
+    first = _reader(github, cache=cache).load_data("main")
+    (entry,) = tmp_path.iterdir()
+    entry.write_text(entry.read_text()[:20])
+    requests_made = len(github.requests)
+    second = _reader(github, cache=cache).load_data("main")
+    assert [document.text for document in second] == [
+        document.text for document in first
+    ]
+    assert len(github.requests) > requests_made + 1
+    # the fetched snapshot replaces the truncated entry
+    assert cache.load(entry.stem) is not None
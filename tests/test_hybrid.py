@@ -0,0 +1,130 @@
+import math
+import pytest
+from collections import Counter
+from llama_index.core import VectorStoreIndex
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import TextNode
+from bcorag.hybrid import (
+    BM25Index,
+    HybridRetriever,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+TEXTS = [
+    "The pipeline reads FASTQ files and aligns the reads with bwa-mem.",
+    "Variant calling uses gatk.HaplotypeCaller on the aligned reads.",
+    "Install the dependencies with pip install -r requirements.txt.",
+    "The output VCF file lists the called variants.",
+    "Set max_threads in the config file to control parallelism.",
+]
+
+
+def _nodes() -> list[TextNode]:
+    return [TextNode(id_=f"node-{i}", text=text) for i, text in enumerate(TEXTS)]
+
+
+def _reference_scores(query: str, k1: float = 1.5, b: float = 0.75) -> list[float]:
+    """Textbook BM25, one node at a time."""
+    documents = [tokenize(text) for text in TEXTS]
+    average_length = sum(len(terms) for terms in documents) / len(documents)
+    scores = []
+    for terms in documents:
+        counts = Counter(terms)
+        score = 0.0
+        for term in set(tokenize(query)):
+            frequency = counts[term]
+            if frequency == 0:
+                continue
+            document_frequency = sum(term in document for document in documents)
+            idf = math.log(
+                1
+                + (len(documents) - document_frequency + 0.5)
+                / (document_frequency + 0.5)
+            )
+            score += (
+                idf
+                * frequency
+                * (k1 + 1)
+                / (frequency + k1 * (1 - b + b * len(terms) / average_length))
+            )
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_splits_compound_tokens():
+    assert tokenize("Calls gatk.HaplotypeCaller with max_threads") == [
+        "calls",
+        "gatk.haplotypecaller",
+        "gatk",
+        "haplotypecaller",
+        "max_threads",
+        "max",
+        "threads",
+    ]
+    assert tokenize("The reads of the file") == ["reads", "file"]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+    assert dict(fused)["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert dict(fused)["c"] == pytest.approx(1 / 63)
+    # ties keep the order the items were first seen in
+    assert [item for item, _ in reciprocal_rank_fusion([["x"], ["y"]])] == ["x", "y"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+@pytest.mark.parametrize(
+    "query", ["aligned reads", "gatk haplotypecaller variants", "max_threads", "vcf"]
+)
+def test_bm25_scores_match_reference(query):
+    index = BM25Index.from_nodes(_nodes())
+    assert index.scores(query).tolist() == pytest.approx(
+        _reference_scores(query), rel=1e-5
+    )
+
+
+def test_bm25_batch_query():
+    index = BM25Index.from_nodes(_nodes())
+    results = index.batch_query(["HaplotypeCaller", "requirements.txt", "unknown"], 3)
+    assert [node_id for node_id, _ in results[0]] == ["node-1"]
+    assert [node_id for node_id, _ in results[1]] == ["node-2"]
+    # nodes matching no query term are not returned
+    assert results[2] == []
+    assert BM25Index.from_nodes([]).batch_query(["reads"], 3) == [[]]
+
+
+def test_bm25_persist_round_trip(tmp_path):
+    index = BM25Index.from_nodes(_nodes())
+    assert BM25Index.from_persist_dir(str(tmp_path)) is None
+    index.persist(str(tmp_path))
+    loaded = BM25Index.from_persist_dir(str(tmp_path))
+    assert loaded is not None
+    assert loaded.node_ids == index.node_ids
+    for query in ["aligned reads", "vcf variants", "max_threads"]:
+        assert loaded.scores(query).tolist() == index.scores(query).tolist()
+
+
+def test_hybrid_retriever_fuses_rankings(embed_model):
+    nodes = _nodes()
+    index = VectorStoreIndex(nodes=nodes)
+    vector_retriever = VectorIndexRetriever(index=index, similarity_top_k=3)
+    bm25_index = BM25Index.from_nodes(nodes)
+    retriever = HybridRetriever(
+        vector_retriever=vector_retriever,
+        bm25_index=bm25_index,
+        docstore=index.docstore,
+        similarity_top_k=3,
+    )
+    query = "gatk.HaplotypeCaller variant calling"
+    results = retriever.retrieve(query)
+
+    vector_ranking = [node.node_id for node in vector_retriever.retrieve(query)]
+    bm25_ranking = [node_id for node_id, _ in bm25_index.batch_query([query], 3)[0]]
+    expected = reciprocal_rank_fusion([vector_ranking, bm25_ranking])[:3]
+    assert [(node.node_id, node.score) for node in results] == [
+        (node_id, pytest.approx(score)) for node_id, score in expected
+    ]
+    assert results[0].node_id == "node-1"
+    assert results[0].node.get_content() == TEXTS[1]
@@ -0,0 +1,105 @@
+import pytest
+from llama_index.core import Document
+from conftest import make_document
+
+
+def _v1():
+    return [
+        make_document("a.py", 300, 1),
+        make_document("b.py", 200, 2),
+        make_document("c.py", 150, 3),
+        make_document("dup.md", 40, 9),
+        make_document("dup.md", 40, 9),
+    ]
+
+
+def _v2():
+    # a.py unchanged, b.py changed, c.py removed, d.py added and one copy of
+    # the duplicated document removed
+    return [
+        make_document("a.py", 300, 1),
+        make_document("b.py", 200, 22),
+        make_document("d.py", 100, 4),
+        make_document("dup.md", 40, 9),
+    ]
+
+
+def _texts(index) -> list[str]:
+    return sorted(node.get_content() for node in index.docstore.docs.values())
+
+
+@pytest.mark.parametrize("vector_store", ["VectorStoreIndex", "NumpyFlatIndex/hybrid"])
+def test_incremental_update_matches_rebuild(
+    bco_rag_factory, embed_model, vector_store
+):
+    bco_rag_factory(_v1(), vector_store=vector_store, cache=True)._build_index()
+
+    embed_model.embedded.clear()
+    updated = bco_rag_factory(_v2(), vector_store=vector_store, cache=True)
+    index = updated._build_index()
+    incremental_embeds = len(embed_model.embedded)
+
+    embed_model.embedded.clear()
+    rebuilt = bco_rag_factory(_v2(), vector_store=vector_store)
+    reference = rebuilt._build_index()
+    full_embeds = len(embed_model.embedded)
+
+    assert _texts(index) == _texts(reference)
+    assert len(index.index_struct.nodes_dict) == len(reference.index_struct.nodes_dict)
+    assert not any("of c.py" in text for text in _texts(index))
+    # only the changed and added documents are embedded
+    assert 0 < incremental_embeds < full_embeds
+    for query in ["Line 5 of b.py sets value_5", "Line 12 of a.py", "d.py value_3"]:
+        assert [node.get_content() for node in index.as_retriever().retrieve(query)] == [
+            node.get_content() for node in reference.as_retriever().retrieve(query)
+        ]
+    if updated._hybrid:
+        assert updated._bm25_index is not None and rebuilt._bm25_index is not None
+        assert sorted(updated._bm25_index.node_ids) == sorted(index.docstore.docs)
+
+        def bm25_results(bco_rag, vector_index):
+            return [
+                (vector_index.docstore.get_node(node_id).get_content(), score)
+                for node_id, score in bco_rag._bm25_index.batch_query(["value_7"], 5)[0]
+            ]
+
+        updated_results = bm25_results(updated, index)
+        rebuilt_results = bm25_results(rebuilt, reference)
+        assert [text for text, _ in updated_results] == [
+            text for text, _ in rebuilt_results
+        ]
+        assert [score for _, score in updated_results] == pytest.approx(
+            [score for _, score in rebuilt_results]
+        )
+
+    # the updated index is cached under the new fingerprint
+    embed_model.embedded.clear()
+    reloaded = bco_rag_factory(_v2(), vector_store=vector_store, cache=True)
+    assert _texts(reloaded._build_index()) == _texts(reference)
+    assert embed_model.embedded == []
+    assert reloaded._index_key == updated._index_key
+    if reloaded._hybrid:
+        assert reloaded._bm25_index is not None
+
+
+def test_unrelated_documents_are_built_from_scratch(bco_rag_factory):
+    bco_rag_factory(_v1(), cache=True)._build_index()
+    other = [make_document("other.py", 100, 5)]
+    index = bco_rag_factory(other, cache=True)._build_index()
+    # no documents are shared, so no cached index is updated
+    assert all("of other.py" in text for text in _texts(index))
+
+
+def test_duplicate_document_ids_are_stable(bco_rag_factory):
+    def load() -> list[Document]:
+        bco_rag = bco_rag_factory()
+        bco_rag._other_docs = ["vendor/a.py", "a.py", "b.py"]
+        # copies of the same cached contents share the document ID
+        bco_rag._read_file = lambda path, loader: [
+            Document(text=path, id_="blob-b" if path == "b.py" else "blob-a")
+        ]
+        return bco_rag._load_documents(None)
+
+    ids = [document.doc_id for document in load()]
+    assert len(set(ids)) == len(ids)
+    assert ids == [document.doc_id for document in load()]
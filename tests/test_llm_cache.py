@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from llama_index.core.base.llms.types import ChatMessage, MessageRole
+from bcorag.bcorag import BcoRag
+from bcorag.cache.llm_cache import CachedLLM, LlmCache, LlmCacheMissError
+from conftest import StubLLM, make_user_selections
+
+
+def _messages(content: str) -> list[ChatMessage]:
+    return [
+        ChatMessage(role=MessageRole.SYSTEM, content="You generate BCO domains."),
+        ChatMessage(role=MessageRole.USER, content=content),
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LlmCache(str(tmp_path / "llm"))
+
+
+def test_record_then_replay(cache):
+    llm = StubLLM()
+    recorder = CachedLLM(llm, cache, "record")
+    completion = recorder.complete("usability").text
+    chat = recorder.chat(_messages("io")).message.content
+    assert llm.calls == 2
+    # recorded responses are served from the cache in both modes
+    assert recorder.complete("usability").text == completion
+    assert asyncio.run(recorder.achat(_messages("io"))).message.content == chat
+    assert llm.calls == 2
+
+    replay_llm = StubLLM()
+    replayer = CachedLLM(replay_llm, cache, "replay")
+    assert replayer.complete("usability").text == completion
+    assert asyncio.run(replayer.acomplete("usability")).text == completion
+    assert replayer.chat(_messages("io")).message.content == chat
+    assert replay_llm.calls == 0
+
+
+def test_replay_miss_raises(cache):
+    llm = StubLLM()
+    replayer = CachedLLM(llm, cache, "replay")
+    with pytest.raises(LlmCacheMissError):
+        replayer.complete("usability")
+    with pytest.raises(LlmCacheMissError):
+        replayer.chat(_messages("io"))
+    assert llm.calls == 0
+
+
+def test_generation_parameters_change_the_key(cache):
+    CachedLLM(StubLLM(temperature=0.0), cache, "record").complete("usability")
+    llm = StubLLM(temperature=0.7)
+    with pytest.raises(LlmCacheMissError):
+        CachedLLM(llm, cache, "replay").complete("usability")
+    # so do the call keyword arguments
+    recorder = CachedLLM(llm, cache, "record")
+    recorder.complete("usability")
+    recorder.complete("usability", formatted=True)
+    assert llm.calls == 2
+    # and the chat roles
+    recorder.chat([ChatMessage(role=MessageRole.USER, content="io")])
+    recorder.chat([ChatMessage(role=MessageRole.SYSTEM, content="io")])
+    assert llm.calls == 4
+
+
+def test_corrupted_entry_is_a_miss(cache, tmp_path):
+    llm = StubLLM()
+    recorder = CachedLLM(llm, cache, "record")
+    recorder.complete("usability")
+    (entry,) = (tmp_path / "llm").iterdir()
+    entry.write_text(entry.read_text()[:20])
+    recorder.complete("usability")
+    assert llm.calls == 2
+    assert len(list((tmp_path / "llm").iterdir())) == 1
+
+
+def test_replay_runs_offline(offline_models, tmp_path, monkeypatch):
+    cache_dir, output_dir = str(tmp_path / "cache"), str(tmp_path)
+    with pytest.raises(EnvironmentError):
+        BcoRag(make_user_selections(tmp_path, "record"), output_dir, cache_dir)
+    user_selections = make_user_selections(tmp_path, "replay")
+    with BcoRag(user_selections, output_dir, cache_dir) as bco_rag:
+        # without any recorded response the replay fails instead of calling the LLM
+        with pytest.raises(LlmCacheMissError):
+            bco_rag.perform_query("usability")
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    user_selections = make_user_selections(tmp_path, "record")
+    with BcoRag(user_selections, output_dir, cache_dir) as bco_rag:
+        recorded = bco_rag.perform_query("usability")
+    monkeypatch.delenv("OPENAI_API_KEY")
+    user_selections = make_user_selections(tmp_path, "replay")
+    with BcoRag(user_selections, output_dir, cache_dir) as bco_rag:
+        assert bco_rag.perform_query("usability") == recorded
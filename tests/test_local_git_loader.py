@@ -0,0 +1,168 @@
+import subprocess
+import pytest
+from pathlib import Path
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from bcorag.custom_types.core_types import GitFilter, create_git_filters
+from bcorag.local_git_loader import (
+    WORKING_TREE_REF,
+    LocalGitReader,
+    blob_sha,
+    local_repo_identity,
+)
+
+INCLUDE = GithubRepositoryReader.FilterType.INCLUDE
+EXCLUDE = GithubRepositoryReader.FilterType.EXCLUDE
+
+FILES = {
+    "README.md": "# Readme\n",
+    "setup.py": "print('setup')\n",
+    "src/main.py": "print('main')\n",
+    "src/util.PY": "print('util')\n",
+    "src/data/values.csv": "1,2,3\n",
+    "docs/usage.md": "Usage.\n",
+    "docs/copy.md": "Usage.\n",
+    "tests/test_main.py": "assert True\n",
+}
+
+
+def _git(path: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", str(path), *args], capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.fixture
+def repo(tmp_path) -> Path:
+    path = tmp_path / "repo"
+    for name, content in FILES.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content)
+    _git(path.parent, "init", "-q", str(path))
+    _git(path, "add", ".")
+    _git(
+        path,
+        "-c",
+        "user.name=test",
+        "-c",
+        "user.email=test@example.com",
+        "commit",
+        "-q",
+        "-m",
+        "initial",
+    )
+    _git(path, "tag", "v1")
+    return path
+
+
+def _files(documents) -> dict[str, str]:
+    return {document.metadata["file_path"]: document.text for document in documents}
+
+
+def test_ref_and_working_tree(repo):
+    (repo / "src" / "main.py").write_text("print('changed')\n")
+    (repo / "untracked.py").write_text("print('new')\n")
+    (repo / ".gitignore").write_text("ignored.py\n")
+    (repo / "ignored.py").write_text("print('ignored')\n")
+
+    # the ref is read from the git objects, ignoring the working tree
+    assert _files(LocalGitReader(str(repo)).load_data("v1")) == FILES
+    # the working tree includes the modified and untracked, non-ignored files
+    working_tree = _files(LocalGitReader(str(repo)).load_data(WORKING_TREE_REF))
+    assert working_tree == {
+        **FILES,
+        "src/main.py": "print('changed')\n",
+        "untracked.py": "print('new')\n",
+        ".gitignore": "ignored.py\n",
+    }
+
+
+def test_ref_reads_are_split_across_processes(repo):
+    for max_workers in [1, 3, 16]:
+        reader = LocalGitReader(str(repo), max_workers=max_workers)
+        assert _files(reader.load_data("v1")) == FILES
+
+
+def test_doc_ids_are_git_blob_shas(repo):
+    for ref in ["v1", WORKING_TREE_REF]:
+        for document in LocalGitReader(str(repo)).load_data(ref):
+            path = document.metadata["file_path"]
+            expected = _git(repo, "hash-object", path).strip()
+            assert document.doc_id == expected
+            assert blob_sha((repo / path).read_bytes()) == expected
+
+
+def test_unknown_ref(repo, tmp_path):
+    with pytest.raises(ValueError, match="`missing`"):
+        LocalGitReader(str(repo)).load_data("missing")
+    with pytest.raises(ValueError, match="`v1`"):
+        LocalGitReader(str(tmp_path / "not-a-repo")).load_data("v1")
+
+
+def test_not_a_git_checkout(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("print('main')\n")
+    documents = LocalGitReader(str(tmp_path)).load_data(WORKING_TREE_REF)
+    assert _files(documents) == {"src/main.py": "print('main')\n"}
+    assert local_repo_identity(str(tmp_path)) == ("local", tmp_path.name)
+
+
+@pytest.mark.parametrize(
+    "remote, identity",
+    [
+        ("https://github.com/Owner/Repo.git", ("owner", "repo")),
+        ("git@github.com:owner/repo.git", ("owner", "repo")),
+        ("https://github.com/owner/repo/", ("owner", "repo")),
+        ("https://gitlab.com/owner/repo.git", ("local", "repo")),
+    ],
+)
+def test_local_repo_identity(repo, remote, identity):
+    _git(repo, "remote", "add", "origin", remote)
+    assert local_repo_identity(str(repo)) == identity
+
+
+def _github_reader(directories=None, extensions=None) -> GithubRepositoryReader:
+    """The upstream github reader, only used for its filter checks."""
+    reader = GithubRepositoryReader.__new__(GithubRepositoryReader)
+    reader._verbose = False
+    reader._filter_directories = directories
+    reader._filter_file_extensions = extensions
+    return reader
+
+
+@pytest.mark.parametrize("directory_type", [INCLUDE, EXCLUDE, None])
+@pytest.mark.parametrize("extension_type", [INCLUDE, EXCLUDE, None])
+def test_filters_match_the_github_reader(repo, directory_type, extension_type):
+    directories, extensions = ["src", "docs/"], [".py", ".csv"]
+    filters = []
+    if directory_type is not None:
+        filters.append(
+            create_git_filters(directory_type, GitFilter.DIRECTORY, value=directories)
+        )
+    if extension_type is not None:
+        filters.append(
+            create_git_filters(
+                extension_type, GitFilter.FILE_EXTENSION, value=extensions
+            )
+        )
+    github = _github_reader(
+        (directories, directory_type) if directory_type is not None else None,
+        (extensions, extension_type) if extension_type is not None else None,
+    )
+    expected = {
+        path
+        for path in FILES
+        if github._check_filter_directories(path)
+        and github._check_filter_file_extensions(path)
+    }
+    for ref in ["v1", WORKING_TREE_REF]:
+        reader = LocalGitReader(str(repo), filters=filters)
+        assert set(_files(reader.load_data(ref))) == expected
+        assert sum(reader.prune_stats["pruned_files"].values()) == len(FILES) - len(
+            expected
+        )
+
+
+def test_undecodable_files_are_skipped(repo):
+    (repo / "logo.png").write_bytes(b"\x89PNG\xff\xfe")
+    documents = LocalGitReader(str(repo)).load_data(WORKING_TREE_REF)
+    assert set(_files(documents)) == set(FILES)
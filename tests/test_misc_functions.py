@@ -0,0 +1,35 @@
+import pytest
+from bcorag import misc_functions as misc_fns
+
+
+@pytest.mark.parametrize(
+    "option, expected",
+    [
+        ("text-embedding-3-small", ("text-embedding-3-small", None)),
+        ("text-embedding-ada-002", ("text-embedding-ada-002", None)),
+        (
+            "text-embedding-3-large/1024 dimensions",
+            ("text-embedding-3-large", 1024),
+        ),
+        (
+            "text-embedding-3-small / 256 dimensions",
+            ("text-embedding-3-small", 256),
+        ),
+    ],
+)
+def test_parse_embedding_model(option, expected):
+    assert misc_fns.parse_embedding_model(option) == expected
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        "text-embedding-3-large/1024",
+        "text-embedding-3-large/large dimensions",
+        "text-embedding-3-large/0 dimensions",
+        "text-embedding-ada-002/512 dimensions",
+    ],
+)
+def test_parse_embedding_model_rejects_invalid_options(option):
+    with pytest.raises(ValueError):
+        misc_fns.parse_embedding_model(option)
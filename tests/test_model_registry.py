@@ -0,0 +1,76 @@
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from bcorag.model_registry import ModelRegistry
+
+
+class StubLoader:
+    """Loads a new object per call, slowly, counting the loads per key."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.loads: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key: str):
+        def load():
+            time.sleep(self.delay)
+            with self._lock:
+                self.loads[key] = self.loads.get(key, 0) + 1
+            return object()
+
+        return load
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_each_key_is_loaded_once():
+    registry = ModelRegistry(idle_timeout=None)
+    loader = StubLoader()
+
+    def use(key: str):
+        with registry.use(key, loader(key)) as model:
+            return model
+
+    keys = ["a", "b"] * 8
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        models = list(executor.map(use, keys))
+    assert loader.loads == {"a": 1, "b": 1}
+    assert len({id(model) for model in models[::2]}) == 1
+    assert models[0] is not models[1]
+
+
+def test_idle_models_are_evicted_and_reloaded():
+    registry = ModelRegistry(idle_timeout=0.1)
+    loader = StubLoader(delay=0.0)
+    with registry.use("a", loader("a")) as first:
+        # a model in use is never evicted
+        time.sleep(0.2)
+        assert registry.evict_idle() == 0
+        assert registry.is_loaded("a")
+    # the reaper thread frees the model once it has been idle for too long
+    assert _wait_for(lambda: not registry.is_loaded("a"))
+    with registry.use("a", loader("a")) as second:
+        assert second is not first
+    assert loader.loads == {"a": 2}
+
+
+def test_eviction_disabled():
+    registry = ModelRegistry(idle_timeout=None)
+    loader = StubLoader(delay=0.0)
+    with registry.use("a", loader("a")):
+        pass
+    assert registry.evict_idle() == 0
+    assert registry.is_loaded("a")
+    registry.clear()
+    assert not registry.is_loaded("a")
+    with pytest.raises(ValueError):
+        ModelRegistry(idle_timeout=0)
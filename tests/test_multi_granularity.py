@@ -0,0 +1,65 @@
+from bcorag.multi_granularity import chunk_documents
+from conftest import make_document
+
+CONFIGS = [
+    "256 chunk size/20 chunk overlap",
+    "512 chunk size/50 chunk overlap",
+    "1024 chunk size/20 chunk overlap",
+]
+
+
+def _documents():
+    # the short documents fit in a single chunk at every chunk size
+    return [
+        make_document("a.py", 200, 1),
+        make_document("b.py", 120, 2),
+        make_document("short.md", 4, 3),
+        make_document("other.md", 6, 4),
+    ]
+
+
+def _nodes(index) -> list[tuple[str, dict, list[float]]]:
+    """The content, metadata and embedding of every node of an index."""
+    return sorted(
+        (
+            node.get_content(),
+            node.metadata,
+            index.vector_store.get(node.node_id),
+        )
+        for node in index.docstore.docs.values()
+    )
+
+
+def test_sweep_matches_separate_builds(bco_rag_factory, embed_model):
+    sweep = bco_rag_factory(
+        _documents(), chunking_config=CONFIGS[0], chunking_sweep=CONFIGS
+    )
+    sweep._build_index()
+    shared_indexes = sweep.shared_indexes()
+    assert list(shared_indexes) == CONFIGS
+    # every distinct chunk across the granularities is embedded once
+    swept_texts = list(embed_model.embedded)
+    assert len(swept_texts) == len(set(swept_texts))
+
+    separate_texts: list[str] = []
+    for chunking_config in CONFIGS:
+        embed_model.embedded.clear()
+        separate = bco_rag_factory(_documents(), chunking_config=chunking_config)
+        reference = separate._build_index()
+        separate_texts += embed_model.embedded
+        shared = shared_indexes[chunking_config]
+        assert shared["index_key"] == separate._index_key
+        assert _nodes(shared["index"]) == _nodes(reference)
+    # the short documents are single chunks shared by every granularity
+    assert len(swept_texts) == len(set(separate_texts)) < len(separate_texts)
+
+
+def test_fixed_size_chunking_matches_the_sentence_splitter(bco_rag_factory):
+    nodes_by_config = chunk_documents(_documents(), CONFIGS)
+    for chunking_config in CONFIGS:
+        separate = bco_rag_factory(_documents(), chunking_config=chunking_config)
+        reference = separate._parse_nodes(separate._documents)
+        assert [node.get_content() for node in nodes_by_config[chunking_config]] == [
+            node.get_content() for node in reference
+        ]
+        assert all(node.embedding is None for node in nodes_by_config[chunking_config])
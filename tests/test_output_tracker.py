@@ -0,0 +1,141 @@
+import csv
+import json
+import shutil
+import sqlite3
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from bcorag import misc_functions as misc_fns
+from bcorag.cache.embedding_cache import EmbeddingCache
+from bcorag.custom_types.output_map_types import (
+    create_output_tracker_param_set,
+    create_output_tracker_runs_entry,
+)
+from bcorag.output_tracker import (
+    OUTPUT_MAP_JSON,
+    OUTPUT_MAP_TSV,
+    OutputTracker,
+    export_output_maps,
+    load_output_map,
+)
+
+
+def _params(llm: str = "gpt-4o-mini"):
+    return create_output_tracker_param_set(
+        "SimpleDirectoryReader",
+        "VectorStoreIndex",
+        llm,
+        "text-embedding-3-small",
+        2,
+        "256 chunk size/20 chunk overlap",
+        None,
+        None,
+        None,
+    )
+
+
+def _record(tracker: OutputTracker, domain, hash_str: str, llm: str = "gpt-4o-mini"):
+    index = tracker.reserve_run(domain, hash_str, _params(llm))
+    tracker.add_run(
+        domain,
+        hash_str,
+        create_output_tracker_runs_entry(
+            index,
+            "2024-01-01-00-00-00",
+            f"/out/{domain}-{hash_str}-{index}.txt",
+            f"/out/{domain}-{hash_str}-{index}.json",
+            f"/out/{domain}-{hash_str}-{index}-source.txt",
+            1.5,
+        ),
+    )
+    return index
+
+
+def test_concurrent_reservations_are_distinct(tmp_path):
+    tracker = OutputTracker(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        indexes = list(
+            executor.map(lambda _: _record(tracker, "usability", "hash-a"), range(40))
+        )
+    assert sorted(indexes) == list(range(1, 41))
+    # other domains and parameter sets count separately
+    assert _record(tracker, "io", "hash-a") == 1
+    assert _record(tracker, "usability", "hash-b", llm="gpt-4o") == 1
+    output_map = tracker.materialize()
+    entries = output_map["usability"][0]["entries"]
+    assert entries["curr_index"] == 40 and len(entries["runs"]) == 40
+    tracker.close()
+
+
+def test_runs_do_not_rewrite_the_views(tmp_path):
+    tracker = OutputTracker(str(tmp_path))
+    _record(tracker, "usability", "hash-a")
+    assert not (tmp_path / OUTPUT_MAP_JSON).exists()
+    # readers materialize the output map from the database
+    assert load_output_map(str(tmp_path)) == tracker.materialize()
+    tracker.close()
+
+
+def test_closing_bco_rag_exports_the_views(bco_rag_factory, tmp_path):
+    bco_rag = bco_rag_factory()
+    bco_rag._embedding_cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    output_path = tmp_path / "output" / "paper"
+    with bco_rag:
+        _record(bco_rag._output_tracker, "usability", "hash-a")
+        assert not (output_path / OUTPUT_MAP_JSON).exists()
+    assert misc_fns.load_json(str(output_path / OUTPUT_MAP_JSON)) == load_output_map(
+        str(output_path)
+    )
+    assert (output_path / OUTPUT_MAP_TSV).exists()
+    # the instance's connections are closed
+    with pytest.raises(sqlite3.ProgrammingError):
+        bco_rag._embedding_cache.size_bytes()
+    with pytest.raises(sqlite3.ProgrammingError):
+        bco_rag._output_tracker.materialize()
+
+
+def test_export_round_trip(tmp_path):
+    first = tmp_path / "first"
+    tracker = OutputTracker(str(first))
+    _record(tracker, "usability", "hash-a")
+    _record(tracker, "usability", "hash-a")
+    _record(tracker, "parametric", "hash-b", llm="gpt-4o")
+    assert tracker.export()
+    output_map = tracker.materialize()
+    tracker.close()
+
+    assert misc_fns.load_output_tracker(str(first / OUTPUT_MAP_JSON)) == output_map
+    with open(first / OUTPUT_MAP_JSON) as f:
+        assert json.load(f)["usability"][0]["hash_str"] == "hash-a"
+    with open(first / OUTPUT_MAP_TSV, newline="") as f:
+        rows = list(csv.DictReader(f, delimiter="\t"))
+    assert [(row["domain"], row["index"], row["llm"]) for row in rows] == [
+        ("usability", "1", "gpt-4o-mini"),
+        ("usability", "2", "gpt-4o-mini"),
+        ("parametric", "1", "gpt-4o"),
+    ]
+    assert rows[0]["txt_file"] == "usability-hash-a-1.txt"
+
+    # exporting every output directory under a directory
+    assert export_output_maps(str(tmp_path)) == [str(first)]
+
+
+def test_legacy_output_map_is_imported(tmp_path):
+    legacy = tmp_path / "legacy"
+    tracker = OutputTracker(str(legacy))
+    _record(tracker, "usability", "hash-a")
+    _record(tracker, "usability", "hash-a")
+    tracker.export()
+    output_map = tracker.materialize()
+    tracker.close()
+
+    # an output directory from before the tracker only has the JSON map
+    imported = tmp_path / "imported"
+    imported.mkdir()
+    shutil.copy(legacy / OUTPUT_MAP_JSON, imported / OUTPUT_MAP_JSON)
+    assert load_output_map(str(imported)) == output_map
+    tracker = OutputTracker(str(imported))
+    assert tracker.materialize() == output_map
+    # the run indexes carry on from the imported runs
+    assert _record(tracker, "usability", "hash-a") == 3
+    assert _record(tracker, "io", "hash-a") == 1
+    tracker.close()
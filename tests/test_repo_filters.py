@@ -0,0 +1,104 @@
+import pytest
+from llama_index.readers.github import GithubRepositoryReader  # type: ignore
+from bcorag.custom_types.core_types import GitFilter, create_git_filters
+from bcorag.repo_filters import (
+    BYTES_PER_TOKEN,
+    create_prune_stats,
+    filter_reason,
+    format_prune_stats,
+    is_binary_or_minified,
+    match_glob,
+    prune_file,
+)
+
+INCLUDE = GithubRepositoryReader.FilterType.INCLUDE
+EXCLUDE = GithubRepositoryReader.FilterType.EXCLUDE
+
+
+@pytest.mark.parametrize(
+    "path, patterns, expected",
+    [
+        ("src/app/test_main.py", ["test_*.py"], True),
+        ("src/app/main.py", ["test_*.py"], False),
+        ("docs/api/index.md", ["docs/*"], True),
+        # patterns with a `/` match the full path
+        ("src/docs/index.md", ["docs/*"], False),
+        ("Data/Values.CSV", ["*.csv"], False),
+    ],
+)
+def test_match_glob(path, patterns, expected):
+    assert match_glob(path, patterns) == expected
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("assets/logo.PNG", True),
+        ("dist/app.min.js", True),
+        ("static/Style.Min.CSS", True),
+        ("data/reads.bam", True),
+        ("src/main.py", False),
+        ("src/minimal.js", False),
+    ],
+)
+def test_is_binary_or_minified(path, expected):
+    assert is_binary_or_minified(path) == expected
+
+
+def test_binary_extra_patterns():
+    assert is_binary_or_minified("vendor/lib.generated.ts", ["*.generated.ts"])
+    assert not is_binary_or_minified("src/lib.ts", ["*.generated.ts"])
+
+
+def test_filter_reason():
+    filters = [
+        create_git_filters(EXCLUDE, GitFilter.DIRECTORY, ["tests"]),
+        create_git_filters(INCLUDE, GitFilter.FILE_EXTENSION, [".py", ".md", ".png"]),
+        create_git_filters(EXCLUDE, GitFilter.GLOB, ["*_pb2.py"]),
+        create_git_filters(EXCLUDE, GitFilter.MAX_FILE_SIZE, ["1000"]),
+        create_git_filters(EXCLUDE, GitFilter.BINARY, []),
+    ]
+    assert filter_reason("src/main.py", 500, filters) is None
+    assert filter_reason("tests/test_main.py", 500, filters) == GitFilter.DIRECTORY
+    assert filter_reason("src/main.js", 500, filters) == GitFilter.FILE_EXTENSION
+    assert filter_reason("src/api_pb2.py", 500, filters) == GitFilter.GLOB
+    assert filter_reason("src/big.py", 5000, filters) == GitFilter.MAX_FILE_SIZE
+    # an unknown size skips the size filter
+    assert filter_reason("src/big.py", None, filters) is None
+    assert filter_reason("docs/logo.png", 500, filters) == GitFilter.BINARY
+    # the first failed filter is reported
+    assert filter_reason("tests/big.js", 5000, filters) == GitFilter.DIRECTORY
+    assert filter_reason("anything.bin", 10**9, []) is None
+
+
+def test_include_glob():
+    filters = [create_git_filters(INCLUDE, GitFilter.GLOB, ["src/*", "README.md"])]
+    assert filter_reason("src/main.py", None, filters) is None
+    assert filter_reason("docs/README.md", None, filters) is None
+    assert filter_reason("docs/index.md", None, filters) == GitFilter.GLOB
+
+
+def test_prune_file_tallies_stats():
+    filters = [
+        create_git_filters(EXCLUDE, GitFilter.DIRECTORY, ["data"]),
+        create_git_filters(EXCLUDE, GitFilter.MAX_FILE_SIZE, ["1000"]),
+    ]
+    stats = create_prune_stats()
+    kept = [
+        prune_file(path, size, filters, stats)
+        for path, size in [
+            ("src/main.py", 100),
+            ("data/a.csv", 400),
+            ("data/b.csv", None),
+            ("src/big.py", 4000),
+        ]
+    ]
+    assert kept == [True, False, False, False]
+    assert stats["pruned_files"] == {"directory": 2, "max_file_size": 1}
+    assert stats["pruned_bytes"] == {"directory": 400, "max_file_size": 4000}
+    assert stats["estimated_tokens"] == 4400 // BYTES_PER_TOKEN
+    assert format_prune_stats(stats).splitlines() == [
+        "directory: 2 file(s), 400 bytes",
+        "max_file_size: 1 file(s), 4000 bytes",
+        f"estimated tokens saved: {4400 // BYTES_PER_TOKEN}",
+    ]
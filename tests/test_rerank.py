@@ -0,0 +1,108 @@
+import pytest
+from llama_index.core import QueryBundle
+from llama_index.core.schema import NodeWithScore, TextNode
+from bcorag.model_registry import MODEL_REGISTRY
+from bcorag.rerank import SCORE_CACHE, ScoreCache, SharedRerank
+from conftest import StubCrossEncoder
+
+
+@pytest.fixture
+def cross_encoder(monkeypatch):
+    stub = StubCrossEncoder()
+    monkeypatch.setattr("bcorag.rerank.load_cross_encoder", lambda model, device: stub)
+    MODEL_REGISTRY.clear()
+    SCORE_CACHE.clear()
+    yield stub
+    MODEL_REGISTRY.clear()
+    SCORE_CACHE.clear()
+
+
+TEXTS = [
+    "the pipeline inputs are fastq files",
+    "usage of the pipeline command line",
+    "error handling of missing inputs",
+    "the outputs are bed files",
+]
+
+
+def _candidates() -> list[NodeWithScore]:
+    return [
+        NodeWithScore(node=TextNode(text=text, id_=f"node-{i}"), score=0.5)
+        for i, text in enumerate(TEXTS)
+    ]
+
+
+def _bundle(query: str) -> QueryBundle:
+    return QueryBundle(query_str=query)
+
+
+def _ranked(nodes: list[NodeWithScore]) -> list[tuple[str, float]]:
+    return [(node.node.node_id, node.score) for node in nodes]  # type: ignore
+
+
+def test_batch_matches_single_queries(cross_encoder):
+    rerank = SharedRerank(top_n=2, device="cpu")
+    queries = ["the pipeline inputs", "the pipeline usage", "the outputs files"]
+    batched = rerank.postprocess_batch(
+        [(_candidates(), _bundle(query)) for query in queries]
+    )
+    SCORE_CACHE.clear()
+    single = [
+        rerank.postprocess_nodes(_candidates(), query_bundle=_bundle(query))
+        for query in queries
+    ]
+    assert [_ranked(nodes) for nodes in batched] == [
+        _ranked(nodes) for nodes in single
+    ]
+
+
+def test_batch_scores_each_pair_once(cross_encoder):
+    rerank = SharedRerank(top_n=4, device="cpu", keep_retrieval_score=True)
+    shared = _candidates()
+    # the same node objects are candidates of both requests, and twice of one
+    first, second = rerank.postprocess_batch(
+        [
+            (shared + shared[:1], _bundle("the pipeline inputs")),
+            (shared, _bundle("the outputs files")),
+        ]
+    )
+    pairs = cross_encoder.pairs
+    assert len(pairs) == len(set(pairs)) == 2 * len(TEXTS)
+    # the scores of one request don't leak into the other
+    assert dict(_ranked(first))["node-0"] == 3.0
+    assert dict(_ranked(second))["node-0"] == 2.0
+    assert {node.node.metadata["retrieval_score"] for node in first + second} == {0.5}
+
+
+def test_scores_are_reused_across_instances(cross_encoder):
+    queries = ["the pipeline inputs", "the outputs files"]
+    first = SharedRerank(top_n=2, device="cpu").postprocess_batch(
+        [(_candidates(), _bundle(query)) for query in queries]
+    )
+    scored = len(cross_encoder.pairs)
+    # another parameter set sharing the retrieval prompts, with another top n
+    second = SharedRerank(top_n=1, device="cpu").postprocess_batch(
+        [(_candidates(), _bundle(query)) for query in queries]
+    )
+    assert len(cross_encoder.pairs) == scored
+    assert [_ranked(nodes)[:1] for nodes in first] == [
+        _ranked(nodes) for nodes in second
+    ]
+    # a new query or another model is scored again
+    SharedRerank(top_n=1, device="cpu").postprocess_nodes(
+        _candidates(), query_bundle=_bundle("missing inputs")
+    )
+    SharedRerank(model="other-model", top_n=1, device="cpu").postprocess_nodes(
+        _candidates(), query_bundle=_bundle("the pipeline inputs")
+    )
+    assert len(cross_encoder.pairs) == scored + 2 * len(TEXTS)
+
+
+def test_score_cache_is_bounded():
+    cache = ScoreCache(max_scores=2)
+    cache.put_many(["a", "b"], [1.0, 2.0])
+    assert cache.get_many(["a"]) == [1.0]
+    cache.put_many(["c"], [3.0])
+    # "b" was the least recently used
+    assert cache.get_many(["a", "b", "c"]) == [1.0, None, 3.0]
+    assert len(cache) == 2
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from llama_index.core import QueryBundle
+from llama_index.core.schema import NodeWithScore, TextNode
+from bcorag.bcorag import BcoRag
+from bcorag.cache.retrieval_cache import RetrievalCache
+
+
+def _nodes() -> list[NodeWithScore]:
+    return [
+        NodeWithScore(node=TextNode(text="The usage.", id_="node-1"), score=0.9),
+        NodeWithScore(node=TextNode(text="The inputs.", id_="node-2"), score=None),
+    ]
+
+
+def _bco_rag(bco_rag_factory, index_key="index-a", top_k=2, rerank_model="model-a"):
+    """A BcoRag instance running the real async query path with a retrieval
+    cache, on a stub query engine counting the retrievals and reranks."""
+    bco_rag = bco_rag_factory(cache=True, similarity_top_k=top_k)
+    bco_rag._index_key = index_key
+    bco_rag.calls = {"aretrieve": 0, "rerank": 0}
+    bco_rag._create_query_bundle = lambda domain: QueryBundle(
+        query_str=f"Generate the {domain} domain.",
+        custom_embedding_strs=[f"Retrieve for the {domain} domain."],
+    )
+
+    async def aretrieve(query_bundle):
+        bco_rag.calls["aretrieve"] += 1
+        return _nodes()
+
+    def postprocess_nodes(nodes, query_bundle):
+        bco_rag.calls["rerank"] += 1
+        return nodes[:top_k]
+
+    async def asynthesize(query_bundle, nodes):
+        return nodes
+
+    bco_rag._rerank_postprocessor = SimpleNamespace(
+        model=rerank_model, postprocess_nodes=postprocess_nodes
+    )
+    bco_rag._query_engine = SimpleNamespace(
+        retriever=SimpleNamespace(aretrieve=aretrieve), asynthesize=asynthesize
+    )
+    bco_rag._handle_query_response = lambda domain, bundle, nodes, start: nodes
+    return bco_rag
+
+
+def _query(bco_rag: BcoRag, domain="usability") -> list[NodeWithScore]:
+    return asyncio.run(bco_rag.aperform_query(domain))  # type: ignore
+
+
+def test_round_trip(tmp_path):
+    cache = RetrievalCache(str(tmp_path))
+    assert cache.load("key") is None
+    assert cache.store("key", _nodes())
+    cached = cache.load("key")
+    assert cached is not None
+    assert [
+        (node.node.node_id, node.node.get_content(), node.score) for node in cached
+    ] == [(node.node.node_id, node.node.get_content(), node.score) for node in _nodes()]
+
+
+def test_hit_skips_retrieval_and_rerank(bco_rag_factory):
+    first = _bco_rag(bco_rag_factory)
+    nodes = _query(first)
+    assert first.calls == {"aretrieve": 1, "rerank": 1}  # type: ignore
+
+    second = _bco_rag(bco_rag_factory)
+    cached = _query(second)
+    assert second.calls == {"aretrieve": 0, "rerank": 0}  # type: ignore
+    assert [node.node.node_id for node in cached] == [
+        node.node.node_id for node in nodes
+    ]
+    # every domain has its own entry
+    _query(second, "io")
+    assert second.calls == {"aretrieve": 1, "rerank": 1}  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "changed", [{"top_k": 1}, {"rerank_model": "model-b"}, {"index_key": "index-b"}]
+)
+def test_changed_parameters_miss(bco_rag_factory, changed):
+    _query(_bco_rag(bco_rag_factory))
+    bco_rag = _bco_rag(bco_rag_factory, **changed)
+    _query(bco_rag)
+    assert bco_rag.calls == {"aretrieve": 1, "rerank": 1}  # type: ignore
+
+
+def test_disabled_without_an_index_key(bco_rag_factory, tmp_path):
+    _query(_bco_rag(bco_rag_factory, index_key=None))
+    assert list((tmp_path / "retrieval_cache").iterdir()) == []
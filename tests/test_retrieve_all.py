@@ -0,0 +1,67 @@
+import pytest
+from types import SimpleNamespace
+from llama_index.core import QueryBundle
+from llama_index.core.retrievers import VectorIndexRetriever
+from bcorag.bcorag import BcoRag
+from bcorag.hybrid import BM25Index, HybridRetriever
+from bcorag.prompts import RETRIEVAL_PROMPT
+from bcorag.vector_stores import missing_dependency
+from conftest import make_document
+
+VECTOR_STORES = [
+    "VectorStoreIndex",
+    "VectorStoreIndex/hybrid",
+    "NumpyFlatIndex",
+    "NumpyFlatIndex/hybrid",
+    "HNSWIndex",
+    "FaissFlatIndex",
+]
+
+
+def _index(bco_rag: BcoRag):
+    """Builds the index and the retriever the way the constructor does."""
+    bco_rag._index = bco_rag._build_index()
+    if bco_rag._hybrid and bco_rag._bm25_index is None:
+        bco_rag._bm25_index = BM25Index.from_nodes(
+            list(bco_rag._index.docstore.docs.values())
+        )
+    top_k = bco_rag._similarity_top_k * 3
+    retriever = VectorIndexRetriever(index=bco_rag._index, similarity_top_k=top_k)
+    if bco_rag._bm25_index is not None:
+        retriever = HybridRetriever(
+            vector_retriever=retriever,
+            bm25_index=bco_rag._bm25_index,
+            docstore=bco_rag._index.docstore,
+            similarity_top_k=top_k,
+        )
+    bco_rag._query_engine = SimpleNamespace(retriever=retriever)
+
+
+@pytest.mark.parametrize("vector_store", VECTOR_STORES)
+def test_retrieve_all_matches_retriever(bco_rag_factory, vector_store):
+    if missing_dependency(vector_store) is not None:
+        pytest.skip(f"{missing_dependency(vector_store)} is not installed")
+    documents = [
+        make_document("src/main.py", 120, 1),
+        make_document("README.md", 80, 2),
+        make_document("docs/usage.md", 60, 3),
+    ]
+    bco_rag = bco_rag_factory(documents, vector_store=vector_store)
+    _index(bco_rag)
+    domains = ["usability", "io", "description", "execution", "parametric", "error"]
+    candidates = bco_rag.retrieve_all(domains)
+
+    assert list(candidates) == domains
+    for domain in domains:
+        query = RETRIEVAL_PROMPT.format(
+            domain, bco_rag._domain_map[domain]["retrieval_prompt"]
+        )
+        expected = bco_rag._query_engine.retriever.retrieve(QueryBundle(query))
+        assert len(candidates[domain]) == bco_rag._similarity_top_k * 3
+        assert [node.node_id for node in candidates[domain]] == [
+            node.node_id for node in expected
+        ]
+        assert [node.score for node in candidates[domain]] == pytest.approx(
+            [node.score for node in expected], abs=1e-5
+        )
+    assert bco_rag.retrieve_all([]) == {}
@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+from llama_index.core import Document
+from llama_index.core.schema import MetadataMode
+from bcorag.semantic_splitter import EmbeddingReuseSemanticSplitter
+from conftest import HashEmbedding
+
+TEXTS = [
+    "The pipeline reads fastq files. It writes bed files.",
+    "Usage is simple. Run the command. Then read the output. Errors are logged to a file. The end is near.",
+]
+
+
+def _splitter(embed_model: HashEmbedding) -> EmbeddingReuseSemanticSplitter:
+    return EmbeddingReuseSemanticSplitter.from_defaults(
+        buffer_size=1, embed_model=embed_model, breakpoint_percentile_threshold=95
+    )
+
+
+def _documents(excluded_embed_metadata_keys=None) -> list[Document]:
+    return [
+        Document(
+            text=text,
+            metadata={"file_path": f"doc-{i}.txt"},
+            excluded_embed_metadata_keys=excluded_embed_metadata_keys or [],
+        )
+        for i, text in enumerate(TEXTS)
+    ]
+
+
+def _check_embeddings(embed_model: HashEmbedding, nodes) -> int:
+    """Checks every reused embedding is the embedding of the node's embedding
+    content and returns the number of nodes with an embedding."""
+    reused = [node for node in nodes if node.embedding is not None]
+    for node in reused:
+        content = node.get_content(metadata_mode=MetadataMode.EMBED)
+        assert np.allclose(node.embedding, embed_model.vector(content))
+    return len(reused)
+
+
+def test_built_nodes_reuse_the_sentence_group_embeddings():
+    embed_model = HashEmbedding()
+    splitter = _splitter(embed_model)
+    nodes = splitter.build_semantic_nodes_from_documents(_documents())
+    assert _check_embeddings(embed_model, nodes) == splitter.reused_embeddings > 0
+
+
+@pytest.mark.parametrize(
+    "excluded_embed_metadata_keys, reused", [(None, False), (["file_path"], True)]
+)
+def test_transformation_matches_the_final_embedding_content(
+    excluded_embed_metadata_keys, reused
+):
+    embed_model = HashEmbedding()
+    splitter = _splitter(embed_model)
+    nodes = splitter.get_nodes_from_documents(_documents(excluded_embed_metadata_keys))
+    assert all(node.metadata["file_path"] for node in nodes)
+    # nodes embedding the file path never get a metadata-free embedding
+    assert _check_embeddings(embed_model, nodes) == splitter.reused_embeddings
+    assert (splitter.reused_embeddings > 0) == reused
+    # the sentence group embeddings are released after every call
+    assert splitter._chunk_embeddings == {}
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore, VectorStoreQuery
+from bcorag.similarity import EmbeddingMatrix, top_k_indices
+from bcorag.vector_stores.simple_matrix import MatrixSimpleVectorStore
+
+
+def _nodes(count: int, dimensions: int = 16, seed: int = 0) -> list[TextNode]:
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(
+            id_=f"node-{i}",
+            text=f"node {i}",
+            embedding=rng.normal(size=dimensions).tolist(),
+        )
+        for i in range(count)
+    ]
+
+
+def _query(vector_store, embedding, k: int) -> tuple[list[str], list[float]]:
+    result = vector_store.query(
+        VectorStoreQuery(query_embedding=embedding, similarity_top_k=k)
+    )
+    return list(result.ids), list(result.similarities)
+
+
+def test_matrix_store_matches_simple_store():
+    nodes = _nodes(200)
+    simple_store = SimpleVectorStore()
+    matrix_store = MatrixSimpleVectorStore()
+    simple_store.add(nodes)
+    matrix_store.add(nodes)
+    rng = np.random.default_rng(1)
+    for _ in range(10):
+        embedding = rng.normal(size=16).tolist()
+        expected_ids, expected_scores = _query(simple_store, embedding, 10)
+        ids, scores = _query(matrix_store, embedding, 10)
+        assert ids == expected_ids
+        assert scores == pytest.approx(expected_scores, abs=1e-5)
+
+
+def test_matrix_store_tracks_changes():
+    nodes = _nodes(20)
+    matrix_store = MatrixSimpleVectorStore()
+    matrix_store.add(nodes[:10])
+    embedding = nodes[15].embedding
+    assert "node-15" not in _query(matrix_store, embedding, 3)[0]
+    matrix_store.add(nodes[10:])
+    assert _query(matrix_store, embedding, 3)[0][0] == "node-15"
+    matrix_store.delete_nodes(["node-15"])
+    assert "node-15" not in _query(matrix_store, embedding, 20)[0]
+    matrix_store.clear()
+    assert _query(matrix_store, embedding, 3) == ([], [])
+
+
+def test_batch_query_matches_single_queries():
+    matrix_store = MatrixSimpleVectorStore()
+    matrix_store.add(_nodes(50))
+    queries = np.random.default_rng(2).normal(size=(4, 16)).tolist()
+    batched = matrix_store.batch_query(queries, 5)
+    for query, result in zip(queries, batched):
+        ids, scores = _query(matrix_store, query, 5)
+        assert [node_id for node_id, _ in result] == ids
+        assert [score for _, score in result] == pytest.approx(scores)
+
+
+def test_top_k_indices_matches_full_sort():
+    scores = np.random.default_rng(3).normal(size=(5, 100)).astype(np.float32)
+    # ties keep the column order
+    scores[:, 10] = scores[:, 20] = scores[:, 30] = 10.0
+    indices, top_scores = top_k_indices(scores, 7)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :7]
+    assert np.array_equal(indices, order)
+    assert np.array_equal(top_scores, np.take_along_axis(scores, order, axis=1))
+    assert list(indices[0, :3]) == [10, 20, 30]
+    # k is capped at the column count
+    assert top_k_indices(scores[:, :4], 7)[0].shape == (5, 4)
+
+
+def test_embedding_matrix_edge_cases():
+    empty = EmbeddingMatrix([], np.empty((0, 4)))
+    assert empty.top_k([[1.0, 0.0, 0.0, 0.0]], 3) == [[]]
+    matrix = EmbeddingMatrix(["zero", "x"], [[0.0, 0.0], [2.0, 0.0]])
+    # zero embeddings stay zero instead of becoming NaN
+    assert matrix.top_k([3.0, 0.0], 2) == [[("x", 1.0), ("zero", 0.0)]]
+    assert matrix.top_k([1.0, 0.0], 0) == [[]]
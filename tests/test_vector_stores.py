@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import SimpleVectorStore, VectorStoreQuery
+from bcorag.similarity import (
+    normalize_rows,
+    quantize_rows,
+    quantized_scores,
+    recall_at_k,
+)
+from bcorag.vector_stores import LOCAL_VECTOR_STORES, missing_dependency
+
+DIMENSIONS = 16
+
+
+def _nodes(count: int, seed: int = 0) -> list[TextNode]:
+    rng = np.random.default_rng(seed)
+    nodes = []
+    for i in range(count):
+        node = TextNode(
+            id_=f"node-{i}",
+            text=f"node {i}",
+            embedding=rng.normal(size=DIMENSIONS).tolist(),
+        )
+        node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+            node_id=f"doc-{i % 5}"
+        )
+        nodes.append(node)
+    return nodes
+
+
+def _store(option: str, **kwargs):
+    if missing_dependency(option) is not None:
+        pytest.skip(f"{missing_dependency(option)} is not installed")
+    store_cls, store_kwargs = LOCAL_VECTOR_STORES[option]
+    return store_cls(**{**store_kwargs, **kwargs})
+
+
+def _ids(vector_store, embedding, k: int, **query_kwargs) -> list[str]:
+    return list(
+        vector_store.query(
+            VectorStoreQuery(
+                query_embedding=embedding, similarity_top_k=k, **query_kwargs
+            )
+        ).ids
+    )
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """The exact search results of `SimpleVectorStore` over 500 nodes."""
+    nodes = _nodes(500)
+    simple_store = SimpleVectorStore()
+    simple_store.add(nodes)
+    queries = np.random.default_rng(1).normal(size=(20, DIMENSIONS)).tolist()
+    results = [_ids(simple_store, query, 10) for query in queries]
+    return nodes, queries, results
+
+
+def test_numpy_flat_is_exact(reference):
+    nodes, queries, expected = reference
+    store = _store("NumpyFlatIndex")
+    store.add(nodes)
+    assert [_ids(store, query, 10) for query in queries] == expected
+    batched = store.batch_query(queries, 10)
+    assert [[node_id for node_id, _ in result] for result in batched] == expected
+
+
+@pytest.mark.parametrize(
+    "option, store_kwargs",
+    [
+        ("HNSWIndex", {}),
+        ("FaissFlatIndex", {}),
+        ("FaissIVFIndex", {"min_train_size": 200}),
+    ],
+)
+def test_approximate_stores_recall(reference, option, store_kwargs):
+    nodes, queries, expected = reference
+    store = _store(option, **store_kwargs)
+    store.add(nodes)
+    results = [_ids(store, query, 10) for query in queries]
+    assert recall_at_k(expected, results, 10) >= 0.9
+
+
+@pytest.mark.parametrize("option", ["NumpyFlatIndex", "HNSWIndex", "FaissFlatIndex"])
+def test_persist_round_trip(tmp_path, reference, option):
+    nodes, queries, _ = reference
+    store = _store(option)
+    store.add(nodes)
+    persist_path = str(tmp_path / "default__vector_store.json")
+    store.persist(persist_path)
+    store_cls, store_kwargs = LOCAL_VECTOR_STORES[option]
+    loaded = store_cls.from_persist_path(persist_path, **store_kwargs)
+    assert loaded.node_ids == store.node_ids
+    assert [_ids(loaded, query, 10) for query in queries] == [
+        _ids(store, query, 10) for query in queries
+    ]
+
+
+def test_delete_and_subset_queries():
+    nodes = _nodes(20)
+    store = _store("NumpyFlatIndex")
+    store.add(nodes)
+    embedding = nodes[3].embedding
+    assert _ids(store, embedding, 1) == ["node-3"]
+    # node 3 belongs to doc-3 along with node 8, 13 and 18
+    assert sorted(_ids(store, embedding, 20, doc_ids=["doc-3"])) == [
+        "node-13",
+        "node-18",
+        "node-3",
+        "node-8",
+    ]
+    assert _ids(store, embedding, 5, node_ids=["node-1", "node-2"]) in (
+        ["node-1", "node-2"],
+        ["node-2", "node-1"],
+    )
+    store.delete("doc-3")
+    assert len(store.node_ids) == 16
+    assert "node-3" not in _ids(store, embedding, 20)
+    store.delete_nodes([node_id for node_id in store.node_ids])
+    assert store.matrix is None
+    assert _ids(store, embedding, 5) == []
+
+
+@pytest.mark.parametrize("option", ["NumpyFlatIndex/float16", "NumpyFlatIndex/int8"])
+def test_quantized_stores(reference, option):
+    nodes, queries, expected = reference
+    store = _store(option)
+    store.add(nodes)
+    results = store.batch_query(queries, 10)
+    assert recall_at_k(expected, [[i for i, _ in r] for r in results], 10) >= 0.95
+    # the candidates are re-scored at full precision
+    exact = _store("NumpyFlatIndex")
+    exact.add(nodes)
+    exact_scores = dict(exact.batch_query(queries[:1], len(nodes))[0])
+    for node_id, score in results[0]:
+        assert score == pytest.approx(exact_scores[node_id], abs=1e-5)
+
+
+def test_quantize_rows():
+    matrix = normalize_rows(np.random.default_rng(4).normal(size=(50, DIMENSIONS)))
+    codes, scales = quantize_rows(matrix, "int8")
+    assert codes.dtype == np.int8 and scales is not None
+    assert np.abs(codes).max() == 127
+    assert np.allclose(codes * scales[:, None], matrix, atol=0.01)
+    queries = normalize_rows(np.random.default_rng(5).normal(size=(3, DIMENSIONS)))
+    assert np.allclose(
+        quantized_scores(queries, codes, scales), queries @ matrix.T, atol=0.02
+    )
+    codes, scales = quantize_rows(matrix, "float16")
+    assert codes.dtype == np.float16 and scales is None
+    with pytest.raises(ValueError):
+        quantize_rows(matrix, "int4")  # type: ignore